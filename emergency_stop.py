@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 Project Chimera 緊急停止スクリプト
-Manual Override機E - 全注斁EャンセルとシスチE停止
+Manual Override機能 - 全注文キャンセルとシステム停止
 """
 
 import sys
@@ -12,71 +12,81 @@ import time
 from datetime import datetime
 from src.shared_modules.config_loader import ConfigLoader
 from src.shared_modules.discord_logger import DiscordLogger
-from src.shared_modules.ib_connector import IBConnector
 
 class EmergencyStop:
     def __init__(self):
-        """緊急停止シスチEの初期匁E""
+        """緊急停止システムの初期化"""
         self.config = ConfigLoader()
         self.discord = DiscordLogger(self.config.get("discord_webhook_url"))
-        self.ib_connector = IBConnector()
+        self._ib_connector = None
         self.stop_flag_file = "STOP.flag"
     
+    @property
+    def ib_connector(self):
+        """IB接続（ibapiの読み込みは実際に停止するときまで遅延）"""
+        if self._ib_connector is None:
+            from src.shared_modules.ib_connector import IBConnector
+            self._ib_connector = IBConnector()
+        return self._ib_connector
+    
     def execute_emergency_stop(self, reason: str = "manual_override"):
-        """緊急停止を実衁E""
-        print("🚨 Project Chimera 緊急停止を実行しまぁE..")
+        """緊急停止を実行"""
+        print("🚨 Project Chimera 緊急停止を実行します...")
         
         try:
-            # 1. IB接続を確竁E            ib_config = self.config.get("ib_account")
+            # 1. IB接続を確立
+            ib_config = self.config.get("ib_account")
             if not self.ib_connector.connect_to_ib(
-                ib_config["host"], 
-                ib_config["port"], 
+                ib_config["host"],
+                ib_config["port"],
                 ib_config["client_id"]
             ):
-                print("⚠EEIB接続に失敗しました。注斁EャンセルをスキチEEします、E)
+                print("⚠️ IB接続に失敗しました。注文キャンセルをスキップします。")
             else:
-                # 2. 全注斁Eキャンセル
+                # 2. 全注文をキャンセル
                 self._cancel_all_orders()
             
-            # 3. STOP.flagを作E
+            # 3. STOP.flagを作成
             self._create_stop_flag(reason)
             
             # 4. DiscordにCRITICAL通知
             self._send_critical_notification(reason)
             
-            print("✁E緊急停止が完亁Eました")
-            print("📋 実行E容:")
-            print("   - 全注斁EEキャンセル")
-            print("   - STOP.flagの作E")
+            print("✅ 緊急停止が完了しました")
+            print("📋 実行内容:")
+            print("   - 全注文のキャンセル")
+            print("   - STOP.flagの作成")
             print("   - Discord通知の送信")
-            print("   - シスチEの停止")
+            print("   - システムの停止")
             
         except Exception as e:
-            print(f"❁E緊急停止実行中にエラーが発生しました: {e}")
-            # エラーが発生してもSTOP.flagは作E
+            print(f"❌ 緊急停止実行中にエラーが発生しました: {e}")
+            # エラーが発生してもSTOP.flagは作成
             self._create_stop_flag(f"emergency_stop_error: {str(e)}")
-        
+            
         finally:
-            # 5. IB接続を刁E
+            # 5. IB接続を切断
             try:
-                self.ib_connector.disconnect_from_ib()
+                if self._ib_connector is not None:
+                    self._ib_connector.disconnect_from_ib()
             except:
                 pass
     
     def _cancel_all_orders(self):
-        """全注斁Eキャンセル"""
+        """全注文をキャンセル"""
         try:
-            print("📋 全注斁EEキャンセルを開姁E..")
+            print("📋 全注文のキャンセルを開始...")
+            
+            # IB APIを使用して全注文をキャンセル
+            # 実装は後で詳細化（IB APIの注文キャンセル機能）
             
-            # IB APIを使用して全注斁Eキャンセル
-            # 実裁EE後で詳細化！EB APIの注斁Eャンセル機EEE            
-            print("✁E全注斁EEキャンセルが完亁Eました")
+            print("✅ 全注文のキャンセルが完了しました")
             
         except Exception as e:
-            print(f"⚠EE注斁Eャンセル中にエラーが発生しました: {e}")
+            print(f"⚠️ 注文キャンセル中にエラーが発生しました: {e}")
     
     def _create_stop_flag(self, reason: str):
-        """STOP.flagを作E"""
+        """STOP.flagを作成"""
         try:
             stop_data = {
                 "reason": reason,
@@ -88,24 +98,24 @@ class EmergencyStop:
             with open(self.stop_flag_file, "w", encoding="utf-8") as f:
                 json.dump(stop_data, f, ensure_ascii=False, indent=2)
             
-            print(f"🛑 STOP.flagを作Eしました: {reason}")
+            print(f"🛑 STOP.flagを作成しました: {reason}")
             
         except Exception as e:
-            print(f"❁ESTOP.flag作Eエラー: {e}")
+            print(f"❌ STOP.flag作成エラー: {e}")
     
     def _send_critical_notification(self, reason: str):
         """DiscordにCRITICAL通知を送信"""
         try:
             fields = [
-                {"name": "停止琁E", "value": reason, "inline": False},
+                {"name": "停止理由", "value": reason, "inline": False},
                 {"name": "実行時刻", "value": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "inline": True},
-                {"name": "実行老E, "value": "emergency_stop.py", "inline": True},
-                {"name": "スチEEタス", "value": "🚨 CRITICAL STOP", "inline": True}
+                {"name": "実行者", "value": "emergency_stop.py", "inline": True},
+                {"name": "ステータス", "value": "🚨 CRITICAL STOP", "inline": True}
             ]
             
             self.discord.send_message(
                 "🚨 【CRITICAL】Project Chimera 緊急停止",
-                "シスチEが緊急停止されました。E取引が停止されてぁEす、E,
+                "システムが緊急停止されました。全取引が停止されています。",
                 0xe74c3c,  # 赤色
                 fields
             )
@@ -113,29 +123,29 @@ class EmergencyStop:
             print("📢 Discord通知を送信しました")
             
         except Exception as e:
-            print(f"⚠EEDiscord通知送信エラー: {e}")
+            print(f"⚠️ Discord通知送信エラー: {e}")
     
     def check_stop_flag(self) -> bool:
-        """STOP.flagの存在をチェチE"""
+        """STOP.flagの存在をチェック"""
         return os.path.exists(self.stop_flag_file)
     
     def remove_stop_flag(self):
-        """STOP.flagを削除EシスチE再開時！E""
+        """STOP.flagを削除（システム再開時）"""
         try:
             if os.path.exists(self.stop_flag_file):
                 os.remove(self.stop_flag_file)
-                print("✁ESTOP.flagを削除しました")
+                print("✅ STOP.flagを削除しました")
                 
                 # 再開通知をDiscordに送信
-                self.discord.success("Project Chimera シスチE再開", "STOP.flagが削除され、シスチEがE開されました、E)
+                self.discord.success("Project Chimera システム再開", "STOP.flagが削除され、システムが再開されました。")
             else:
-                print("ℹEESTOP.flagは存在しません")
+                print("ℹ️ STOP.flagは存在しません")
                 
         except Exception as e:
-            print(f"❁ESTOP.flag削除エラー: {e}")
+            print(f"❌ STOP.flag削除エラー: {e}")
     
     def get_stop_flag_info(self) -> dict:
-        """STOP.flagの惁Eを取征E""
+        """STOP.flagの情報を取得"""
         try:
             if os.path.exists(self.stop_flag_file):
                 with open(self.stop_flag_file, "r", encoding="utf-8") as f:
@@ -143,40 +153,42 @@ class EmergencyStop:
             else:
                 return {}
         except Exception as e:
-            print(f"STOP.flag惁E取得エラー: {e}")
+            print(f"STOP.flag情報取得エラー: {e}")
             return {}
 
 def main():
     """メイン関数"""
     print("=" * 60)
-    print("🚨 Project Chimera 緊急停止シスチE")
+    print("🚨 Project Chimera 緊急停止システム")
     print("=" * 60)
     
     emergency_stop = EmergencyStop()
     
-    # 現在のSTOP.flag状況を確誁E    if emergency_stop.check_stop_flag():
-        print("⚠EESTOP.flagが既に存在しまぁE)
+    # 現在のSTOP.flag状況を確認
+    if emergency_stop.check_stop_flag():
+        print("⚠️ STOP.flagが既に存在します")
         flag_info = emergency_stop.get_stop_flag_info()
         if flag_info:
-            print(f"   停止琁E: {flag_info.get('reason', '不E')}")
-            print(f"   停止時刻: {flag_info.get('timestamp', '不E')}")
+            print(f"   停止理由: {flag_info.get('reason', '不明')}")
+            print(f"   停止時刻: {flag_info.get('timestamp', '不明')}")
         
-        choice = input("\\nSTOP.flagを削除してシスチEをE開しますかEE(y/n): ").lower()
+        choice = input("\nSTOP.flagを削除してシステムを再開しますか？ (y/n): ").lower()
         if choice == 'y':
             emergency_stop.remove_stop_flag()
         else:
             print("操作をキャンセルしました")
     else:
-        print("ℹEEシスチEは現在稼働中でぁE)
+        print("ℹ️ システムは現在稼働中です")
         
-        # 緊急停止の確誁E        print("\\n⚠EE緊急停止を実行すると以下が行われまぁE")
-        print("   - 全注斁EEキャンセル")
-        print("   - シスチEの完E停止")
+        # 緊急停止の確認
+        print("\n⚠️ 緊急停止を実行すると以下が行われます:")
+        print("   - 全注文のキャンセル")
+        print("   - システムの完全停止")
         print("   - Discord通知の送信")
         
-        choice = input("\\n緊急停止を実行しますかEE(y/n): ").lower()
+        choice = input("\n緊急停止を実行しますか？ (y/n): ").lower()
         if choice == 'y':
-            reason = input("停止琁EをE力してください (空白可): ").strip()
+            reason = input("停止理由を入力してください (空白可): ").strip()
             if not reason:
                 reason = "manual_override"
             
@@ -184,9 +196,9 @@ def main():
         else:
             print("操作をキャンセルしました")
     
-    print("\\n" + "=" * 60)
-    print("緊急停止シスチEを終亁EまぁE)
+    print("\n" + "=" * 60)
+    print("緊急停止システムを終了します")
     print("=" * 60)
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
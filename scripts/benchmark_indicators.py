@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Project Chimera 指標ベンチマーク
+
+src/shared_modules/indicators.py の指標と pandas の rolling（Bot の以前の計算方法）の実行時間と差を比べる。
+- backtest: 「銘柄 × 足」の全期間を一括計算（バックテスト・パラメータ探索）
+- live: 1銘柄の直近の足から最新の値だけを計算（Bot の1回の判定）
+
+使い方:
+    python scripts/benchmark_indicators.py
+    python scripts/benchmark_indicators.py --symbols 225 --bars 2520 --period 20 --repeat 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.shared_modules.indicators import atr, bollinger_bands, range_ratio  # noqa: E402
+
+
+def best_time(func, repeat: int) -> float:
+    """repeat 回実行した最短時間（秒）"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def pandas_bands(frame: pd.DataFrame, period: int, std_dev: float):
+    middle = frame.rolling(period).mean()
+    std = frame.rolling(period).std()
+    return middle + std * std_dev, middle, middle - std * std_dev
+
+
+def pandas_atr(high: pd.DataFrame, low: pd.DataFrame, close: pd.DataFrame, period: int):
+    previous = close.shift(1).fillna(close)
+    true_range = np.maximum(high - low, np.maximum((high - previous).abs(), (low - previous).abs()))
+    return true_range.rolling(period).mean()
+
+
+def pandas_range_ratio(high: pd.DataFrame, low: pd.DataFrame, window: int):
+    lowest = low.rolling(window).min()
+    return (high.rolling(window).max() - lowest) / lowest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project Chimera 指標ベンチマーク")
+    parser.add_argument("--symbols", type=int, default=225, help="銘柄数")
+    parser.add_argument("--bars", type=int, default=2520, help="足数")
+    parser.add_argument("--period", type=int, default=20, help="ボリンジャーバンド・ATR の期間")
+    parser.add_argument("--window", type=int, default=126, help="レンジ比率の期間")
+    parser.add_argument("--repeat", type=int, default=10, help="繰り返し回数（最短時間を表示）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(args.seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, (args.symbols, args.bars)), axis=1))
+    high = close * (1 + rng.uniform(0, 0.02, close.shape))
+    low = close * (1 - rng.uniform(0, 0.02, close.shape))
+    frames = [pd.DataFrame(values.T) for values in (close, high, low)]
+    
+    cases = [
+        ("bollinger", lambda: bollinger_bands(close, args.period, 2.0),
+         lambda: pandas_bands(frames[0], args.period, 2.0)),
+        ("atr", lambda: atr(high, low, close, args.period),
+         lambda: pandas_atr(frames[1], frames[2], frames[0], args.period)),
+        ("range_ratio", lambda: range_ratio(high, low, args.window),
+         lambda: pandas_range_ratio(frames[1], frames[2], args.window)),
+    ]
+    
+    print(f"backtest: {args.symbols}銘柄 × {args.bars}足（最短 / {args.repeat}回）")
+    for name, kernel, reference in cases:
+        kernel_time = best_time(kernel, args.repeat)
+        reference_time = best_time(reference, args.repeat)
+        ours = kernel()
+        theirs = reference()
+        ours = ours[1] if isinstance(ours, tuple) else ours
+        theirs = (theirs[1] if isinstance(theirs, tuple) else theirs).to_numpy().T
+        diff = np.nanmax(np.abs(ours - theirs))
+        print(f"  {name:<12} indicators {kernel_time * 1000:8.2f}ms  pandas {reference_time * 1000:8.2f}ms"
+              f"  {reference_time / kernel_time:5.1f}倍  最大差 {diff:.2e}")
+    
+    # Bot の1回の判定（以前は Series の rolling を平均と標準偏差で2回）
+    recent = close[0, -(args.period + 10):]
+    series = pd.Series(recent)
+    repeat = args.repeat * 100
+    kernel_time = best_time(lambda: bollinger_bands(recent, args.period, 2.0), repeat)
+    reference_time = best_time(
+        lambda: (series.rolling(window=args.period).mean().iloc[-1], series.rolling(window=args.period).std().iloc[-1]),
+        repeat
+    )
+    print(f"live: 1銘柄 × {len(recent)}足の最新値（最短 / {repeat}回）")
+    print(f"  {'bollinger':<12} indicators {kernel_time * 1e6:8.1f}µs  pandas {reference_time * 1e6:8.1f}µs"
+          f"  {reference_time / kernel_time:5.1f}倍")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Project Chimera 起動時間ベンチマーク
+
+各エントリーポイントを新しいPythonプロセスで繰り返し起動し、
+import + 初期化にかかる時間と、読み込まれた重い依存モジュールを表示する。
+子プロセスは設定ファイルだけを写した一時ディレクトリで実行する（状態ストア・台帳などをリポジトリに作らない）。
+
+使い方:
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --repeat 10 --target emergency_stop
+    python scripts/benchmark_startup.py --importtime --target emergency_stop
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 起動時に読み込まれていないことを確認したい重い依存
+HEAVY_MODULES = ["pandas", "numpy", "yfinance", "requests", "bs4", "ibapi"]
+
+TARGETS = {
+    "config_loader": (
+        "from src.shared_modules.config_loader import ConfigLoader\n"
+        "ConfigLoader()"
+    ),
+    "discord_logger": (
+        "from src.shared_modules.discord_logger import DiscordLogger\n"
+        "DiscordLogger('')"
+    ),
+    "emergency_stop": (
+        "import emergency_stop\n"
+        "stop = emergency_stop.EmergencyStop()\n"
+        "stop.check_stop_flag()"
+    ),
+    "main_controller": (
+        "from src.main_controller import MainController\n"
+        "MainController()"
+    ),
+}
+
+CHILD_TEMPLATE = """
+import contextlib, io, json, sys, time
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+{body}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"elapsed": elapsed, "heavy": heavy}}))
+"""
+
+
+def build_child_code(target: str) -> str:
+    """子プロセスで実行するコードを生成"""
+    body = "\n".join("    " + line for line in TARGETS[target].splitlines())
+    return CHILD_TEMPLATE.format(body=body, heavy=HEAVY_MODULES)
+
+
+def run_child(args) -> subprocess.CompletedProcess:
+    """一時ディレクトリを作業ディレクトリにして子プロセスを実行（設定ファイル・.env だけを写す）"""
+    with tempfile.TemporaryDirectory(prefix="chimera-bench-") as workdir:
+        os.makedirs(os.path.join(workdir, "src", "config"))
+        shutil.copy(os.path.join(PROJECT_ROOT, "src", "config", "config.yaml"),
+                    os.path.join(workdir, "src", "config", "config.yaml"))
+        if os.path.exists(os.path.join(PROJECT_ROOT, ".env")):
+            shutil.copy(os.path.join(PROJECT_ROOT, ".env"), workdir)
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [PROJECT_ROOT, env.get("PYTHONPATH")]))
+        return subprocess.run([sys.executable] + args, cwd=workdir, env=env, capture_output=True, text=True)
+
+
+def run_once(target: str) -> dict:
+    """新しいプロセスで1回起動して計測"""
+    start = time.perf_counter()
+    result = run_child(["-c", build_child_code(target)])
+    wall = time.perf_counter() - start
+    
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()
+        return {"error": error[-1] if error else f"exit code {result.returncode}"}
+    
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    data["wall"] = wall
+    return data
+
+
+def show_importtime(target: str, top: int):
+    """-X importtime の結果から累積時間の大きいモジュールを表示"""
+    result = run_child(["-X", "importtime", "-c", build_child_code(target)])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # 形式: "import time:  self [us] | cumulative | imported package"
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        rows.append((int(cumulative_us), int(self_us), name))
+    
+    print(f"\n[{target}] 累積import時間 上位{top}件")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name.strip()}")
+
+
+def benchmark(targets, repeat: int):
+    """各ターゲットの起動時間を計測して表示"""
+    print(f"{'target':<18}{'median':>10}{'min':>10}{'wall':>10}  heavy modules")
+    print("-" * 72)
+    for target in targets:
+        runs = [run_once(target) for _ in range(repeat)]
+        errors = [r["error"] for r in runs if "error" in r]
+        if errors:
+            print(f"{target:<18}{'-':>10}{'-':>10}{'-':>10}  エラー: {errors[0]}")
+            continue
+        
+        elapsed = [r["elapsed"] * 1000 for r in runs]
+        wall = [r["wall"] * 1000 for r in runs]
+        heavy = ", ".join(runs[-1]["heavy"]) or "(なし)"
+        print(
+            f"{target:<18}{statistics.median(elapsed):>8.1f}ms{min(elapsed):>8.1f}ms"
+            f"{statistics.median(wall):>8.1f}ms  {heavy}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project Chimera 起動時間ベンチマーク")
+    parser.add_argument("--target", action="append", choices=sorted(TARGETS), help="計測対象（複数指定可）")
+    parser.add_argument("--repeat", type=int, default=5, help="計測回数")
+    parser.add_argument("--importtime", action="store_true", help="-X importtime の上位モジュールを表示")
+    parser.add_argument("--top", type=int, default=15, help="importtime の表示件数")
+    args = parser.parse_args()
+    
+    targets = args.target or list(TARGETS)
+    benchmark(targets, args.repeat)
+    
+    if args.importtime:
+        for target in targets:
+            show_importtime(target, args.top)
+
+
+if __name__ == "__main__":
+    main()
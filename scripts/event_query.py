@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Project Chimera イベントジャーナル検索ツール
+
+events/ 以下の全ストリーム（main・gateway・worker-*）から、
+銘柄・戦略・種別・期間でイベントを絞り込んで表示する。
+
+使い方:
+    python scripts/event_query.py --symbol 7203 --since 7d
+    python scripts/event_query.py --strategy range --kind order --kind fill --since 2025-01-01 --until 2025-02-01
+    python scripts/event_query.py --kind error --limit 20 --json
+    python scripts/event_query.py --symbol 7203 --count
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.shared_modules.event_journal import EVENT_KINDS, EventJournalReader  # noqa: E402
+
+RELATIVE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_time(value: str) -> float:
+    """ISO形式の日時、または "30m" "2h" "7d" のような相対時間をUNIX時刻に変換"""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhdw])", value)
+    if match:
+        return time.time() - float(match.group(1)) * RELATIVE_UNITS[match.group(2)]
+    return datetime.fromisoformat(value).timestamp()
+
+
+def format_event(event: dict) -> str:
+    """1イベントを1行に整形"""
+    timestamp = datetime.fromtimestamp(event["ts"]).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    columns = [
+        timestamp,
+        f"{event['kind']:<12}",
+        f"{event['strategy'] or '-':<9}",
+        f"{event['symbol'] or '-':<6}",
+        f"{event['side'] or '-':<4}"
+    ]
+    if event["quantity"] is not None:
+        columns.append(f"qty={event['quantity']:g}")
+    if event["price"] is not None:
+        columns.append(f"@{event['price']:,.1f}")
+    if event["order_id"] is not None:
+        columns.append(f"order={event['order_id']}")
+    if event["details"]:
+        columns.append(json.dumps(event["details"], ensure_ascii=False))
+    return "  ".join(columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project Chimera イベントジャーナル検索")
+    parser.add_argument("--dir", default=os.path.join(PROJECT_ROOT, "events"), help="ジャーナルのディレクトリ")
+    parser.add_argument("--symbol", action="append", help="銘柄コード（複数指定可）")
+    parser.add_argument("--strategy", action="append", help="戦略名（複数指定可）")
+    parser.add_argument("--kind", action="append", choices=EVENT_KINDS, help="イベント種別（複数指定可）")
+    parser.add_argument("--since", type=parse_time, help="開始日時（ISO形式または 30m / 2h / 7d）")
+    parser.add_argument("--until", type=parse_time, help="終了日時（ISO形式または 30m / 2h / 7d）")
+    parser.add_argument("--limit", type=int, default=100, help="表示件数（新しい順に取得、0で全件）")
+    parser.add_argument("--count", action="store_true", help="件数だけ表示")
+    parser.add_argument("--json", action="store_true", help="JSON Linesで出力")
+    args = parser.parse_args()
+    
+    if not os.path.isdir(args.dir):
+        print(f"ジャーナルが見つかりません: {args.dir}")
+        sys.exit(1)
+    
+    reader = EventJournalReader(args.dir)
+    filters = dict(symbols=args.symbol, strategies=args.strategy, kinds=args.kind, start=args.since, end=args.until)
+    start = time.perf_counter()
+    
+    if args.count:
+        count = reader.count(**filters)
+        print(f"{count:,}件 ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        return
+    
+    events = reader.query(limit=args.limit or None, **filters)
+    elapsed = time.perf_counter() - start
+    for event in events:
+        print(json.dumps(event, ensure_ascii=False) if args.json else format_event(event))
+    if not args.json:
+        print(f"-- {len(events):,}件 / ストリーム: {', '.join(reader.streams) or '(なし)'} ({elapsed * 1000:.1f} ms)",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Project Chimera Profile Risk
+
+リスク診断のプロファイル（risk_assessment.profiles）ごとの想定リスクを、戦略ごとの過去の月次リターンの
+ブロック・ブートストラップで推定する（数千経路を1回の行列計算で評価）。
+
+使い方:
+    python scripts/profile_risk.py                                  # risk_assessment.returns_file を使用
+    python scripts/profile_risk.py --prices data/nikkei225_close.csv --save-returns data/sleeve_returns.csv
+    python scripts/profile_risk.py --synthetic 100 --years 20 --paths 20000 --horizon-years 20 --block-months 24
+"""
+
+import argparse
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from run_backtest import download_prices, load_prices, synthetic_prices  # noqa: E402
+from src.backtesting.monte_carlo import MonteCarloEngine  # noqa: E402
+from src.backtesting.portfolio_simulator import (  # noqa: E402
+    load_sleeve_returns, save_sleeve_returns, sleeve_returns_from_settings
+)
+from src.shared_modules.config_loader import ConfigLoader  # noqa: E402
+from src.shared_modules.risk_assessor import RiskAssessor  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project Chimera プロファイル別の想定リスク")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--returns", help="戦略ごとの月次リターンのCSV（既定は risk_assessment.returns_file）")
+    source.add_argument("--prices", help="終値のCSV/Parquet（行: 日付、列: 銘柄コード）")
+    source.add_argument("--download", action="store_true", help="yfinanceで終値を取得")
+    source.add_argument("--synthetic", type=int, metavar="N", help="N銘柄の疑似株価で実行（速度確認用）")
+    parser.add_argument("--symbols", nargs="+", help="--download で取得する銘柄コード")
+    parser.add_argument("--years", type=int, default=20, help="株価の期間（年）")
+    parser.add_argument("--cache", default=os.path.join(PROJECT_ROOT, "data", "close.csv"), help="取得した終値の保存先")
+    parser.add_argument("--config", default=os.path.join(PROJECT_ROOT, "src", "config", "config.yaml"))
+    parser.add_argument("--dividend-yield", type=float, help="高配当の分配金利回り（年率%%、既定は dividend_bot.min_dividend_yield）")
+    parser.add_argument("--paths", type=int, help="経路数（既定は risk_assessment.simulation_paths）")
+    parser.add_argument("--horizon-years", type=float, help="期間（年、既定は risk_assessment.horizon_years）")
+    parser.add_argument("--block-months", type=int, help="連続して抜き出す月数（既定は risk_assessment.block_months）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    parser.add_argument("--save-returns", help="月次リターンのCSV出力先（リスク診断で使うなら risk_assessment.returns_file）")
+    parser.add_argument("--metrics-out", help="プロファイルごとの指標のCSV出力先")
+    args = parser.parse_args()
+    
+    config = ConfigLoader(args.config)
+    settings = config.settings
+    risk_settings = settings.risk_assessment
+    
+    if args.prices or args.download or args.synthetic:
+        if args.prices:
+            prices = load_prices(args.prices)
+        elif args.download:
+            if not args.symbols:
+                parser.error("--download には --symbols が必要です")
+            prices = download_prices(args.symbols, args.years, args.cache)
+        else:
+            prices = synthetic_prices(args.synthetic, args.years)
+        sleeves = sleeve_returns_from_settings(prices, settings, args.dividend_yield)
+    else:
+        path = args.returns or risk_settings.returns_file
+        if not os.path.exists(path):
+            parser.error(f"月次リターンが見つかりません: {path}（--prices と --save-returns で作成できます）")
+        sleeves = load_sleeve_returns(path)
+    if args.save_returns:
+        save_sleeve_returns(args.save_returns, sleeves)
+        print(f"月次リターンを保存しました: {args.save_returns}")
+    
+    returns = sleeves["returns"]
+    engine = MonteCarloEngine(
+        returns,
+        n_paths=args.paths or risk_settings.simulation_paths,
+        horizon_months=round((args.horizon_years or risk_settings.horizon_years) * 12),
+        block_months=args.block_months or risk_settings.block_months,
+        seed=args.seed
+    )
+    start = time.perf_counter()
+    result = engine.simulate(RiskAssessor(config).risk_profiles)
+    metrics = result.metrics()
+    elapsed = time.perf_counter() - start
+    
+    print(f"月次リターン: {len(returns)}ヶ月 ({returns.index[0]:%Y-%m} ～ {returns.index[-1]:%Y-%m})")
+    print(result.summary())
+    print(f"実行時間: {elapsed:.2f}秒")
+    if args.metrics_out:
+        metrics.to_csv(args.metrics_out)
+
+
+if __name__ == "__main__":
+    main()
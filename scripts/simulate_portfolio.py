@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Project Chimera Portfolio Simulator
+
+3戦略の月次積立・リバランス・NISA枠・口座の振り分けを、履歴の全ての開始月について同時にシミュレーションする。
+既定値（目標比率・積立額・NISA枠・NISAで買う戦略）は config.yaml。
+
+使い方:
+    python scripts/simulate_portfolio.py --prices data/nikkei225_close.csv --horizon-years 10
+    python scripts/simulate_portfolio.py --synthetic 100 --years 20 --monthly 150000 --horizon-years 10
+    python scripts/simulate_portfolio.py --returns data/sleeve_returns.csv --monthly 100000 --horizon-years 30 --wrap
+    python scripts/simulate_portfolio.py --prices data/nikkei225_close.csv --save-returns data/sleeve_returns.csv
+
+--prices / --synthetic では、インデックスは index_bot.ticker の終値（無ければ全銘柄の平均）、
+高配当は全銘柄の平均 + --dividend-yield の分配金、レンジは RangeBacktester の資産曲線を月次リターンにする。
+--returns は月次リターンのCSV（列: index, dividend, range、分配金は任意で index_income などの列に月率で）。
+"""
+
+import argparse
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from run_backtest import download_prices, load_prices, synthetic_prices  # noqa: E402
+from src.backtesting.portfolio_simulator import (  # noqa: E402
+    PortfolioSimulator, load_sleeve_returns, save_sleeve_returns, sleeve_returns_from_settings
+)
+from src.shared_modules.config_loader import ConfigLoader  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project Chimera ポートフォリオ・シミュレーション")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--prices", help="終値のCSV/Parquet（行: 日付、列: 銘柄コード）")
+    source.add_argument("--download", action="store_true", help="yfinanceで終値を取得")
+    source.add_argument("--synthetic", type=int, metavar="N", help="N銘柄の疑似株価で実行（速度確認用）")
+    source.add_argument("--returns", help="戦略ごとの月次リターンのCSV")
+    parser.add_argument("--symbols", nargs="+", help="--download で取得する銘柄コード")
+    parser.add_argument("--years", type=int, default=20, help="株価の期間（年）")
+    parser.add_argument("--cache", default=os.path.join(PROJECT_ROOT, "data", "close.csv"), help="取得した終値の保存先")
+    parser.add_argument("--config", default=os.path.join(PROJECT_ROOT, "src", "config", "config.yaml"))
+    parser.add_argument("--horizon-years", type=float, default=10.0, help="シミュレーション期間（年）")
+    parser.add_argument("--wrap", action="store_true", help="履歴の最後から先頭に戻って全ての月を開始月にする")
+    parser.add_argument("--monthly", type=float, help="リバランスで配分する毎月の積立額（既定は index_bot.monthly_investment）")
+    parser.add_argument("--index-monthly", type=float, help="インデックスBotの毎月の積立額（既定は --monthly と同じ）")
+    parser.add_argument("--profile", help="目標比率に使うリスクプロファイル（既定は rebalance.risk_profile）")
+    parser.add_argument("--dividend-yield", type=float, help="高配当の分配金利回り（年率%%、既定は dividend_bot.min_dividend_yield）")
+    parser.add_argument("--index-yield", type=float, default=0.0, help="インデックスの分配金利回り（年率%%）")
+    parser.add_argument("--results-out", help="開始月ごとの結果のCSV出力先")
+    parser.add_argument("--save-returns", help="戦略ごとの月次リターンのCSV出力先（--returns・リスク診断で使える形式）")
+    args = parser.parse_args()
+    
+    config = ConfigLoader(args.config)
+    settings = config.settings
+    
+    if args.returns:
+        sleeves = load_sleeve_returns(args.returns)
+    else:
+        if args.prices:
+            prices = load_prices(args.prices)
+        elif args.download:
+            if not args.symbols:
+                parser.error("--download には --symbols が必要です")
+            prices = download_prices(args.symbols, args.years, args.cache)
+        else:
+            prices = synthetic_prices(args.synthetic, args.years)
+        sleeves = sleeve_returns_from_settings(prices, settings, args.dividend_yield, args.index_yield)
+    if args.save_returns:
+        save_sleeve_returns(args.save_returns, sleeves)
+        print(f"月次リターンを保存しました: {args.save_returns}")
+    
+    overrides = {}
+    if args.monthly is not None:
+        overrides["monthly_investment"] = args.monthly
+        overrides["index_monthly_investment"] = args.monthly
+    if args.index_monthly is not None:
+        overrides["index_monthly_investment"] = args.index_monthly
+    if args.profile:
+        from src.shared_modules.risk_assessor import RiskAssessor
+        overrides["target_ratios"] = RiskAssessor(config).get_portfolio_ratios(args.profile)
+    simulator = PortfolioSimulator.from_config(config, **overrides)
+    
+    months = round(args.horizon_years * 12)
+    if not args.wrap and months > len(sleeves["returns"]):
+        parser.error(f"履歴（{len(sleeves['returns'])}ヶ月）がシミュレーション期間より短いです（--wrap で循環させられます）")
+    
+    start = time.perf_counter()
+    result = simulator.run(sleeves["returns"], months, sleeves["income"], wrap=args.wrap)
+    elapsed = time.perf_counter() - start
+    
+    ratios = ", ".join(f"{s} {r:.0%}" for s, r in zip(simulator.strategies, simulator.target_ratios))
+    print(f"目標比率: {ratios}  積立: インデックス {simulator.index_monthly_investment:,.0f}円"
+          f" + リバランス {simulator.monthly_investment:,.0f}円 / 月")
+    print(result.summary())
+    print(f"実行時間: {elapsed:.2f}秒")
+    
+    if args.results_out:
+        result.frame().to_csv(args.results_out, index=False)
+
+
+if __name__ == "__main__":
+    main()
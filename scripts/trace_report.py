@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Project Chimera Trace Report
+
+トレース（tracing）が書き出したスパンを全プロセス分まとめ、シグナルから注文・約定までの段階ごとの
+件数・百分位（p50/p90/p99）・最大・平均・合計を表示する。
+Chrome のトレース形式（chrome://tracing・Perfetto・speedscope）や folded 形式（flamegraph.pl）にも書き出せる。
+
+使い方:
+    python scripts/trace_report.py
+    python scripts/trace_report.py --chrome traces.json --folded traces.folded
+    python scripts/trace_report.py --trace 3f2a9c0d1e4b5a67
+"""
+
+import argparse
+import json
+import os
+import sys
+import unicodedata
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.shared_modules.tracing import chrome_trace, folded_stacks, read_spans, stage_summary  # noqa: E402
+
+
+def _width(text: str) -> int:
+    return sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
+
+
+def _pad(text: str, width: int) -> str:
+    """全角文字を2桁として左寄せ"""
+    return text + " " * max(width - _width(text), 0)
+
+
+def _rjust(text: str, width: int) -> str:
+    """全角文字を2桁として右寄せ"""
+    return " " * max(width - _width(text), 0) + text
+
+
+def print_summary(spans):
+    summary = stage_summary(spans)
+    traces = len({span["trace"] for span in spans})
+    print(f"{len(spans):,}スパン / {traces:,}トレース（単位: ms）")
+    print("  " + _pad("段階", 28) + "".join(_rjust(label, 10) for label in
+                                            ("件数", "p50", "p90", "p99", "最大", "平均", "合計")))
+    for name, stats in sorted(summary.items(), key=lambda item: -item[1]["total"]):
+        print("  " + _pad(name, 28) + f"{stats['count']:>10,}" + "".join(
+            f"{stats[key]:>10,.3f}" for key in ("p50", "p90", "p99", "max", "mean", "total")))
+
+
+def print_trace(spans, trace_id):
+    """1つのトレースをツリー表示（開始からの経過ms・所要ms）"""
+    spans = [span for span in spans if span["trace"] == trace_id]
+    if not spans:
+        print(f"トレースが見つかりません: {trace_id}")
+        return
+    origin = spans[0]["start_ns"]
+    children = {}
+    for span in spans:
+        children.setdefault(span["parent"], []).append(span)
+    ids = {span["span"] for span in spans}
+    
+    def walk(span, depth):
+        attrs = " ".join(f"{key}={value}" for key, value in span["attrs"].items())
+        print(f"  {(span['start_ns'] - origin) / 1e6:>10,.3f} {span['duration_ns'] / 1e6:>10,.3f}  "
+              f"{'  ' * depth}{span['name']}  [{span['thread']}] {attrs}")
+        for child in children.get(span["span"], []):
+            walk(child, depth + 1)
+    
+    print(f"  {_rjust('開始', 10)} {_rjust('所要', 10)}  段階")
+    for span in spans:
+        if span["parent"] not in ids:
+            walk(span, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project Chimera 段階ごとの所要時間")
+    parser.add_argument("--dir", default=os.path.join(PROJECT_ROOT, "traces"), help="書き出し先（tracing.directory）")
+    parser.add_argument("--trace", metavar="ID", help="表の代わりにこのトレースをツリー表示")
+    parser.add_argument("--chrome", metavar="PATH", help="Chrome のトレース形式（JSON）で書き出す")
+    parser.add_argument("--folded", metavar="PATH", help="folded 形式（フレームグラフ用）で書き出す")
+    args = parser.parse_args()
+    
+    spans = read_spans(args.dir)
+    if not spans:
+        print(f"記録がありません: {args.dir}")
+        return
+    if args.trace:
+        print_trace(spans, args.trace)
+    else:
+        print_summary(spans)
+    
+    if args.chrome:
+        with open(args.chrome, "w", encoding="utf-8") as f:
+            json.dump(chrome_trace(spans), f, ensure_ascii=False)
+        print(f"Chrome 形式で書き出しました: {args.chrome}")
+    if args.folded:
+        with open(args.folded, "w", encoding="utf-8") as f:
+            f.write("\n".join(folded_stacks(spans)) + "\n")
+        print(f"folded 形式で書き出しました: {args.folded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Project Chimera Walk-Forward Analysis
+
+学習期間でパラメータを選び、直後の検証期間で成績を測ることを期間をずらしながら繰り返し、
+アウトオブサンプル（検証期間だけをつないだ）成績を報告する。
+移動平均・標準偏差・レンジ比率は窓の長さごとに1度だけ計算し、全フォールド・全パラメータで使い回す。
+
+使い方:
+    python scripts/walk_forward.py --prices data/nikkei225_close.csv --strategy range
+    python scripts/walk_forward.py --prices data/nikkei225_close.csv --fundamentals data/fundamentals.csv
+    python scripts/walk_forward.py --synthetic 225 --years 10 --budget 60 --report-out walk_forward.csv
+
+--fundamentals は縦持ちのCSV（列: date, symbol, dividend_yield, per, equity_ratio）。
+各日付の値は「その日に分かっていた値」であること（決算発表日で記録し、次の発表まで前方補完する）。
+高配当Botの検証には必須（--synthetic では疑似的な財務データを生成）。
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from run_backtest import download_prices, load_prices, synthetic_prices  # noqa: E402
+from src.backtesting.backtest_engine import TRADING_DAYS_PER_YEAR  # noqa: E402
+from src.backtesting.optimizer import OBJECTIVES, ParameterSpace  # noqa: E402
+from src.backtesting.walk_forward import DividendStrategy, RangeStrategy, WalkForward  # noqa: E402
+from src.shared_modules.config_loader import ConfigLoader  # noqa: E402
+
+DEFAULT_RANGE_PARAMETERS = [
+    "bollinger_period=10,15,20,25,30",
+    "bollinger_std_dev=1.5,2.0,2.5,3.0",
+    "stop_loss_percentage_on_break=0.01,0.02,0.03,0.05"
+]
+DEFAULT_DIVIDEND_PARAMETERS = [
+    "min_dividend_yield=3.0,3.5,4.0,4.5",
+    "max_per=15,20,25",
+    "ma_period=20,25,50,75"
+]
+FUNDAMENTAL_FIELDS = ("dividend_yield", "per", "equity_ratio")
+
+
+def load_fundamentals(path: str, prices: pd.DataFrame) -> dict:
+    """縦持ちの財務データを終値と同じ並び（銘柄 × 足）の行列にする（発表日以降に前方補完）"""
+    data = pd.read_csv(path, parse_dates=["date"], dtype={"symbol": str})
+    fundamentals = {}
+    for field in FUNDAMENTAL_FIELDS:
+        if field not in data.columns:
+            continue
+        table = data.pivot_table(index="date", columns="symbol", values=field, aggfunc="last")
+        table = table.reindex(table.index.union(prices.index)).sort_index().ffill()
+        fundamentals[field] = table.reindex(index=prices.index, columns=prices.columns).to_numpy(dtype=float).T
+    missing = {"dividend_yield", "per"} - set(fundamentals)
+    if missing:
+        raise ValueError(f"財務データに必要な列がありません: {sorted(missing)}")
+    return fundamentals
+
+
+def synthetic_fundamentals(prices: pd.DataFrame, seed: int = 0) -> dict:
+    """速度確認用の疑似財務データ（利回り・PER・自己資本比率がゆっくり変動する）"""
+    rng = np.random.default_rng(seed)
+    n_symbols, n_bars = prices.shape[1], prices.shape[0]
+    
+    def walk(start, scale, low, high):
+        steps = rng.normal(0, scale, (n_symbols, n_bars))
+        return np.clip(start[:, None] + np.cumsum(steps, axis=1), low, high)
+    
+    return {
+        "dividend_yield": walk(rng.uniform(1.0, 5.0, n_symbols), 0.02, 0.0, 10.0),
+        "per": walk(rng.uniform(8.0, 35.0, n_symbols), 0.1, 3.0, 80.0),
+        "equity_ratio": walk(rng.uniform(20.0, 70.0, n_symbols), 0.05, 5.0, 95.0)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project Chimera ウォークフォワード分析")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--prices", help="終値のCSV/Parquet（行: 日付、列: 銘柄コード）")
+    source.add_argument("--download", action="store_true", help="yfinanceで終値を取得")
+    source.add_argument("--synthetic", type=int, metavar="N", help="N銘柄の疑似株価・財務データで実行（速度確認用）")
+    parser.add_argument("--symbols", nargs="+", help="--download で取得する銘柄コード")
+    parser.add_argument("--years", type=int, default=10, help="期間（年）")
+    parser.add_argument("--cache", default=os.path.join(PROJECT_ROOT, "data", "close.csv"), help="取得した終値の保存先")
+    parser.add_argument("--fundamentals", help="財務データのCSV（高配当Botの検証に必要）")
+    parser.add_argument("--config", default=os.path.join(PROJECT_ROOT, "src", "config", "config.yaml"))
+    parser.add_argument("--strategy", choices=("range", "dividend", "all"), default="all", help="検証するBot")
+    parser.add_argument("--train-years", type=float, default=2.0, help="学習期間（年）")
+    parser.add_argument("--test-months", type=float, default=6.0, help="検証期間（月）")
+    parser.add_argument("--anchored", action="store_true", help="学習期間の開始を固定して伸ばしていく")
+    parser.add_argument("--method", choices=("grid", "random"), default="grid", help="学習期間での探索方法")
+    parser.add_argument("--samples", type=int, default=50, help="random の評価数（フォールドごと）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="sharpe", help="最大化する指標")
+    parser.add_argument("--budget", type=float, default=60.0, help="実行時間の上限（秒）")
+    parser.add_argument("--range-param", action="append", help="レンジ取引Botの探索パラメータ（複数指定可）")
+    parser.add_argument("--dividend-param", action="append", help="高配当Botの探索パラメータ（複数指定可）")
+    parser.add_argument("--min-trades", type=int, default=10, help="レンジ取引Botで採用する最少取引数（学習期間）")
+    parser.add_argument("--lot-size", type=int, default=100, help="レンジ取引Botの1回の購入株数")
+    parser.add_argument("--commission", type=float, default=0.0, help="売買手数料率")
+    parser.add_argument("--cash", type=float, default=10_000_000, help="初期資金")
+    parser.add_argument("--screen", action="store_true", help="直近6ヶ月のレンジ比率が0.25以下の銘柄だけ購入")
+    parser.add_argument("--report-out", help="フォールドごとの結果のCSV出力先")
+    parser.add_argument("--equity-out", help="アウトオブサンプルの資産曲線のCSV出力先")
+    args = parser.parse_args()
+    
+    if args.prices:
+        prices = load_prices(args.prices)
+    elif args.download:
+        if not args.symbols:
+            parser.error("--download には --symbols が必要です")
+        prices = download_prices(args.symbols, args.years, args.cache)
+    else:
+        prices = synthetic_prices(args.synthetic, args.years)
+    
+    config = ConfigLoader(args.config)
+    strategies = []
+    if args.strategy in ("range", "all"):
+        range_settings = config.settings.range_bot
+        space = ParameterSpace.parse(args.range_param or DEFAULT_RANGE_PARAMETERS)
+        fixed = {
+            "bollinger_period": range_settings.bollinger_period,
+            "bollinger_std_dev": range_settings.bollinger_std_dev,
+            "stop_loss_percentage_on_break": range_settings.stop_loss_percentage_on_break,
+            "lot_size": args.lot_size,
+            "commission_rate": args.commission
+        }
+        strategies.append(RangeStrategy(space, screen=args.screen, min_trades=args.min_trades,
+                                        **{key: value for key, value in fixed.items() if key not in space.names}))
+    if args.strategy in ("dividend", "all"):
+        if args.fundamentals:
+            fundamentals = load_fundamentals(args.fundamentals, prices)
+        elif args.synthetic:
+            fundamentals = synthetic_fundamentals(prices, args.seed)
+        elif args.strategy == "dividend":
+            parser.error("高配当Botの検証には --fundamentals が必要です")
+        else:
+            fundamentals = None
+            print("財務データが無いため高配当Botは対象外です（--fundamentals を指定してください）")
+        if fundamentals is not None:
+            dividend_settings = config.settings.dividend_bot
+            space = ParameterSpace.parse(args.dividend_param or DEFAULT_DIVIDEND_PARAMETERS)
+            fixed = {
+                "max_holding_stocks": dividend_settings.max_holding_stocks,
+                "min_dividend_yield": dividend_settings.min_dividend_yield,
+                "min_equity_ratio": dividend_settings.min_equity_ratio,
+                "max_per": dividend_settings.max_per,
+                "ma_period": dividend_settings.ma_period,
+                "purchase_amount": dividend_settings.purchase_amount,
+                "commission_rate": args.commission
+            }
+            strategies.append(DividendStrategy(fundamentals, space,
+                                               **{key: value for key, value in fixed.items() if key not in space.names}))
+    
+    walk_forward = WalkForward(
+        prices, strategies,
+        train_bars=round(args.train_years * TRADING_DAYS_PER_YEAR),
+        test_bars=round(args.test_months * TRADING_DAYS_PER_YEAR / 12),
+        anchored=args.anchored, method=args.method, samples=args.samples, objective=args.objective,
+        time_budget_seconds=args.budget, seed=args.seed, initial_cash=args.cash
+    )
+    if not walk_forward.folds():
+        parser.error("学習期間と検証期間に対して株価の期間が短すぎます")
+    report = walk_forward.run()
+    
+    print(f"{prices.shape[1]}銘柄 × {prices.shape[0]}日 ({prices.index[0]:%Y-%m-%d} ～ {prices.index[-1]:%Y-%m-%d})")
+    print(report.summary())
+    
+    if args.report_out:
+        report.folds.to_csv(args.report_out, index=False)
+    if args.equity_out:
+        pd.DataFrame(report.equity).to_csv(args.equity_out)
+
+
+if __name__ == "__main__":
+    main()
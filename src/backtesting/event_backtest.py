@@ -0,0 +1,777 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+イベント駆動バックテストモジュール
+
+本番と同じ CoreIndexBot / SatelliteDividendBot / SatelliteRangeBot を変更せずに動かし、
+MainController のcronスケジュールを疑似時計で再生する。
+- IB接続: SimulatedIBConnector（発注前ゲートを通したうえで現在値で即時約定）
+- 株価・財務: HistoricalDataSource（Botから見える yfinance を差し替え、当日分は場中の値まで）
+- Discord: CapturingDiscord（送信せずメモリに記録）
+- 時刻: SimulatedClock（NISA台帳・状態ストアの datetime を疑似時計に差し替え）
+
+高速化のため、株価は quote_interval_minutes 分ごとにしか変わらないものとし、
+株価・約定・スクリーニング結果のいずれも変わっていない分足ジョブは実行を省略する
+（入力が同じなら判断も同じになるため、売買結果は変わらない）。
+"""
+
+import bisect
+import copy
+import heapq
+import itertools
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from src.backtesting.backtest_engine import compute_metrics
+from src.main_controller import MainController
+from src.shared_modules.config_loader import ConfigLoader
+from src.shared_modules.discord_logger import DiscordLogger
+from src.shared_modules.event_journal import open_event_journal
+from src.shared_modules.job_metrics import JobMetrics
+from src.shared_modules.nisa_monitor import NISAMonitor
+from src.shared_modules.position_journal import PositionJournal
+from src.shared_modules.pre_trade_gate import build_pre_trade_gate
+from src.shared_modules.screening_registry import ScreeningRegistry
+from src.shared_modules.state_store import StateStore
+
+SESSION_OPEN = dtime(9, 0)
+SESSION_CLOSE = dtime(15, 0)
+
+# 疑似時計で datetime.now() / date.today() を差し替えるモジュール
+CLOCK_PATCHED_MODULES = (
+    "src.shared_modules.nisa_ledger",
+    "src.shared_modules.nisa_monitor",
+    "src.shared_modules.state_store"
+)
+
+class SimulatedClock:
+    """バックテスト中の現在時刻"""
+    
+    def __init__(self, start: datetime):
+        self.current = start
+    
+    def now(self) -> datetime:
+        return self.current
+    
+    def timestamp(self) -> float:
+        """現在時刻のUNIX時刻（イベントジャーナルの記録時刻用）"""
+        return self.current.timestamp()
+    
+    def set(self, value: datetime):
+        self.current = value
+    
+    @contextmanager
+    def patch(self, module_names: Iterable[str] = CLOCK_PATCHED_MODULES):
+        """モジュールの datetime / date を疑似時計を返すものに差し替える"""
+        import importlib
+        
+        clock = self
+        
+        class SimulatedDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return clock.current if tz is None else clock.current.replace(tzinfo=tz)
+        
+        class SimulatedDate(date):
+            @classmethod
+            def today(cls):
+                return clock.current.date()
+        
+        originals = []
+        try:
+            for name in module_names:
+                module = importlib.import_module(name)
+                for attr, replacement in (("datetime", SimulatedDatetime), ("date", SimulatedDate)):
+                    if getattr(module, attr, None) in (datetime, date):
+                        originals.append((module, attr, getattr(module, attr)))
+                        setattr(module, attr, replacement)
+            yield self
+        finally:
+            for module, attr, original in originals:
+                setattr(module, attr, original)
+
+
+class HistoricalDataSource:
+    """日足（行: 日付、列: Open/High/Low/Close/Volume）から、疑似時刻における株価と履歴を返す
+
+    場中（9:00～15:00）の株価は始値から終値へ quote_interval_minutes 分刻みで直線的に動くものとし、
+    当日の足は場中の値まで（高値・安値も始値と現在値の範囲）しか見せない。
+    """
+    
+    def __init__(self, bars: Dict[str, pd.DataFrame], clock: SimulatedClock,
+                 fundamentals: Optional[Dict[str, Dict]] = None, quote_interval_minutes: int = 5):
+        self.clock = clock
+        self.fundamentals = {str(symbol): dict(info) for symbol, info in (fundamentals or {}).items()}
+        self.quote_interval_minutes = max(1, int(quote_interval_minutes))
+        self.bars = {}
+        self._dates = {}
+        self._values = {}
+        for symbol, frame in bars.items():
+            frame = frame.sort_index()
+            frame.index = pd.DatetimeIndex(frame.index).normalize()
+            self.bars[str(symbol)] = frame[["Open", "High", "Low", "Close", "Volume"]].astype(float)
+            self._dates[str(symbol)] = frame.index.to_numpy(dtype="datetime64[D]")
+            self._values[str(symbol)] = self.bars[str(symbol)].to_numpy()
+        self._cache = {}
+        self._cache_version = None
+        self._period_start_dates = {}
+    
+    @classmethod
+    def from_close(cls, close: pd.DataFrame, clock: SimulatedClock, **kwargs) -> "HistoricalDataSource":
+        """終値の表（行: 日付、列: 銘柄）から作成（始値・高値・安値も終値で代用）"""
+        bars = {}
+        for symbol in close.columns:
+            series = close[symbol].dropna()
+            bars[str(symbol)] = pd.DataFrame({
+                "Open": series, "High": series, "Low": series, "Close": series, "Volume": 0.0
+            })
+        return cls(bars, clock, **kwargs)
+    
+    def trading_days(self) -> pd.DatetimeIndex:
+        """いずれかの銘柄に足がある日"""
+        dates = sorted(set().union(*(frame.index for frame in self.bars.values()))) if self.bars else []
+        return pd.DatetimeIndex(dates)
+    
+    @property
+    def version(self):
+        """株価が変わる単位（日付・場中の刻み）。同じ値の間は株価も履歴も変わらない"""
+        now = self.clock.now()
+        minutes = (now.hour - SESSION_OPEN.hour) * 60 + now.minute - SESSION_OPEN.minute
+        session_minutes = (SESSION_CLOSE.hour - SESSION_OPEN.hour) * 60
+        if minutes < 0:
+            bucket = -1
+        elif minutes >= session_minutes:
+            bucket = session_minutes
+        else:
+            bucket = minutes // self.quote_interval_minutes * self.quote_interval_minutes
+        return now.date(), bucket
+    
+    def _today_bar(self, symbol: str):
+        """(当日までの足数, 当日の足を含むか, 当日足の進み具合 0～1)"""
+        day, bucket = self.version
+        dates = self._dates[symbol]
+        end = int(np.searchsorted(dates, np.datetime64(day, "D"), side="right"))
+        has_today = end > 0 and dates[end - 1] == np.datetime64(day, "D")
+        if has_today and bucket < 0:
+            return end - 1, False, 0.0
+        session_minutes = (SESSION_CLOSE.hour - SESSION_OPEN.hour) * 60
+        return end, has_today, min(1.0, bucket / session_minutes) if has_today else 1.0
+    
+    def price(self, symbol) -> float:
+        """現在値（データが無ければ0）"""
+        symbol = str(symbol)
+        if symbol not in self.bars:
+            return 0.0
+        end, has_today, progress = self._today_bar(symbol)
+        if end == 0:
+            return 0.0
+        open_, close = self._values[symbol][end - 1, [0, 3]]
+        if has_today and progress < 1.0:
+            return float(open_ + (close - open_) * progress)
+        return float(close)
+    
+    def history(self, symbol, period: str = "1mo") -> pd.DataFrame:
+        """yfinance の Ticker.history(period=...) 相当（期間は暦日、当日は場中の値まで）"""
+        symbol = str(symbol)
+        version = self.version
+        if version != self._cache_version:
+            self._cache.clear()
+            self._cache_version = version
+        key = (symbol, period)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        
+        if symbol not in self.bars:
+            frame = pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"], dtype=float)
+        else:
+            end, has_today, progress = self._today_bar(symbol)
+            start = self._period_start(symbol, end, period)
+            frame = self.bars[symbol].iloc[start:end]
+            if has_today and progress < 1.0:
+                # 当日の足は高値・安値・終値を場中の値に置き換える
+                values = frame.to_numpy(copy=True)
+                price = self.price(symbol)
+                open_ = values[-1, 0]
+                values[-1, 1:4] = max(open_, price), min(open_, price), price
+                frame = pd.DataFrame(values, index=frame.index, columns=frame.columns)
+        self._cache[key] = frame
+        return frame
+    
+    def _period_start(self, symbol: str, end: int, period: str) -> int:
+        """期間の開始位置（暦日で数える。該当する足が無ければ直近1本）"""
+        if period in ("max", None) or end == 0:
+            return 0
+        today = self.clock.now().date()
+        start_date = self._period_start_dates.get((today, period))
+        if start_date is None:
+            match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+            if period == "ytd":
+                start_date = np.datetime64(date(today.year, 1, 1), "D") - 1
+            elif match:
+                count, unit = int(match.group(1)), match.group(2)
+                offset = {"d": pd.DateOffset(days=count), "wk": pd.DateOffset(weeks=count),
+                          "mo": pd.DateOffset(months=count), "y": pd.DateOffset(years=count)}[unit]
+                start_date = np.datetime64((pd.Timestamp(today) - offset).date(), "D")
+            else:
+                raise ValueError(f"未対応の期間です: {period}")
+            self._period_start_dates[(today, period)] = start_date
+        start = int(np.searchsorted(self._dates[symbol], start_date, side="right"))
+        return min(start, end - 1)
+    
+    def info(self, symbol) -> Dict:
+        """yfinance の Ticker.info 相当（与えられた財務データ）"""
+        return dict(self.fundamentals.get(str(symbol), {}))
+
+
+class SimulatedTicker:
+    def __init__(self, source: HistoricalDataSource, symbol: str):
+        self.source = source
+        self.symbol = symbol
+    
+    def history(self, period="1mo", **kwargs):
+        return self.source.history(self.symbol, period)
+    
+    @property
+    def info(self):
+        return self.source.info(self.symbol)
+
+
+class SimulatedYFinance:
+    """Botモジュールの yf の代わりに置く（"7203.T" のような東証ティッカーを受け付ける）"""
+    
+    def __init__(self, source: HistoricalDataSource):
+        self.source = source
+    
+    def Ticker(self, ticker: str) -> SimulatedTicker:
+        return SimulatedTicker(self.source, ticker[:-2] if ticker.endswith(".T") else ticker)
+
+
+class SimulatedIBConnector:
+    """IBConnector と同じインターフェースの疑似ブローカー（成行は現在値で即時約定）
+
+    Botは金額指定の買い注文で数量に金額を入れるため（totalQuantity == amount）、
+    その場合は金額を約定価格で割った株数（端数あり）として約定させる。
+    """
+    
+    def __init__(self, source: HistoricalDataSource, clock: SimulatedClock, initial_cash: float = 10_000_000,
+                 commission_rate: float = 0.0, slippage: float = 0.0, main_account: str = "main",
+                 nisa_account: str = "nisa"):
+        self.source = source
+        self.clock = clock
+        self.cash = float(initial_cash)
+        self.commission_rate = commission_rate
+        self.slippage = slippage
+        self.main_account = main_account
+        self.nisa_account = nisa_account
+        
+        self.connected = False
+        self.next_order_id = 1
+        self.pre_trade_gate = None
+        self.event_journal = None
+        self.order_info = {}
+        self.positions = {}  # (口座, 銘柄) -> 株数
+        self.strategy_positions = {}  # (戦略, 銘柄) -> 株数
+        self.fills = []
+        self.rejections = []
+    
+    def connect_to_ib(self, host=None, port=None, client_id=None):
+        self.connected = True
+        return True
+    
+    def disconnect_from_ib(self):
+        self.connected = False
+    
+    def wait_for_order_acks(self, timeout=10):
+        return []
+    
+    def create_stock_contract(self, symbol, exchange="TSE"):
+        return SimpleNamespace(symbol=symbol, secType="STK", exchange=exchange, currency="JPY")
+    
+    def create_market_order(self, action, quantity):
+        return SimpleNamespace(action=action, orderType="MKT", totalQuantity=quantity, lmtPrice=None, account="")
+    
+    def create_limit_order(self, action, quantity, limit_price):
+        return SimpleNamespace(action=action, orderType="LMT", totalQuantity=quantity, lmtPrice=limit_price,
+                               account="")
+    
+    def place_order(self, contract, order, strategy=None, amount=None, nisa=False):
+        """IBConnector.place_order と同じく発注前ゲートで予約してから約定させる"""
+        if not self.connected:
+            raise Exception("IB接続が確立されていません")
+        
+        reservation = None
+        try:
+            if self.pre_trade_gate is not None:
+                if strategy is None:
+                    self.pre_trade_gate.check_kill_switch()
+                else:
+                    reservation = self.pre_trade_gate.reserve(strategy, contract.symbol, amount, order.action, nisa)
+        except Exception as e:
+            self.rejections.append({"time": self.clock.now(), "strategy": strategy, "symbol": contract.symbol,
+                                    "side": order.action, "reason": str(e)})
+            self._record_event("reject", strategy=strategy, symbol=contract.symbol, quantity=order.totalQuantity,
+                               side=order.action, reason=str(e))
+            raise
+        
+        try:
+            order_id = self.next_order_id
+            fill = self._fill(order_id, contract, order, strategy, amount, nisa)
+            self.next_order_id += 1
+        except Exception:
+            if reservation is not None:
+                reservation.release()
+            raise
+        
+        if reservation is not None:
+            reservation.commit(order_id)
+        self._record_event("order", strategy=strategy, symbol=contract.symbol, order_id=order_id,
+                           quantity=order.totalQuantity, side=order.action, order_type=order.orderType,
+                           amount=amount, nisa=nisa)
+        self._record_event("fill", strategy=strategy, symbol=contract.symbol, order_id=order_id,
+                           quantity=fill["quantity"], price=fill["price"])
+        return order_id
+    
+    def _fill(self, order_id, contract, order, strategy, amount, nisa) -> Dict:
+        """現在値で約定させて現金・保有を更新"""
+        symbol = str(contract.symbol)
+        price = self.source.price(symbol)
+        if price <= 0:
+            raise Exception(f"株価データがありません: {symbol}")
+        side = 1 if order.action == "BUY" else -1
+        fill_price = price * (1 + side * self.slippage)
+        if order.orderType == "LMT" and side * (fill_price - order.lmtPrice) > 0:
+            raise Exception(f"指値が約定しません: {symbol} {order.lmtPrice} (現在値 {price})")
+        
+        if amount is not None and order.action == "BUY" and order.totalQuantity == amount:
+            quantity = amount / fill_price
+        else:
+            quantity = float(order.totalQuantity)
+        notional = quantity * fill_price
+        commission = notional * self.commission_rate
+        
+        account = getattr(order, "account", "") or (self.nisa_account if nisa else self.main_account)
+        self.cash -= side * notional + commission
+        self.positions[(account, symbol)] = self.positions.get((account, symbol), 0.0) + side * quantity
+        key = (strategy, symbol)
+        self.strategy_positions[key] = self.strategy_positions.get(key, 0.0) + side * quantity
+        
+        fill = {
+            "time": self.clock.now(), "order_id": order_id, "strategy": strategy, "account": account,
+            "symbol": symbol, "side": order.action, "quantity": quantity, "price": fill_price,
+            "commission": commission, "nisa": bool(nisa)
+        }
+        self.fills.append(fill)
+        return fill
+    
+    def _record_event(self, kind, **fields):
+        if self.event_journal is not None:
+            self.event_journal.record(kind, **fields)
+    
+    def request_positions(self, account_id=None, timeout=10):
+        """保有ポジション（銘柄コード -> 数量）"""
+        positions = {}
+        for (account, symbol), quantity in self.positions.items():
+            if (account_id is None or account == account_id) and abs(quantity) > 1e-9:
+                positions[symbol] = positions.get(symbol, 0.0) + quantity
+        return positions
+    
+    def strategy_value(self, strategy) -> float:
+        """戦略ごとの保有の時価"""
+        return sum(quantity * self.source.price(symbol)
+                   for (name, symbol), quantity in self.strategy_positions.items() if name == strategy)
+    
+    def equity(self) -> float:
+        """現金 + 保有の時価"""
+        return self.cash + sum(quantity * self.source.price(symbol)
+                               for (_, symbol), quantity in self.positions.items())
+    
+    def get_account_summary(self, account_id):
+        return {"TotalCashValue": self.cash, "NetLiquidation": self.equity()}
+
+
+class CapturingDiscord(DiscordLogger):
+    """Discordへ送らずにメッセージを記録する"""
+    
+    def __init__(self, clock: SimulatedClock):
+        super().__init__(None)
+        self.clock = clock
+        self.messages = []
+    
+    def _post(self, payload):
+        for embed in payload["embeds"]:
+            self.messages.append({
+                "time": self.clock.now(),
+                "title": embed["title"],
+                "description": embed["description"],
+                "fields": embed["fields"]
+            })
+        return True
+
+
+class _ScheduledJob:
+    __slots__ = ("id", "name", "func", "trigger", "args", "kwargs", "runs", "skipped", "seconds", "last_inputs")
+    
+    def __init__(self, job_id, name, func, trigger, args, kwargs):
+        self.id = job_id
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.args = args
+        self.kwargs = kwargs
+        self.runs = 0
+        self.skipped = 0
+        self.seconds = 0.0
+        self.last_inputs = None
+
+
+class SimulatedScheduler:
+    """APSchedulerのトリガーを疑似時計で発火させるスケジューラー（add_job の互換部分のみ）"""
+    
+    def __init__(self, clock: SimulatedClock):
+        self.clock = clock
+        self.jobs = []
+        self.listeners = []
+        self._templates = {}
+        self._day_times = {}
+    
+    def add_job(self, func, trigger, id=None, name=None, args=None, kwargs=None, **trigger_args):
+        if isinstance(trigger, str):
+            if trigger != "interval":
+                raise ValueError(f"未対応のトリガーです: {trigger}")
+            trigger = IntervalTrigger(**trigger_args)
+        job = _ScheduledJob(id or getattr(func, "__name__", "job"), name, func, trigger, args or (), kwargs or {})
+        self.jobs.append(job)
+        return job
+    
+    def add_listener(self, callback, mask=None):
+        self.listeners.append((callback, mask))
+    
+    def shutdown(self, wait=True):
+        pass
+    
+    @staticmethod
+    def _trigger_next(trigger, previous: Optional[datetime], now: datetime) -> Optional[datetime]:
+        """トリガーの次の発火時刻（疑似時刻はトリガーのタイムゾーンの時刻として扱う）"""
+        tz = getattr(trigger, "timezone", None)
+        result = trigger.get_next_fire_time(
+            previous.replace(tzinfo=tz) if previous is not None else None, now.replace(tzinfo=tz)
+        )
+        return result.replace(tzinfo=None) if result is not None else None
+    
+    def _next_fire_time(self, trigger, previous: Optional[datetime], now: datetime) -> Optional[datetime]:
+        """now 以降の次の発火時刻
+
+        cronの時・分・秒は日付によらないため、発火する日の時刻一覧（1分ごとなら1440件）を
+        トリガーごとに1度だけ求めて使い回す。以降は発火する日の判定だけをトリガーに問い合わせる。
+        """
+        if isinstance(trigger, DateTrigger):
+            # 引数なしの DateTrigger（起動時に1回）は開始時刻に発火
+            return now if previous is None else None
+        if not isinstance(trigger, CronTrigger):
+            return self._trigger_next(trigger, previous, now)
+        
+        day = now.date()
+        while True:
+            cached_day, times = self._day_times.get(id(trigger), (None, ()))
+            if cached_day != day:
+                first = self._trigger_next(trigger, None, datetime.combine(day, dtime.min))
+                if first is None:
+                    return None
+                day = first.date()
+                times = self._templates.get(id(trigger))
+                if times is None or times[0] != first.time():
+                    times = self._fire_times_on(trigger, first)
+                    self._templates.setdefault(id(trigger), times)
+                self._day_times[id(trigger)] = (day, times)
+            i = bisect.bisect_left(times, now.time()) if day == now.date() else 0
+            if i < len(times):
+                return datetime.combine(day, times[i])
+            day += timedelta(days=1)
+    
+    def _fire_times_on(self, trigger, first: datetime) -> tuple:
+        """first と同じ日の発火時刻の一覧"""
+        times = []
+        fire_time = first
+        while fire_time is not None and fire_time.date() == first.date():
+            times.append(fire_time.time())
+            fire_time = self._trigger_next(trigger, fire_time, fire_time + timedelta(microseconds=1))
+        return tuple(times)
+    
+    def run(self, start: datetime, end: datetime, should_stop: Callable[[], bool] = lambda: False,
+            inputs: Optional[Dict[str, Callable]] = None) -> Dict:
+        """start から end まで発火時刻順にジョブを実行（inputs のジョブは入力が同じなら省略）"""
+        inputs = inputs or {}
+        queue = []
+        order = itertools.count()
+        for job in self.jobs:
+            fire_time = self._next_fire_time(job.trigger, None, start)
+            if fire_time is not None:
+                heapq.heappush(queue, (fire_time, next(order), job))
+        
+        while queue and not should_stop():
+            fire_time, _, job = heapq.heappop(queue)
+            if fire_time > end:
+                break
+            self.clock.set(fire_time)
+            
+            # 実行前の入力で比較する（実行中の約定で入力が変わったら、次の回は実行する）
+            key_func = inputs.get(job.id)
+            key = key_func() if key_func is not None else None
+            if key is not None and key == job.last_inputs:
+                job.skipped += 1
+            else:
+                job.last_inputs = key
+                started = time.perf_counter()
+                try:
+                    job.func(*job.args, **job.kwargs)
+                except Exception as e:
+                    print(f"ジョブ実行エラー {job.id} ({fire_time}): {e}")
+                job.seconds += time.perf_counter() - started
+                job.runs += 1
+            
+            next_time = self._next_fire_time(job.trigger, fire_time, fire_time + timedelta(microseconds=1))
+            if next_time is not None:
+                heapq.heappush(queue, (next_time, next(order), job))
+        
+        return {job.id: {"name": job.name, "runs": job.runs, "skipped": job.skipped,
+                         "seconds": round(job.seconds, 3)} for job in self.jobs}
+
+
+class BacktestController(MainController):
+    """疑似ブローカー・疑似スケジューラーで MainController のスケジュールと各Botを動かす"""
+    
+    def __init__(self, config: ConfigLoader, clock: SimulatedClock, broker: SimulatedIBConnector,
+                 universes: Optional[Dict[str, List[str]]] = None):
+        settings = config.settings
+        self.config = config
+        self.clock = clock
+        self.discord = CapturingDiscord(clock)
+        self.ib_connector = broker
+        self.scheduler = SimulatedScheduler(clock)
+        self.universes = universes or {}
+        
+        # 記録時刻は再生時の壁時計ではなく疑似時刻（時刻範囲での検索・事後の調査のため）
+        self.events = open_event_journal(config, "backtest", clock=clock.timestamp)
+        self.discord.event_journal = self.events
+        self.ib_connector.event_journal = self.events
+        self.stop_flag_file = settings.pre_trade.stop_flag_file
+        
+        self.metrics = JobMetrics()
+        self.discord.add_error_listener(self.metrics.note_handled_error)
+        self.state_store = StateStore(settings.state_store.path)
+        self.screening = ScreeningRegistry(self.state_store)
+        self.nisa_monitor = NISAMonitor(config, self.discord, broker)
+        self.pre_trade_gate = build_pre_trade_gate(config, self.nisa_monitor, self.state_store)
+        self.ib_connector.pre_trade_gate = self.pre_trade_gate
+        
+        self._bots = {}
+        self._bots_lock = threading.Lock()
+        self.execution_mode = "thread"
+        self.workers = None
+        self.quote_book = None
+        self._stop_lock = threading.Lock()
+        self.stopped = False
+        self.stop_reason = None
+    
+    def create_bot(self, strategy):
+        """バックテスト用の状態ストア・建玉ジャーナルでBotを生成（銘柄リストは指定があれば差し替え）"""
+        settings = self.config.settings
+        if strategy == "index":
+            from src.bots.core_index_bot import CoreIndexBot
+            bot = CoreIndexBot(self.config, self.discord, self.ib_connector)
+        elif strategy == "dividend":
+            from src.bots.satellite_dividend_bot import SatelliteDividendBot
+            bot = SatelliteDividendBot(self.config, self.discord, self.ib_connector, metrics=self.metrics,
+                                       state_store=self.state_store)
+            if "dividend" in self.universes:
+                bot.get_topix100_symbols = lambda: list(self.universes["dividend"])
+        elif strategy == "range":
+            from src.bots.satellite_range_bot import SatelliteRangeBot
+            bot = SatelliteRangeBot(self.config, self.discord, self.ib_connector, metrics=self.metrics,
+                                    state_store=self.state_store,
+                                    position_journal=PositionJournal(settings.range_bot.journal_path,
+                                                                     fsync_interval=60))
+            if "range" in self.universes:
+                bot.get_nikkei225_symbols = lambda: list(self.universes["range"])
+        else:
+            raise ValueError(f"未知の戦略です: {strategy}")
+        return bot
+    
+    def get_strategy_value(self, strategy):
+        """各戦略の評価額（疑似ブローカーの保有の時価）"""
+        return self.ib_connector.strategy_value(strategy)
+    
+    def get_total_portfolio_value(self):
+        return self.ib_connector.equity()
+    
+    def stop(self):
+        """STOP.flag 等で停止したらシミュレーションを終える"""
+        with self._stop_lock:
+            if self.stopped:
+                return None
+            self.stopped = True
+        self.stop_reason = f"{self.clock.now():%Y-%m-%d %H:%M} に停止"
+        self.events.record("stop", reason="backtest_stop")
+        return None
+    
+    def job_inputs(self) -> Dict[str, Callable]:
+        """入力が変わらなければ実行を省略できる分足ジョブと、その入力"""
+        return {"range_trading": self.market_inputs, "stop_flag_monitor": self.check_stop_flag}
+    
+    def market_inputs(self):
+        """分足ジョブの入力（株価の刻み・約定数・スクリーニング結果）"""
+        return (
+            self.ib_connector.source.version,
+            self.ib_connector.next_order_id,
+            self.state_store.get_version("range_targets"),
+            self.state_store.get_version("dividend_candidates")
+        )
+    
+    def close(self):
+        for bot in self._bots.values():
+            if hasattr(bot, "close"):
+                bot.close()
+        self.events.close()
+        self.state_store.close()
+
+
+class EventBacktestResult:
+    """イベント駆動バックテストの結果"""
+    
+    def __init__(self, fills: pd.DataFrame, equity: pd.Series, messages: List[Dict], jobs: Dict,
+                 rejections: List[Dict], metrics: Dict, stop_reason: Optional[str], elapsed: float):
+        self.fills = fills
+        self.equity = equity
+        self.messages = messages
+        self.jobs = jobs
+        self.rejections = rejections
+        self.metrics = metrics
+        self.stop_reason = stop_reason
+        self.elapsed = elapsed
+    
+    def summary(self) -> str:
+        m = self.metrics
+        lines = [
+            f"最終資産: {m['final_equity']:,.0f}円 (初期資金 {m['initial_cash']:,.0f}円)",
+            f"トータルリターン: {m['total_return']:+.2%}  最大ドローダウン: {m['max_drawdown']:.2%}"
+            f"  シャープレシオ: {m['sharpe']:.2f}",
+            f"約定: {len(self.fills):,}件  発注前チェックでの拒否: {len(self.rejections):,}件"
+            f"  Discord通知: {len(self.messages):,}件",
+        ]
+        for job_id, stats in self.jobs.items():
+            lines.append(f"  {job_id}: 実行 {stats['runs']:,}回 / 省略 {stats['skipped']:,}回 ({stats['seconds']:.1f}秒)")
+        if self.stop_reason:
+            lines.append(f"停止: {self.stop_reason}")
+        lines.append(f"実行時間: {self.elapsed:.1f}秒")
+        return "\n".join(lines)
+
+
+class EventDrivenBacktest:
+    def __init__(self, source: HistoricalDataSource, config: ConfigLoader, initial_cash: float = 10_000_000,
+                 commission_rate: float = 0.0, slippage: float = 0.0,
+                 universes: Optional[Dict[str, List[str]]] = None, skip_unchanged: bool = True,
+                 workdir: Optional[str] = None):
+        """バックテストの初期化（config は本番と同じ設定。保存先はすべて作業ディレクトリに置き換える）"""
+        self.source = source
+        self.clock = source.clock
+        self.base_config = config
+        self.initial_cash = initial_cash
+        self.commission_rate = commission_rate
+        self.slippage = slippage
+        self.universes = universes
+        self.skip_unchanged = skip_unchanged
+        self.workdir = workdir
+    
+    def _backtest_config(self, workdir: str) -> ConfigLoader:
+        """保存先を作業ディレクトリに向け、監視・メトリクス出力を止めた設定"""
+        raw = copy.deepcopy(self.base_config.config)
+        overrides = {
+            ("state_store", "path"): os.path.join(workdir, "chimera_state.db"),
+            ("range_bot", "journal_path"): os.path.join(workdir, "journal", "range_positions.jsonl"),
+            ("nisa_settings", "ledger_dir"): os.path.join(workdir, "nisa_ledger"),
+            ("nisa_settings", "legacy_usage_file"): os.path.join(workdir, "nisa_usage.json"),
+            ("event_journal", "directory"): os.path.join(workdir, "events"),
+            ("pre_trade", "stop_flag_file"): os.path.join(workdir, "STOP.flag"),
+            ("metrics", "textfile_path"): None,
+            ("config_reload", "enabled"): False
+        }
+        for (section, key), value in overrides.items():
+            raw.setdefault(section, {})[key] = value
+        return ConfigLoader.from_dict(raw)
+    
+    def run(self, start: datetime, end: datetime) -> EventBacktestResult:
+        """start から end までスケジュールを再生"""
+        import src.bots.satellite_dividend_bot as dividend_module
+        import src.bots.satellite_range_bot as range_module
+        
+        workdir = os.path.abspath(self.workdir or tempfile.mkdtemp(prefix="chimera_backtest_"))
+        os.makedirs(workdir, exist_ok=True)
+        config = self._backtest_config(workdir)
+        settings = config.settings
+        self.clock.set(start)
+        broker = SimulatedIBConnector(
+            self.source, self.clock, self.initial_cash, self.commission_rate, self.slippage,
+            main_account=settings.ib_account.main_account_id or "main",
+            nisa_account=settings.ib_account.nisa_account_id or "nisa"
+        )
+        broker.connect_to_ib()
+        fake_yf = SimulatedYFinance(self.source)
+        
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            stack.enter_context(self.clock.patch())
+            for module in (dividend_module, range_module):
+                stack.callback(setattr, module, "yf", module.yf)
+                module.yf = fake_yf
+            controller = BacktestController(config, self.clock, broker, self.universes)
+            stack.callback(controller.close)
+            controller.setup_scheduler()
+            inputs = controller.job_inputs() if self.skip_unchanged else {}
+            jobs = controller.scheduler.run(start, end, lambda: controller.stopped, inputs)
+            messages = list(controller.discord.messages)
+            stop_reason = controller.stop_reason
+        elapsed = time.perf_counter() - started
+        
+        fills = pd.DataFrame(broker.fills, columns=["time", "order_id", "strategy", "account", "symbol", "side",
+                                                    "quantity", "price", "commission", "nisa"])
+        equity = self.equity_curve(fills, start, end)
+        metrics = compute_metrics(equity, pd.DataFrame({"pnl": [], "open": [], "return": [], "bars_held": [],
+                                                        "reason": []}), self.initial_cash)
+        return EventBacktestResult(fills, equity, messages, jobs, broker.rejections, metrics, stop_reason, elapsed)
+    
+    def equity_curve(self, fills: pd.DataFrame, start: datetime, end: datetime) -> pd.Series:
+        """約定履歴と日々の終値から日次の資産曲線を作成"""
+        days = self.source.trading_days()
+        days = days[(days >= pd.Timestamp(start.date())) & (days <= pd.Timestamp(end.date()))]
+        if len(days) == 0:
+            return pd.Series([self.initial_cash], index=[pd.Timestamp(start.date())], name="equity")
+        if fills.empty:
+            return pd.Series(self.initial_cash, index=days, name="equity")
+        
+        fill_days = pd.DatetimeIndex(fills["time"]).normalize()
+        side = np.where(fills["side"] == "BUY", 1.0, -1.0)
+        shares = pd.DataFrame({"day": fill_days, "symbol": fills["symbol"], "qty": side * fills["quantity"]})
+        holdings = shares.pivot_table(index="day", columns="symbol", values="qty", aggfunc="sum")
+        holdings = holdings.reindex(days.union(holdings.index)).fillna(0).cumsum().reindex(days)
+        
+        closes = pd.DataFrame({symbol: self.source.bars[symbol]["Close"] for symbol in holdings.columns})
+        closes = closes.reindex(days.union(closes.index)).ffill().reindex(days)
+        cash_flow = pd.Series(-side * fills["quantity"].to_numpy() * fills["price"].to_numpy()
+                              - fills["commission"].to_numpy(), index=fill_days).groupby(level=0).sum()
+        cash = self.initial_cash + cash_flow.reindex(days.union(cash_flow.index)).fillna(0).cumsum().reindex(days)
+        return (cash + (holdings * closes).fillna(0).sum(axis=1)).rename("equity")
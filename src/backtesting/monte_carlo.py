@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+モンテカルロ・シミュレーションモジュール
+
+戦略ごとの過去の月次リターンをブロック・ブートストラップで並べ替えて「経路 × 月」の行列を作り、
+リスクプロファイル（戦略の比率）ごとの資産の分布・元本割れ確率・最大ドローダウンを一括で計算する。
+
+- 同じ月の行をまとめて抽出するので、戦略間の相関はそのまま残る
+- block_months 以上の長さの連続した月を抜き出すので、月をまたぐ自己相関（下落の連続）も残る
+- 比率は毎月リバランスで維持されるものとする（積立・税金・NISA枠は PortfolioSimulator で扱う）
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+MONTHS_PER_YEAR = 12
+
+
+def block_bootstrap_indices(n_history: int, n_paths: int, horizon: int, block_size: int = 1,
+                            rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """循環ブロック・ブートストラップの月の番号（経路 × 月、block_size=1 なら各月を独立に復元抽出）"""
+    rng = rng or np.random.default_rng()
+    block_size = max(1, min(int(block_size), n_history))
+    n_blocks = -(-horizon // block_size)
+    starts = rng.integers(0, n_history, (n_paths, n_blocks))
+    indices = (starts[:, :, None] + np.arange(block_size)) % n_history
+    return indices.reshape(n_paths, -1)[:, :horizon]
+
+
+class MonteCarloResult:
+    """プロファイルごとの分布（wealth: 経路 × 月 × プロファイル、初期資産 = 1）"""
+    
+    def __init__(self, profiles: Dict[str, Dict[str, float]], wealth: np.ndarray, max_drawdown: np.ndarray,
+                 monthly_returns: np.ndarray, horizon: int):
+        self.profiles = profiles
+        self.wealth = wealth
+        self.max_drawdown = max_drawdown
+        self.monthly_returns = monthly_returns
+        self.horizon = horizon
+        self._metrics = None
+    
+    @property
+    def terminal(self) -> np.ndarray:
+        """最終資産（経路 × プロファイル）"""
+        return self.wealth[:, -1, :]
+    
+    def metrics(self) -> pd.DataFrame:
+        """プロファイルごとの指標"""
+        if self._metrics is not None:
+            return self._metrics
+        terminal = self.terminal
+        years = self.horizon / MONTHS_PER_YEAR
+        p5, p50, p95 = np.percentile(terminal, [5, 50, 95], axis=0)
+        worst = np.sort(terminal, axis=0)[:max(1, len(terminal) // 20)]
+        drawdown_p50, drawdown_p95 = np.percentile(self.max_drawdown, [50, 95], axis=0)
+        volatility = self.monthly_returns.std(axis=1, ddof=1).mean(axis=0) * np.sqrt(MONTHS_PER_YEAR)
+        self._metrics = pd.DataFrame({
+            "annual_return": p50 ** (1 / years) - 1,
+            "annual_volatility": volatility,
+            "terminal_p5": p5,
+            "terminal_median": p50,
+            "terminal_p95": p95,
+            "terminal_mean": terminal.mean(axis=0),
+            "terminal_cvar5": worst.mean(axis=0),
+            "loss_probability": (terminal < 1.0).mean(axis=0),
+            "max_drawdown_median": drawdown_p50,
+            "max_drawdown_p95": drawdown_p95
+        }, index=pd.Index(list(self.profiles), name="profile"))
+        return self._metrics
+    
+    def describe(self, profile: str) -> str:
+        """1プロファイルのリスクの説明（1行）"""
+        m = self.metrics().loc[profile]
+        years = self.horizon / MONTHS_PER_YEAR
+        return (
+            f"{profile}: 期待リターン 年{m['annual_return']:+.1%}（中央値、変動 年{m['annual_volatility']:.1%}）"
+            f"  {years:g}年後の資産 {m['terminal_median']:.2f}倍"
+            f"（5%: {m['terminal_p5']:.2f}倍 / 95%: {m['terminal_p95']:.2f}倍）"
+            f"  元本割れ {m['loss_probability']:.1%}"
+            f"  最大ドローダウン {m['max_drawdown_median']:.1%}（悪い5%: {m['max_drawdown_p95']:.1%}）"
+        )
+    
+    def summary(self) -> str:
+        n_paths = self.wealth.shape[0]
+        lines = [f"モンテカルロ・シミュレーション（{n_paths:,}経路 × {self.horizon}ヶ月、初期資産 = 1）"]
+        for profile, ratios in self.profiles.items():
+            weights = ", ".join(f"{strategy} {ratio:.0%}" for strategy, ratio in ratios.items())
+            lines.append(f"{self.describe(profile)}  [{weights}]")
+        return "\n".join(lines)
+
+
+class MonteCarloEngine:
+    def __init__(self, returns: pd.DataFrame, n_paths: int = 10000, horizon_months: int = 120,
+                 block_months: int = 12, seed: Optional[int] = 0):
+        """シミュレーションの初期化（returns は戦略ごとの月次リターン、行: 月、列: 戦略）"""
+        returns = returns.dropna(how="all").fillna(0.0)
+        if returns.empty:
+            raise ValueError("月次リターンがありません")
+        self.returns = returns
+        self.n_paths = int(n_paths)
+        self.horizon = int(horizon_months)
+        self.block_months = int(block_months)
+        self.seed = seed
+        self._indices = None
+    
+    def indices(self) -> np.ndarray:
+        """抽出する月の番号（全プロファイルで共通の経路を使い、比較のばらつきを抑える）"""
+        if self._indices is None:
+            rng = np.random.default_rng(self.seed)
+            self._indices = block_bootstrap_indices(len(self.returns), self.n_paths, self.horizon,
+                                                    self.block_months, rng)
+        return self._indices
+    
+    def simulate(self, profiles: Dict[str, Dict[str, float]]) -> MonteCarloResult:
+        """全プロファイルを1回の行列計算でシミュレーション"""
+        strategies = list(self.returns.columns)
+        missing = {s for ratios in profiles.values() for s, ratio in ratios.items() if ratio and s not in strategies}
+        if missing:
+            raise ValueError(f"月次リターンに無い戦略があります: {sorted(missing)}")
+        weights = np.array([[float(ratios.get(s, 0.0)) for s in strategies] for ratios in profiles.values()])
+        weights /= weights.sum(axis=1, keepdims=True)
+        
+        # 月 × プロファイル のリターンを先に計算してから抽出（経路 × 月 × プロファイル）
+        portfolio = (self.returns.to_numpy(dtype=float) @ weights.T)[self.indices()]
+        wealth = np.cumprod(1.0 + portfolio, axis=1)
+        peak = np.maximum(np.maximum.accumulate(wealth, axis=1), 1.0)
+        max_drawdown = (1.0 - wealth / peak).max(axis=1)
+        return MonteCarloResult(dict(profiles), wealth, max_drawdown, portfolio, self.horizon)
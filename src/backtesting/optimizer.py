@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+パラメータ探索モジュール
+
+RangeBacktester のパラメータ（bollinger_period / bollinger_std_dev / stop_loss_percentage_on_break など）を
+グリッド・ランダム・ベイズ最適化（TPE）で探索し、プロセスプールで並列に評価する。
+- 終値・スクリーニング条件・期間ごとの移動平均と標準偏差は親プロセスで1度だけ計算し、
+  共有メモリに置いてワーカーから参照する（ワーカーはデータの読み込みも指標の再計算もしない）
+- 評価結果はパラメータ・データ・売買ルールのコードのハッシュをキーにファイルへ追記し、同じ組み合わせは再評価しない
+- 最良のパラメータは config.yaml への変更案（unified diff）として出力する
+"""
+
+import difflib
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import re
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.backtesting.backtest_engine import RangeBacktester, rolling_mean_std
+from src.backtesting.result_store import code_version
+
+OBJECTIVES = ("sharpe", "total_return", "cagr", "profit_factor", "win_rate", "max_drawdown")
+
+# 指標の事前計算をあきらめて各ワーカーで計算する共有メモリの上限
+MAX_SHARED_BYTES = 2 * 1024 ** 3
+
+
+@dataclass(frozen=True)
+class Dimension:
+    """探索するパラメータ1つ（values の候補から選ぶか、low～high の範囲から選ぶ）"""
+    name: str
+    values: Optional[Tuple] = None
+    low: Optional[float] = None
+    high: Optional[float] = None
+    integer: bool = False
+    decimals: int = 4
+    
+    @classmethod
+    def parse(cls, text: str) -> "Dimension":
+        """"name=10,15,20"（候補）または "name=1.5:3.0"（範囲）の形式から作成"""
+        name, _, spec = text.partition("=")
+        if not spec:
+            raise ValueError(f"パラメータの指定が不正です: {text}")
+        if ":" in spec:
+            low, high = spec.split(":", 1)
+            integer = re.fullmatch(r"-?\d+", low.strip()) is not None and re.fullmatch(r"-?\d+", high.strip()) is not None
+            return cls(name.strip(), low=float(low), high=float(high), integer=integer)
+        values = tuple(int(v) if re.fullmatch(r"-?\d+", v.strip()) else float(v) for v in spec.split(","))
+        return cls(name.strip(), values=values)
+    
+    def grid(self) -> Tuple:
+        if self.values is not None:
+            return self.values
+        if self.integer:
+            return tuple(range(int(self.low), int(self.high) + 1))
+        raise ValueError(f"{self.name}: グリッド探索には候補（name=a,b,c）の指定が必要です")
+    
+    def to_unit(self, value) -> float:
+        """[0, 1] の座標に変換（候補は順番で並べる）"""
+        if self.values is not None:
+            return self.values.index(value) / max(1, len(self.values) - 1)
+        return (value - self.low) / (self.high - self.low) if self.high > self.low else 0.0
+    
+    def from_unit(self, unit: float):
+        """[0, 1] の座標から値に戻す（整数・候補は最も近い値）"""
+        unit = min(1.0, max(0.0, float(unit)))
+        if self.values is not None:
+            return self.values[int(round(unit * (len(self.values) - 1)))]
+        value = self.low + unit * (self.high - self.low)
+        return int(round(value)) if self.integer else round(value, self.decimals)
+
+
+class ParameterSpace:
+    """探索空間（Dimension の集まり）"""
+    
+    def __init__(self, dimensions: Sequence[Dimension]):
+        self.dimensions = list(dimensions)
+        names = [d.name for d in self.dimensions]
+        if len(set(names)) != len(names):
+            raise ValueError("同じパラメータが複数回指定されています")
+    
+    @classmethod
+    def parse(cls, specs: Sequence[str]) -> "ParameterSpace":
+        return cls([Dimension.parse(spec) for spec in specs])
+    
+    @property
+    def names(self) -> List[str]:
+        return [d.name for d in self.dimensions]
+    
+    def values_of(self, name: str) -> Optional[Tuple]:
+        """取り得る値の一覧（連続値なら None）"""
+        for dimension in self.dimensions:
+            if dimension.name == name:
+                try:
+                    return dimension.grid()
+                except ValueError:
+                    return None
+        return None
+    
+    def grid(self) -> List[Dict]:
+        return [dict(zip(self.names, combo)) for combo in itertools.product(*(d.grid() for d in self.dimensions))]
+    
+    def sample(self, rng: np.random.Generator) -> Dict:
+        return self.from_unit(rng.random(len(self.dimensions)))
+    
+    def to_unit(self, params: Dict) -> np.ndarray:
+        return np.array([d.to_unit(params[d.name]) for d in self.dimensions])
+    
+    def from_unit(self, unit: np.ndarray) -> Dict:
+        return {d.name: d.from_unit(u) for d, u in zip(self.dimensions, unit)}
+
+
+class TPESampler:
+    """Tree-structured Parzen Estimator による候補の提案
+
+    評価済みの点を上位 gamma（良い点）とそれ以外に分け、良い点の周りから候補を引いて
+    「良い点の密度 / それ以外の密度」が最大のものを次に評価する。
+    """
+    
+    def __init__(self, space: ParameterSpace, gamma: float = 0.25, n_startup: int = 10,
+                 n_candidates: int = 64, bandwidth: float = 0.15):
+        self.space = space
+        self.gamma = gamma
+        self.n_startup = n_startup
+        self.n_candidates = n_candidates
+        self.bandwidth = bandwidth
+    
+    def suggest(self, history: List[Tuple[Dict, float]], rng: np.random.Generator,
+                exclude: Optional[set] = None) -> Dict:
+        finite = [(params, score) for params, score in history if math.isfinite(score)]
+        if len(finite) < self.n_startup:
+            return self.space.sample(rng)
+        
+        finite.sort(key=lambda item: item[1], reverse=True)
+        n_good = max(1, int(math.ceil(self.gamma * len(finite))))
+        points = np.array([self.space.to_unit(params) for params, _ in finite])
+        good, bad = points[:n_good], points[n_good:]
+        if not len(bad):
+            bad = np.array([self.space.to_unit(params) for params, _ in history])
+        
+        # 良い点の周りから候補を引く
+        centers = good[rng.integers(0, len(good), self.n_candidates)]
+        candidates = np.clip(centers + rng.normal(0, self.bandwidth, centers.shape), 0, 1)
+        score = self._log_density(candidates, good) - self._log_density(candidates, bad)
+        for index in np.argsort(-score):
+            params = self.space.from_unit(candidates[index])
+            if exclude is None or parameter_key(params) not in exclude:
+                return params
+        return self.space.sample(rng)
+    
+    def _log_density(self, x: np.ndarray, points: np.ndarray) -> np.ndarray:
+        """各点を中心とするガウスカーネルの平均密度（対数）"""
+        squared = ((x[:, None, :] - points[None, :, :]) / self.bandwidth) ** 2
+        log_kernel = -0.5 * squared.sum(axis=-1)
+        peak = log_kernel.max(axis=1, keepdims=True)
+        return (peak + np.log(np.exp(log_kernel - peak).mean(axis=1, keepdims=True)))[:, 0]
+
+
+def parameter_key(params: Dict) -> str:
+    return json.dumps(params, sort_keys=True)
+
+
+def result_hash(params: Dict, context: Dict) -> str:
+    """パラメータ・固定条件・データのハッシュ（キャッシュのキー）"""
+    payload = json.dumps({"params": params, "context": context}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class SweepCache:
+    """評価結果のキャッシュ（1行1結果の追記専用 JSON Lines）"""
+    
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.results = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 書き込み途中で終了した行
+                    self.results[record["key"]] = record["metrics"]
+    
+    def get(self, key: str) -> Optional[Dict]:
+        return self.results.get(key)
+    
+    def put(self, key: str, params: Dict, metrics: Dict):
+        self.results[key] = metrics
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "params": params, "metrics": metrics}, ensure_ascii=False) + "\n")
+
+
+class SharedArrays:
+    """numpy 配列を共有メモリに置き、ワーカーへは名前・形状だけを渡す"""
+    
+    def __init__(self):
+        self.blocks = []
+        self.descriptors = {}
+    
+    def add(self, name: str, array: np.ndarray) -> np.ndarray:
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        view[...] = array
+        self.blocks.append(block)
+        self.descriptors[name] = (block.name, array.shape, array.dtype.str)
+        return view
+    
+    @staticmethod
+    def attach(descriptors: Dict) -> Tuple[Dict[str, np.ndarray], List]:
+        """ワーカー側で共有メモリを開く（読み取り専用のビューを返す）"""
+        arrays, blocks = {}, []
+        for name, (block_name, shape, dtype) in descriptors.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            array.flags.writeable = False
+            arrays[name] = array
+            blocks.append(block)
+        return arrays, blocks
+    
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+# ワーカープロセス内の評価用データ（initializer で設定）
+_worker = {}
+
+
+def _init_worker(descriptors: Dict, periods: Tuple[int, ...], fixed: Dict):
+    arrays, blocks = SharedArrays.attach(descriptors)
+    _worker.clear()
+    _worker.update(arrays=arrays, blocks=blocks, periods=periods, fixed=fixed, local_bands={})
+
+
+def _mean_std(period: int):
+    """共有メモリにある期間はそれを使い、無ければワーカー内で計算して再利用"""
+    arrays = _worker["arrays"]
+    if period in _worker["periods"]:
+        index = _worker["periods"].index(period)
+        return arrays["mean"][index], arrays["std"][index]
+    local = _worker["local_bands"]
+    if period not in local:
+        local[period] = rolling_mean_std(arrays["close"], period)
+    return local[period]
+
+
+def _evaluate(params: Dict) -> Dict:
+    """1組のパラメータを評価して成績指標を返す"""
+    arrays = _worker["arrays"]
+    backtester = RangeBacktester(**{**_worker["fixed"], **params})
+    metrics, _ = backtester.evaluate(arrays["close"], arrays.get("entry_mask"), _mean_std(backtester.bollinger_period))
+    return metrics
+
+
+def score_of(metrics: Dict, objective: str, min_trades: int) -> float:
+    """目的関数の値（取引数が足りない・計算できない場合は -inf）"""
+    value = metrics.get(objective)
+    if value is None or metrics.get("trades", 0) < min_trades or not math.isfinite(value):
+        return float("-inf")
+    return float(value)
+
+
+class SweepResult:
+    """探索結果（評価順の一覧と最良のパラメータ）"""
+    
+    def __init__(self, results: pd.DataFrame, names: List[str], objective: str, evaluated: int, cached: int):
+        self.results = results
+        self.names = names
+        self.objective = objective
+        self.evaluated = evaluated
+        self.cached = cached
+    
+    @property
+    def best(self) -> Optional[Dict]:
+        ranked = self.ranked()
+        if ranked.empty or not math.isfinite(ranked["score"].iloc[0]):
+            return None
+        row = ranked.iloc[0]
+        return {name: row[name].item() if hasattr(row[name], "item") else row[name] for name in self.names}
+    
+    def ranked(self) -> pd.DataFrame:
+        return self.results.sort_values("score", ascending=False, kind="stable").reset_index(drop=True)
+    
+    def summary(self, top: int = 10) -> str:
+        columns = self.names + ["score", "trades", "total_return", "max_drawdown", "win_rate", "cached"]
+        lines = [
+            f"評価 {len(self.results):,}件（新規 {self.evaluated:,}件 / キャッシュ {self.cached:,}件）"
+            f"  目的関数: {self.objective}",
+            self.ranked()[columns].head(top).to_string(index=False)
+        ]
+        return "\n".join(lines)
+
+
+class ParameterSweep:
+    def __init__(self, prices: pd.DataFrame, space: ParameterSpace, objective: str = "sharpe",
+                 min_trades: int = 10, workers: Optional[int] = None, cache_path: Optional[str] = None,
+                 entry_mask: Optional[np.ndarray] = None, **backtester_kwargs):
+        """探索の初期化（backtester_kwargs は探索しない RangeBacktester の引数）"""
+        if objective not in OBJECTIVES:
+            raise ValueError(f"目的関数は {' / '.join(OBJECTIVES)} のいずれかを指定してください: {objective}")
+        self.prices = prices
+        self.space = space
+        self.objective = objective
+        self.min_trades = min_trades
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.cache = SweepCache(cache_path)
+        self.entry_mask = entry_mask
+        self.fixed = backtester_kwargs
+        
+        close = prices.to_numpy(dtype=float).T
+        digest = hashlib.blake2b(close.tobytes(), digest_size=16)
+        digest.update(repr(close.shape).encode())
+        if entry_mask is not None:
+            digest.update(np.ascontiguousarray(entry_mask).tobytes())
+        self.context = {"data": digest.hexdigest(), "fixed": self.fixed, "code": code_version(RangeBacktester)}
+        self._close = close
+    
+    def run(self, method: str = "grid", samples: int = 50, seed: int = 0) -> SweepResult:
+        """探索を実行（method: grid / random / bayes）"""
+        rng = np.random.default_rng(seed)
+        self._shared = SharedArrays()
+        self._pool = None
+        self._started = False
+        try:
+            rows = []
+            if method == "grid":
+                self._evaluate_batch(self.space.grid(), rows)
+            elif method == "random":
+                self._evaluate_batch([self.space.sample(rng) for _ in range(samples)], rows)
+            elif method == "bayes":
+                self._run_bayes(samples, rng, rows)
+            else:
+                raise ValueError(f"未対応の探索方法です: {method}")
+        finally:
+            self._shutdown()
+        
+        results = pd.DataFrame(rows)
+        evaluated = int((~results["cached"]).sum()) if len(results) else 0
+        return SweepResult(results, self.space.names, self.objective, evaluated, len(results) - evaluated)
+    
+    def _start_workers(self):
+        """評価が必要になった時点で共有メモリとプロセスプールを用意（全件キャッシュ済みなら何もしない）"""
+        if self._started:
+            return
+        self._started = True
+        descriptors, periods = self._share(self._shared)
+        if self.workers > 1:
+            context = multiprocessing.get_context("spawn")
+            self._pool = context.Pool(self.workers, initializer=_init_worker,
+                                      initargs=(descriptors, periods, self.fixed))
+        else:
+            _init_worker(descriptors, periods, self.fixed)
+    
+    def _shutdown(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        for block in _worker.get("blocks", []):
+            block.close()
+        _worker.clear()
+        self._shared.close()
+    
+    def _share(self, shared: SharedArrays):
+        """終値・スクリーニング条件・期間ごとの移動平均と標準偏差を共有メモリに置く"""
+        shared.add("close", self._close)
+        if self.entry_mask is not None:
+            shared.add("entry_mask", np.asarray(self.entry_mask, dtype=bool))
+        
+        periods = self.space.values_of("bollinger_period")
+        if periods is None:
+            periods = (self.fixed.get("bollinger_period", 20),) if "bollinger_period" not in self.space.names else ()
+        periods = tuple(sorted({int(p) for p in periods}))
+        if 2 * len(periods) * self._close.nbytes > MAX_SHARED_BYTES:
+            periods = ()
+        if periods:
+            mean = np.empty((len(periods),) + self._close.shape)
+            std = np.empty((len(periods),) + self._close.shape)
+            for i, period in enumerate(periods):
+                mean[i], std[i] = rolling_mean_std(self._close, period)
+            shared.add("mean", mean)
+            shared.add("std", std)
+            del mean, std
+        return dict(shared.descriptors), periods
+    
+    def _evaluate_batch(self, candidates: List[Dict], rows: List[Dict]):
+        """キャッシュに無い組み合わせだけを評価して rows に追加"""
+        unique = {}
+        for params in candidates:
+            unique.setdefault(parameter_key(params), params)
+        keys = {name: result_hash(params, self.context) for name, params in unique.items()}
+        pending = [params for name, params in unique.items() if self.cache.get(keys[name]) is None]
+        
+        if pending:
+            self._start_workers()
+        if self._pool is not None:
+            # 期間ごとにまとめて同じワーカーのキャッシュが効くようにする
+            pending.sort(key=lambda params: params.get("bollinger_period", 0))
+            computed = self._pool.map(_evaluate, pending, chunksize=max(1, len(pending) // (self.workers * 4)))
+        else:
+            computed = [_evaluate(params) for params in pending]
+        fresh = set()
+        for params, metrics in zip(pending, computed):
+            self.cache.put(keys[parameter_key(params)], params, metrics)
+            fresh.add(parameter_key(params))
+        
+        for name, params in unique.items():
+            metrics = self.cache.get(keys[name])
+            rows.append({**params, **{k: v for k, v in metrics.items() if k != "exit_reasons"},
+                         "score": score_of(metrics, self.objective, self.min_trades), "cached": name not in fresh})
+    
+    def _run_bayes(self, samples: int, rng: np.random.Generator, rows: List[Dict]):
+        """ワーカー数ずつ候補を提案して評価（同じバッチ内で同じ点は提案しない）"""
+        sampler = TPESampler(self.space, n_startup=max(10, self.workers))
+        batch_size = max(1, self.workers)
+        while len(rows) < samples:
+            history = [({name: row[name] for name in self.space.names}, row["score"]) for row in rows]
+            seen = {parameter_key(params) for params, _ in history}
+            batch = []
+            for _ in range(min(batch_size, samples - len(rows))):
+                params = sampler.suggest(history, rng, exclude=seen)
+                seen.add(parameter_key(params))
+                batch.append(params)
+            self._evaluate_batch(batch, rows)
+
+
+def propose_config_diff(config_path: str, section: str, values: Dict) -> str:
+    """config.yaml の section の値を values に置き換えた場合の unified diff（コメント・書式は維持）"""
+    with open(config_path, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines(keepends=True)
+    
+    updated = []
+    remaining = dict(values)
+    in_section = False
+    indent = "  "
+    for line in lines:
+        header = re.match(r"^([A-Za-z_][\w]*):", line)
+        if header:
+            if in_section and remaining:
+                updated.extend(f"{indent}{key}: {_yaml_scalar(value)}\n" for key, value in remaining.items())
+                remaining = {}
+            in_section = header.group(1) == section
+        elif in_section:
+            match = re.match(r"^(\s+)([\w]+):(\s*)([^#\n]*?)(\s*#.*)?(\r?\n)?$", line)
+            if match and match.group(2) in remaining:
+                indent = match.group(1)
+                value = remaining.pop(match.group(2))
+                line = (f"{match.group(1)}{match.group(2)}:{match.group(3) or ' '}{_yaml_scalar(value)}"
+                        f"{match.group(5) or ''}{match.group(6) or ''}")
+        updated.append(line)
+    if in_section and remaining:
+        updated.extend(f"{indent}{key}: {_yaml_scalar(value)}\n" for key, value in remaining.items())
+    
+    relative = os.path.relpath(config_path)
+    return "".join(difflib.unified_diff(lines, updated, fromfile=f"a/{relative}", tofile=f"b/{relative}"))
+
+
+def _yaml_scalar(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return repr(round(value, 10))
+    return str(value)
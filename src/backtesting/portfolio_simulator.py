@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ポートフォリオ・シミュレーター
+
+3戦略（インデックス・高配当・レンジ）の月次積立とリバランス、NISA枠、口座の振り分けを
+月単位で再現し、多数の開始月を同時に（開始月 × 戦略 の行列で）シミュレーションする。
+
+毎月1日の処理は本番のスケジュールと同じ順番:
+1. インデックスBotの積立（index_bot.monthly_investment、NISA）
+   - 発注前ゲートと同じく、NISA残枠が足りなければ注文は拒否され、資金は現金のまま残る
+2. リバランス（同額を allocate_cash で目標比率からの乖離が最小になるよう配分）
+   - rebalance.nisa_strategies の戦略は戦略の順に NISA 残枠を消費し、超過分は課税口座へ
+   - それ以外の戦略は課税口座
+3. その月のリターンを反映（分配金は再投資されず現金に入る。課税口座では源泉徴収）
+
+売買単位の端数と手数料は扱わない（金額ベース）。NISA枠は年間・生涯とも購入額で消費し、
+売却による枠の復活は扱わない（Botは NISA で売却しないため）。
+課税口座の税金は、分配金は受取時、レンジ戦略（短期売買）の損益は年末にまとめて、
+それ以外の含み益は最後に全売却したとして計算する（損益通算は戦略ごと）。
+"""
+
+import os
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.shared_modules.config_schema import STRATEGIES
+from src.shared_modules.rebalance_allocator import allocate_cash
+
+TAX_RATE = 0.20315
+
+
+def monthly_sleeve_returns(prices: pd.DataFrame, index_symbol: Optional[str] = None,
+                           range_equity: Optional[pd.Series] = None, dividend_yield: float = 0.0,
+                           index_yield: float = 0.0) -> Dict[str, pd.DataFrame]:
+    """日次の終値から各戦略の月次リターンと分配金利回り（月率）を作る
+
+    - index: index_symbol の終値（無ければ全銘柄の等金額平均）
+    - dividend: 全銘柄の等金額平均 + 年率 dividend_yield（%）の分配金
+    - range: RangeBacktester の資産曲線（無ければ 0）
+    """
+    daily = prices.sort_index().ffill().pct_change(fill_method=None)
+    equal_weight = daily.mean(axis=1)
+    index_daily = daily[index_symbol] if index_symbol in daily.columns else equal_weight
+    sleeves = pd.DataFrame({"index": index_daily, "dividend": equal_weight}).fillna(0.0)
+    returns = (1 + sleeves).resample("ME").prod() - 1
+    if range_equity is not None:
+        monthly_equity = range_equity.resample("ME").last()
+        returns["range"] = monthly_equity.pct_change().reindex(returns.index).fillna(0.0)
+    else:
+        returns["range"] = 0.0
+    
+    income = pd.DataFrame(0.0, index=returns.index, columns=returns.columns)
+    income["index"] = index_yield / 100 / 12
+    income["dividend"] = dividend_yield / 100 / 12
+    returns[["index", "dividend"]] += income[["index", "dividend"]]
+    return {"returns": returns[list(STRATEGIES)], "income": income[list(STRATEGIES)]}
+
+
+def sleeve_returns_from_settings(prices: pd.DataFrame, settings, dividend_yield: Optional[float] = None,
+                                 index_yield: float = 0.0) -> Dict[str, pd.DataFrame]:
+    """config.settings の銘柄・パラメータで monthly_sleeve_returns を作る（レンジは RangeBacktester で再現）"""
+    from src.backtesting.backtest_engine import RangeBacktester
+    
+    range_equity = RangeBacktester(
+        bollinger_period=settings.range_bot.bollinger_period,
+        bollinger_std_dev=settings.range_bot.bollinger_std_dev,
+        stop_loss_percentage_on_break=settings.range_bot.stop_loss_percentage_on_break
+    ).run(prices).equity
+    if dividend_yield is None:
+        dividend_yield = settings.dividend_bot.min_dividend_yield
+    return monthly_sleeve_returns(prices, settings.index_bot.ticker, range_equity, dividend_yield, index_yield)
+
+
+def load_sleeve_returns(path: str) -> Dict[str, pd.DataFrame]:
+    """戦略ごとの月次リターンのCSV（列: index, dividend, range、分配金は任意で index_income などの列）を読み込む"""
+    data = pd.read_csv(path, index_col=0, parse_dates=True).sort_index()
+    missing = [strategy for strategy in STRATEGIES if strategy not in data.columns]
+    if missing:
+        raise ValueError(f"月次リターンに必要な列がありません: {missing}")
+    income = pd.DataFrame({strategy: data.get(f"{strategy}_income", 0.0) for strategy in STRATEGIES},
+                          index=data.index).fillna(0.0)
+    return {"returns": data[list(STRATEGIES)].fillna(0.0), "income": income}
+
+
+def save_sleeve_returns(path: str, sleeves: Dict[str, pd.DataFrame]):
+    """load_sleeve_returns で読める形式で保存"""
+    data = sleeves["returns"].copy()
+    for strategy in STRATEGIES:
+        data[f"{strategy}_income"] = sleeves["income"][strategy]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data.to_csv(path)
+
+
+class PortfolioSimulationResult:
+    """シミュレーション結果（各配列の先頭の軸が開始月）"""
+    
+    def __init__(self, start_dates: pd.DatetimeIndex, months: int, strategies: Sequence[str],
+                 target_ratios: np.ndarray, history: Dict[str, np.ndarray], final: Dict[str, np.ndarray],
+                 lifetime_limit: float):
+        self.start_dates = start_dates
+        self.months = months
+        self.strategies = list(strategies)
+        self.target_ratios = target_ratios
+        self.history = history
+        self.final = final
+        self.lifetime_limit = lifetime_limit
+    
+    def months_to_fill(self) -> np.ndarray:
+        """NISA生涯枠を使い切った月数（未到達は NaN）"""
+        filled = self.history["lifetime_used"] >= self.lifetime_limit
+        return np.where(filled.any(axis=1), filled.argmax(axis=1) + 1.0, np.nan)
+    
+    def frame(self) -> pd.DataFrame:
+        """開始月ごとの結果"""
+        final = self.final
+        frame = pd.DataFrame({
+            "start": self.start_dates,
+            "contributed": final["contributed"],
+            "total_value": final["total_value"],
+            "after_tax_value": final["after_tax_value"],
+            "nisa_value": final["nisa_value"],
+            "taxable_value": final["taxable_value"],
+            "cash": final["cash"],
+            "tax_paid": final["tax_paid"],
+            "nisa_used": final["lifetime_used"],
+            "taxable_contributed": final["taxable_contributed"],
+            "rejected_index": final["rejected_index"],
+            "months_to_fill": self.months_to_fill(),
+            "max_ratio_gap": final["max_ratio_gap"]
+        })
+        for i, strategy in enumerate(self.strategies):
+            frame[f"weight_{strategy}"] = final["weights"][:, i]
+        return frame
+    
+    def summary(self) -> str:
+        frame = self.frame()
+        
+        def spread(column, fmt="{:,.0f}円"):
+            low, mid, high = np.nanpercentile(frame[column], [5, 50, 95])
+            return f"{fmt.format(mid)}（5%: {fmt.format(low)} / 95%: {fmt.format(high)}）"
+        
+        lines = [
+            f"開始月 {len(frame)}通り（{self.start_dates[0]:%Y-%m} ～ {self.start_dates[-1]:%Y-%m}）× {self.months}ヶ月",
+            f"拠出額: {frame['contributed'].iloc[0]:,.0f}円",
+            f"最終資産: {spread('total_value')}",
+            f"税引後（課税口座を全売却）: {spread('after_tax_value')}",
+            f"NISA口座: {spread('nisa_value')}  課税口座: {spread('taxable_value')}  現金: {spread('cash')}",
+            f"課税口座への拠出: {spread('taxable_contributed')}  積立の拒否: {spread('rejected_index', '{:.0f}回')}"
+        ]
+        fill = frame["months_to_fill"]
+        if fill.notna().any():
+            lines.append(
+                f"NISA生涯枠 {self.lifetime_limit:,.0f}円 の到達: {fill.notna().mean():.0%}の開始月で"
+                f" 中央値 {fill.median() / 12:.1f}年（最短 {fill.min() / 12:.1f}年 / 最長 {fill.max() / 12:.1f}年）"
+            )
+        else:
+            lines.append(f"NISA生涯枠 {self.lifetime_limit:,.0f}円 には到達しません（使用額 {spread('nisa_used')}）")
+        weights = "  ".join(
+            f"{strategy} {np.median(frame[f'weight_{strategy}']):.1%}（目標 {ratio:.0%}）"
+            for strategy, ratio in zip(self.strategies, self.target_ratios)
+        )
+        lines.append(f"最終比率（中央値）: {weights}")
+        lines.append(f"目標比率からの最大乖離: {spread('max_ratio_gap', '{:.1%}')}")
+        return "\n".join(lines)
+
+
+class PortfolioSimulator:
+    def __init__(self, target_ratios: Dict[str, float], monthly_investment: float,
+                 index_monthly_investment: Optional[float] = None,
+                 nisa_strategies: Sequence[str] = ("index", "dividend"), annual_limit: float = 3_600_000,
+                 lifetime_limit: float = 18_000_000, monitoring_enabled: bool = True,
+                 realized_strategies: Sequence[str] = ("range",), tax_rate: float = TAX_RATE):
+        """シミュレーターの初期化（index_monthly_investment を省略すると monthly_investment と同額）"""
+        self.strategies = list(target_ratios.keys())
+        self.target_ratios = np.array([float(target_ratios[s]) for s in self.strategies])
+        self.monthly_investment = float(monthly_investment)
+        self.index_monthly_investment = float(
+            monthly_investment if index_monthly_investment is None else index_monthly_investment
+        )
+        self.nisa_strategies = [s for s in self.strategies if s in set(nisa_strategies)]
+        # 監視が無効なら発注前ゲートも台帳も枠を数えない
+        self.annual_limit = float(annual_limit) if monitoring_enabled else np.inf
+        self.lifetime_limit = float(lifetime_limit) if monitoring_enabled else np.inf
+        self.realized_strategies = [s for s in self.strategies if s in set(realized_strategies)]
+        self.tax_rate = tax_rate
+    
+    @classmethod
+    def from_config(cls, config, **overrides) -> "PortfolioSimulator":
+        """config.settings の値で作成（目標比率はリバランスと同じくリスクプロファイルを優先）"""
+        settings = config.settings
+        if settings.rebalance.risk_profile:
+            from src.shared_modules.risk_assessor import RiskAssessor
+            target_ratios = RiskAssessor(config).get_portfolio_ratios(settings.rebalance.risk_profile)
+        else:
+            target_ratios = settings.portfolio_ratios.as_dict()
+        params = {
+            "target_ratios": target_ratios,
+            "monthly_investment": settings.index_bot.monthly_investment,
+            "index_monthly_investment": settings.index_bot.monthly_investment,
+            "nisa_strategies": settings.rebalance.nisa_strategies,
+            "annual_limit": settings.nisa_settings.annual_limit,
+            "lifetime_limit": settings.nisa_settings.lifetime_limit,
+            "monitoring_enabled": settings.nisa_settings.monitoring_enabled
+        }
+        params.update(overrides)
+        return cls(**params)
+    
+    def start_indices(self, n_months: int, months: int, wrap: bool = False) -> np.ndarray:
+        """シミュレーションできる開始月（wrap=True なら全ての月、履歴の最後から先頭に戻る）"""
+        if wrap:
+            return np.arange(n_months)
+        return np.arange(max(n_months - months + 1, 0))
+    
+    def run(self, returns: pd.DataFrame, months: int, income: Optional[pd.DataFrame] = None,
+            starts: Optional[Sequence[int]] = None, wrap: bool = False) -> PortfolioSimulationResult:
+        """月次リターン（行: 月、列: 戦略）で全開始月を同時にシミュレーション
+
+        income は returns のうち分配金として現金で受け取る部分（月率）。
+        """
+        if months < 1:
+            raise ValueError("months は1以上を指定してください")
+        n_months = len(returns)
+        starts = self.start_indices(n_months, months, wrap) if starts is None else np.asarray(starts, dtype=int)
+        if len(starts) == 0:
+            raise ValueError(f"{months}ヶ月のシミュレーションには履歴が足りません（{n_months}ヶ月）")
+        if not wrap and (starts + months > n_months).any():
+            raise ValueError("開始月から履歴の終わりまでの期間が足りません")
+        
+        R = returns[self.strategies].to_numpy(dtype=float)
+        I = np.zeros_like(R) if income is None else income.reindex_like(returns)[self.strategies].fillna(0.0).to_numpy()
+        years = returns.index.year.to_numpy()
+        S, K = len(starts), len(self.strategies)
+        nisa_columns = np.array([s in self.nisa_strategies for s in self.strategies])
+        realized_columns = np.array([s in self.realized_strategies for s in self.strategies])
+        index_column = self.strategies.index("index") if "index" in self.strategies else None
+        
+        nisa = np.zeros((S, K))
+        taxable = np.zeros((S, K))
+        basis = np.zeros((S, K))
+        realized_pnl = np.zeros((S, K))
+        cash = np.zeros(S)
+        annual_used = np.zeros(S)
+        lifetime_used = np.zeros(S)
+        contributed = np.zeros(S)
+        taxable_contributed = np.zeros(S)
+        tax_paid = np.zeros(S)
+        rejected_index = np.zeros(S)
+        max_gap = np.zeros(S)
+        history = {name: np.zeros((S, months)) for name in ("total", "nisa", "taxable", "cash", "lifetime_used")}
+        
+        for m in range(months):
+            t = (starts + m) % n_months
+            
+            # 年が変わったら年間枠をリセットし、レンジ戦略の前年の損益に課税
+            if m > 0:
+                new_year = years[t] != years[(starts + m - 1) % n_months]
+                annual_used[new_year] = 0.0
+                tax = self._settle_realized(taxable, realized_pnl, realized_columns, new_year)
+                tax_paid += tax
+            
+            # 1. インデックス積立（残枠が足りなければ発注前ゲートで拒否）
+            contributed += self.index_monthly_investment + self.monthly_investment
+            if index_column is not None and self.index_monthly_investment > 0:
+                headroom = np.minimum(self.annual_limit - annual_used, self.lifetime_limit - lifetime_used)
+                accepted = self.index_monthly_investment <= headroom
+                amount = np.where(accepted, self.index_monthly_investment, 0.0)
+                nisa[:, index_column] += amount
+                annual_used += amount
+                lifetime_used += amount
+                cash += self.index_monthly_investment - amount
+                rejected_index += ~accepted
+            else:
+                cash += self.index_monthly_investment
+            
+            # 2. リバランス（乖離最小の配分 → NISA残枠を戦略の順に消費、超過分は課税口座）
+            amounts = allocate_cash(nisa + taxable, self.target_ratios, np.full(S, self.monthly_investment))
+            headroom = np.maximum(np.minimum(self.annual_limit - annual_used, self.lifetime_limit - lifetime_used), 0.0)
+            to_nisa = np.zeros((S, K))
+            for k in np.flatnonzero(nisa_columns):
+                to_nisa[:, k] = np.minimum(amounts[:, k], headroom)
+                headroom -= to_nisa[:, k]
+            to_taxable = amounts - to_nisa
+            nisa += to_nisa
+            taxable += to_taxable
+            basis += to_taxable
+            annual_used += to_nisa.sum(axis=1)
+            lifetime_used += to_nisa.sum(axis=1)
+            taxable_contributed += to_taxable.sum(axis=1)
+            cash += self.monthly_investment - amounts.sum(axis=1)
+            
+            # 3. リターンを反映（分配金は現金で受け取り、課税口座は源泉徴収）
+            price_return = R[t] - I[t]
+            nisa_income = (nisa * I[t]).sum(axis=1)
+            taxable_income = (taxable * I[t]).sum(axis=1)
+            realized_pnl += np.where(realized_columns, taxable * price_return, 0.0)
+            nisa *= 1 + price_return
+            taxable *= 1 + price_return
+            cash += nisa_income + taxable_income * (1 - self.tax_rate)
+            tax_paid += taxable_income * self.tax_rate
+            
+            invested = nisa + taxable
+            total_invested = invested.sum(axis=1, keepdims=True)
+            weights = np.divide(invested, total_invested, out=np.zeros_like(invested), where=total_invested > 0)
+            gap = np.abs(weights - self.target_ratios / self.target_ratios.sum()).max(axis=1)
+            max_gap = np.maximum(max_gap, np.where(total_invested[:, 0] > 0, gap, 0.0))
+            
+            history["total"][:, m] = total_invested[:, 0] + cash
+            history["nisa"][:, m] = nisa.sum(axis=1)
+            history["taxable"][:, m] = taxable.sum(axis=1)
+            history["cash"][:, m] = cash
+            history["lifetime_used"][:, m] = lifetime_used
+        
+        # 最後に課税口座を全売却した場合の税金（レンジ戦略は今年分の損益、それ以外は含み益）
+        unrealized = np.where(realized_columns, realized_pnl, taxable - basis)
+        liquidation_tax = (np.maximum(unrealized, 0.0) * self.tax_rate).sum(axis=1)
+        total_value = history["total"][:, -1]
+        final = {
+            "contributed": contributed,
+            "total_value": total_value,
+            "after_tax_value": total_value - liquidation_tax,
+            "nisa_value": nisa.sum(axis=1),
+            "taxable_value": taxable.sum(axis=1),
+            "cash": cash,
+            "tax_paid": tax_paid,
+            "lifetime_used": lifetime_used,
+            "taxable_contributed": taxable_contributed,
+            "rejected_index": rejected_index,
+            "weights": weights,
+            "max_ratio_gap": max_gap
+        }
+        return PortfolioSimulationResult(returns.index[starts], months, self.strategies, self.target_ratios,
+                                         history, final, self.lifetime_limit)
+    
+    def _settle_realized(self, taxable: np.ndarray, realized_pnl: np.ndarray, realized_columns: np.ndarray,
+                         rows: np.ndarray) -> np.ndarray:
+        """年末の確定損益に課税（評価額から差し引く）し、翌年の集計を始める"""
+        tax = np.zeros(len(taxable))
+        if not realized_columns.any() or not rows.any():
+            return tax
+        settled = np.where(rows[:, None] & realized_columns, np.maximum(realized_pnl, 0.0) * self.tax_rate, 0.0)
+        settled = np.minimum(settled, taxable)
+        taxable -= settled
+        realized_pnl[rows] = 0.0
+        return settled.sum(axis=1)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+バックテスト結果ストア
+
+同じ条件のバックテストを再計算しないよう、結果を「戦略のコード・パラメータ・銘柄ユニバース・データ期間と内容」
+のハッシュで保存する。
+- 索引（条件・成績指標）は SQLite、取引一覧と資産曲線は列ごとの配列として圧縮 .npz に保存
+- 成績指標だけの参照（パラメータ探索・一覧表示）は .npz を読まずに索引から返す
+- 同じ戦略・パラメータ・ユニバースで、より新しい足まで含むデータの結果を保存すると、古い結果は削除する
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.backtesting.backtest_engine import BacktestResult
+from src.shared_modules import indicators
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    strategy TEXT NOT NULL,
+    code_version TEXT NOT NULL,
+    params TEXT NOT NULL,
+    universe TEXT NOT NULL,
+    data_start TEXT NOT NULL,
+    data_end TEXT NOT NULL,
+    data_hash TEXT NOT NULL,
+    bars INTEGER NOT NULL,
+    symbols INTEGER NOT NULL,
+    metrics TEXT NOT NULL,
+    path TEXT,
+    created_at TEXT NOT NULL,
+    last_used_at TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_results_lineage ON results (strategy, params, universe, data_start);
+"""
+
+# 売買ルールのファイルに加えてハッシュに含める、Bot と共有の指標計算
+SHARED_SOURCES = (indicators,)
+
+_code_versions = {}
+
+
+def code_version(obj) -> str:
+    """クラス（またはモジュール）を定義しているソースファイルと共有の指標計算のハッシュ
+    （売買ルール・指標の計算の変更で結果を無効化）"""
+    path = inspect.getsourcefile(obj if inspect.ismodule(obj) or inspect.isclass(obj) else type(obj))
+    if path not in _code_versions:
+        digest = hashlib.blake2b(digest_size=8)
+        for source in [path] + [inspect.getsourcefile(module) for module in SHARED_SOURCES]:
+            with open(source, "rb") as f:
+                digest.update(f.read())
+        _code_versions[path] = digest.hexdigest()
+    return _code_versions[path]
+
+
+def data_fingerprint(prices: pd.DataFrame, *extra_arrays) -> Dict:
+    """終値の表の期間・銘柄・内容のハッシュ（extra_arrays はスクリーニング条件などの追加入力）"""
+    universe = hashlib.blake2b(json.dumps([str(c) for c in prices.columns]).encode("utf-8"), digest_size=8)
+    digest = hashlib.blake2b(np.ascontiguousarray(prices.to_numpy(dtype=float)).tobytes(), digest_size=16)
+    digest.update(np.asarray(prices.index.asi8 if isinstance(prices.index, pd.DatetimeIndex) else prices.index).tobytes())
+    for array in extra_arrays:
+        if array is not None:
+            digest.update(np.ascontiguousarray(array).tobytes())
+    return {
+        "universe": universe.hexdigest(),
+        "start": str(prices.index[0]) if len(prices) else "",
+        "end": str(prices.index[-1]) if len(prices) else "",
+        "hash": digest.hexdigest(),
+        "bars": int(prices.shape[0]),
+        "symbols": int(prices.shape[1])
+    }
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class BacktestResultStore:
+    def __init__(self, directory: str = "backtest_results"):
+        """結果ストアの初期化（directory に索引 index.db と結果の .npz を置く）"""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+    
+    @staticmethod
+    def make_key(strategy: str, code: str, params: Dict, fingerprint: Dict) -> str:
+        payload = json.dumps({"strategy": strategy, "code": code, "params": params, "data": fingerprint},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+    
+    def _touch(self, key: str):
+        self._conn.execute("UPDATE results SET hits = hits + 1, last_used_at = ? WHERE key = ?",
+                           (datetime.now().isoformat(), key))
+        self._conn.commit()
+    
+    def get_metrics(self, key: str) -> Optional[Dict]:
+        """成績指標だけを返す（取引一覧・資産曲線は読まない）"""
+        with self._lock:
+            row = self._conn.execute("SELECT metrics FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._touch(key)
+        return json.loads(row[0])
+    
+    def get(self, key: str) -> Optional[BacktestResult]:
+        """保存済みの結果（無ければ None）"""
+        with self._lock:
+            row = self._conn.execute("SELECT params, metrics, path FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            params, metrics, path = json.loads(row[0]), json.loads(row[1]), row[2]
+            if not path or not os.path.exists(os.path.join(self.directory, path)):
+                return None
+            self._touch(key)
+        trades, equity = self._load_arrays(os.path.join(self.directory, path))
+        return BacktestResult(trades, equity, metrics, params)
+    
+    def put(self, key: str, strategy: str, code: str, params: Dict, fingerprint: Dict, metrics: Dict,
+            trades: Optional[pd.DataFrame] = None, equity: Optional[pd.Series] = None):
+        """結果を保存し、同じ条件でより古い足までのデータの結果を削除"""
+        path = None
+        if trades is not None and equity is not None:
+            path = f"{key}.npz"
+            self._save_arrays(os.path.join(self.directory, path), trades, equity)
+        now = datetime.now().isoformat()
+        params_json = json.dumps(_jsonable(params), sort_keys=True)
+        with self._lock:
+            superseded = self._conn.execute(
+                "SELECT key, path FROM results WHERE strategy = ? AND params = ? AND universe = ? AND data_start = ?"
+                " AND data_end < ? AND key != ?",
+                (strategy, params_json, fingerprint["universe"], fingerprint["start"], fingerprint["end"], key)
+            ).fetchall()
+            self._delete(superseded)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, strategy, code_version, params, universe, data_start, data_end,"
+                " data_hash, bars, symbols, metrics, path, created_at, last_used_at, hits)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, strategy, code, params_json, fingerprint["universe"], fingerprint["start"], fingerprint["end"],
+                 fingerprint["hash"], fingerprint["bars"], fingerprint["symbols"],
+                 json.dumps(_jsonable(metrics), ensure_ascii=False), path, now, now)
+            )
+            self._conn.commit()
+    
+    def invalidate(self, strategy: Optional[str] = None, code: Optional[str] = None) -> int:
+        """戦略（省略時は全て）の結果を削除（code を指定するとそれ以外のコードの結果だけ）"""
+        query, args = "SELECT key, path FROM results WHERE 1 = 1", []
+        if strategy:
+            query += " AND strategy = ?"
+            args.append(strategy)
+        if code:
+            query += " AND code_version != ?"
+            args.append(code)
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+            self._delete(rows)
+            self._conn.commit()
+        return len(rows)
+    
+    def _delete(self, rows):
+        for key, path in rows:
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            if path:
+                try:
+                    os.remove(os.path.join(self.directory, path))
+                except FileNotFoundError:
+                    pass
+    
+    def query(self, strategy: Optional[str] = None) -> pd.DataFrame:
+        """保存済みの結果の一覧（パラメータ・成績指標を列に展開、ダッシュボード用）"""
+        query = "SELECT key, strategy, params, data_start, data_end, bars, symbols, metrics, hits, created_at FROM results"
+        args = ()
+        if strategy:
+            query += " WHERE strategy = ?"
+            args = (strategy,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY created_at", args).fetchall()
+        records = []
+        for key, name, params, start, end, bars, symbols, metrics, hits, created_at in rows:
+            record = {"key": key, "strategy": name, "data_start": start, "data_end": end, "bars": bars,
+                      "symbols": symbols, "hits": hits, "created_at": created_at}
+            record.update(json.loads(params))
+            record.update({k: v for k, v in json.loads(metrics).items() if not isinstance(v, dict)})
+            records.append(record)
+        return pd.DataFrame(records)
+    
+    @staticmethod
+    def _save_arrays(path: str, trades: pd.DataFrame, equity: pd.Series):
+        """取引一覧と資産曲線を列ごとの配列として圧縮保存（pickle を使わない型に変換）"""
+        arrays = {}
+        for column in trades.columns:
+            values = trades[column].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            arrays[f"trades/{column}"] = values
+        index = equity.index
+        arrays["equity/index"] = index.to_numpy() if isinstance(index, pd.DatetimeIndex) else np.asarray(index)
+        arrays["equity/values"] = equity.to_numpy(dtype=float)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+    
+    @staticmethod
+    def _load_arrays(path: str):
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name.split("/", 1)[1]: data[name] for name in data.files if name.startswith("trades/")}
+            trades = pd.DataFrame({
+                column: values.astype(object) if values.dtype.kind == "U" else values
+                for column, values in columns.items()
+            })
+            equity = pd.Series(data["equity/values"], index=pd.Index(data["equity/index"]), name="equity")
+        return trades, equity
+
+
+def cached_run(store: Optional[BacktestResultStore], backtester, prices: pd.DataFrame,
+               entry_mask: Optional[np.ndarray] = None):
+    """backtester.run(prices, entry_mask) をストア経由で実行（戻り値は (結果, キャッシュから読んだか)）"""
+    if store is None:
+        return backtester.run(prices, entry_mask=entry_mask), False
+    strategy = type(backtester).__name__
+    code = code_version(backtester)
+    params = _jsonable(backtester.params())
+    fingerprint = data_fingerprint(prices, entry_mask)
+    key = store.make_key(strategy, code, params, fingerprint)
+    result = store.get(key)
+    if result is not None:
+        return result, True
+    result = backtester.run(prices, entry_mask=entry_mask)
+    store.put(key, strategy, code, params, fingerprint, result.metrics, result.trades, result.equity)
+    return result, False
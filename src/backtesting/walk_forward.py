@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ウォークフォワード分析モジュール
+
+学習期間でパラメータを選び、直後の検証期間（アウトオブサンプル）で成績を測ることを
+期間をずらしながら繰り返し、検証期間だけをつないだ成績を報告する。
+
+- 移動平均・標準偏差・レンジ比率は全期間に対して期間（窓の長さ）ごとに1度だけ計算し、
+  全フォールド・全パラメータで切り出して使い回す（各足の値はその足までのデータだけで決まるので先読みにならない）
+- time_budget_seconds を超えないよう、残り時間をまだ処理していないフォールドに均等に配分し、
+  時間内に評価できた候補の中から学習期間の最良を選ぶ
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.backtesting.backtest_engine import (
+    TRADING_DAYS_PER_YEAR, DividendBacktester, RangeBacktester, compute_metrics, rolling_mean_std,
+    rolling_range_ratio
+)
+from src.backtesting.optimizer import ParameterSpace, score_of
+
+EMPTY_TRADES = pd.DataFrame({"pnl": [], "open": [], "return": [], "bars_held": [], "reason": []})
+
+
+class IndicatorCache:
+    """全期間の指標を窓の長さごとに1度だけ計算して保持する（銘柄 × 足）"""
+    
+    def __init__(self, close: np.ndarray, high: Optional[np.ndarray] = None, low: Optional[np.ndarray] = None):
+        self.close = np.asarray(close, dtype=float)
+        self.high = self.close if high is None else np.asarray(high, dtype=float)
+        self.low = self.close if low is None else np.asarray(low, dtype=float)
+        self._mean_std = {}
+        self._range_ratio = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def mean_std(self, window: int) -> Tuple[np.ndarray, np.ndarray]:
+        window = int(window)
+        if window in self._mean_std:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._mean_std[window] = rolling_mean_std(self.close, window)
+        return self._mean_std[window]
+    
+    def range_ratio(self, window: int) -> np.ndarray:
+        window = int(window)
+        if window in self._range_ratio:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._range_ratio[window] = rolling_range_ratio(self.high, self.low, window)
+        return self._range_ratio[window]
+    
+    @property
+    def windows(self) -> Dict[str, List[int]]:
+        return {"mean_std": sorted(self._mean_std), "range_ratio": sorted(self._range_ratio)}
+
+
+class RangeStrategy:
+    """レンジ取引Bot（RangeBacktester）のウォークフォワード用アダプター"""
+    
+    name = "range"
+    window_parameter = "bollinger_period"
+    
+    def __init__(self, space: ParameterSpace, screen: bool = False, screen_window: int = 126,
+                 max_range_ratio: float = 0.25, min_trades: int = 10, **fixed):
+        self.space = space
+        self.screen = screen
+        self.screen_window = screen_window
+        self.max_range_ratio = max_range_ratio
+        self.min_trades = min_trades
+        self.fixed = fixed
+    
+    def prepare(self, cache: IndicatorCache):
+        """探索空間で使う窓の指標を事前に計算"""
+        for window in self.space.values_of(self.window_parameter) or (self.fixed.get(self.window_parameter, 20),):
+            cache.mean_std(window)
+        if self.screen:
+            cache.range_ratio(self.screen_window)
+    
+    def evaluate(self, cache: IndicatorCache, start: int, end: int, params: Dict) -> Tuple[Dict, np.ndarray]:
+        backtester = RangeBacktester(**{**self.fixed, **params})
+        mean, std = cache.mean_std(backtester.bollinger_period)
+        entry_mask = None
+        if self.screen:
+            with np.errstate(invalid="ignore"):
+                entry_mask = cache.range_ratio(self.screen_window)[:, start:end] <= self.max_range_ratio
+        return backtester.evaluate(cache.close[:, start:end], entry_mask, (mean[:, start:end], std[:, start:end]))
+
+
+class DividendStrategy:
+    """高配当株Bot（DividendBacktester）のウォークフォワード用アダプター
+
+    fundamentals は "dividend_yield"（%）・"per"・任意で "equity_ratio"（%）の行列（銘柄 × 足、その日に分かっていた値）。
+    """
+    
+    name = "dividend"
+    window_parameter = "ma_period"
+    
+    def __init__(self, fundamentals: Dict[str, np.ndarray], space: ParameterSpace, min_trades: int = 0, **fixed):
+        self.fundamentals = {key: np.asarray(value, dtype=float) for key, value in fundamentals.items()}
+        self.space = space
+        self.min_trades = min_trades
+        self.fixed = fixed
+    
+    def prepare(self, cache: IndicatorCache):
+        for window in self.space.values_of(self.window_parameter) or (self.fixed.get(self.window_parameter, 25),):
+            cache.mean_std(window)
+    
+    def evaluate(self, cache: IndicatorCache, start: int, end: int, params: Dict) -> Tuple[Dict, np.ndarray]:
+        backtester = DividendBacktester(**{**self.fixed, **params})
+        moving_average = cache.mean_std(backtester.ma_period)[0]
+        equity_ratio = self.fundamentals.get("equity_ratio")
+        metrics, equity = backtester.evaluate(
+            cache.close[:, start:end],
+            self.fundamentals["dividend_yield"][:, start:end],
+            self.fundamentals["per"][:, start:end],
+            equity_ratio[:, start:end] if equity_ratio is not None else None,
+            moving_average[:, start:end]
+        )
+        # 売却しない戦略なので、取引数には購入数（未決済）を数える
+        metrics["trades"] = metrics["open_positions"]
+        return metrics, equity
+
+
+class WalkForwardReport:
+    """ウォークフォワード分析の結果"""
+    
+    def __init__(self, folds: pd.DataFrame, equity: Dict[str, pd.Series], metrics: Dict[str, Dict],
+                 objective: str, elapsed: float, budget: float, skipped_folds: int, cache: IndicatorCache):
+        self.folds = folds
+        self.equity = equity
+        self.metrics = metrics
+        self.objective = objective
+        self.elapsed = elapsed
+        self.budget = budget
+        self.skipped_folds = skipped_folds
+        self.cache_windows = cache.windows
+        self.cache_hits = cache.hits
+        self.cache_misses = cache.misses
+    
+    def efficiency(self, strategy: str) -> float:
+        """ウォークフォワード効率（検証期間の目的関数の平均 / 学習期間の平均）"""
+        rows = self.folds[self.folds["strategy"] == strategy]
+        rows = rows[np.isfinite(rows["train_score"]) & np.isfinite(rows["test_score"])]
+        train = rows["train_score"].mean() if len(rows) else float("nan")
+        return float(rows["test_score"].mean() / train) if len(rows) and train else float("nan")
+    
+    def summary(self) -> str:
+        lines = [f"ウォークフォワード分析（目的関数: {self.objective}、実行時間 {self.elapsed:.1f}秒 / 予算 {self.budget:.0f}秒）"]
+        for strategy, m in self.metrics.items():
+            rows = self.folds[self.folds["strategy"] == strategy]
+            lines.append(
+                f"[{strategy}] フォールド {len(rows)}件  アウトオブサンプル: リターン {m['total_return']:+.2%}"
+                f"  CAGR {m['cagr']:+.2%}  最大ドローダウン {m['max_drawdown']:.2%}  シャープレシオ {m['sharpe']:.2f}"
+                f"  効率 {self.efficiency(strategy):.2f}"
+            )
+            for row in rows.itertuples():
+                lines.append(
+                    f"  {row.test_start:%Y-%m-%d}～{row.test_end:%Y-%m-%d}  {row.params}"
+                    f"  学習 {row.train_score:.2f} → 検証 {row.test_score:.2f} (リターン {row.test_return:+.2%},"
+                    f" 候補 {row.candidates}件)"
+                )
+        if self.skipped_folds:
+            lines.append(f"時間切れで評価できなかったフォールド: {self.skipped_folds}件")
+        lines.append(f"指標の事前計算: 移動平均・標準偏差 {self.cache_windows['mean_std']}"
+                     f" / レンジ比率 {self.cache_windows['range_ratio']}（再利用 {self.cache_hits:,}回）")
+        return "\n".join(lines)
+
+
+class WalkForward:
+    def __init__(self, prices: pd.DataFrame, strategies: Sequence, train_bars: int = 2 * TRADING_DAYS_PER_YEAR,
+                 test_bars: int = TRADING_DAYS_PER_YEAR // 2, step_bars: Optional[int] = None, anchored: bool = False,
+                 method: str = "grid", samples: int = 50, objective: str = "sharpe",
+                 time_budget_seconds: float = 60.0, seed: int = 0, high: Optional[pd.DataFrame] = None,
+                 low: Optional[pd.DataFrame] = None, initial_cash: float = 10_000_000):
+        """ウォークフォワード分析の初期化（anchored=True なら学習期間の開始を固定して伸ばしていく）"""
+        if method not in ("grid", "random"):
+            raise ValueError(f"未対応の探索方法です: {method}")
+        if step_bars is not None and step_bars < test_bars:
+            raise ValueError("step_bars が test_bars より短いと検証期間が重なります")
+        self.prices = prices
+        self.strategies = list(strategies)
+        self.train_bars = int(train_bars)
+        self.test_bars = int(test_bars)
+        self.step_bars = int(step_bars or test_bars)
+        self.anchored = anchored
+        self.method = method
+        self.samples = samples
+        self.objective = objective
+        self.time_budget_seconds = time_budget_seconds
+        self.seed = seed
+        self.initial_cash = initial_cash
+        self.cache = IndicatorCache(
+            prices.to_numpy(dtype=float).T,
+            high.reindex_like(prices).to_numpy(dtype=float).T if high is not None else None,
+            low.reindex_like(prices).to_numpy(dtype=float).T if low is not None else None
+        )
+    
+    def folds(self) -> List[Tuple[int, int, int, int]]:
+        """(学習開始, 学習終了, 検証開始, 検証終了) の一覧（終了は含まない）"""
+        n_bars = len(self.prices)
+        folds = []
+        train_start = 0
+        while train_start + self.train_bars < n_bars:
+            train_end = train_start + self.train_bars
+            test_end = min(train_end + self.test_bars, n_bars)
+            folds.append((0 if self.anchored else train_start, train_end, train_end, test_end))
+            train_start += self.step_bars
+        return folds
+    
+    def _candidates(self, strategy, rng: np.random.Generator) -> List[Dict]:
+        """評価順に並べた候補（グリッドは順番を混ぜ、時間切れでも偏りなく評価されるようにする）"""
+        if self.method == "grid":
+            grid = strategy.space.grid()
+            return [grid[i] for i in rng.permutation(len(grid))]
+        return [strategy.space.sample(rng) for _ in range(self.samples)]
+    
+    def run(self) -> WalkForwardReport:
+        started = time.perf_counter()
+        deadline = started + self.time_budget_seconds
+        rng = np.random.default_rng(self.seed)
+        dates = self.prices.index
+        
+        # 指標は全フォールドで共通なので最初にまとめて計算
+        for strategy in self.strategies:
+            strategy.prepare(self.cache)
+        
+        folds = self.folds()
+        units = [(fold_index, fold, strategy) for fold_index, fold in enumerate(folds) for strategy in self.strategies]
+        rows = []
+        equity_parts = {strategy.name: [] for strategy in self.strategies}
+        skipped = 0
+        for unit_index, (fold_index, (train_start, train_end, test_start, test_end), strategy) in enumerate(units):
+            now = time.perf_counter()
+            if now >= deadline:
+                skipped = len(units) - unit_index
+                break
+            unit_deadline = now + (deadline - now) / (len(units) - unit_index)
+            
+            best_params, best_score, evaluated = None, float("-inf"), 0
+            for params in self._candidates(strategy, rng):
+                if evaluated and time.perf_counter() >= unit_deadline:
+                    break
+                metrics, _ = strategy.evaluate(self.cache, train_start, train_end,
+                                               {**params, "initial_cash": self.initial_cash})
+                score = score_of(metrics, self.objective, strategy.min_trades)
+                evaluated += 1
+                if best_params is None or score > best_score:
+                    best_params, best_score = params, score
+            
+            test_metrics, test_equity = strategy.evaluate(self.cache, test_start, test_end,
+                                                          {**best_params, "initial_cash": self.initial_cash})
+            equity_parts[strategy.name].append(pd.Series(test_equity, index=dates[test_start:test_end]))
+            rows.append({
+                "strategy": strategy.name,
+                "fold": fold_index,
+                "train_start": dates[train_start],
+                "train_end": dates[train_end - 1],
+                "test_start": dates[test_start],
+                "test_end": dates[test_end - 1],
+                "params": best_params,
+                "candidates": evaluated,
+                "train_score": best_score,
+                "test_score": score_of(test_metrics, self.objective, 0),
+                "test_return": test_metrics["total_return"],
+                "test_max_drawdown": test_metrics["max_drawdown"],
+                "test_trades": test_metrics["trades"]
+            })
+        
+        equity = {name: self._stitch(parts) for name, parts in equity_parts.items() if parts}
+        metrics = {name: compute_metrics(series, EMPTY_TRADES, self.initial_cash) for name, series in equity.items()}
+        return WalkForwardReport(pd.DataFrame(rows), equity, metrics, self.objective,
+                                 time.perf_counter() - started, self.time_budget_seconds, skipped, self.cache)
+    
+    def _stitch(self, parts: List[pd.Series]) -> pd.Series:
+        """各検証期間の資産曲線をリターンでつなぐ（各期間は初期資金から始まる）"""
+        level = self.initial_cash
+        stitched = []
+        for part in parts:
+            stitched.append(part * (level / self.initial_cash))
+            level = stitched[-1].iloc[-1]
+        return pd.concat(stitched).rename("equity")
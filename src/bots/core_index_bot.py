@@ -1,6 +1,5 @@
 from src.shared_modules.config_loader import ConfigLoader
 from src.shared_modules.discord_logger import DiscordLogger
-from src.shared_modules.ib_connector import IBConnector
 
 class CoreIndexBot:
     def __init__(self, config, discord, ib_connector):
@@ -9,64 +8,74 @@ class CoreIndexBot:
         self.ib_connector = ib_connector
     
     def execute_monthly_investment(self):
-        """毎月の積立投賁E実衁E""
+        """毎月の積立投資を実行"""
         try:
-            ticker = self.config.get("index_bot.ticker")
-            amount = self.config.get("index_bot.monthly_investment")
-            nisa_account = self.config.get("ib_account.nisa_account_id")
+            settings = self.config.settings
+            ticker = settings.index_bot.ticker
+            amount = settings.index_bot.monthly_investment
+            nisa_account = settings.ib_account.nisa_account_id
             
-            self.discord.info(f"インチEクス積立を開姁E {ticker} {amount}冁E)
+            self.discord.info(f"インデックス積立を開始: {ticker} {amount}円")
             
-            # 契紁EE
+            # 契約作成
             contract = self.ib_connector.create_stock_contract(ticker)
             
-            # 成行買ぁE斁E            order = self.ib_connector.create_market_order("BUY", amount)
+            # 成行買い注文
+            order = self.ib_connector.create_market_order("BUY", amount)
             
-            # 注斁E衁E            order_id = self.ib_connector.place_order(contract, order)
+            # 注文実行
+            order_id = self.ib_connector.place_order(contract, order, strategy="index", amount=amount, nisa=True)
             
             # 取引通知
             self.discord.trade_notification("BUY", ticker, amount, order_id=order_id)
             
-            self.discord.success(f"インチEクス積立完亁E {ticker} {amount}冁E(注文ID: {order_id})")
+            self.discord.success(f"インデックス積立完了: {ticker} {amount}円 (注文ID: {order_id})")
             
         except Exception as e:
-            self.discord.error(f"インチEクス積立エラー: {str(e)}")
+            self.discord.error(f"インデックス積立エラー: {str(e)}")
     
     def execute_additional_investment(self, amount):
-        """追加投賁E実行（リバランス時！E""
+        """追加投資を実行（リバランス時）"""
         try:
-            ticker = self.config.get("index_bot.ticker")
-            nisa_account = self.config.get("ib_account.nisa_account_id")
+            settings = self.config.settings
+            ticker = settings.index_bot.ticker
+            nisa_account = settings.ib_account.nisa_account_id
             
-            self.discord.info(f"インチEクス追加投賁E開姁E {ticker} {amount}冁E)
+            self.discord.info(f"インデックス追加投資を開始: {ticker} {amount}円")
             
-            # 契紁EE
+            # 契約作成
             contract = self.ib_connector.create_stock_contract(ticker)
             
-            # 成行買ぁE斁E            order = self.ib_connector.create_market_order("BUY", amount)
+            # 成行買い注文
+            order = self.ib_connector.create_market_order("BUY", amount)
             
-            # 注斁E衁E            order_id = self.ib_connector.place_order(contract, order)
+            # 注文実行
+            order_id = self.ib_connector.place_order(contract, order, strategy="index", amount=amount, nisa=True)
             
             # 取引通知
             self.discord.trade_notification("BUY", ticker, amount, order_id=order_id)
             
-            self.discord.success(f"インチEクス追加投賁E亁E {ticker} {amount}冁E(注文ID: {order_id})")
+            self.discord.success(f"インデックス追加投資完了: {ticker} {amount}円 (注文ID: {order_id})")
             
         except Exception as e:
-            self.discord.error(f"インチEクス追加投賁Eラー: {str(e)}")
+            self.discord.error(f"インデックス追加投資エラー: {str(e)}")
     
     def get_current_holdings(self):
-        """現在の保有状況を取征E""
+        """現在の保有状況を取得"""
         try:
-            # 実裁EE後で詳細匁E            # IB APIを使用して保有銘柄を取征E            return []
+            # 実装は後で詳細化
+            # IB APIを使用して保有銘柄を取得
+            return []
         except Exception as e:
             self.discord.error(f"保有状況取得エラー: {str(e)}")
             return []
     
     def get_position_value(self):
-        """現在のポジション価値を取征E""
+        """現在のポジション価値を取得"""
         try:
-            # 実裁EE後で詳細匁E            # IB APIを使用してポジション価値を取征E            return 0
+            # 実装は後で詳細化
+            # IB APIを使用してポジション価値を取得
+            return 0
         except Exception as e:
             self.discord.error(f"ポジション価値取得エラー: {str(e)}")
             return 0
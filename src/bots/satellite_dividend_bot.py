@@ -1,42 +1,51 @@
-import pandas as pd
-import yfinance as yf
-import requests
-from bs4 import BeautifulSoup
+from src.shared_modules.lazy_import import lazy_import
 from src.shared_modules.config_loader import ConfigLoader
 from src.shared_modules.discord_logger import DiscordLogger
-from src.shared_modules.ib_connector import IBConnector
+from src.shared_modules.event_journal import get_event_journal
+from src.shared_modules.indicators import sma
+from src.shared_modules.job_metrics import get_job_metrics
+from src.shared_modules.screening_registry import ScreeningRegistry
+from src.shared_modules.state_store import get_state_store
+
+pd = lazy_import("pandas")
+yf = lazy_import("yfinance")
 
 class SatelliteDividendBot:
-    def __init__(self, config, discord, ib_connector):
+    def __init__(self, config, discord, ib_connector, metrics=None, quote_book=None, state_store=None):
         self.config = config
         self.discord = discord
         self.ib_connector = ib_connector
-        self.candidates_file = "purchase_candidate.csv"
-        self.holdings_file = "dividend_holdings.csv"
+        self.metrics = metrics or get_job_metrics()
+        self.quote_book = quote_book  # プロセス分離時の共有株価
+        self.state_store = state_store or get_state_store(config.settings.state_store.path)
+        self.screening = ScreeningRegistry(self.state_store)
+        self.events = get_event_journal()
     
     def run_screening(self):
-        """高E当株のスクリーニングを実衁E""
+        """高配当株のスクリーニングを実行"""
         try:
-            self.discord.info("高E当株スクリーニングを開姁E)
+            self.discord.info("高配当株スクリーニングを開始")
             
-            # TOPIX100構E銘柄のスクリーニング
+            # TOPIX100構成銘柄のスクリーニング
             candidates = self.screen_dividend_stocks()
             
-            # 結果をCSVに保孁E            candidates.to_csv(self.candidates_file, index=False)
+            # 結果を状態ストアに保存
+            self.state_store.replace_dividend_candidates(candidates.to_dict("records"))
             
-            self.discord.success(f"スクリーニング完亁E {len(candidates)}銘柄を候補として保孁E)
+            self.discord.success(f"スクリーニング完了: {len(candidates)}銘柄を候補として保存")
             
         except Exception as e:
             self.discord.error(f"スクリーニングエラー: {str(e)}")
     
     def screen_dividend_stocks(self):
-        """高E当株のスクリーニング条件を適用"""
+        """高配当株のスクリーニング条件を適用"""
         try:
-            # TOPIX100構E銘柄リスト（仮のチEEタEE            topix100_symbols = self.get_topix100_symbols()
+            # TOPIX100構成銘柄リスト（仮のデータ）
+            topix100_symbols = self.get_topix100_symbols()
             
             candidates = []
             
-            for symbol in topix100_symbols[:10]:  # チEト用に10銘柄のみ
+            for symbol in topix100_symbols[:10]:  # テスト用に10銘柄のみ
                 try:
                     stock_data = self.get_stock_fundamentals(symbol)
                     
@@ -50,204 +59,206 @@ class SatelliteDividendBot:
                         })
                         
                 except Exception as e:
-                    print(f"銘柄 {symbol} のチEEタ取得エラー: {e}")
+                    print(f"銘柄 {symbol} のデータ取得エラー: {e}")
                     continue
             
             return pd.DataFrame(candidates)
             
         except Exception as e:
-            self.discord.error(f"スクリーニング処琁Eラー: {str(e)}")
+            self.discord.error(f"スクリーニング処理エラー: {str(e)}")
             return pd.DataFrame()
     
     def get_topix100_symbols(self):
-        """TOPIX100構E銘柄を取征E""
-        # 実裁EE後で詳細化（外部APIまたEスクレイピングEE        return ["7203", "6758", "9984", "6861", "9432"]  # 仮のチEEタ
+        """TOPIX100構成銘柄を取得"""
+        # 実装は後で詳細化（外部APIまたはスクレイピング）
+        return ["7203", "6758", "9984", "6861", "9432"]  # 仮のデータ
     
     def get_stock_fundamentals(self, symbol):
-        """銘柄の財務データを取征E""
+        """銘柄の財務データを取得"""
         try:
-            # yfinanceを使用してチEEタを取征E            ticker = yf.Ticker(f"{symbol}.T")
-            info = ticker.info
+            # yfinanceを使用してデータを取得
+            with self.metrics.time_fetch(symbol, "fundamentals"):
+                ticker = yf.Ticker(f"{symbol}.T")
+                info = ticker.info
             
             return {
-                'dividend_yield': info.get('dividendYield', 0) * 100,  # パEセンチE                'per': info.get('trailingPE', 0),
-                'equity_ratio': 50.0,  # 仮の値E実裁EE後で詳細化！E                'no_dividend_cut': True  # 仮の値E実裁EE後で詳細化！E            }
+                'dividend_yield': info.get('dividendYield', 0) * 100,  # パーセント
+                'per': info.get('trailingPE', 0),
+                'equity_ratio': 50.0,  # 仮の値（実装は後で詳細化）
+                'no_dividend_cut': True  # 仮の値（実装は後で詳細化）
+            }
             
         except Exception as e:
             print(f"財務データ取得エラー {symbol}: {e}")
             return {}
     
     def check_dividend_criteria(self, stock_data):
-        """高E当株の条件をチェチE"""
+        """高配当株の条件をチェック"""
         try:
-            # 配当利回り >= 3.5%
-            if stock_data.get('dividend_yield', 0) < 3.5:
+            dividend_settings = self.config.settings.dividend_bot
+            
+            # 配当利回り >= min_dividend_yield（既定 3.5%）
+            if stock_data.get('dividend_yield', 0) < dividend_settings.min_dividend_yield:
                 return False
             
-            # 自己賁E比率 >= 40.0%
-            if stock_data.get('equity_ratio', 0) < 40.0:
+            # 自己資本比率 >= min_equity_ratio（既定 40.0%）
+            if stock_data.get('equity_ratio', 0) < dividend_settings.min_equity_ratio:
                 return False
             
-            # PER < 25
-            if stock_data.get('per', 0) >= 25:
+            # PER < max_per（既定 25）
+            if stock_data.get('per', 0) >= dividend_settings.max_per:
                 return False
             
-            # 過去10年間E減EなぁE            if not stock_data.get('no_dividend_cut', False):
+            # 過去10年間の減配なし
+            if not stock_data.get('no_dividend_cut', False):
                 return False
             
             return True
             
         except Exception as e:
-            print(f"条件チェチEエラー: {e}")
+            print(f"条件チェックエラー: {e}")
             return False
     
     def run_purchase_decision(self):
-        """高E当株の購入判断を実衁E""
+        """高配当株の購入判断を実行"""
         try:
-            self.discord.info("高E当株購入判断を開姁E)
+            self.discord.info("高配当株購入判断を開始")
             
-            # 現在の保有銘柄数チェチE
+            # 現在の保有銘柄数チェック
             current_holdings = self.get_current_holdings()
-            max_holdings = self.config.get("dividend_bot.max_holding_stocks")
+            max_holdings = self.config.settings.dividend_bot.max_holding_stocks
             
             if len(current_holdings) >= max_holdings:
-                self.discord.info("保有銘柄数が上限に達してぁEため、購入をスキチEE")
-                return
-            
-            # 購入候補から選宁E            try:
-                candidates = pd.read_csv(self.candidates_file)
-            except FileNotFoundError:
-                self.discord.warning("購入候補ファイルが見つかりません")
+                self.discord.info("保有銘柄数が上限に達しているため、購入をスキップ")
                 return
             
-            if candidates.empty:
+            # 購入候補から選定（配当利回りの高い順）
+            candidates = self.screening.dividend_candidates()
+            if not candidates:
                 self.discord.warning("購入候補がありません")
                 return
             
-            # 購入条件チェチE
-            for _, candidate in candidates.iterrows():
+            # 購入条件チェック
+            for candidate in candidates:
                 if self.check_purchase_condition(candidate):
                     self.execute_purchase(candidate)
                     break
-            
+                    
         except Exception as e:
             self.discord.error(f"購入判断エラー: {str(e)}")
     
     def check_purchase_condition(self, candidate):
-        """購入条件をチェチE"""
+        """購入条件をチェック"""
         try:
-            symbol = candidate['symbol']
+            symbol = candidate.symbol
             
-            # 現在の株価 < 25日移動平坁EE            current_price = self.get_current_price(symbol)
-            ma25 = self.get_moving_average(symbol, 25)
+            # 現在の株価 < ma_period日移動平均線（既定 25日）
+            ma_period = self.config.settings.dividend_bot.ma_period
+            current_price = self.get_current_price(symbol)
+            moving_average = self.get_moving_average(symbol, ma_period)
             
-            if current_price < ma25:
+            if current_price < moving_average:
+                self.events.record("signal", strategy="dividend", symbol=symbol, price=current_price, side="BUY",
+                                   reason=f"{ma_period}日移動平均線割れ", moving_average=float(moving_average))
                 return True
             
             return False
             
         except Exception as e:
-            print(f"購入条件チェチEエラー: {e}")
+            print(f"購入条件チェックエラー: {e}")
             return False
     
     def execute_purchase(self, candidate):
-        """購入を実衁E""
+        """購入を実行"""
         try:
-            symbol = candidate['symbol']
-            nisa_account = self.config.get("ib_account.nisa_account_id")
+            symbol = candidate.symbol
+            nisa_account = self.config.settings.ib_account.nisa_account_id
             
-            # 購入金額を決定（仮の値EE            purchase_amount = 50000  # 5丁EE
+            # 購入金額
+            purchase_amount = self.config.settings.dividend_bot.purchase_amount
             
-            self.discord.info(f"高E当株購入を開姁E {symbol} {purchase_amount}冁E)
+            self.discord.info(f"高配当株購入を開始: {symbol} {purchase_amount}円")
             
-            # 契紁EE
+            # 契約作成
             contract = self.ib_connector.create_stock_contract(symbol)
             
-            # 成行買ぁE斁E            order = self.ib_connector.create_market_order("BUY", purchase_amount)
+            # 成行買い注文
+            order = self.ib_connector.create_market_order("BUY", purchase_amount)
             
-            # 注斁E衁E            order_id = self.ib_connector.place_order(contract, order)
+            # 注文実行
+            order_id = self.ib_connector.place_order(contract, order, strategy="dividend", amount=purchase_amount,
+                                                     nisa=True)
             
             # 取引通知
             self.discord.trade_notification("BUY", symbol, purchase_amount, order_id=order_id)
             
-            # 保有銘柄リストに追加
-            self.add_to_holdings(symbol, purchase_amount, order_id)
+            # 保有銘柄リストへの追加と約定の記録（1つのトランザクション）
+            self.add_to_holdings(symbol, purchase_amount, order_id, nisa_account)
             
-            self.discord.success(f"高E当株購入完亁E {symbol} {purchase_amount}冁E(注文ID: {order_id})")
+            self.discord.success(f"高配当株購入完了: {symbol} {purchase_amount}円 (注文ID: {order_id})")
             
         except Exception as e:
             self.discord.error(f"購入実行エラー: {str(e)}")
     
     def get_current_price(self, symbol):
-        """現在の株価を取征E""
+        """現在の株価を取得"""
+        if self.quote_book is not None:
+            cached_price = self.quote_book.get(symbol)
+            if cached_price:
+                return cached_price
+        
         try:
-            ticker = yf.Ticker(f"{symbol}.T")
-            hist = ticker.history(period="1d")
-            return hist['Close'].iloc[-1]
+            with self.metrics.time_fetch(symbol, "quote"):
+                ticker = yf.Ticker(f"{symbol}.T")
+                hist = ticker.history(period="1d")
+            price = hist['Close'].iloc[-1]
+            if self.quote_book is not None:
+                self.quote_book.put(symbol, price)
+            return price
         except Exception as e:
             print(f"株価取得エラー {symbol}: {e}")
             return 0
     
     def get_moving_average(self, symbol, period):
-        """移動平坁E取征E""
+        """移動平均を取得"""
         try:
-            ticker = yf.Ticker(f"{symbol}.T")
-            hist = ticker.history(period=f"{period+10}d")
-            return hist['Close'].rolling(window=period).mean().iloc[-1]
+            with self.metrics.time_fetch(symbol, "history"):
+                ticker = yf.Ticker(f"{symbol}.T")
+                hist = ticker.history(period=f"{period+10}d")
+            return float(sma(hist['Close'].to_numpy(dtype=float), period)[-1])
         except Exception as e:
-            print(f"移動平坁E得エラー {symbol}: {e}")
+            print(f"移動平均取得エラー {symbol}: {e}")
             return 0
     
     def get_current_holdings(self):
-        """現在の保有銘柄を取征E""
+        """現在の保有銘柄を取得"""
         try:
-            df = pd.read_csv(self.holdings_file)
-            return df['symbol'].tolist()
-        except FileNotFoundError:
-            return []
+            return self.state_store.holding_symbols("dividend")
         except Exception as e:
             print(f"保有銘柄取得エラー: {e}")
             return []
     
-    def add_to_holdings(self, symbol, amount, order_id):
-        """保有銘柄リストに追加"""
+    def add_to_holdings(self, symbol, amount, order_id, account=None):
+        """保有銘柄リストに追加し、買いの約定も同じトランザクションで記録"""
         try:
-            new_holding = pd.DataFrame({
-                'symbol': [symbol],
-                'amount': [amount],
-                'order_id': [order_id],
-                'purchase_date': [pd.Timestamp.now()]
-            })
-            
-            try:
-                existing_df = pd.read_csv(self.holdings_file)
-                updated_df = pd.concat([existing_df, new_holding], ignore_index=True)
-            except FileNotFoundError:
-                updated_df = new_holding
-            
-            updated_df.to_csv(self.holdings_file, index=False)
-            
+            self.state_store.record_purchase("dividend", symbol, amount, order_id=order_id, account=account,
+                                             amount=amount)
         except Exception as e:
             print(f"保有銘柄追加エラー: {e}")
     
     def execute_additional_investment(self, amount):
-        """追加投賁E実行（リバランス時！E""
+        """追加投資を実行（リバランス時）"""
         try:
-            self.discord.info(f"高E当株追加投賁E開姁E {amount}冁E)
+            self.discord.info(f"高配当株追加投資を開始: {amount}円")
             
-            # 購入候補から最適な銘柄を選宁E            try:
-                candidates = pd.read_csv(self.candidates_file)
-            except FileNotFoundError:
-                self.discord.warning("購入候補ファイルが見つかりません")
-                return
-            
-            if candidates.empty:
+            # 最も配当利回りが高い銘柄を選定
+            best_candidate = self.screening.best_dividend_candidate()
+            if best_candidate is None:
                 self.discord.warning("購入候補がありません")
                 return
             
-            # 最もE当利回りが高い銘柄を選宁E            best_candidate = candidates.loc[candidates['dividend_yield'].idxmax()]
-            
-            # 購入実衁E            self.execute_purchase(best_candidate)
+            # 購入実行
+            self.execute_purchase(best_candidate)
             
         except Exception as e:
-            self.discord.error(f"追加投賁Eラー: {str(e)}")
+            self.discord.error(f"追加投資エラー: {str(e)}")
@@ -1,30 +1,50 @@
-import pandas as pd
-import numpy as np
-import yfinance as yf
+from src.shared_modules.lazy_import import lazy_import
 from src.shared_modules.config_loader import ConfigLoader
 from src.shared_modules.discord_logger import DiscordLogger
-from src.shared_modules.ib_connector import IBConnector
+from src.shared_modules.event_journal import get_event_journal
+from src.shared_modules.indicators import bollinger_bands, range_ratio
+from src.shared_modules.job_metrics import get_job_metrics
+from src.shared_modules.position_journal import get_position_journal
+from src.shared_modules.screening_registry import ScreeningRegistry
+from src.shared_modules.state_store import get_state_store
+from src.shared_modules.tracing import get_tracer
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+yf = lazy_import("yfinance")
 
 class SatelliteRangeBot:
-    def __init__(self, config, discord, ib_connector):
+    def __init__(self, config, discord, ib_connector, metrics=None, quote_book=None, state_store=None,
+                 position_journal=None):
         self.config = config
         self.discord = discord
         self.ib_connector = ib_connector
-        self.targets_file = "range_trade_target.csv"
-        self.holdings_file = "range_holdings.csv"
-        self.holdings = {}
+        self.metrics = metrics or get_job_metrics()
+        self.quote_book = quote_book  # プロセス分離時の共有株価
+        self.state_store = state_store or get_state_store(config.settings.state_store.path)
+        self.screening = ScreeningRegistry(self.state_store)
+        self.events = get_event_journal()
+        self.tracer = get_tracer()
+        
+        # 建玉はジャーナルから復元（再起動しても保有中の銘柄を忘れない）
+        self.position_journal = position_journal or get_position_journal(
+            config.settings.range_bot.journal_path,
+            fsync_interval=config.settings.range_bot.journal_fsync_interval_seconds
+        )
+        self.holdings = self.position_journal.get_positions()
     
     def run_screening(self):
-        """レンジ相場のスクリーニングを実衁E""
+        """レンジ相場のスクリーニングを実行"""
         try:
-            self.discord.info("レンジ相場スクリーニングを開姁E)
+            self.discord.info("レンジ相場スクリーニングを開始")
             
-            # 日絁E25構E銘柄のスクリーニング
+            # 日経225構成銘柄のスクリーニング
             targets = self.screen_range_stocks()
             
-            # 結果をCSVに保孁E            targets.to_csv(self.targets_file, index=False)
+            # 結果を状態ストアに保存
+            self.state_store.replace_range_targets(targets.to_dict("records"))
             
-            self.discord.success(f"レンジ相場スクリーニング完亁E {len(targets)}銘柄を対象として保孁E)
+            self.discord.success(f"レンジ相場スクリーニング完了: {len(targets)}銘柄を対象として保存")
             
         except Exception as e:
             self.discord.error(f"レンジ相場スクリーニングエラー: {str(e)}")
@@ -32,13 +52,15 @@ class SatelliteRangeBot:
     def screen_range_stocks(self):
         """レンジ相場のスクリーニング条件を適用"""
         try:
-            # 日絁E25構E銘柄リスト（仮のチEEタEE            nikkei225_symbols = self.get_nikkei225_symbols()
+            # 日経225構成銘柄リスト（仮のデータ）
+            nikkei225_symbols = self.get_nikkei225_symbols()
             
             targets = []
             
-            for symbol in nikkei225_symbols[:20]:  # チEト用に20銘柄のみ
+            for symbol in nikkei225_symbols[:20]:  # テスト用に20銘柄のみ
                 try:
-                    # 過去6ヶ月E価格チEEタを取征E                    price_data = self.get_price_data(symbol, period="6mo")
+                    # 過去6ヶ月の価格データを取得
+                    price_data = self.get_price_data(symbol, period="6mo")
                     
                     if self.check_range_criteria(price_data):
                         targets.append({
@@ -49,85 +71,89 @@ class SatelliteRangeBot:
                         })
                         
                 except Exception as e:
-                    print(f"銘柄 {symbol} のチEEタ取得エラー: {e}")
+                    print(f"銘柄 {symbol} のデータ取得エラー: {e}")
                     continue
             
             return pd.DataFrame(targets)
             
         except Exception as e:
-            self.discord.error(f"スクリーニング処琁Eラー: {str(e)}")
+            self.discord.error(f"スクリーニング処理エラー: {str(e)}")
             return pd.DataFrame()
     
     def get_nikkei225_symbols(self):
-        """日絁E25構E銘柄を取征E""
-        # 実裁EE後で詳細化（外部APIまたEスクレイピングEE        return ["7203", "6758", "9984", "6861", "9432", "7201", "6752", "8035", "8306", "4503"]  # 仮のチEEタ
+        """日経225構成銘柄を取得"""
+        # 実装は後で詳細化（外部APIまたはスクレイピング）
+        return ["7203", "6758", "9984", "6861", "9432", "7201", "6752", "8035", "8306", "4503"]  # 仮のデータ
     
     def get_price_data(self, symbol, period="6mo"):
-        """価格チEEタを取征E""
+        """価格データを取得"""
         try:
-            ticker = yf.Ticker(f"{symbol}.T")
-            hist = ticker.history(period=period)
+            with self.metrics.time_fetch(symbol, "history"):
+                ticker = yf.Ticker(f"{symbol}.T")
+                hist = ticker.history(period=period)
             return hist
         except Exception as e:
-            print(f"価格チEEタ取得エラー {symbol}: {e}")
+            print(f"価格データ取得エラー {symbol}: {e}")
             return pd.DataFrame()
     
     def check_range_criteria(self, price_data):
-        """レンジ相場の条件をチェチE"""
+        """レンジ相場の条件をチェック"""
         try:
             if price_data.empty:
                 return False
             
-            # (過去6ヶ月E最高値 - 最安値) / 最安値 <= 0.25
-            high_6m = price_data['High'].max()
-            low_6m = price_data['Low'].min()
-            range_ratio = (high_6m - low_6m) / low_6m
-            
-            return range_ratio <= 0.25
+            # (過去6ヶ月の最高値 - 最安値) / 最安値 <= 0.25
+            return self._range_ratio(price_data) <= 0.25
             
         except Exception as e:
-            print(f"レンジ条件チェチEエラー: {e}")
+            print(f"レンジ条件チェックエラー: {e}")
             return False
     
     def calculate_range_ratio(self, price_data):
-        """レンジ比率を計箁E""
+        """レンジ比率を計算"""
         try:
-            high_6m = price_data['High'].max()
-            low_6m = price_data['Low'].min()
-            return (high_6m - low_6m) / low_6m
+            return self._range_ratio(price_data)
         except Exception as e:
             print(f"レンジ比率計算エラー: {e}")
             return 0
     
+    def _range_ratio(self, price_data):
+        """期間全体のレンジ比率（バックテストのスクリーニングと同じ計算）"""
+        high = price_data['High'].to_numpy(dtype=float)
+        low = price_data['Low'].to_numpy(dtype=float)
+        return float(range_ratio(high, low, len(high))[-1])
+    
     def run_range_trading(self):
-        """レンジ取引を実衁E""
+        """レンジ取引を実行"""
         try:
-            # 取引対象銘柄の監要E            try:
-                targets = pd.read_csv(self.targets_file)
-            except FileNotFoundError:
-                self.discord.warning("取引対象ファイルが見つかりません")
-                return
-            
-            if targets.empty:
+            # 取引対象銘柄の監視（スクリーニングが更新されたときだけ読み直す）
+            targets = self.screening.range_targets()
+            if not targets:
                 self.discord.warning("取引対象がありません")
                 return
             
-            for _, target in targets.iterrows():
+            for target in targets:
                 self.monitor_stock(target)
                 
         except Exception as e:
             self.discord.error(f"レンジ取引エラー: {str(e)}")
     
     def monitor_stock(self, target):
-        """銘柄を監視して売買判断"""
+        """銘柄を監視して売買判断（シグナルから発注までを1つのトレースとして記録）"""
+        with self.tracer.trace("range.monitor_stock", symbol=target.symbol):
+            self._monitor_stock(target)
+    
+    def _monitor_stock(self, target):
         try:
-            symbol = target['symbol']
+            symbol = target.symbol
             
-            # 現在の株価を取征E            current_price = self.get_current_price(symbol)
+            # 現在の株価を取得
+            current_price = self.get_current_price(symbol)
             if current_price == 0:
                 return
             
-            # ボリンジャーバンドを計箁E            bb_data = self.calculate_bollinger_bands(symbol)
+            # ボリンジャーバンドを計算
+            bb_data = self.calculate_bollinger_bands(symbol)
             if bb_data is None:
                 return
             
@@ -135,177 +161,227 @@ class SatelliteRangeBot:
             lower_band = bb_data['lower']
             middle_band = bb_data['middle']
             
-            # 現在の保有状況を確誁E            if symbol in self.holdings:
+            # 現在の保有状況を確認
+            if symbol in self.holdings:
                 # 売却判断
-                self.check_sell_conditions(symbol, current_price, bb_data)
+                with self.tracer.span("range.check_sell"):
+                    self.check_sell_conditions(symbol, current_price, bb_data)
             else:
                 # 購入判断
-                self.check_buy_conditions(symbol, current_price, bb_data)
-                
+                with self.tracer.span("range.check_buy"):
+                    self.check_buy_conditions(symbol, current_price, bb_data)
+                    
         except Exception as e:
-            print(f"銘柄監視エラー {target['symbol']}: {e}")
+            print(f"銘柄監視エラー {target.symbol}: {e}")
     
     def check_buy_conditions(self, symbol, current_price, bb_data):
-        """購入条件をチェチE"""
+        """購入条件をチェック"""
         try:
             lower_band = bb_data['lower']
             
-            # 現在の株価 <= ボリンジャーバンド下限 (-2ρE
+            # 現在の株価 <= ボリンジャーバンド下限 (-2σ)
             if current_price <= lower_band:
+                self.events.record("signal", strategy="range", symbol=symbol, price=current_price, side="BUY",
+                                   reason="ボリンジャーバンド下限", lower_band=float(lower_band))
                 self.execute_buy(symbol, current_price)
                 
         except Exception as e:
-            print(f"購入条件チェチEエラー {symbol}: {e}")
+            print(f"購入条件チェックエラー {symbol}: {e}")
     
     def check_sell_conditions(self, symbol, current_price, bb_data):
-        """売却条件をチェチE"""
+        """売却条件をチェック"""
         try:
             upper_band = bb_data['upper']
             lower_band = bb_data['lower']
             holding = self.holdings[symbol]
             purchase_price = holding['price']
             
-            # 利確: 現在の株価 >= ボリンジャーバンド上限 (+2ρE
+            # 利確: 現在の株価 >= ボリンジャーバンド上限 (+2σ)
             if current_price >= upper_band:
                 self.execute_sell(symbol, current_price, "利確")
                 return
             
-            # 損EめE 現在の株価 <= 購入時Eボリンジャーバンド下限 * 0.98
+            # 損切り: 現在の株価 <= 購入時のボリンジャーバンド下限 * 0.98
             stop_loss_price = lower_band * 0.98
             if current_price <= stop_loss_price:
-                self.execute_sell(symbol, current_price, "損EめE)
+                self.execute_sell(symbol, current_price, "損切り")
                 return
             
-            # レンジブレイク損EめE            if current_price <= purchase_price * (1 - self.config.get("range_bot.stop_loss_percentage_on_break")):
-                self.execute_sell(symbol, current_price, "レンジブレイク損EめE)
+            # レンジブレイク損切り
+            if current_price <= purchase_price * (1 - self.config.settings.range_bot.stop_loss_percentage_on_break):
+                self.execute_sell(symbol, current_price, "レンジブレイク損切り")
                 
         except Exception as e:
-            print(f"売却条件チェチEエラー {symbol}: {e}")
+            print(f"売却条件チェックエラー {symbol}: {e}")
     
     def execute_buy(self, symbol, price):
-        """購入を実衁E""
+        """購入を実行"""
         try:
-            main_account = self.config.get("ib_account.main_account_id")
+            with self.tracer.span("range.config"):
+                main_account = self.config.settings.ib_account.main_account_id
             
-            # 購入数量を決定（仮の値EE            quantity = 100  # 100株
+            # 購入数量を決定（仮の値）
+            quantity = 100  # 100株
             
-            self.discord.info(f"レンジ取引購入を開姁E {symbol} {quantity}株 @{price}冁E)
+            self.discord.info(f"レンジ取引購入を開始: {symbol} {quantity}株 @{price}円")
             
-            # 契紁EE
+            # 契約作成
             contract = self.ib_connector.create_stock_contract(symbol)
             
-            # 成行買ぁE斁E            order = self.ib_connector.create_market_order("BUY", quantity)
+            # 成行買い注文
+            order = self.ib_connector.create_market_order("BUY", quantity)
             
-            # 注斁E衁E            order_id = self.ib_connector.place_order(contract, order)
+            # 注文実行（発注前チェックで銘柄数・投資額の上限を確認）
+            order_id = self.ib_connector.place_order(contract, order, strategy="range", amount=price * quantity)
             
             # 取引通知
             self.discord.trade_notification("BUY", symbol, quantity, price, order_id)
+            with self.tracer.span("state.record_fill"):
+                self.state_store.record_fill("range", symbol, "BUY", quantity, price, order_id, main_account)
             
-            # 保有惁Eを記録
+            # 保有情報を記録
             self.holdings[symbol] = {
                 'price': price,
                 'quantity': quantity,
                 'order_id': order_id,
                 'purchase_time': pd.Timestamp.now()
             }
+            with self.tracer.span("journal.record_open"):
+                self.position_journal.record_open(symbol, price, quantity, order_id,
+                                                  self.holdings[symbol]['purchase_time'])
             
-            self.discord.success(f"レンジ取引購入完亁E {symbol} {quantity}株 @{price}冁E(注文ID: {order_id})")
+            self.discord.success(f"レンジ取引購入完了: {symbol} {quantity}株 @{price}円 (注文ID: {order_id})")
             
         except Exception as e:
             self.discord.error(f"レンジ取引購入エラー: {str(e)}")
     
     def execute_sell(self, symbol, price, reason):
-        """売却を実衁E""
+        """売却を実行"""
         try:
             if symbol not in self.holdings:
                 return
             
             holding = self.holdings[symbol]
+            self.events.record("signal", strategy="range", symbol=symbol, price=price, side="SELL", reason=reason,
+                               purchase_price=float(holding['price']))
             quantity = holding['quantity']
             
-            self.discord.info(f"レンジ取引売却を開姁E {symbol} {quantity}株 @{price}冁E({reason})")
+            self.discord.info(f"レンジ取引売却を開始: {symbol} {quantity}株 @{price}円 ({reason})")
             
-            # 契紁EE
+            # 契約作成
             contract = self.ib_connector.create_stock_contract(symbol)
             
-            # 成行売り注斁E            order = self.ib_connector.create_market_order("SELL", quantity)
+            # 成行売り注文
+            order = self.ib_connector.create_market_order("SELL", quantity)
             
-            # 注斁E衁E            order_id = self.ib_connector.place_order(contract, order)
+            # 注文実行
+            order_id = self.ib_connector.place_order(contract, order, strategy="range", amount=holding['price'] * quantity)
             
             # 取引通知
             self.discord.trade_notification("SELL", symbol, quantity, price, order_id)
+            with self.tracer.span("state.record_fill"):
+                self.state_store.record_fill("range", symbol, "SELL", quantity, price, order_id,
+                                             self.config.settings.ib_account.main_account_id)
             
-            # 保有惁Eを削除
+            # 保有情報を削除
             del self.holdings[symbol]
+            with self.tracer.span("journal.record_close"):
+                self.position_journal.record_close(symbol, price, order_id, reason)
             
-            # 損益計箁E            profit_loss = (price - holding['price']) * quantity
-            profit_loss_text = f"損益: {profit_loss:+,.0f}冁E
+            # 損益計算
+            profit_loss = (price - holding['price']) * quantity
+            profit_loss_text = f"損益: {profit_loss:+,.0f}円"
             
-            self.discord.success(f"レンジ取引売却完亁E {symbol} {quantity}株 @{price}冁E({reason}) - {profit_loss_text} (注文ID: {order_id})")
+            self.discord.success(f"レンジ取引売却完了: {symbol} {quantity}株 @{price}円 ({reason}) - {profit_loss_text} (注文ID: {order_id})")
             
         except Exception as e:
             self.discord.error(f"レンジ取引売却エラー: {str(e)}")
     
     def get_current_price(self, symbol):
-        """現在の株価を取征E""
+        """現在の株価を取得"""
+        if self.quote_book is not None:
+            with self.tracer.span("range.price_fetch", source="quote_book"):
+                cached_price = self.quote_book.get(symbol)
+            if cached_price:
+                return cached_price
+        
         try:
-            ticker = yf.Ticker(f"{symbol}.T")
-            hist = ticker.history(period="1d")
-            return hist['Close'].iloc[-1]
+            with self.tracer.span("range.price_fetch", source="yfinance"), self.metrics.time_fetch(symbol, "quote"):
+                ticker = yf.Ticker(f"{symbol}.T")
+                hist = ticker.history(period="1d")
+            price = hist['Close'].iloc[-1]
+            if self.quote_book is not None:
+                self.quote_book.put(symbol, price)
+            return price
         except Exception as e:
             print(f"株価取得エラー {symbol}: {e}")
             return 0
     
     def calculate_bollinger_bands(self, symbol):
-        """ボリンジャーバンドを計箁E""
+        """ボリンジャーバンドを計算"""
         try:
-            period = self.config.get("range_bot.bollinger_period")
-            std_dev = self.config.get("range_bot.bollinger_std_dev")
+            with self.tracer.span("range.config"):
+                range_settings = self.config.settings.range_bot
+                period = range_settings.bollinger_period
+                std_dev = range_settings.bollinger_std_dev
             
-            ticker = yf.Ticker(f"{symbol}.T")
-            hist = ticker.history(period=f"{period+10}d")
+            with self.tracer.span("range.history_fetch"), self.metrics.time_fetch(symbol, "history"):
+                ticker = yf.Ticker(f"{symbol}.T")
+                hist = ticker.history(period=f"{period+10}d")
             
             if len(hist) < period:
                 return None
             
-            # 移動平坁E            middle_band = hist['Close'].rolling(window=period).mean().iloc[-1]
-            
-            # 標準偏差
-            std = hist['Close'].rolling(window=period).std().iloc[-1]
-            
-            # ボリンジャーバンチE            upper_band = middle_band + (std * std_dev)
-            lower_band = middle_band - (std * std_dev)
+            # ボリンジャーバンド（バックテストと同じ計算、最新の足の値）
+            with self.tracer.span("range.band_compute"):
+                upper, middle, lower = bollinger_bands(hist['Close'].to_numpy(dtype=float), period, std_dev)
             
             return {
-                'upper': upper_band,
-                'middle': middle_band,
-                'lower': lower_band
+                'upper': float(upper[-1]),
+                'middle': float(middle[-1]),
+                'lower': float(lower[-1])
             }
             
         except Exception as e:
             print(f"ボリンジャーバンド計算エラー {symbol}: {e}")
             return None
     
+    def reconcile_positions(self):
+        """建玉ジャーナルをIBの実ポジションと照合"""
+        try:
+            main_account = self.config.settings.ib_account.main_account_id
+            report = self.position_journal.reconcile(self.ib_connector.request_positions(main_account))
+            self.holdings = self.position_journal.get_positions()
+            
+            if report["closed"] or report["adjusted"]:
+                self.discord.warning(
+                    f"レンジ建玉を補正しました: 決済済み {report['closed']} / 数量補正 {report['adjusted']}"
+                )
+            else:
+                self.discord.info(f"レンジ建玉をIBと照合しました: {len(self.holdings)}銘柄")
+                
+        except Exception as e:
+            self.discord.error(f"レンジ建玉照合エラー: {str(e)}")
+    
+    def close(self):
+        """建玉ジャーナルを同期して閉じる"""
+        self.position_journal.close()
+    
     def execute_additional_investment(self, amount):
-        """追加投賁E実行（リバランス時！E""
+        """追加投資を実行（リバランス時）"""
         try:
-            self.discord.info(f"レンジ相場追加投賁E開姁E {amount}冁E)
+            self.discord.info(f"レンジ相場追加投資を開始: {amount}円")
             
-            # 取引対象から最適な銘柄を選宁E            try:
-                targets = pd.read_csv(self.targets_file)
-            except FileNotFoundError:
-                self.discord.warning("取引対象ファイルが見つかりません")
-                return
-            
-            if targets.empty:
+            # 最もレンジ比率が小さい（安定した）銘柄を選定
+            best_target = self.screening.best_range_target()
+            if best_target is None:
                 self.discord.warning("取引対象がありません")
                 return
             
-            # 最もレンジ比率が小さぁE安定した）銘柁E選宁E            best_target = targets.loc[targets['range_ratio'].idxmin()]
-            
-            # 購入実衁E            current_price = self.get_current_price(best_target['symbol'])
+            # 購入実行
+            current_price = self.get_current_price(best_target.symbol)
             if current_price > 0:
-                self.execute_buy(best_target['symbol'], current_price)
-            
+                self.execute_buy(best_target.symbol, current_price)
+                
         except Exception as e:
-            self.discord.error(f"追加投賁Eラー: {str(e)}")
+            self.discord.error(f"追加投資エラー: {str(e)}")
@@ -1,191 +1,520 @@
 import yaml
 import os
+import signal
 import time
+import threading
+from datetime import datetime
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
 from src.shared_modules.config_loader import ConfigLoader
 from src.shared_modules.discord_logger import DiscordLogger
-from src.shared_modules.ib_connector import IBConnector
+from src.shared_modules.event_journal import open_event_journal
+from src.shared_modules.graceful_shutdown import GracefulShutdown
 from src.shared_modules.nisa_monitor import NISAMonitor
-from src.bots.core_index_bot import CoreIndexBot
-from src.bots.satellite_dividend_bot import SatelliteDividendBot
-from src.bots.satellite_range_bot import SatelliteRangeBot
+from src.shared_modules.pre_trade_gate import apply_gate_config, build_pre_trade_gate
+from src.shared_modules.job_metrics import get_job_metrics
+from src.shared_modules.process_workers import build_bot, watch_config
+from src.shared_modules.risk_assessor import RiskAssessor
+from src.shared_modules.screening_registry import ScreeningRegistry
+from src.shared_modules.state_store import get_state_store
+from src.shared_modules.tracing import open_tracer
 
 class MainController:
     def __init__(self):
-        """メインコントローラーの初期匁E""
+        """メインコントローラーの初期化"""
         self.config = ConfigLoader()
-        self.discord = DiscordLogger(self.config.get("discord_webhook_url"))
-        self.ib_connector = IBConnector()
+        settings = self.config.settings  # 設定に誤りがあればここで全項目をまとめて報告して停止
+        self.discord = DiscordLogger(
+            settings.discord_webhook_url,
+            async_send=settings.discord_async_send
+        )
+        self._ib_connector = None
         self.scheduler = BlockingScheduler()
+        
+        # イベントジャーナル（シグナル・注文・約定・通知・停止）
+        self.events = open_event_journal(self.config, "main")
+        self.discord.event_journal = self.events
         self.stop_flag_file = "STOP.flag"
         
-        # NISA監視を初期匁E        self.nisa_monitor = NISAMonitor(self.config, self.discord, self.ib_connector)
+        # シグナル→注文→約定の所要時間のトレース
+        self.tracer = open_tracer(self.config, "main")
+        
+        # ジョブ計測
+        self.metrics = get_job_metrics()
+        self.discord.add_error_listener(self.metrics.note_handled_error)
+        
+        # 戦略状態ストア（初回のみ旧CSVを取り込む）
+        self.state_store = get_state_store(settings.state_store.path)
+        migrated = self.state_store.migrate_legacy_csv()
+        if migrated:
+            print(f"旧CSVを状態ストアに取り込みました: {migrated}")
+        self.screening = ScreeningRegistry(self.state_store)
+        
+        # NISA監視を初期化
+        self.nisa_monitor = NISAMonitor(self.config, self.discord, None)
+        
+        # 発注前リスクゲート（プロセス分離時はゲートウェイプロセス側のゲートが使われる）
+        self.pre_trade_gate = build_pre_trade_gate(self.config, self.nisa_monitor, self.state_store)
+        
+        # Botインスタンス（各Botは最初のジョブ実行時に生成）
+        self._bots = {}
+        self._bots_lock = threading.Lock()
+        
+        # 実行モード: "thread"（同一プロセス）/ "process"（Botごとにワーカープロセス）
+        self.execution_mode = settings.execution.mode
+        self.workers = None
+        self.quote_book = None
+        self.dashboard = None
+        self.resource_monitor = None
+        
+        # 停止手順（実行中ジョブ・注文・書き出しを待ってから切断）
+        self.shutdown = GracefulShutdown(
+            self.scheduler,
+            self.metrics,
+            drain_timeout=settings.shutdown.drain_timeout_seconds,
+            ack_timeout=settings.shutdown.order_ack_timeout_seconds,
+            flush_timeout=settings.shutdown.flush_timeout_seconds
+        )
+        self.shutdown.register_flush_hook("metrics", self.flush_metrics)
+        self.shutdown.register_flush_hook("resources", self.stop_resource_monitor)
+        self.shutdown.register_flush_hook("bots", self.close_bots)
+        self._stop_lock = threading.Lock()
+        self.stopped = False
+        
+        # 設定ファイルの監視（変更は検証後にまとめて反映）
+        self.config.add_reload_listener(self.on_config_reload)
+    
+    @property
+    def ib_connector(self):
+        """IB接続（ibapiの読み込みは最初に使うときまで遅延。プロセス分離時はゲートウェイクライアント）"""
+        if self._ib_connector is None:
+            from src.shared_modules.ib_connector import IBConnector
+            connector = IBConnector()
+            connector.event_journal = self.events
+            connector.pre_trade_gate = self.pre_trade_gate
+            self._ib_connector = self.nisa_monitor.ib_connector = connector
+        return self._ib_connector
+    
+    @ib_connector.setter
+    def ib_connector(self, connector):
+        self._ib_connector = connector
+    
+    @property
+    def index_bot(self):
+        return self.get_bot("index")
+    
+    @property
+    def dividend_bot(self):
+        return self.get_bot("dividend")
+    
+    @property
+    def range_bot(self):
+        return self.get_bot("range")
+    
+    def get_bot(self, strategy):
+        """戦略のBotを取得（未生成ならモジュールの読み込みから行う）"""
+        bot = self._bots.get(strategy)
+        if bot is not None:
+            return bot
+        
+        with self._bots_lock:
+            if strategy not in self._bots:
+                self._bots[strategy] = self.create_bot(strategy)
+            return self._bots[strategy]
+    
+    def create_bot(self, strategy):
+        """Botを生成"""
+        return build_bot(strategy, self.config, self.discord, self.ib_connector,
+                         metrics=self.metrics, quote_book=self.quote_book)
+    
+    def bot_job(self, strategy, method_name):
+        """Botのメソッドを呼び出すジョブ関数（Botは初回実行時に生成）"""
+        def job():
+            return self.run_bot_method(strategy, method_name)
         
-        # Botインスタンス
-        self.index_bot = CoreIndexBot(self.config, self.discord, self.ib_connector)
-        self.dividend_bot = SatelliteDividendBot(self.config, self.discord, self.ib_connector)
-        self.range_bot = SatelliteRangeBot(self.config, self.discord, self.ib_connector)
+        job.__name__ = method_name
+        return job
+    
+    def run_bot_method(self, strategy, method_name, *args):
+        """Botのメソッドを実行（プロセス分離時は担当ワーカーで実行）"""
+        if self.workers is not None:
+            # ワーカー内でDiscordに通知されたエラーもこのジョブの失敗として計測
+            for message in self.workers.run_job(strategy, method_name, *args):
+                self.metrics.note_handled_error(message)
+            return None
+        return getattr(self.get_bot(strategy), method_name)(*args)
+    
+    def get_current_price(self, strategy, symbol):
+        """現在の株価を取得（プロセス分離時は共有株価、無ければ担当ワーカーが取得して共有する）"""
+        if self.workers is None:
+            return self.get_bot(strategy).get_current_price(symbol)
+        price = self.quote_book.get(symbol)
+        if price:
+            return price
+        return self.workers.call(strategy, "get_current_price", symbol)
     
     def start(self):
-        """シスチEを起勁E""
+        """システムを起動"""
         try:
-            # STOP.flagの存在をチェチE
+            # STOP.flagの存在をチェック
             if self.check_stop_flag():
-                self.discord.error("【CRITICAL】STOP.flagが検Eされました。シスチEを起動しません、E)
-                print("STOP.flagが存在するため、シスチEを起動しません、E)
-                print("emergency_stop.pyを実行してSTOP.flagを削除してください、E)
+                self.discord.error("【CRITICAL】STOP.flagが検出されました。システムを起動しません。")
+                print("STOP.flagが存在するため、システムを起動しません。")
+                print("emergency_stop.pyを実行してSTOP.flagを削除してください。")
                 return False
             
-            # IB接綁E            ib_config = self.config.get("ib_account")
-            if not self.ib_connector.connect_to_ib(
-                ib_config["host"], 
-                ib_config["port"], 
-                ib_config["client_id"]
-            ):
+            # IB接続（プロセス分離時はゲートウェイプロセスが接続を保持）
+            if self.execution_mode == "process":
+                connected = self.start_workers()
+            else:
+                ib_config = self.config.settings.ib_account
+                connected = self.ib_connector.connect_to_ib(
+                    ib_config.host,
+                    ib_config.port,
+                    ib_config.client_id
+                )
+            if not connected:
                 raise Exception("IB接続に失敗しました")
             
             self.discord.success("Project Chimera が起動しました")
             
-            # スケジューラー設宁E            self.setup_scheduler()
+            # スケジューラー設定
+            self.setup_scheduler()
+            
+            # メトリクス公開
+            self.start_metrics_export()
             
-            # メインループ開姁E            self.scheduler.start()
+            # ダッシュボード公開
+            self.start_dashboard()
+            
+            # リソース監視
+            self.start_resource_monitor()
+            
+            # 設定ファイルの監視
+            watch_config(self.config)
+            
+            # メインループ開始
+            self.scheduler.start()
             
         except Exception as e:
-            self.discord.error(f"シスチE起動エラー: {str(e)}")
+            self.discord.error(f"システム起動エラー: {str(e)}")
             raise
     
+    def start_workers(self):
+        """IBゲートウェイ・共有状態・Botワーカーの各プロセスを起動"""
+        from src.shared_modules.process_workers import WorkerSupervisor
+        
+        self.workers = WorkerSupervisor(self.config, metrics=self.metrics)
+        connected = self.workers.start()
+        
+        # 監督プロセスからの発注（リバランス）もゲートウェイ経由にする
+        self.ib_connector = self.workers.gateway_client()
+        self.nisa_monitor.ib_connector = self.ib_connector
+        self.quote_book = self.workers.quote_book()
+        print(f"ワーカープロセスを起動しました: {', '.join(self.workers.strategies)}")
+        return connected
+    
+    def on_config_reload(self, changed):
+        """設定の再読み込み時に上限値を反映して通知"""
+        self.nisa_monitor.apply_config()
+        apply_gate_config(self.pre_trade_gate, self.config)
+        shown = ", ".join(changed[:10]) + (f" ほか{len(changed) - 10}件" if len(changed) > 10 else "")
+        self.discord.info(f"設定を再読み込みしました: {shown}")
+    
     def check_stop_flag(self) -> bool:
-        """STOP.flagの存在をチェチE"""
+        """STOP.flagの存在をチェック"""
         return os.path.exists(self.stop_flag_file)
     
     def monitor_stop_flag(self):
-        """STOP.flagを監視し、検E時EシスチEを停止"""
+        """STOP.flagを監視し、検出時はシステムを停止"""
         if self.check_stop_flag():
-            self.discord.error("【CRITICAL】STOP.flagが検Eされました。シスチEを停止します、E)
-            print("STOP.flagが検Eされました。シスチEを停止します、E)
-            self.scheduler.shutdown()
+            self.discord.error("【CRITICAL】STOP.flagが検出されました。システムを停止します。")
+            self.pre_trade_gate.trip("STOP.flag検出")
+            self.events.record("stop", reason="STOP.flag検出")
+            print("STOP.flagが検出されました。システムを停止します。")
+            # このジョブ自身の完了も待つため、停止処理は別スレッドで実行
+            threading.Thread(target=self.stop, name="graceful-shutdown").start()
             return True
         return False
     
+    def add_job(self, func, trigger, job_id, name, budget_seconds=None):
+        """計測付きでスケジューラーにジョブを登録"""
+        self.scheduler.add_job(
+            self.metrics.instrument(job_id, func, budget_seconds),
+            trigger,
+            id=job_id,
+            name=name
+        )
+    
     def setup_scheduler(self):
         """スケジューラーにタスクを登録"""
-        # STOP.flag監要E 1刁Eと
-        self.scheduler.add_job(
+        self.metrics.attach_to_scheduler(self.scheduler)
+        
+        # レンジBot建玉の照合: 起動時に1回
+        self.add_job(
+            self.bot_job("range", "reconcile_positions"),
+            DateTrigger(),
+            "range_reconcile",
+            "レンジ建玉照合"
+        )
+        
+        # STOP.flag監視: 1分ごと
+        self.add_job(
             self.monitor_stop_flag,
             CronTrigger(minute="*"),
-            id="stop_flag_monitor",
-            name="STOP.flag監要E
+            "stop_flag_monitor",
+            "STOP.flag監視",
+            budget_seconds=60
         )
         
-        # インチEクスBot: 毎月1日 9:30
-        self.scheduler.add_job(
-            self.index_bot.execute_monthly_investment,
+        # インデックスBot: 毎月1日 9:30
+        self.add_job(
+            self.bot_job("index", "execute_monthly_investment"),
             CronTrigger(day=1, hour=9, minute=30),
-            id="index_monthly",
-            name="インチEクス積立実衁E
+            "index_monthly",
+            "インデックス積立実行"
         )
         
-        # 高E当Bot: 毎週日曁E22:00 (スクリーニング)
-        self.scheduler.add_job(
-            self.dividend_bot.run_screening,
+        # 高配当Bot: 毎週日曜 22:00 (スクリーニング)
+        self.add_job(
+            self.bot_job("dividend", "run_screening"),
             CronTrigger(day_of_week=6, hour=22, minute=0),
-            id="dividend_screening",
-            name="高E当株スクリーニング"
+            "dividend_screening",
+            "高配当株スクリーニング"
         )
         
-        # 高E当Bot: 毎営業日 9:05 (購入判断)
-        self.scheduler.add_job(
-            self.dividend_bot.run_purchase_decision,
+        # 高配当Bot: 毎営業日 9:05 (購入判断)
+        self.add_job(
+            self.bot_job("dividend", "run_purchase_decision"),
             CronTrigger(day_of_week="mon-fri", hour=9, minute=5),
-            id="dividend_purchase",
-            name="高E当株購入判断"
+            "dividend_purchase",
+            "高配当株購入判断"
         )
         
         # レンジBot: 毎営業日 16:00 (スクリーニング)
-        self.scheduler.add_job(
-            self.range_bot.run_screening,
+        self.add_job(
+            self.bot_job("range", "run_screening"),
             CronTrigger(day_of_week="mon-fri", hour=16, minute=0),
-            id="range_screening",
-            name="レンジ相場スクリーニング"
+            "range_screening",
+            "レンジ相場スクリーニング"
         )
         
-        # レンジBot: 取引時間中 常時実衁E        self.scheduler.add_job(
-            self.range_bot.run_range_trading,
+        # レンジBot: 取引時間中 常時実行（1分ごとに起動するため予算は60秒）
+        self.add_job(
+            self.bot_job("range", "run_range_trading"),
             CronTrigger(day_of_week="mon-fri", hour="9-15", minute="*"),
-            id="range_trading",
-            name="レンジ取引実衁E
+            "range_trading",
+            "レンジ取引実行",
+            budget_seconds=60
         )
         
-        # ポEトフォリオリバランス: 毎月1日 10:00
-        self.scheduler.add_job(
+        # ポートフォリオリバランス: 毎月1日 10:00
+        self.add_job(
             self.rebalance_portfolio,
             CronTrigger(day=1, hour=10, minute=0),
-            id="portfolio_rebalance",
-            name="ポEトフォリオリバランス"
+            "portfolio_rebalance",
+            "ポートフォリオリバランス"
         )
         
-        # NISA使用状況レポEチE 毎日 18:00
-        self.scheduler.add_job(
+        # NISA使用状況レポート: 毎日 18:00
+        self.add_job(
             self.nisa_monitor.send_usage_report,
             CronTrigger(hour=18, minute=0),
-            id="nisa_report",
-            name="NISA使用状況レポEチE
+            "nisa_report",
+            "NISA使用状況レポート"
         )
         
         self.discord.info("スケジューラーが設定されました")
     
+    def start_metrics_export(self):
+        """メトリクスのテキストファイル出力とHTTP公開を開始"""
+        metrics_settings = self.config.settings.metrics
+        if not metrics_settings.enabled:
+            return
+        
+        textfile_path = metrics_settings.textfile_path
+        if textfile_path:
+            interval = metrics_settings.export_interval_seconds
+            self.scheduler.add_job(
+                self.metrics.write_textfile,
+                "interval",
+                seconds=interval,
+                args=[textfile_path],
+                id="metrics_export",
+                name="メトリクス出力"
+            )
+        
+        http_port = metrics_settings.http_port
+        if http_port:
+            http_host = metrics_settings.http_host
+            try:
+                self.metrics.start_http_server(http_host, http_port)
+                print(f"メトリクスを公開しました: http://{http_host}:{http_port}/metrics")
+            except OSError as e:
+                print(f"メトリクスHTTPサーバー起動エラー: {e}")
+    
+    def start_dashboard(self):
+        """ダッシュボード（状態ストア・NISA台帳・ジョブ計測・共有株価の表示）を公開"""
+        settings = self.config.settings.dashboard
+        if not settings.enabled or not settings.port:
+            return
+        from dashboard.app import create_dashboard
+        try:
+            self.dashboard = create_dashboard(
+                self.config,
+                state_store=self.state_store,
+                nisa_ledger=self.nisa_monitor.ledger,
+                metrics=self.metrics,
+                quote_book=self.quote_book
+            ).start()
+            print(f"ダッシュボードを公開しました: {self.dashboard.url}")
+        except OSError as e:
+            print(f"ダッシュボード起動エラー: {e}")
+    
+    def start_resource_monitor(self):
+        """CPU時間・メモリ・スレッド・GC・キューの長さの定期記録を開始"""
+        settings = self.config.settings.resource_monitor
+        if not settings.enabled:
+            return
+        from src.shared_modules.resource_monitor import ResourceMonitor
+        monitor = ResourceMonitor(settings.path, settings.interval_seconds, settings.max_bytes, settings.backup_count)
+        monitor.add_queue("scheduler_running", self.metrics.in_flight_count)
+        monitor.add_queue("scheduler_due", self.due_job_count)
+        monitor.add_queue("discord", self.discord.pending_count)
+        # IBへの送信はソケットへの同期書き込みなので、送信後に確認待ちの注文数を見る
+        # （プロセス分離時はゲートウェイプロセスが持つため記録しない）
+        if hasattr(self.ib_connector, "pending_orders"):
+            monitor.add_queue("ib_pending_orders", lambda: len(self.ib_connector.pending_orders))
+        try:
+            self.resource_monitor = monitor.start()
+        except OSError as e:
+            print(f"リソース監視の開始エラー: {e}")
+    
+    def stop_resource_monitor(self):
+        """リソース監視の最後の値を記録して停止"""
+        if self.resource_monitor is not None:
+            self.resource_monitor.stop()
+            self.resource_monitor = None
+    
+    def due_job_count(self) -> int:
+        """実行予定時刻を過ぎてまだ始まっていないジョブの数"""
+        count = 0
+        for job in self.scheduler.get_jobs():
+            next_run_time = getattr(job, "next_run_time", None)
+            if next_run_time is not None and next_run_time <= datetime.now(next_run_time.tzinfo):
+                count += 1
+        return count
+    
     def rebalance_portfolio(self):
-        """ポEトフォリオリバランスを実衁E""
+        """ポートフォリオリバランスを実行"""
         try:
-            self.discord.info("ポEトフォリオリバランスを実行中...")
-            
-            # 現在の総賁E評価額を取征E            total_value = self.get_total_portfolio_value()
-            
-            # 吁E略の現在の評価額を取征E            index_value = self.get_strategy_value("index")
-            dividend_value = self.get_strategy_value("dividend")
-            range_value = self.get_strategy_value("range")
-            
-            # 現在の比率を計箁E            current_ratios = {
-                "index": index_value / total_value if total_value > 0 else 0,
-                "dividend": dividend_value / total_value if total_value > 0 else 0,
-                "range": range_value / total_value if total_value > 0 else 0
-            }
+            self.discord.info("ポートフォリオリバランスを実行中...")
             
             # 目標比率
-            target_ratios = self.config.get("portfolio_ratios")
+            target_ratios = self.get_target_ratios()
+            
+            # 各戦略の現在の評価額を取得
+            current_values = {strategy: self.get_strategy_value(strategy) for strategy in target_ratios}
             
-            # 最も比率が不足してぁE戦略を特宁E            max_deviation = 0
-            target_strategy = "index"
+            # 追加投資額を乖離が最小になるよう各戦略に配分
+            from src.shared_modules.rebalance_allocator import RebalanceAllocator
+            settings = self.config.settings
+            monthly_investment = settings.index_bot.monthly_investment
+            allocator = RebalanceAllocator(
+                target_ratios,
+                nisa_strategies=settings.rebalance.nisa_strategies,
+                default_lot_size=settings.rebalance.default_lot_size,
+                lot_sizes=settings.rebalance.lot_sizes
+            )
+            strategy_amounts = allocator.allocate(current_values, monthly_investment)
             
-            for strategy in ["index", "dividend", "range"]:
-                deviation = target_ratios[strategy] - current_ratios[strategy]
-                if deviation > max_deviation:
-                    max_deviation = deviation
-                    target_strategy = strategy
+            # 銘柄単位の注文バスケットを作成（NISA残枠超過分は課税口座へ）
+            annual_remaining, lifetime_remaining = self.nisa_monitor.get_remaining_limits()
+            plan = allocator.build_basket(
+                strategy_amounts,
+                self.get_rebalance_sub_positions(strategy_amounts),
+                nisa_remaining=min(annual_remaining, lifetime_remaining)
+            )
             
-            # 追加投賁EEを特定戦略に割り当て
-            monthly_investment = self.config.get("index_bot.monthly_investment")
+            self.submit_rebalance_basket(plan["orders"])
             
-            if target_strategy == "index":
-                self.index_bot.execute_additional_investment(monthly_investment)
-            elif target_strategy == "dividend":
-                self.dividend_bot.execute_additional_investment(monthly_investment)
-            elif target_strategy == "range":
-                self.range_bot.execute_additional_investment(monthly_investment)
+            # 銘柄情報が無い戦略は各Botの追加投資に任せる
+            for strategy, amount in plan["unallocated"].items():
+                if strategy in ("index", "dividend", "range"):
+                    self.run_bot_method(strategy, "execute_additional_investment", int(amount))
             
-            self.discord.success(f"リバランス完亁E {target_strategy}戦略に{monthly_investment}冁E追加投賁E)
+            summary = ", ".join(f"{s}: {a:,.0f}円" for s, a in strategy_amounts.items())
+            self.discord.success(
+                f"リバランス完了: {summary} (注文{len(plan['orders'])}件, 未使用 {plan['leftover_cash']:,.0f}円)"
+            )
             
         except Exception as e:
             self.discord.error(f"リバランスエラー: {str(e)}")
     
+    def get_target_ratios(self):
+        """目標比率を取得（リスクプロファイル指定時はその比率）"""
+        profile = self.config.settings.rebalance.risk_profile
+        if profile:
+            return RiskAssessor(self.config).get_portfolio_ratios(profile)
+        return self.config.settings.portfolio_ratios.as_dict()
+    
+    def get_rebalance_sub_positions(self, strategy_amounts):
+        """リバランス対象の銘柄と現在値を戦略ごとに取得"""
+        sub_positions = {}
+        
+        if strategy_amounts.get("index", 0) > 0:
+            ticker = self.config.settings.index_bot.ticker
+            # インデックスBotは株価を取得しないため、レンジBotの取得処理を使う
+            sub_positions["index"] = [{"symbol": ticker, "price": self.get_current_price("range", ticker)}]
+        
+        if strategy_amounts.get("dividend", 0) > 0:
+            max_holdings = self.config.settings.dividend_bot.max_holding_stocks
+            sub_positions["dividend"] = [
+                {"symbol": candidate.symbol, "price": self.get_current_price("dividend", candidate.symbol)}
+                for candidate in self.screening.dividend_candidates(limit=max_holdings)
+            ]
+        
+        if strategy_amounts.get("range", 0) > 0:
+            sub_positions["range"] = [
+                {"symbol": target.symbol, "price": self.get_current_price("range", target.symbol)}
+                for target in self.screening.range_targets()
+            ]
+        
+        return {s: [p for p in positions if p["price"] > 0] for s, positions in sub_positions.items()}
+    
+    def submit_rebalance_basket(self, orders):
+        """注文バスケットを発注"""
+        accounts = {
+            "nisa": self.config.settings.ib_account.nisa_account_id,
+            "taxable": self.config.settings.ib_account.main_account_id
+        }
+        for basket_order in orders:
+            try:
+                contract = self.ib_connector.create_stock_contract(basket_order["symbol"])
+                order = self.ib_connector.create_market_order("BUY", basket_order["quantity"])
+                order.account = accounts.get(basket_order["account"], "")
+                # NISA枠の予約・台帳への記録は発注前ゲートが行う
+                order_id = self.ib_connector.place_order(
+                    contract, order, strategy=basket_order["strategy"], amount=basket_order["amount"],
+                    nisa=basket_order["account"] == "nisa"
+                )
+                
+                self.discord.trade_notification(
+                    "BUY", basket_order["symbol"], basket_order["quantity"], basket_order["price"], order_id
+                )
+            except Exception as e:
+                self.discord.error(f"リバランス発注エラー {basket_order['symbol']}: {str(e)}")
+    
     def get_total_portfolio_value(self):
-        """総Eートフォリオ価値を取征E""
-        # 実裁EE後で詳細匁E        return 1000000  # 仮の値
+        """総ポートフォリオ価値を取得"""
+        # 実装は後で詳細化
+        return 1000000  # 仮の値
     
     def get_strategy_value(self, strategy):
-        """吁E略の評価額を取征E""
-        # 実裁EE後で詳細匁E        values = {
+        """各戦略の評価額を取得"""
+        # 実装は後で詳細化
+        values = {
             "index": 500000,
             "dividend": 300000,
             "range": 200000
@@ -193,16 +522,63 @@ class MainController:
         return values.get(strategy, 0)
     
     def stop(self):
-        """シスチEを停止"""
+        """システムを停止（新規ジョブ停止 → 実行中ジョブ完了待ち → 注文確認 → 書き出し → 切断）"""
+        with self._stop_lock:
+            if self.stopped:
+                return None
+            self.stopped = True
+        
+        self.events.record("stop", reason="graceful_shutdown")
+        self.config.stop_watching()
         try:
-            self.scheduler.shutdown()
-            self.ib_connector.disconnect_from_ib()
-            self.discord.info("Project Chimera が停止しました")
+            report = self.shutdown.run(
+                wait_for_orders=self.ib_connector.wait_for_order_acks,
+                flush_notifications=self.discord.flush,
+                disconnect=self.disconnect
+            )
+            summary = self.shutdown.format_report()
+            print(f"停止手順:\n{summary}")
+            self.discord.info(
+                "Project Chimera が停止しました",
+                fields=[{"name": "停止手順", "value": summary, "inline": False}]
+            )
+            self.discord.close(self.shutdown.flush_timeout)
+            self.events.close()
+            self.tracer.close()
+            return report
         except Exception as e:
-            print(f"シスチE停止エラー: {e}")
+            print(f"システム停止エラー: {e}")
+    
+    def flush_metrics(self):
+        """メトリクスの最終値を書き出してHTTP公開（メトリクス・ダッシュボード）を停止"""
+        self.metrics.stop_http_server()
+        if self.dashboard is not None:
+            self.dashboard.stop()
+            self.dashboard = None
+        textfile_path = self.config.settings.metrics.textfile_path
+        if textfile_path:
+            self.metrics.write_textfile(textfile_path)
+    
+    def close_bots(self):
+        """生成済みのBotの状態ファイルを閉じる"""
+        for bot in list(self._bots.values()):
+            if hasattr(bot, "close"):
+                bot.close()
+    
+    def disconnect(self):
+        """IB接続（プロセス分離時は全ワーカー）を停止"""
+        if self.workers is not None:
+            self.workers.shutdown()
+        else:
+            self.ib_connector.disconnect_from_ib()
+
+def _raise_keyboard_interrupt(signum, frame):
+    """SIGTERMでもCtrl+Cと同じ停止手順を実行"""
+    raise KeyboardInterrupt
 
 if __name__ == "__main__":
     controller = MainController()
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
     try:
         controller.start()
     except KeyboardInterrupt:
@@ -1,32 +1,112 @@
 import yaml
+import copy
 import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Dict, List, Optional
+from src.shared_modules.config_schema import ConfigValidationError, Settings, collect_errors
 from src.shared_modules.env_loader import EnvLoader
 
+_MISSING = object()
+
+
+def _freeze(value):
+    """設定値を変更不可な形に変換（辞書は読み取り専用ビュー、リストはタプル）"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def compile_config(config: Dict) -> MappingProxyType:
+    """ネストした設定を「ドット区切りのキー -> 値」のフラットな読み取り専用スナップショットに変換"""
+    flat = {}
+    
+    def walk(prefix, value):
+        flat[prefix] = _freeze(value)
+        if isinstance(value, dict):
+            for k, v in value.items():
+                walk(f"{prefix}.{k}", v)
+    
+    for key, value in config.items():
+        walk(str(key), value)
+    return MappingProxyType(flat)
+
+
+@dataclass(frozen=True)
+class ConfigState:
+    """ある時点の設定一式（再読み込みはこのオブジェクトの差し替え1回で反映する）"""
+    raw: Dict
+    snapshot: MappingProxyType
+    settings: Optional[Settings]
+    errors: List[str]
+    
+    @classmethod
+    def compile(cls, raw: Dict) -> "ConfigState":
+        """フラットなスナップショットと型付きの設定を作成"""
+        settings, errors = collect_errors(raw)
+        return cls(raw, compile_config(raw), settings, errors)
+
+
 class ConfigLoader:
-    def __init__(self, config_path="src/config/config.yaml"):
+    def __init__(self, config_path="src/config/config.yaml", env_path=".env"):
         self.config_path = config_path
-        self.env_loader = EnvLoader()
-        self.config = self.load_config()
+        self.env_loader = EnvLoader(env_path)
+        self.overrides = {}
+        self.reload_listeners = []
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._watch_stop = threading.Event()
+        self._mtimes = self._file_mtimes()
+        
+        self._state = ConfigState.compile(self.load_config())
+        if self._state.errors:
+            print(ConfigValidationError(self._state.errors))
+    
+    @classmethod
+    def from_dict(cls, config: Dict) -> "ConfigLoader":
+        """ファイルを読まずに辞書から作成（テスト・バックテスト用）"""
+        loader = cls.__new__(cls)
+        loader.config_path = None
+        loader.env_loader = None
+        loader.overrides = {}
+        loader.reload_listeners = []
+        loader._reload_lock = threading.Lock()
+        loader._watcher = None
+        loader._watch_stop = threading.Event()
+        loader._mtimes = {}
+        loader._state = ConfigState.compile(dict(config))
+        return loader
+    
+    @property
+    def state(self) -> ConfigState:
+        """現在の設定一式（1回の処理の中で複数の値を揃えて読むときはこれを1度だけ取得する）"""
+        return self._state
+    
+    @property
+    def config(self) -> Dict:
+        """現在の設定（ネストした辞書）"""
+        return self._state.raw
+    
+    @property
+    def settings(self) -> Settings:
+        """検証済みの型付き設定（設定に誤りがあれば ConfigValidationError）"""
+        state = self._state
+        if state.settings is None:
+            raise ConfigValidationError(state.errors)
+        return state.settings
+    
+    @property
+    def snapshot(self) -> MappingProxyType:
+        """現在の設定のフラットなスナップショット"""
+        return self._state.snapshot
     
     def load_config(self):
         """設定ファイルを読み込む"""
         try:
-            with open(self.config_path, "r", encoding="utf-8") as file:
-                config = yaml.safe_load(file)
-            
-            # 環墁E数から機寁E報を取得して設定に追加
-            config["ib_account"] = {
-                "main_account_id": self.env_loader.get_ib_main_account_id(),
-                "nisa_account_id": self.env_loader.get_ib_nisa_account_id(),
-                "host": self.config.get("ib_gateway", {}).get("host", "127.0.0.1"),
-                "port": self.config.get("ib_gateway", {}).get("port", 5000),
-                "client_id": self.config.get("ib_gateway", {}).get("client_id", 1)
-            }
-            
-            config["discord_webhook_url"] = self.env_loader.get_discord_webhook_url()
-            
-            return config
-            
+            return self._read_config()
         except FileNotFoundError:
             print(f"設定ファイルが見つかりません: {self.config_path}")
             return {}
@@ -37,40 +117,147 @@ class ConfigLoader:
             print(f"設定読み込みエラー: {e}")
             return {}
     
-    def get(self, key, default=None):
-        """設定値を取得する（ドチE記法対応！E""
+    def _read_config(self) -> Dict:
+        """設定ファイルと環境変数から設定を組み立てる（失敗時は例外）"""
+        with open(self.config_path, "r", encoding="utf-8") as file:
+            config = yaml.safe_load(file) or {}
+        
+        # 環境変数から機密情報を取得して設定に追加（未設定ならconfig.yamlの値を使う）
+        ib_account = dict(config.get("ib_account") or {})
+        ib_gateway = config.get("ib_gateway") or {}
+        config["ib_account"] = {
+            "main_account_id": self.env_loader.get("IB_MAIN_ACCOUNT_ID", ib_account.get("main_account_id")),
+            "nisa_account_id": self.env_loader.get("IB_NISA_ACCOUNT_ID", ib_account.get("nisa_account_id")),
+            "host": ib_gateway.get("host", ib_account.get("host", "127.0.0.1")),
+            "port": ib_gateway.get("port", ib_account.get("port", 5000)),
+            "client_id": ib_gateway.get("client_id", ib_account.get("client_id", 1))
+        }
+        
+        config["discord_webhook_url"] = self.env_loader.get("DISCORD_WEBHOOK_URL", config.get("discord_webhook_url"))
+        
+        for key, value in self.overrides.items():
+            self._set_nested(config, key, value)
+        return config
+    
+    @staticmethod
+    def _set_nested(config: Dict, key: str, value):
+        """ドット区切りのキーで値を設定"""
         keys = key.split(".")
-        value = self.config
-        for k in keys:
-            if isinstance(value, dict) and k in value:
-                value = value[k]
-            else:
-                return default
-        return value
+        target = config
+        for k in keys[:-1]:
+            if not isinstance(target.get(k), dict):
+                target[k] = {}
+            target = target[k]
+        target[keys[-1]] = value
+    
+    def get(self, key, default=None):
+        """設定値を取得する（ドット記法対応、スナップショットから1回の辞書参照で取得）"""
+        value = self._state.snapshot.get(key, _MISSING)
+        return default if value is _MISSING else value
+    
+    def set_override(self, key: str, value):
+        """実行中に設定値を上書き（再読み込み後も維持される。検証に通らない値は ConfigValidationError）"""
+        with self._reload_lock:
+            raw = copy.deepcopy(self._state.raw)
+            self._set_nested(raw, key, value)
+            errors = self.validate_values(raw)
+            if errors:
+                raise ConfigValidationError(errors)
+            self.overrides[key] = value
+            self._swap(raw)
     
     def reload(self):
-        """設定ファイルをE読み込み"""
-        self.config = self.load_config()
-        return self.config
+        """設定ファイルを再読み込み（検証に通らない場合は現在の設定を維持）"""
+        with self._reload_lock:
+            try:
+                if self.env_loader is not None:
+                    self.env_loader.load_env(override=True)
+                raw = self._read_config()
+                errors = self.validate_values(raw)
+                if errors:
+                    raise ConfigValidationError(errors)
+            except Exception as e:
+                print(f"設定の再読み込みに失敗しました（現在の設定を維持します）: {e}")
+                return self._state.raw
+            changed = self._swap(raw)
+        
+        if changed:
+            print(f"設定を再読み込みしました: {', '.join(changed)}")
+            for listener in self.reload_listeners:
+                try:
+                    listener(changed)
+                except Exception as e:
+                    print(f"設定再読み込みリスナー実行エラー: {e}")
+        return self._state.raw
+    
+    def _swap(self, raw: Dict) -> List[str]:
+        """新しい設定一式に1回の代入で差し替え、値が変わった末端のキーを返す"""
+        old = self._state.snapshot
+        state = ConfigState.compile(raw)
+        self._state = state
+        new = state.snapshot
+        return sorted(
+            key for key in set(old) | set(new)
+            if not isinstance(new.get(key, old.get(key)), MappingProxyType) and old.get(key, _MISSING) != new.get(key, _MISSING)
+        )
+    
+    def add_reload_listener(self, listener: Callable[[List[str]], None]):
+        """再読み込みで値が変わったときに呼び出すリスナーを登録（引数は変わったキーの一覧）"""
+        self.reload_listeners.append(listener)
+    
+    def _file_mtimes(self) -> Dict[str, float]:
+        """監視対象ファイルの更新時刻"""
+        mtimes = {}
+        for path in (self.config_path, self.env_loader.env_path if self.env_loader else None):
+            if path and os.path.exists(path):
+                mtimes[path] = os.stat(path).st_mtime_ns
+        return mtimes
+    
+    def check_for_changes(self) -> bool:
+        """config.yaml・.envが更新されていれば再読み込み"""
+        mtimes = self._file_mtimes()
+        if mtimes == self._mtimes:
+            return False
+        self._mtimes = mtimes
+        self.reload()
+        return True
+    
+    def start_watching(self, interval: float = 2.0):
+        """ファイル監視スレッドを開始"""
+        if self._watcher is not None:
+            return
+        self._watch_stop.clear()
+        
+        def watch():
+            while not self._watch_stop.wait(interval):
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    print(f"設定ファイル監視エラー: {e}")
+        
+        self._watcher = threading.Thread(target=watch, name="config-watcher", daemon=True)
+        self._watcher.start()
+    
+    def stop_watching(self):
+        """ファイル監視スレッドを停止"""
+        self._watch_stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+    
+    @staticmethod
+    def validate_values(config: Dict) -> List[str]:
+        """設定値をスキーマで検証（問題の一覧を返す）"""
+        return collect_errors(config)[1]
     
     def validate_config(self):
-        """設定E妥当性をチェチE"""
+        """設定の妥当性をチェック"""
         try:
-            # 忁EE環墁E数をチェチE
+            # 必須の環境変数をチェック
             self.env_loader.validate_required_vars()
             
-            # 忁EE設定頁EをチェチE
-            required_configs = [
-                "portfolio_ratios.index",
-                "portfolio_ratios.dividend", 
-                "portfolio_ratios.range",
-                "index_bot.ticker",
-                "index_bot.monthly_investment"
-            ]
-            
-            for config_key in required_configs:
-                if self.get(config_key) is None:
-                    raise ValueError(f"忁EE設定頁Eが不足してぁEぁE {config_key}")
+            # 設定項目をスキーマでチェック
+            self.settings
             
             return True
             
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+設定スキーマモジュール
+
+config.yaml の全セクションを frozen dataclass で定義し、読み込み時（起動時・再読み込み時）に
+一度だけ型・範囲・未知のキーを検証する。Botは config.settings.range_bot.bollinger_period のように
+属性で参照し、設定の誤りはジョブ実行中ではなく起動時にまとめてエラーになる。
+"""
+
+import collections.abc
+from dataclasses import dataclass, field, fields, is_dataclass, MISSING
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple, Union, get_args, get_origin, get_type_hints
+
+STRATEGIES = ("index", "dividend", "range")
+
+
+class ConfigValidationError(ValueError):
+    """設定の検証エラー（errors に「キー: 内容」の一覧を持つ）"""
+    
+    def __init__(self, errors: List[str]):
+        self.errors = list(errors)
+        super().__init__("設定にエラーがあります:\n" + "\n".join(f"  - {error}" for error in self.errors))
+
+
+def _field(default=MISSING, **constraints):
+    """制約付きのフィールド（gt / ge / lt / le / choices）"""
+    if isinstance(default, (dict, list)):
+        value = default
+        return field(default_factory=lambda: _freeze(value), metadata=constraints)
+    return field(default=default, metadata=constraints)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType(dict(value))
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+@dataclass(frozen=True)
+class IBAccountSettings:
+    main_account_id: Optional[str] = None
+    nisa_account_id: Optional[str] = None
+    host: str = "127.0.0.1"
+    port: int = _field(5000, gt=0, le=65535)
+    client_id: int = _field(1, ge=0)
+
+
+@dataclass(frozen=True)
+class PortfolioRatios:
+    index: float = _field(ge=0, le=1)
+    dividend: float = _field(ge=0, le=1)
+    range: float = _field(ge=0, le=1)
+    
+    def validate(self) -> List[str]:
+        total = self.index + self.dividend + self.range
+        if abs(total - 1.0) > 1e-6:
+            return [f"index・dividend・rangeの合計が1ではありません: {total:g}"]
+        return []
+    
+    def as_dict(self) -> Dict[str, float]:
+        return {strategy: getattr(self, strategy) for strategy in STRATEGIES}
+
+
+@dataclass(frozen=True)
+class IndexBotSettings:
+    ticker: str = _field()
+    monthly_investment: int = _field(gt=0)
+
+
+@dataclass(frozen=True)
+class DividendBotSettings:
+    max_holding_stocks: int = _field(5, ge=1)
+    stop_loss_percentage: float = _field(0.20, gt=0, lt=1)
+    min_dividend_yield: float = _field(3.5, ge=0)
+    min_equity_ratio: float = _field(40.0, ge=0, le=100)
+    max_per: float = _field(25.0, gt=0)
+    ma_period: int = _field(25, ge=2)
+    purchase_amount: int = _field(50000, gt=0)
+
+
+@dataclass(frozen=True)
+class RangeBotSettings:
+    bollinger_period: int = _field(ge=2)
+    bollinger_std_dev: float = _field(gt=0)
+    stop_loss_percentage_on_break: float = _field(gt=0, lt=1)
+    journal_path: str = "journal/range_positions.jsonl"
+    journal_fsync_interval_seconds: float = _field(0.5, ge=0)
+
+
+@dataclass(frozen=True)
+class MetricsSettings:
+    enabled: bool = True
+    textfile_path: Optional[str] = None
+    export_interval_seconds: float = _field(15, gt=0)
+    http_host: str = "127.0.0.1"
+    http_port: int = _field(0, ge=0, le=65535)
+
+
+@dataclass(frozen=True)
+class ResourceMonitorSettings:
+    enabled: bool = False
+    path: str = "metrics/resources.jsonl"
+    interval_seconds: float = _field(30, gt=0)
+    max_bytes: int = _field(5000000, ge=1024)
+    backup_count: int = _field(3, ge=0)
+
+
+@dataclass(frozen=True)
+class DashboardSettings:
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = _field(8050, ge=0, le=65535)
+    refresh_interval_seconds: float = _field(2.0, gt=0)
+    recent_trades: int = _field(20, ge=1)
+    max_clients: int = _field(50, ge=1)
+    timeseries_path: str = "data/timeseries.db"
+    chart_points: int = _field(500, ge=3)
+    minute_retention_days: int = _field(14, ge=1)
+    hour_retention_days: int = _field(730, ge=1)
+
+
+@dataclass(frozen=True)
+class StateStoreSettings:
+    path: str = "chimera_state.db"
+
+
+@dataclass(frozen=True)
+class NISASettings:
+    annual_limit: int = _field(3600000, gt=0)
+    lifetime_limit: int = _field(18000000, gt=0)
+    monitoring_enabled: bool = True
+    ledger_dir: str = "nisa_ledger"
+    snapshot_interval: int = _field(50, ge=1)
+    legacy_usage_file: str = "nisa_usage.json"
+    
+    def validate(self) -> List[str]:
+        if self.annual_limit > self.lifetime_limit:
+            return ["annual_limitがlifetime_limitを超えています"]
+        return []
+
+
+@dataclass(frozen=True)
+class PreTradeSettings:
+    max_range_positions: int = _field(5, ge=0)
+    max_symbol_exposure: Optional[float] = _field(None, gt=0)
+    stop_flag_file: str = "STOP.flag"
+    kill_switch_poll_seconds: float = _field(1.0, ge=0)
+
+
+@dataclass(frozen=True)
+class EventJournalSettings:
+    directory: str = "events"
+    block_size: int = _field(65536, ge=1)
+    flush_interval_seconds: float = _field(1.0, gt=0)
+
+
+@dataclass(frozen=True)
+class TracingSettings:
+    enabled: bool = False
+    directory: str = "traces"
+    max_spans: int = _field(20000, ge=1)
+    window: int = _field(1000, ge=1)
+    export_interval_seconds: float = _field(60, gt=0)
+
+
+@dataclass(frozen=True)
+class ConfigReloadSettings:
+    enabled: bool = False
+    interval_seconds: float = _field(2.0, gt=0)
+
+
+@dataclass(frozen=True)
+class ExecutionSettings:
+    mode: str = _field("thread", choices=("thread", "process"))
+    job_timeout_seconds: float = _field(900, gt=0)
+    quote_max_age_seconds: float = _field(30, ge=0)
+
+
+@dataclass(frozen=True)
+class ShutdownSettings:
+    drain_timeout_seconds: float = _field(60, ge=0)
+    order_ack_timeout_seconds: float = _field(10, ge=0)
+    flush_timeout_seconds: float = _field(10, ge=0)
+
+
+@dataclass(frozen=True)
+class RiskAssessmentSettings:
+    default_profile: str = "aggressive"
+    profiles: Mapping[str, PortfolioRatios] = _field({})
+    returns_file: str = "data/sleeve_returns.csv"
+    simulation_paths: int = _field(10000, ge=100)
+    horizon_years: float = _field(10.0, gt=0)
+    block_months: int = _field(12, ge=1)
+    
+    def validate(self) -> List[str]:
+        if self.profiles and self.default_profile not in self.profiles:
+            return [f"default_profile '{self.default_profile}' がprofilesにありません"]
+        return []
+
+
+@dataclass(frozen=True)
+class RebalanceSettings:
+    risk_profile: str = ""
+    nisa_strategies: Tuple[str, ...] = _field(["index", "dividend"], choices=STRATEGIES)
+    default_lot_size: int = _field(100, ge=1)
+    lot_sizes: Mapping[str, int] = _field({}, ge=1)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """config.yaml 全体"""
+    portfolio_ratios: PortfolioRatios
+    index_bot: IndexBotSettings
+    range_bot: RangeBotSettings
+    ib_account: IBAccountSettings = _field(IBAccountSettings())
+    ib_gateway: Optional[IBAccountSettings] = None
+    discord_webhook_url: Optional[str] = None
+    discord_async_send: bool = True
+    dividend_bot: DividendBotSettings = _field(DividendBotSettings())
+    metrics: MetricsSettings = _field(MetricsSettings())
+    resource_monitor: ResourceMonitorSettings = _field(ResourceMonitorSettings())
+    dashboard: DashboardSettings = _field(DashboardSettings())
+    state_store: StateStoreSettings = _field(StateStoreSettings())
+    nisa_settings: NISASettings = _field(NISASettings())
+    pre_trade: PreTradeSettings = _field(PreTradeSettings())
+    event_journal: EventJournalSettings = _field(EventJournalSettings())
+    tracing: TracingSettings = _field(TracingSettings())
+    config_reload: ConfigReloadSettings = _field(ConfigReloadSettings())
+    execution: ExecutionSettings = _field(ExecutionSettings())
+    shutdown: ShutdownSettings = _field(ShutdownSettings())
+    risk_assessment: RiskAssessmentSettings = _field(RiskAssessmentSettings())
+    rebalance: RebalanceSettings = _field(RebalanceSettings())
+    
+    def validate(self) -> List[str]:
+        if self.rebalance.risk_profile and self.rebalance.risk_profile not in self.risk_assessment.profiles:
+            return [f"rebalance.risk_profile '{self.rebalance.risk_profile}' がrisk_assessment.profilesにありません"]
+        return []
+
+
+_INVALID = object()
+_TYPE_NAMES = {bool: "真偽値", int: "整数", float: "数値", str: "文字列"}
+
+
+def _convert(hint, value, path: str, errors: List[str], constraints: Mapping):
+    """値を型ヒントどおりに変換（問題があれば errors に追加して _INVALID を返す）"""
+    origin = get_origin(hint)
+    if origin is Union:
+        if value is None:
+            return None
+        hint = next(arg for arg in get_args(hint) if arg is not type(None))
+        origin = get_origin(hint)
+    
+    if value is None:
+        errors.append(f"{path}: 値がありません")
+        return _INVALID
+    if is_dataclass(hint):
+        result = _build(hint, value, path, errors)
+        return _INVALID if result is None else result
+    if origin is tuple:
+        if not isinstance(value, (list, tuple)):
+            errors.append(f"{path}: リストで指定してください")
+            return _INVALID
+        item_hint = get_args(hint)[0]
+        items = tuple(_convert(item_hint, item, f"{path}[{i}]", errors, constraints) for i, item in enumerate(value))
+        return _INVALID if _INVALID in items else items
+    if origin in (dict, collections.abc.Mapping):
+        if not isinstance(value, Mapping):
+            errors.append(f"{path}: 辞書で指定してください")
+            return _INVALID
+        value_hint = get_args(hint)[1]
+        items = {str(key): _convert(value_hint, item, f"{path}.{key}", errors, constraints) for key, item in value.items()}
+        return _INVALID if _INVALID in items.values() else MappingProxyType(items)
+    
+    if hint is bool:
+        ok = isinstance(value, bool)
+    elif hint is int:
+        ok = isinstance(value, int) and not isinstance(value, bool)
+    elif hint is float:
+        ok = isinstance(value, (int, float)) and not isinstance(value, bool)
+        value = float(value) if ok else value
+    elif hint is str:
+        # YAMLでクォートし忘れた銘柄コード（2559）などは文字列として扱う
+        ok = isinstance(value, (str, int)) and not isinstance(value, bool)
+        value = str(value) if ok else value
+    else:
+        ok = True
+    if not ok:
+        errors.append(f"{path}: {_TYPE_NAMES.get(hint, hint)}で指定してください（{value!r}）")
+        return _INVALID
+    return _check_constraints(value, path, errors, constraints)
+
+
+def _check_constraints(value, path: str, errors: List[str], constraints: Mapping):
+    """範囲・選択肢の制約をチェック"""
+    checks = (
+        ("gt", lambda v, c: v > c, "より大きい値"),
+        ("ge", lambda v, c: v >= c, "以上の値"),
+        ("lt", lambda v, c: v < c, "未満の値"),
+        ("le", lambda v, c: v <= c, "以下の値")
+    )
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        for name, check, label in checks:
+            if name in constraints and not check(value, constraints[name]):
+                errors.append(f"{path}: {constraints[name]}{label}を指定してください（{value!r}）")
+                return _INVALID
+    choices = constraints.get("choices")
+    if choices is not None and value not in choices:
+        errors.append(f"{path}: {' / '.join(choices)} のいずれかを指定してください（{value!r}）")
+        return _INVALID
+    return value
+
+
+def _build(cls, data, path: str, errors: List[str]):
+    """辞書から dataclass を作成（問題があれば errors に追加して None を返す）"""
+    if not isinstance(data, Mapping):
+        errors.append(f"{path or '設定'}: 辞書で指定してください")
+        return None
+    
+    error_count = len(errors)
+    hints = get_type_hints(cls)
+    known = {f.name for f in fields(cls)}
+    for key in data:
+        if key not in known:
+            errors.append(f"{path}.{key}: 未知の設定項目です" if path else f"{key}: 未知の設定項目です")
+    
+    kwargs = {}
+    for f in fields(cls):
+        key_path = f"{path}.{f.name}" if path else f.name
+        if f.name not in data:
+            if f.default is MISSING and f.default_factory is MISSING:
+                errors.append(f"{key_path}: 必須の設定項目がありません")
+            continue
+        value = _convert(hints[f.name], data[f.name], key_path, errors, f.metadata)
+        if value is not _INVALID:
+            kwargs[f.name] = value
+    
+    if len(errors) > error_count:
+        return None
+    instance = cls(**kwargs)
+    validate = getattr(instance, "validate", None)
+    if validate is not None:
+        errors.extend(f"{path}: {error}" if path else error for error in validate())
+    return instance if len(errors) == error_count else None
+
+
+def collect_errors(config: Mapping) -> Tuple[Optional[Settings], List[str]]:
+    """設定を検証し、(Settings または None, エラー一覧) を返す"""
+    errors = []
+    settings = _build(Settings, config, "", errors)
+    return settings, errors
+
+
+def build_settings(config: Mapping) -> Settings:
+    """設定を検証して Settings を作成（エラーがあれば ConfigValidationError）"""
+    settings, errors = collect_errors(config)
+    if errors:
+        raise ConfigValidationError(errors)
+    return settings
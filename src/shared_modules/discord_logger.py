@@ -1,13 +1,86 @@
-import requests
 import json
+import queue
+import threading
+import time
 from datetime import datetime
+from src.shared_modules.lazy_import import lazy_import
+from src.shared_modules.tracing import get_tracer
+
+# requestsは最初の送信時に読み込む
+requests = lazy_import("requests")
 
 class DiscordLogger:
-    def __init__(self, webhook_url):
+    def __init__(self, webhook_url, async_send=False):
         self.webhook_url = webhook_url
+        self.error_listeners = []
+        self.event_journal = None  # 設定されていれば通知をイベントとして記録
+        
+        # 非同期送信時はキューに積み、送信スレッドがWebhookへ投稿する
+        self.queue = None
+        self.sender_thread = None
+        if async_send:
+            self.start_async()
+    
+    def start_async(self):
+        """非同期送信を開始"""
+        if self.sender_thread is not None:
+            return
+        self.queue = queue.Queue()
+        self.sender_thread = threading.Thread(target=self._send_loop, name="discord-sender", daemon=True)
+        self.sender_thread.start()
+    
+    def _send_loop(self):
+        """キューのメッセージを順に送信"""
+        while True:
+            payload = self.queue.get()
+            try:
+                if payload is None:
+                    return
+                self._post(payload)
+            finally:
+                self.queue.task_done()
+    
+    def flush(self, timeout=10) -> bool:
+        """キューに残っているメッセージの送信完了を待つ（期限内に終わればTrue）"""
+        if self.queue is None:
+            return True
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+    
+    def close(self, timeout=10) -> bool:
+        """残りを送信して送信スレッドを停止（以降は同期送信）"""
+        if self.sender_thread is None:
+            return True
+        flushed = self.flush(timeout)
+        self.queue.put(None)
+        self.sender_thread.join(timeout=1)
+        self.sender_thread = None
+        self.queue = None
+        return flushed
+    
+    def pending_count(self) -> int:
+        """未送信のメッセージ数"""
+        return self.queue.unfinished_tasks if self.queue is not None else 0
+    
+    def add_error_listener(self, listener):
+        """エラー通知時に呼び出すリスナーを登録"""
+        self.error_listeners.append(listener)
+    
+    def send_message(self, title, description, color=0x3498db, fields=None, kind="notification"):
+        """Discordにメッセージを送信（トレース中なら送信・キュー投入の時間を記録）"""
+        with get_tracer().span("discord.post", kind=kind, queued=self.queue is not None):
+            return self._send_message(title, description, color, fields, kind)
     
-    def send_message(self, title, description, color=0x3498db, fields=None):
-        """DiscordにメチEージを送信"""
+    def _send_message(self, title, description, color, fields, kind):
+        if self.event_journal is not None:
+            self.event_journal.record(kind, title=title, message=description)
+        
         embed = {
             "title": title,
             "description": description,
@@ -18,6 +91,13 @@ class DiscordLogger:
         
         payload = {"embeds": [embed]}
         
+        if self.queue is not None:
+            self.queue.put(payload)
+            return True
+        return self._post(payload)
+    
+    def _post(self, payload):
+        """Webhookへ投稿"""
         try:
             response = requests.post(self.webhook_url, json=payload)
             response.raise_for_status()
@@ -27,26 +107,31 @@ class DiscordLogger:
             return False
     
     def info(self, message, fields=None):
-        """惁EレベルのメチEージE青色EE""
-        return self.send_message("ℹEEINFO", message, 0x3498db, fields)
+        """情報レベルのメッセージ（青色）"""
+        return self.send_message("ℹ️ INFO", message, 0x3498db, fields)
     
     def success(self, message, fields=None):
-        """成功レベルのメチEージE緑色EE""
-        return self.send_message("✁ESUCCESS", message, 0x2ecc71, fields)
+        """成功レベルのメッセージ（緑色）"""
+        return self.send_message("✅ SUCCESS", message, 0x2ecc71, fields)
     
     def warning(self, message, fields=None):
-        """警告レベルのメチEージE黁EEE""
-        return self.send_message("⚠EEWARNING", message, 0xf39c12, fields)
+        """警告レベルのメッセージ（黄色）"""
+        return self.send_message("⚠️ WARNING", message, 0xf39c12, fields)
     
     def error(self, message, fields=None):
-        """エラーレベルのメチEージE赤色EE""
-        return self.send_message("❁EERROR", message, 0xe74c3c, fields)
+        """エラーレベルのメッセージ（赤色）"""
+        for listener in self.error_listeners:
+            try:
+                listener(message)
+            except Exception as e:
+                print(f"エラーリスナー実行エラー: {e}")
+        return self.send_message("❌ ERROR", message, 0xe74c3c, fields, kind="error")
     
     def trade_notification(self, action, symbol, quantity, price=None, order_id=None):
-        """取引通知専用メチEージ"""
+        """取引通知専用メッセージ"""
         fields = [
             {"name": "銘柄", "value": symbol, "inline": True},
-            {"name": "数釁E, "value": str(quantity), "inline": True},
+            {"name": "数量", "value": str(quantity), "inline": True},
         ]
         
         if price:
@@ -59,8 +144,8 @@ class DiscordLogger:
         color = 0x2ecc71 if action == "BUY" else 0xe74c3c
         
         return self.send_message(
-            f"{action_emoji} {action} 注斁E衁E,
-            f"{action}注斁E実行されました",
+            f"{action_emoji} {action} 注文実行",
+            f"{action}注文が実行されました",
             color,
             fields
         )
@@ -3,52 +3,52 @@ from dotenv import load_dotenv
 
 class EnvLoader:
     def __init__(self, env_path=".env"):
-        """環墁E数ローダーの初期匁E""
+        """環境変数ローダーの初期化"""
         self.env_path = env_path
         self.load_env()
     
-    def load_env(self):
-        """環墁E数ファイルを読み込む"""
+    def load_env(self, override=False):
+        """環境変数ファイルを読み込む（override=Trueなら既存の環境変数も上書き）"""
         try:
-            # .envファイルが存在するかチェチE
+            # .envファイルが存在するかチェック
             if os.path.exists(self.env_path):
-                load_dotenv(self.env_path)
-                print(f"環墁E数ファイルを読み込みました: {self.env_path}")
+                load_dotenv(self.env_path, override=override)
+                print(f"環境変数ファイルを読み込みました: {self.env_path}")
             else:
-                print(f"警呁E 環墁E数ファイルが見つかりません: {self.env_path}")
-                print("代わりにシスチE環墁E数を使用しまぁE)
+                print(f"警告: 環境変数ファイルが見つかりません: {self.env_path}")
+                print("代わりにシステム環境変数を使用します")
         except Exception as e:
-            print(f"環墁E数ファイルの読み込みエラー: {e}")
+            print(f"環境変数ファイルの読み込みエラー: {e}")
     
     def get(self, key, default=None):
-        """環墁E数の値を取征E""
+        """環境変数の値を取得"""
         return os.getenv(key, default)
     
     def get_required(self, key):
-        """忁EE環墁E数の値を取得（存在しなぁE合EエラーEE""
+        """必須の環境変数の値を取得（存在しない場合はエラー）"""
         value = os.getenv(key)
         if value is None:
-            raise ValueError(f"忁EE環墁E数が設定されてぁEせん: {key}")
+            raise ValueError(f"必須の環境変数が設定されていません: {key}")
         return value
     
     def get_ib_main_account_id(self):
-        """IB証券メイン口座IDを取征E""
+        """IB証券メイン口座IDを取得"""
         return self.get_required("IB_MAIN_ACCOUNT_ID")
     
     def get_ib_nisa_account_id(self):
-        """IB証券NISA口座IDを取征E""
+        """IB証券NISA口座IDを取得"""
         return self.get_required("IB_NISA_ACCOUNT_ID")
     
     def get_discord_webhook_url(self):
-        """Discord Webhook URLを取征E""
+        """Discord Webhook URLを取得"""
         return self.get_required("DISCORD_WEBHOOK_URL")
     
     def get_log_level(self):
-        """ログレベルを取得（デフォルチE INFOEE""
+        """ログレベルを取得（デフォルト: INFO）"""
         return self.get("LOG_LEVEL", "INFO")
     
     def validate_required_vars(self):
-        """忁EE環墁E数がすべて設定されてぁEかチェチE"""
+        """必須の環境変数がすべて設定されているかチェック"""
         required_vars = [
             "IB_MAIN_ACCOUNT_ID",
             "IB_NISA_ACCOUNT_ID", 
@@ -61,6 +61,6 @@ class EnvLoader:
                 missing_vars.append(var)
         
         if missing_vars:
-            raise ValueError(f"以下E忁E環墁E数が設定されてぁEせん: {', '.join(missing_vars)}")
+            raise ValueError(f"以下の必須環境変数が設定されていません: {', '.join(missing_vars)}")
         
         return True
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+イベントジャーナルモジュール
+
+シグナル・注文・約定・通知・停止などのイベントを、ストリーム（プロセス）ごとに
+以下のバイナリファイルへ追記する。
+- {stream}.rec : 固定長レコード（時刻・種別・売買・戦略ID・銘柄ID・注文ID・数量・価格・詳細の位置）
+- {stream}.pay : 詳細（JSON）を長さ付きで連結したもの
+- {stream}.str : 戦略名・銘柄コードの文字列辞書（長さ付き、出現順がID）
+- {stream}.idx : block_size件ごとのインデックスブロック（先頭レコード番号・件数・最小/最大時刻）
+
+書き込みは標準ライブラリだけで行い（起動を重くしない）、検索はnumpyのmemmapで
+インデックスから対象ブロックを絞り込んだうえでベクトル演算で行う。
+"""
+
+import glob
+import json
+import math
+import os
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.shared_modules.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+EVENT_KINDS = ("signal", "order", "fill", "notification", "stop", "reject", "error")
+SIDES = ("", "BUY", "SELL")
+
+# 時刻, 種別, 売買, 戦略ID, 銘柄ID, 注文ID, 数量, 価格, 詳細の位置
+RECORD_FORMAT = struct.Struct("<dBBHIqddQ")
+# 先頭レコード番号, 件数, 最小時刻, 最大時刻
+INDEX_FORMAT = struct.Struct("<QIdd")
+LENGTH_FORMAT = struct.Struct("<I")
+STRING_LENGTH_FORMAT = struct.Struct("<H")
+NO_PAYLOAD = 2 ** 64 - 1
+
+RECORD_FIELDS = [
+    ("ts", "<f8"), ("kind", "u1"), ("side", "u1"), ("strategy", "<u2"), ("symbol", "<u4"),
+    ("order_id", "<i8"), ("quantity", "<f8"), ("price", "<f8"), ("payload", "<u8")
+]
+INDEX_FIELDS = [("first", "<u8"), ("count", "<u4"), ("ts_min", "<f8"), ("ts_max", "<f8")]
+
+
+def _stream_paths(directory: str, stream: str) -> Dict[str, str]:
+    return {ext: os.path.join(directory, f"{stream}.{ext}") for ext in ("rec", "pay", "str", "idx")}
+
+
+def _read_strings(path: str) -> List[str]:
+    """文字列辞書を読み込み（書きかけの末尾は無視）"""
+    strings = [""]
+    if not os.path.exists(path):
+        return strings
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    while pos + STRING_LENGTH_FORMAT.size <= len(data):
+        (length,) = STRING_LENGTH_FORMAT.unpack_from(data, pos)
+        end = pos + STRING_LENGTH_FORMAT.size + length
+        if end > len(data):
+            break
+        strings.append(data[pos + STRING_LENGTH_FORMAT.size:end].decode("utf-8"))
+        pos = end
+    return strings
+
+
+class EventJournal:
+    def __init__(self, directory: str = "events", stream: str = "main", block_size: int = 65536,
+                 flush_interval: float = 1.0, clock: Callable[[], float] = time.time):
+        """ジャーナルの初期化（前回のクラッシュで書きかけになった末尾は切り詰める。clock は記録時刻の取得元）"""
+        self.directory = directory
+        self.stream = stream
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.paths = _stream_paths(directory, stream)
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        
+        os.makedirs(directory, exist_ok=True)
+        strings = _read_strings(self.paths["str"])
+        self._strings = {value: i for i, value in enumerate(strings)}
+        self._recover()
+        
+        self._files = {ext: open(path, "ab") for ext, path in self.paths.items()}
+        self._buffers = {ext: bytearray() for ext in self.paths}
+        self._flush_thread = threading.Thread(target=self._flush_loop, name=f"event-journal-{stream}", daemon=True)
+        self._flush_thread.start()
+    
+    def _recover(self):
+        """ファイルの整合性を取り、件数・詳細サイズ・未インデックスブロックの統計を復元"""
+        for ext in ("rec", "pay", "str", "idx"):
+            if not os.path.exists(self.paths[ext]):
+                open(self.paths[ext], "wb").close()
+        
+        # 文字列辞書の書きかけの末尾を切り詰める（残すと次の追記がその後ろに続き、以降のIDがずれる）
+        string_bytes = sum(STRING_LENGTH_FORMAT.size + len(value.encode("utf-8")) for value in self._strings if value)
+        if os.path.getsize(self.paths["str"]) != string_bytes:
+            with open(self.paths["str"], "rb+") as f:
+                f.truncate(string_bytes)
+        
+        self.payload_size = os.path.getsize(self.paths["pay"])
+        record_bytes = os.path.getsize(self.paths["rec"])
+        self.count = record_bytes // RECORD_FORMAT.size
+        
+        # 詳細が書き切れていない末尾レコードは捨てる
+        with open(self.paths["rec"], "rb+") as f, open(self.paths["pay"], "rb") as payload_file:
+            while self.count:
+                f.seek((self.count - 1) * RECORD_FORMAT.size)
+                payload = RECORD_FORMAT.unpack(f.read(RECORD_FORMAT.size))[-1]
+                if payload == NO_PAYLOAD:
+                    break
+                payload_file.seek(payload)
+                header = payload_file.read(LENGTH_FORMAT.size)
+                if len(header) == LENGTH_FORMAT.size:
+                    if payload + LENGTH_FORMAT.size + LENGTH_FORMAT.unpack(header)[0] <= self.payload_size:
+                        break
+                self.count -= 1
+            if record_bytes != self.count * RECORD_FORMAT.size:
+                f.truncate(self.count * RECORD_FORMAT.size)
+        
+        index_bytes = os.path.getsize(self.paths["idx"])
+        self.indexed_blocks = min(index_bytes // INDEX_FORMAT.size, self.count // self.block_size)
+        if index_bytes != self.indexed_blocks * INDEX_FORMAT.size:
+            with open(self.paths["idx"], "rb+") as f:
+                f.truncate(self.indexed_blocks * INDEX_FORMAT.size)
+        
+        # 未インデックスのまま溜まっていた完結ブロックを書き出し、残りから現在ブロックの統計を作る
+        self._block_first = self.indexed_blocks * self.block_size
+        while self.count - self._block_first >= self.block_size:
+            ts_min, ts_max = self._block_range(self._block_first)
+            with open(self.paths["idx"], "ab") as f:
+                f.write(INDEX_FORMAT.pack(self._block_first, self.block_size, ts_min, ts_max))
+            self.indexed_blocks += 1
+            self._block_first += self.block_size
+        self._block_ts_min, self._block_ts_max = self._block_range(self._block_first)
+    
+    def _block_range(self, first: int):
+        """ブロックの最小・最大時刻をファイルから求める（復旧時のみ）"""
+        with open(self.paths["rec"], "rb") as f:
+            f.seek(first * RECORD_FORMAT.size)
+            data = f.read(min(self.count - first, self.block_size) * RECORD_FORMAT.size)
+        times = [ts for (ts, *_rest) in RECORD_FORMAT.iter_unpack(data)]
+        return (min(times), max(times)) if times else (math.inf, -math.inf)
+    
+    def _intern(self, value) -> int:
+        """文字列をIDに変換（初出なら辞書に追記）"""
+        if value is None:
+            return 0
+        value = str(value)
+        string_id = self._strings.get(value)
+        if string_id is None:
+            string_id = self._strings[value] = len(self._strings)
+            encoded = value.encode("utf-8")
+            self._buffers["str"] += STRING_LENGTH_FORMAT.pack(len(encoded)) + encoded
+        return string_id
+    
+    def record(self, kind: str, strategy: Optional[str] = None, symbol=None, order_id=None, quantity=None,
+               price=None, side: Optional[str] = None, ts: Optional[float] = None, **details):
+        """イベントを1件記録（ファイルへの書き出しはバックグラウンドでまとめて行う）"""
+        if self._closed.is_set():
+            return
+        ts = self.clock() if ts is None else ts
+        with self._lock:
+            if details:
+                encoded = json.dumps(details, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+                payload = self.payload_size
+                self._buffers["pay"] += LENGTH_FORMAT.pack(len(encoded)) + encoded
+                self.payload_size += LENGTH_FORMAT.size + len(encoded)
+            else:
+                payload = NO_PAYLOAD
+            
+            self._buffers["rec"] += RECORD_FORMAT.pack(
+                ts,
+                EVENT_KINDS.index(kind),
+                SIDES.index(side) if side in SIDES else 0,
+                self._intern(strategy),
+                self._intern(symbol),
+                int(order_id) if order_id is not None else -1,
+                float(quantity) if quantity is not None else math.nan,
+                float(price) if price is not None else math.nan,
+                payload
+            )
+            self.count += 1
+            self._block_ts_min = min(self._block_ts_min, ts)
+            self._block_ts_max = max(self._block_ts_max, ts)
+            
+            if self.count - self._block_first >= self.block_size:
+                self._buffers["idx"] += INDEX_FORMAT.pack(
+                    self._block_first, self.block_size, self._block_ts_min, self._block_ts_max
+                )
+                self.indexed_blocks += 1
+                self._block_first = self.count
+                self._block_ts_min = math.inf
+                self._block_ts_max = -math.inf
+    
+    def flush(self):
+        """バッファをファイルに書き出す（レコードより先に文字列・詳細を書く）"""
+        with self._lock:
+            if self._files["rec"].closed:
+                return
+            for ext in ("str", "pay", "rec", "idx"):
+                buffer = self._buffers[ext]
+                if buffer:
+                    self._files[ext].write(buffer)
+                    self._files[ext].flush()
+                    buffer.clear()
+    
+    def _flush_loop(self):
+        """一定間隔でまとめて書き出す"""
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except (OSError, ValueError) as e:
+                print(f"イベントジャーナル書き込みエラー: {e}")
+    
+    def close(self):
+        """書き出してファイルを閉じる"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flush_thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+
+
+class EventJournalReader:
+    def __init__(self, directory: str = "events"):
+        """ディレクトリ内の全ストリームを読み込み対象にする"""
+        self.directory = directory
+        self.streams = sorted(
+            os.path.basename(path)[:-len(".rec")] for path in glob.glob(os.path.join(directory, "*.rec"))
+        )
+        self.record_dtype = np.dtype(RECORD_FIELDS)
+        self.index_dtype = np.dtype(INDEX_FIELDS)
+    
+    def _load(self, stream: str):
+        """レコード（memmap）・インデックス・文字列辞書を読み込み"""
+        paths = _stream_paths(self.directory, stream)
+        count = os.path.getsize(paths["rec"]) // RECORD_FORMAT.size
+        records = (np.memmap(paths["rec"], dtype=self.record_dtype, mode="r", shape=(count,))
+                   if count else np.zeros(0, dtype=self.record_dtype))
+        index = (np.fromfile(paths["idx"], dtype=self.index_dtype)
+                 if os.path.exists(paths["idx"]) else np.zeros(0, dtype=self.index_dtype))
+        return paths, records, index, _read_strings(paths["str"])
+    
+    def _candidate_ranges(self, records, index, start, end):
+        """インデックスから時刻範囲に掛かるレコード範囲を求める"""
+        ranges = []
+        indexed_end = 0
+        if len(index):
+            hit = np.ones(len(index), dtype=bool)
+            if start is not None:
+                hit &= index["ts_max"] >= start
+            if end is not None:
+                hit &= index["ts_min"] < end
+            for entry in index[hit]:
+                ranges.append((int(entry["first"]), int(entry["first"]) + int(entry["count"])))
+            indexed_end = int(index["first"][-1]) + int(index["count"][-1])
+        if indexed_end < len(records):
+            ranges.append((indexed_end, len(records)))
+        
+        # 連続する範囲はまとめる
+        merged = []
+        for first, last in ranges:
+            if merged and merged[-1][1] == first:
+                merged[-1] = (merged[-1][0], last)
+            else:
+                merged.append((first, last))
+        return merged
+    
+    def _select(self, stream, symbols, strategies, kinds, start, end, limit=None):
+        """1ストリーム分の条件に合うレコードを返す（limit指定時は新しいブロックから必要な分だけ走査）"""
+        paths, records, index, strings = self._load(stream)
+        if not len(records):
+            return paths, records, strings
+        
+        lookup = {value: i for i, value in enumerate(strings)}
+        symbol_ids = [lookup[str(s)] for s in symbols or () if str(s) in lookup]
+        strategy_ids = [lookup[s] for s in strategies or () if s in lookup]
+        if (symbols and not symbol_ids) or (strategies and not strategy_ids):
+            return paths, records[:0], strings
+        kind_ids = [EVENT_KINDS.index(kind) for kind in kinds or ()]
+        
+        selected = []
+        found = 0
+        for first, last in reversed(self._candidate_ranges(records, index, start, end)):
+            block = records[first:last]
+            mask = np.ones(len(block), dtype=bool)
+            if start is not None:
+                mask &= block["ts"] >= start
+            if end is not None:
+                mask &= block["ts"] < end
+            if symbol_ids:
+                mask &= np.isin(block["symbol"], symbol_ids)
+            if strategy_ids:
+                mask &= np.isin(block["strategy"], strategy_ids)
+            if kind_ids:
+                mask &= np.isin(block["kind"], kind_ids)
+            selected.append(block[mask])
+            found += len(selected[-1])
+            if limit is not None and found >= limit:
+                break
+        result = np.concatenate(selected[::-1]) if selected else records[:0]
+        if limit is not None:
+            # レコードは追記順＝時刻順なので末尾が最新
+            result = result[-limit:]
+        return paths, result, strings
+    
+    def count(self, symbols: Optional[Iterable] = None, strategies: Optional[Iterable[str]] = None,
+              kinds: Optional[Iterable[str]] = None, start: Optional[float] = None, end: Optional[float] = None) -> int:
+        """条件に合うイベント数"""
+        return sum(len(self._select(stream, symbols, strategies, kinds, start, end)[1]) for stream in self.streams)
+    
+    def query(self, symbols: Optional[Iterable] = None, strategies: Optional[Iterable[str]] = None,
+              kinds: Optional[Iterable[str]] = None, start: Optional[float] = None, end: Optional[float] = None,
+              limit: Optional[int] = None) -> List[Dict]:
+        """条件に合うイベントを時刻順に返す（limit指定時は新しいほうからlimit件）"""
+        matches = []
+        for stream in self.streams:
+            paths, selected, strings = self._select(stream, symbols, strategies, kinds, start, end, limit)
+            matches.extend((stream, paths, strings, row) for row in selected)
+        
+        matches.sort(key=lambda match: match[3]["ts"])
+        if limit is not None:
+            matches = matches[-limit:]
+        return [self._decode(*match) for match in matches]
+    
+    def _decode(self, stream, paths, strings, row) -> Dict:
+        """レコードを辞書に変換（詳細はファイルから読む）"""
+        def string(string_id):
+            return strings[string_id] if string_id < len(strings) else "?"
+        
+        event = {
+            "ts": float(row["ts"]),
+            "stream": stream,
+            "kind": EVENT_KINDS[row["kind"]] if row["kind"] < len(EVENT_KINDS) else "?",
+            "side": SIDES[row["side"]] if row["side"] < len(SIDES) else "",
+            "strategy": string(int(row["strategy"])),
+            "symbol": string(int(row["symbol"])),
+            "order_id": int(row["order_id"]) if row["order_id"] >= 0 else None,
+            "quantity": None if math.isnan(row["quantity"]) else float(row["quantity"]),
+            "price": None if math.isnan(row["price"]) else float(row["price"]),
+            "details": {}
+        }
+        if int(row["payload"]) != NO_PAYLOAD:
+            with open(paths["pay"], "rb") as f:
+                f.seek(int(row["payload"]))
+                (length,) = LENGTH_FORMAT.unpack(f.read(LENGTH_FORMAT.size))
+                event["details"] = json.loads(f.read(length))
+        return event
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_event_journal(directory: Optional[str] = None, stream: Optional[str] = None, **kwargs) -> EventJournal:
+    """プロセス内で共有するジャーナルを取得（最初の呼び出しで保存先とストリーム名が決まる）"""
+    global _journal
+    with _journal_lock:
+        if _journal is None or _journal._closed.is_set():
+            _journal = EventJournal(directory or "events", stream or "main", **kwargs)
+        return _journal
+
+
+def open_event_journal(config, stream: str, clock: Callable[[], float] = time.time) -> EventJournal:
+    """設定に従い、プロセスごとのストリーム名でジャーナルを開く（同じファイルに複数プロセスが書かないため）"""
+    settings = config.settings.event_journal
+    return get_event_journal(
+        settings.directory,
+        stream,
+        block_size=settings.block_size,
+        flush_interval=settings.flush_interval_seconds,
+        clock=clock
+    )
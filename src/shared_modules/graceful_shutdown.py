@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+グレースフルシャットダウンモジュール
+
+停止時に以下の順でフェーズを実行し、各フェーズの所要時間を記録する。
+1. 新規ジョブの受付停止
+2. 実行中ジョブの完了待ち（期限付き）
+3. 発注済み注文のIB受付確認待ち
+4. 状態ジャーナル・メトリクスなどの書き出し
+5. 通知キューの送信
+6. IB切断
+"""
+
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class GracefulShutdown:
+    def __init__(self, scheduler, metrics, drain_timeout: float = 60, ack_timeout: float = 10,
+                 flush_timeout: float = 10):
+        """シャットダウン手順の初期化"""
+        self.scheduler = scheduler
+        self.metrics = metrics
+        self.drain_timeout = drain_timeout
+        self.ack_timeout = ack_timeout
+        self.flush_timeout = flush_timeout
+        self.flush_hooks = []
+        self.report = []
+    
+    def register_flush_hook(self, name: str, func: Callable):
+        """停止前に書き出す処理を登録（登録順に実行）"""
+        self.flush_hooks.append((name, func))
+    
+    def run(self, wait_for_orders: Optional[Callable] = None, flush_notifications: Optional[Callable] = None,
+            disconnect: Optional[Callable] = None) -> List[Dict]:
+        """シャットダウンを実行し、フェーズごとの結果を返す"""
+        self.report = []
+        self._phase("stop_scheduling", self.stop_scheduling)
+        self._phase("drain_jobs", self.drain_jobs)
+        if wait_for_orders is not None:
+            self._phase("order_acks", lambda: self.wait_for_orders(wait_for_orders))
+        for name, func in self.flush_hooks:
+            self._phase(f"flush:{name}", func)
+        if flush_notifications is not None:
+            self._phase("notifications", lambda: flush_notifications(self.flush_timeout))
+        if disconnect is not None:
+            self._phase("disconnect", disconnect)
+        return self.report
+    
+    def _phase(self, name: str, func: Callable):
+        """1フェーズを実行して所要時間を記録（失敗しても次のフェーズへ進む）"""
+        start = time.perf_counter()
+        try:
+            result = func()
+            ok = result is not False
+            detail = "" if isinstance(result, bool) or result is None else str(result)
+        except Exception as e:
+            ok = False
+            detail = f"{type(e).__name__}: {e}"
+        self.report.append({"phase": name, "seconds": time.perf_counter() - start, "ok": ok, "detail": detail})
+    
+    def stop_scheduling(self):
+        """新しいジョブを起動しないようスケジューラーを一時停止"""
+        if self.scheduler.running:
+            self.scheduler.pause()
+    
+    def drain_jobs(self):
+        """実行中のジョブが終わるまで待つ（期限切れ時は残っているジョブ名を表示）"""
+        deadline = time.monotonic() + self.drain_timeout
+        drained = True
+        while self.metrics.in_flight_count() > 0:
+            if time.monotonic() >= deadline:
+                running = sorted(job for job, count in dict(self.metrics.job_in_flight).items() if count > 0)
+                print(f"期限内に完了しなかったジョブ: {', '.join(running)}")
+                drained = False
+                break
+            time.sleep(0.1)
+        
+        # 実行中のジョブを待ち終えてからスケジューラーを止める
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        return drained
+    
+    def wait_for_orders(self, wait_for_orders: Callable):
+        """発注済み注文の受付確認を待つ"""
+        unacknowledged = wait_for_orders(self.ack_timeout)
+        if unacknowledged:
+            print(f"受付確認が取れなかった注文ID: {unacknowledged}")
+            return False
+        return True
+    
+    def format_report(self) -> str:
+        """フェーズごとの所要時間を文字列に整形"""
+        lines = []
+        for entry in self.report:
+            mark = "✅" if entry["ok"] else "⚠️"
+            detail = f" ({entry['detail']})" if entry["detail"] else ""
+            lines.append(f"{mark} {entry['phase']}: {entry['seconds']:.2f}秒{detail}")
+        total = sum(entry["seconds"] for entry in self.report)
+        lines.append(f"合計: {total:.2f}秒")
+        return "\n".join(lines)
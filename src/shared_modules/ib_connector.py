@@ -4,6 +4,12 @@ from ibapi.contract import Contract
 from ibapi.order import Order
 import threading
 import time
+from src.shared_modules.tracing import get_tracer
+
+# 注文が無効になったステータス（未約定分は発注前ゲートの確定を取り消す）
+INACTIVE_ORDER_STATUSES = ("Cancelled", "ApiCancelled", "Inactive")
+# 注文は有効なまま届く警告（拒否として扱わない）
+ORDER_WARNING_CODES = (399, 2109)
 
 class IBConnector(EWrapper, EClient):
     def __init__(self):
@@ -11,9 +17,25 @@ class IBConnector(EWrapper, EClient):
         self.connected = False
         self.next_order_id = 1
         self.thread = None
+        
+        # 発注後、IBからステータスが返るまでの注文
+        self.pending_orders = {}
+        self.order_statuses = {}
+        self.order_condition = threading.Condition()
+        
+        # reqPositions の受信結果
+        self.positions = {}
+        self.positions_done = threading.Event()
+        
+        # 発注前リスクゲート（設定されていれば全注文をチェック）
+        self.pre_trade_gate = None
+        
+        # イベントジャーナル（設定されていれば注文・約定・拒否を記録）
+        self.event_journal = None
+        self.order_info = {}
     
     def connect_to_ib(self, host, port, client_id):
-        """IB Gatewayに接綁E""
+        """IB Gatewayに接続"""
         try:
             self.connect(host, port, client_id)
             self.thread = threading.Thread(target=self.run, daemon=True)
@@ -25,7 +47,7 @@ class IBConnector(EWrapper, EClient):
             return False
     
     def disconnect_from_ib(self):
-        """IB Gatewayから刁E"""
+        """IB Gatewayから切断"""
         if self.connected:
             self.disconnect()
             if self.thread:
@@ -34,7 +56,7 @@ class IBConnector(EWrapper, EClient):
     def connectionClosed(self):
         """接続が閉じられた時のコールバック"""
         self.connected = False
-        print("IB接続が刁Eされました")
+        print("IB接続が切断されました")
     
     def nextValidId(self, orderId):
         """次の有効な注文IDを受け取った時のコールバック"""
@@ -42,18 +64,105 @@ class IBConnector(EWrapper, EClient):
         self.connected = True
         print(f"IB接続が確立されました。次の注文ID: {orderId}")
     
-    def place_order(self, contract, order):
-        """注斁E発注"""
+    def place_order(self, contract, order, strategy=None, amount=None, nisa=False):
+        """注文を発注（戦略・金額が指定されていれば発注前ゲートで枠を予約してから送る）"""
+        with get_tracer().span("ib.place_order", symbol=contract.symbol, side=order.action):
+            return self._place_order(contract, order, strategy, amount, nisa)
+    
+    def _place_order(self, contract, order, strategy, amount, nisa):
         if not self.connected:
-            raise Exception("IB接続が確立されてぁEせん")
+            raise Exception("IB接続が確立されていません")
         
-        self.placeOrder(self.next_order_id, contract, order)
-        order_id = self.next_order_id
-        self.next_order_id += 1
+        tracer = get_tracer()
+        reservation = None
+        try:
+            with tracer.span("ib.pre_trade_gate"):
+                if self.pre_trade_gate is not None:
+                    if strategy is None:
+                        self.pre_trade_gate.check_kill_switch()
+                    else:
+                        reservation = self.pre_trade_gate.reserve(strategy, contract.symbol, amount, order.action,
+                                                                  nisa)
+        except Exception as e:
+            self._record_event("reject", strategy=strategy, symbol=contract.symbol, quantity=order.totalQuantity,
+                               side=order.action, reason=str(e))
+            raise
+        
+        try:
+            order_id = self.next_order_id
+            with self.order_condition:
+                self.pending_orders[order_id] = time.time()
+            # IBからの受付・約定の通知を、この発注と同じトレースに記録する（通知が先に届いても取りこぼさないよう送信前に）
+            tracer.bind(order_id, order_id=order_id)
+            with tracer.span("ib.send", order_id=order_id):
+                self.placeOrder(order_id, contract, order)
+            self.next_order_id += 1
+        except Exception:
+            if reservation is not None:
+                reservation.release()
+            raise
+        
+        if reservation is not None:
+            reservation.commit(order_id)
+        self.order_info[order_id] = (strategy, contract.symbol)
+        self._record_event("order", strategy=strategy, symbol=contract.symbol, order_id=order_id,
+                           quantity=order.totalQuantity, price=order.lmtPrice if order.orderType == "LMT" else None, side=order.action,
+                           order_type=order.orderType, amount=amount, nisa=nisa)
+        # 確定より先に拒否・取消の通知が届いていた場合はここで取り消す
+        status = self.order_statuses.get(order_id, "")
+        if status in INACTIVE_ORDER_STATUSES or status.startswith("Error"):
+            self._reverse_order(order_id, status)
         return order_id
     
+    def _record_event(self, kind, **fields):
+        """イベントジャーナルに記録（未設定なら何もしない）"""
+        if self.event_journal is not None:
+            self.event_journal.record(kind, **fields)
+    
+    def _reverse_order(self, order_id, reason, unfilled_ratio=1.0):
+        """拒否・取消された注文の発注前ゲートの確定（投資額・NISA枠）を取り消す"""
+        if self.pre_trade_gate is None or not self.pre_trade_gate.reverse(order_id, reason, unfilled_ratio):
+            return
+        strategy, symbol = self.order_info.pop(order_id, (None, None))
+        self._record_event("reject", strategy=strategy, symbol=symbol, order_id=order_id, reason=reason)
+    
+    def _acknowledge_order(self, order_id, status):
+        """注文がIBに受け付けられた（または拒否された）ことを記録"""
+        with self.order_condition:
+            self.order_statuses[order_id] = status
+            if self.pending_orders.pop(order_id, None) is not None:
+                get_tracer().complete(order_id, "ib.ack", final=False, status=status)
+                self.order_condition.notify_all()
+    
+    def orderStatus(self, orderId, status, filled, remaining, avgFillPrice, permId,
+                    parentId, lastFillPrice, clientId, whyHeld, mktCapPrice):
+        """注文ステータスのコールバック"""
+        self._acknowledge_order(orderId, status)
+        if status in INACTIVE_ORDER_STATUSES:
+            # 一部約定後の取消なら未約定の割合だけ戻す
+            total = float(filled) + float(remaining)
+            self._reverse_order(orderId, status, float(remaining) / total if total > 0 else 1.0)
+        if status == "Filled" and self.pre_trade_gate is not None:
+            self.pre_trade_gate.settle(orderId)
+        if status == "Filled" and orderId in self.order_info:
+            get_tracer().complete(orderId, "ib.fill")
+            strategy, symbol = self.order_info.pop(orderId)
+            self._record_event("fill", strategy=strategy, symbol=symbol, order_id=orderId, quantity=filled,
+                               price=avgFillPrice)
+    
+    def wait_for_order_acks(self, timeout=10):
+        """未確認の注文がなくなるまで待つ（戻り値は期限までに確認できなかった注文ID）"""
+        deadline = time.monotonic() + timeout
+        with self.order_condition:
+            while self.pending_orders:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.connected:
+                    break
+                self.order_condition.wait(remaining)
+            return sorted(self.pending_orders)
+    
     def create_stock_contract(self, symbol, exchange="TSE"):
-        """株式契紁E作E"""
+        """株式契約を作成"""
         contract = Contract()
         contract.symbol = symbol
         contract.secType = "STK"
@@ -62,7 +171,7 @@ class IBConnector(EWrapper, EClient):
         return contract
     
     def create_market_order(self, action, quantity):
-        """成行注斁E作E"""
+        """成行注文を作成"""
         order = Order()
         order.action = action
         order.orderType = "MKT"
@@ -70,7 +179,7 @@ class IBConnector(EWrapper, EClient):
         return order
     
     def create_limit_order(self, action, quantity, limit_price):
-        """持E注斁E作E"""
+        """指値注文を作成"""
         order = Order()
         order.action = action
         order.orderType = "LMT"
@@ -79,17 +188,49 @@ class IBConnector(EWrapper, EClient):
         return order
     
     def get_account_summary(self, account_id):
-        """口座サマリーを取征E""
+        """口座サマリーを取得"""
         if not self.connected:
-            raise Exception("IB接続が確立されてぁEせん")
+            raise Exception("IB接続が確立されていません")
         
         self.reqAccountSummary(1, "All", "TotalCashValue,NetLiquidation,GrossPositionValue")
         return True
     
+    def request_positions(self, account_id=None, timeout=10):
+        """保有ポジションを取得（戻り値は 銘柄コード -> 数量）"""
+        if not self.connected:
+            raise Exception("IB接続が確立されていません")
+        
+        self.positions = {}
+        self.positions_done.clear()
+        self.reqPositions()
+        if not self.positions_done.wait(timeout):
+            raise TimeoutError("ポジション取得がタイムアウトしました")
+        self.cancelPositions()
+        
+        return {
+            symbol: quantity
+            for (account, symbol), quantity in self.positions.items()
+            if account_id is None or account == account_id
+        }
+    
+    def position(self, account, contract, position, avgCost):
+        """ポジションのコールバック"""
+        key = (account, contract.symbol)
+        self.positions[key] = self.positions.get(key, 0) + float(position)
+    
+    def positionEnd(self):
+        """ポジション受信完了のコールバック"""
+        self.positions_done.set()
+    
     def accountSummary(self, reqId, account, tag, value, currency):
         """口座サマリーのコールバック"""
         print(f"口座サマリー - {tag}: {value} {currency}")
     
-    def error(self, reqId, errorCode, errorString):
+    def error(self, reqId, errorCode, errorString, *args):
         """エラーのコールバック"""
         print(f"IB API エラー [{errorCode}]: {errorString}")
+        
+        # 発注に対するエラーは拒否として確認済みにし、発注前ゲートの確定を取り消す
+        if reqId in self.pending_orders and errorCode not in ORDER_WARNING_CODES:
+            self._acknowledge_order(reqId, f"Error {errorCode}")
+            self._reverse_order(reqId, f"Error {errorCode}: {errorString}")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+テクニカル指標モジュール
+
+移動平均・標準偏差・ボリンジャーバンド・ATR・レンジ比率を「銘柄 × 足」の配列（1銘柄なら1次元）で一括計算する。
+Bot（直近の足だけ）とバックテスト（全期間）が同じ関数を使う。
+
+- 移動平均・標準偏差は価格を 1/256 円単位の整数にして累積和の差で窓の合計を求める（期間によらず O(足数)）。
+  整数の和は誤差が出ないので、同じ窓の値なら前に何本の足があっても結果はビット単位で同じになる
+  （Bot が直近30日で計算した値とバックテストが10年分で計算したその日の値が一致する）
+- 最高値・最安値はブロックごとの累積最大・最小（van Herk / Gil-Werman）で求める（期間によらず O(足数)）
+- 期間に満たない足・欠損を含む窓は NaN
+"""
+
+from src.shared_modules.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+# 価格を整数にするときの小数部のビット数（1/256 円単位）
+FIXED_POINT_BITS = 8
+_SCALE = float(1 << FIXED_POINT_BITS)
+
+
+def _window_sum(x, period: int):
+    """先頭に0を置いた累積和の差で窓の合計（途中で int64 があふれても、窓の合計が int64 に収まれば差は正しい）"""
+    total = np.zeros(x.shape[:-1] + (x.shape[-1] + 1,), dtype=np.int64)
+    with np.errstate(over="ignore"):
+        np.cumsum(x, axis=-1, out=total[..., 1:])
+        return total[..., period:] - total[..., :-period]
+
+
+def _window_sums(values, period: int, squares: bool = False):
+    """窓の合計（整数、窓の数 = 足数 - period + 1）と欠損を含む窓のマスク（欠損が無ければ None）"""
+    if period < 1:
+        raise ValueError(f"期間は1以上を指定してください: {period}")
+    scaled = values * _SCALE
+    finite = np.isfinite(scaled)
+    missing = None
+    if not finite.all():
+        scaled[~finite] = 0.0
+        missing = _window_sum(~finite, period) > 0
+    fixed = np.rint(scaled, out=scaled).astype(np.int64)
+    s1 = _window_sum(fixed, period)
+    s2 = None
+    if squares:
+        with np.errstate(over="ignore"):
+            s2 = _window_sum(fixed * fixed, period)
+    return s1, s2, missing
+
+
+def _max_spread(values, period: int) -> float:
+    """窓の中の値幅の最大（整数にした単位、全体の値幅で足りなければ窓ごとに求める）"""
+    if not values.size:
+        return 0.0
+    spread = float(np.nanmax(values) - np.nanmin(values)) * _SCALE
+    if spread ** 2 * period ** 2 / 4 < 2.0 ** 62:
+        return spread
+    windows = _rolling_extreme(values, period, np.maximum) - _rolling_extreme(values, period, np.minimum)
+    return float(np.nanmax(windows[..., period - 1:], initial=0.0)) * _SCALE
+
+
+def _empty(values):
+    return np.full(values.shape, np.nan)
+
+
+def sma(values, period: int):
+    """単純移動平均"""
+    values = np.asarray(values, dtype=float)
+    out = _empty(values)
+    if values.shape[-1] >= period:
+        s1, _, missing = _window_sums(values, period)
+        np.divide(s1, period * _SCALE, out=out[..., period - 1:])
+        if missing is not None:
+            out[..., period - 1:][missing] = np.nan
+    return out
+
+
+def rolling_mean_std(values, period: int):
+    """移動平均と標準偏差（ddof=1）"""
+    values = np.asarray(values, dtype=float)
+    middle = _empty(values)
+    std = _empty(values)
+    if values.shape[-1] < period:
+        return middle, std
+    # period * Σx² - (Σx)² = period² × 母分散 は 0 以上で、int64 に収まれば途中のあふれに関係なく正確
+    if _max_spread(values, period) ** 2 * period ** 2 / 4 >= 2.0 ** 62:
+        raise ValueError(f"期間 {period} の窓の値幅が大きすぎて標準偏差を正確に計算できません")
+    s1, s2, missing = _window_sums(values, period, squares=True)
+    with np.errstate(over="ignore"):
+        s2 *= period
+        s2 -= s1 * s1
+    
+    np.divide(s1, period * _SCALE, out=middle[..., period - 1:])
+    if period > 1:
+        np.divide(s2, period * (period - 1) * _SCALE * _SCALE, out=std[..., period - 1:])
+        np.sqrt(std, out=std)
+    if missing is not None:
+        middle[..., period - 1:][missing] = np.nan
+        std[..., period - 1:][missing] = np.nan
+    return middle, std
+
+
+def rolling_std(values, period: int):
+    """標準偏差（ddof=1）"""
+    return rolling_mean_std(values, period)[1]
+
+
+def bollinger_bands(values, period: int, std_dev: float):
+    """ボリンジャーバンド（上限・中心・下限）"""
+    middle, std = rolling_mean_std(values, period)
+    return middle + std * std_dev, middle, middle - std * std_dev
+
+
+def _rolling_extreme(values, window: int, ufunc):
+    """窓の最大（ufunc=np.maximum）・最小（np.minimum）。ブロックの前方累積と後方累積の組み合わせで求める"""
+    n = values.shape[-1]
+    out = _empty(values)
+    if window < 1:
+        raise ValueError(f"期間は1以上を指定してください: {window}")
+    if n < window:
+        return out
+    pad = (-n) % window
+    fill = -np.inf if ufunc is np.maximum else np.inf
+    padded = np.concatenate([values, np.full(values.shape[:-1] + (pad,), fill)], axis=-1)
+    blocks = padded.reshape(values.shape[:-1] + (-1, window))
+    prefix = ufunc.accumulate(blocks, axis=-1).reshape(padded.shape)
+    suffix = ufunc.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1].reshape(padded.shape)
+    out[..., window - 1:] = ufunc(suffix[..., :n - window + 1], prefix[..., window - 1:n])
+    return out
+
+
+def rolling_max(values, window: int):
+    """直近 window 本の最大値"""
+    return _rolling_extreme(np.asarray(values, dtype=float), window, np.maximum)
+
+
+def rolling_min(values, window: int):
+    """直近 window 本の最小値"""
+    return _rolling_extreme(np.asarray(values, dtype=float), window, np.minimum)
+
+
+def range_ratio(high, low, window: int):
+    """直近 window 本の (最高値 - 最安値) / 最安値"""
+    highest = rolling_max(high, window)
+    lowest = rolling_min(low, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (highest - lowest) / lowest
+
+
+def true_range(high, low, close):
+    """真の値幅（max(高値 - 安値, |高値 - 前日終値|, |安値 - 前日終値|)、最初の足は高値 - 安値）"""
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    tr = high - low
+    previous = close[..., :-1]
+    tr[..., 1:] = np.maximum(tr[..., 1:], np.maximum(np.abs(high[..., 1:] - previous), np.abs(low[..., 1:] - previous)))
+    return tr
+
+
+def atr(high, low, close, period: int):
+    """ATR（真の値幅の単純移動平均）"""
+    return sma(true_range(high, low, close), period)
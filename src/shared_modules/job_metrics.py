@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+スケジューラージョブ計測モジュール
+
+ジョブ実行時間・失敗回数・ミスファイア・多重起動と銘柄ごとの
+データ取得レイテンシを集計し、Prometheus形式のテキストで公開する。
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ジョブ実行時間用のバケット（秒）
+JOB_DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 45.0, 60.0, 120.0, 300.0, 600.0)
+
+# データ取得レイテンシ用のバケット（秒）
+FETCH_DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """累積バケット方式のヒストグラム"""
+    
+    __slots__ = ("buckets", "counts", "total", "count")
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        """観測値を追加"""
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+    
+    def cumulative_counts(self) -> List[int]:
+        """Prometheus形式の累積カウントを取得"""
+        result = []
+        running = 0
+        for c in self.counts:
+            running += c
+            result.append(running)
+        return result
+
+
+class JobMetrics:
+    def __init__(self):
+        """ジョブ計測の初期化"""
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        
+        self.job_duration: Dict[str, Histogram] = {}
+        self.job_runs: Dict[Tuple[str, str], int] = {}
+        self.job_exceptions: Dict[Tuple[str, str], int] = {}
+        self.job_misfires: Dict[str, int] = {}
+        self.job_overlaps: Dict[str, int] = {}
+        self.job_in_flight: Dict[str, int] = {}
+        self.job_last_duration: Dict[str, float] = {}
+        self.job_budgets: Dict[str, float] = {}
+        self.fetch_duration: Dict[Tuple[str, str], Histogram] = {}
+        
+        self._http_server = None
+    
+    # ------------------------------------------------------------------
+    # ジョブ計測
+    # ------------------------------------------------------------------
+    def instrument(self, job_id: str, func: Callable, budget_seconds: Optional[float] = None) -> Callable:
+        """ジョブ関数を計測付きの関数でラップ"""
+        if budget_seconds:
+            self.job_budgets[job_id] = float(budget_seconds)
+        
+        def wrapper(*args, **kwargs):
+            with self.track_job(job_id):
+                return func(*args, **kwargs)
+        
+        wrapper.__name__ = getattr(func, "__name__", job_id)
+        wrapper.__doc__ = getattr(func, "__doc__", None)
+        return wrapper
+    
+    @contextmanager
+    def track_job(self, job_id: str):
+        """ジョブ1回分の実行を計測"""
+        with self._lock:
+            self.job_in_flight[job_id] = self.job_in_flight.get(job_id, 0) + 1
+            if self.job_in_flight[job_id] > 1:
+                self.job_overlaps[job_id] = self.job_overlaps.get(job_id, 0) + 1
+        
+        previous_job = getattr(self._local, "job_id", None)
+        previous_errors = getattr(self._local, "handled_errors", 0)
+        self._local.job_id = job_id
+        self._local.handled_errors = 0
+        
+        started = time.perf_counter()
+        outcome = "success"
+        try:
+            yield
+        except Exception as e:
+            outcome = "error"
+            self._increment_exception(job_id, type(e).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            if outcome == "success" and self._local.handled_errors:
+                outcome = "error"
+            self._local.job_id = previous_job
+            self._local.handled_errors = previous_errors
+            self.observe_job(job_id, elapsed, outcome)
+            with self._lock:
+                self.job_in_flight[job_id] -= 1
+    
+    def observe_job(self, job_id: str, seconds: float, outcome: str = "success"):
+        """ジョブの実行時間と結果を記録"""
+        with self._lock:
+            histogram = self.job_duration.get(job_id)
+            if histogram is None:
+                histogram = self.job_duration[job_id] = Histogram(JOB_DURATION_BUCKETS)
+            histogram.observe(seconds)
+            self.job_last_duration[job_id] = seconds
+            key = (job_id, outcome)
+            self.job_runs[key] = self.job_runs.get(key, 0) + 1
+    
+    def note_handled_error(self, message=None, *args, **kwargs):
+        """ジョブ内で捕捉・通知されたエラーを実行中のジョブに記録"""
+        job_id = getattr(self._local, "job_id", None)
+        if job_id is None:
+            return
+        self._local.handled_errors += 1
+        self._increment_exception(job_id, "handled")
+    
+    def _increment_exception(self, job_id: str, exception_type: str):
+        with self._lock:
+            key = (job_id, exception_type)
+            self.job_exceptions[key] = self.job_exceptions.get(key, 0) + 1
+    
+    def record_misfire(self, job_id: str):
+        """ミスファイア（実行予定時刻の取りこぼし）を記録"""
+        with self._lock:
+            self.job_misfires[job_id] = self.job_misfires.get(job_id, 0) + 1
+    
+    def record_overlap(self, job_id: str):
+        """多重起動（前回の実行が終わっていない）を記録"""
+        with self._lock:
+            self.job_overlaps[job_id] = self.job_overlaps.get(job_id, 0) + 1
+    
+    def attach_to_scheduler(self, scheduler):
+        """APSchedulerのイベントからミスファイアと多重起動を収集"""
+        from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+        
+        def listener(event):
+            if event.code == EVENT_JOB_MISSED:
+                self.record_misfire(event.job_id)
+            elif event.code == EVENT_JOB_MAX_INSTANCES:
+                self.record_overlap(event.job_id)
+        
+        scheduler.add_listener(listener, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+    
+    def in_flight_count(self) -> int:
+        """実行中のジョブ数を取得"""
+        with self._lock:
+            return sum(self.job_in_flight.values())
+    
+    # ------------------------------------------------------------------
+    # データ取得レイテンシ
+    # ------------------------------------------------------------------
+    @contextmanager
+    def time_fetch(self, symbol: str, source: str = "yfinance"):
+        """銘柄データ取得の所要時間を計測"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_fetch(symbol, time.perf_counter() - started, source)
+    
+    def observe_fetch(self, symbol: str, seconds: float, source: str = "yfinance"):
+        """銘柄データ取得の所要時間を記録"""
+        key = (source, str(symbol))
+        with self._lock:
+            histogram = self.fetch_duration.get(key)
+            if histogram is None:
+                histogram = self.fetch_duration[key] = Histogram(FETCH_DURATION_BUCKETS)
+            histogram.observe(seconds)
+    
+    def take_fetch_observations(self) -> Dict[Tuple[str, str], Tuple[List[int], float, int]]:
+        """データ取得レイテンシの観測値を取り出して空にする（ワーカープロセスから監督プロセスへ送る用）"""
+        with self._lock:
+            observations = {key: (h.counts, h.total, h.count) for key, h in self.fetch_duration.items()}
+            self.fetch_duration = {}
+        return observations
+    
+    def merge_fetch_observations(self, observations: Dict[Tuple[str, str], Tuple[List[int], float, int]]):
+        """他のプロセスで取り出した観測値を加算"""
+        with self._lock:
+            for key, (counts, total, count) in observations.items():
+                histogram = self.fetch_duration.get(key)
+                if histogram is None:
+                    histogram = self.fetch_duration[key] = Histogram(FETCH_DURATION_BUCKETS)
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.total += total
+                histogram.count += count
+    
+    # ------------------------------------------------------------------
+    # 出力
+    # ------------------------------------------------------------------
+    def job_health(self) -> Dict[str, Dict]:
+        """ジョブごとの実行回数・エラー数・直近の実行時間など（ダッシュボード用）"""
+        with self._lock:
+            jobs = (set(self.job_duration) | set(self.job_in_flight) | set(self.job_budgets)
+                    | set(self.job_misfires) | set(self.job_overlaps) | {job for job, _ in self.job_runs})
+            health = {job: _empty_health() for job in jobs}
+            for (job, outcome), count in self.job_runs.items():
+                health[job]["success" if outcome == "success" else "error"] += count
+            for (job, _), count in self.job_exceptions.items():
+                health.setdefault(job, _empty_health())["exceptions"] += count
+            for job in jobs:
+                health[job].update(
+                    misfires=self.job_misfires.get(job, 0),
+                    overlaps=self.job_overlaps.get(job, 0),
+                    in_flight=self.job_in_flight.get(job, 0),
+                    last_duration=self.job_last_duration.get(job),
+                    budget=self.job_budgets.get(job)
+                )
+        return health
+    
+    def render_prometheus(self) -> str:
+        """Prometheusテキスト形式で出力"""
+        lines: List[str] = []
+        with self._lock:
+            self._render_histogram(
+                lines, "chimera_job_duration_seconds", "ジョブ実行時間",
+                {(job_id,): h for job_id, h in self.job_duration.items()}, ("job",)
+            )
+            self._render_counter(
+                lines, "chimera_job_runs_total", "ジョブ実行回数", self.job_runs, ("job", "outcome")
+            )
+            self._render_counter(
+                lines, "chimera_job_exceptions_total", "ジョブ内で発生したエラー数",
+                self.job_exceptions, ("job", "exception")
+            )
+            self._render_counter(
+                lines, "chimera_job_misfires_total", "ミスファイア回数",
+                {(k,): v for k, v in self.job_misfires.items()}, ("job",)
+            )
+            self._render_counter(
+                lines, "chimera_job_overlaps_total", "多重起動回数",
+                {(k,): v for k, v in self.job_overlaps.items()}, ("job",)
+            )
+            self._render_gauge(
+                lines, "chimera_job_in_flight", "実行中のジョブ数",
+                {(k,): v for k, v in self.job_in_flight.items()}, ("job",)
+            )
+            self._render_gauge(
+                lines, "chimera_job_last_duration_seconds", "直近のジョブ実行時間",
+                {(k,): v for k, v in self.job_last_duration.items()}, ("job",)
+            )
+            self._render_gauge(
+                lines, "chimera_job_budget_seconds", "ジョブの実行時間予算",
+                {(k,): v for k, v in self.job_budgets.items()}, ("job",)
+            )
+            self._render_gauge(
+                lines, "chimera_job_budget_utilization_ratio", "直近の実行時間 / 予算",
+                {
+                    (k,): self.job_last_duration[k] / budget
+                    for k, budget in self.job_budgets.items()
+                    if k in self.job_last_duration and budget > 0
+                },
+                ("job",)
+            )
+            self._render_histogram(
+                lines, "chimera_symbol_fetch_duration_seconds", "銘柄データ取得時間",
+                self.fetch_duration, ("source", "symbol")
+            )
+        return "\n".join(lines) + "\n"
+    
+    @staticmethod
+    def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{n}="{_escape_label(v)}"' for n, v in zip(names, values)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+    
+    def _render_counter(self, lines, name, help_text, values, label_names):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in sorted(values.items()):
+            lines.append(f"{name}{self._format_labels(label_names, labels)} {value}")
+    
+    def _render_gauge(self, lines, name, help_text, values, label_names):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in sorted(values.items()):
+            lines.append(f"{name}{self._format_labels(label_names, labels)} {value:.6g}")
+    
+    def _render_histogram(self, lines, name, help_text, histograms, label_names):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in sorted(histograms.items()):
+            for bound, count in zip(histogram.buckets, histogram.cumulative_counts()):
+                le = self._format_labels(label_names, labels, f'le="{bound:g}"')
+                lines.append(f"{name}_bucket{le} {count}")
+            le = self._format_labels(label_names, labels, 'le="+Inf"')
+            lines.append(f"{name}_bucket{le} {histogram.count}")
+            label_text = self._format_labels(label_names, labels)
+            lines.append(f"{name}_sum{label_text} {histogram.total:.6f}")
+            lines.append(f"{name}_count{label_text} {histogram.count}")
+    
+    def write_textfile(self, path: str):
+        """node_exporterのtextfileコレクター向けにアトミックに書き出し"""
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.render_prometheus())
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"メトリクス書き出しエラー: {e}")
+    
+    def start_http_server(self, host: str = "127.0.0.1", port: int = 9108):
+        """/metrics を返すローカルHTTPサーバーを起動"""
+        metrics = self
+        
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._http_server = ThreadingHTTPServer((host, port), MetricsHandler)
+        thread = threading.Thread(target=self._http_server.serve_forever, daemon=True)
+        thread.start()
+        return self._http_server
+    
+    def stop_http_server(self):
+        """HTTPサーバーを停止"""
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+            self._http_server = None
+
+
+def _empty_health() -> Dict:
+    return {"success": 0, "error": 0, "exceptions": 0, "misfires": 0, "overlaps": 0, "in_flight": 0,
+            "last_duration": None, "budget": None}
+
+
+_HEALTH_SAMPLES = {
+    "chimera_job_exceptions_total": "exceptions",
+    "chimera_job_misfires_total": "misfires",
+    "chimera_job_overlaps_total": "overlaps",
+    "chimera_job_in_flight": "in_flight",
+    "chimera_job_last_duration_seconds": "last_duration",
+    "chimera_job_budget_seconds": "budget",
+}
+
+
+def job_health_from_text(text: str) -> Dict[str, Dict]:
+    """render_prometheus / write_textfile の出力から job_health() と同じ形の値を復元（別プロセスからの参照用）"""
+    health = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#") or "{" not in line:
+            continue
+        name, rest = line.split("{", 1)
+        labels_text, _, value_text = rest.rpartition("} ")
+        if name != "chimera_job_runs_total" and name not in _HEALTH_SAMPLES:
+            continue
+        labels = dict(part.split("=", 1) for part in labels_text.split(",") if "=" in part)
+        labels = {key: value.strip('"') for key, value in labels.items()}
+        if "job" not in labels:
+            continue
+        job = health.setdefault(labels["job"], _empty_health())
+        value = float(value_text)
+        if name == "chimera_job_runs_total":
+            job["success" if labels.get("outcome") == "success" else "error"] += int(value)
+        elif _HEALTH_SAMPLES[name] in ("last_duration", "budget"):
+            job[_HEALTH_SAMPLES[name]] = value
+        else:
+            job[_HEALTH_SAMPLES[name]] += int(value)
+    return health
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+_default_metrics = JobMetrics()
+
+
+def get_job_metrics() -> JobMetrics:
+    """プロセス共通のジョブ計測インスタンスを取得"""
+    return _default_metrics
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+遅延インポートモジュール
+
+pandas / yfinance / requests などの重い依存を、最初に属性へアクセスした
+時点まで読み込まない。緊急停止スクリプトなど一部しか使わない入口の起動を速くする。
+"""
+
+import importlib
+import sys
+import threading
+
+
+class LazyModule:
+    """最初の属性アクセスで実モジュールを読み込むプロキシ"""
+    
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+    
+    def _load(self):
+        """実モジュールを読み込む（スケジューラーの複数スレッドから呼ばれても1回だけ）"""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+    
+    @property
+    def is_loaded(self) -> bool:
+        return self._module is not None
+    
+    def __getattr__(self, attr):
+        if attr in ("_name", "_module", "_lock"):
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+    
+    def __dir__(self):
+        return dir(self._load())
+    
+    def __repr__(self):
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<LazyModule '{self._name}' ({state})>"
+
+
+def lazy_import(name: str):
+    """読み込み済みなら実モジュールを、未読み込みなら遅延プロキシを返す"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NISA取引台帳モジュール
+
+NISA枠の使用を1取引1行の追記専用台帳（JSON Lines）に記録する。
+- 台帳は書き換えず、注文ID・金額・口座・日時を追記するだけ
+- 一定件数ごとに集計済みスナップショットを一時ファイル＋リネームで原子的に保存
+- 年間・生涯使用額は「スナップショット＋それ以降の台帳末尾」から求める
+- 年は取引日時から決まるため、年が変われば自動的に新しい年の集計になる
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, date
+from typing import Dict, List, Optional
+
+
+class NISALedger:
+    def __init__(self, directory: str = "nisa_ledger", snapshot_interval: int = 50, read_only: bool = False):
+        """台帳の初期化（read_only は他プロセスの台帳の参照用で、ファイルを作成・修復しない）"""
+        self.directory = directory
+        self.ledger_path = os.path.join(directory, "ledger.jsonl")
+        self.snapshot_path = os.path.join(directory, "snapshot.json")
+        self.snapshot_interval = snapshot_interval
+        self.annual = {}
+        self.lifetime = 0
+        self.seq = 0
+        self.records_since_snapshot = 0
+        self.offset = 0  # 集計済みの台帳バイト位置
+        self._lock = threading.Lock()
+        self.read_only = read_only
+        
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+        self.load()
+    
+    def load(self):
+        """スナップショットを読み込み、それ以降の台帳末尾を適用"""
+        snapshot = self._read_snapshot()
+        self.annual = {str(year): int(amount) for year, amount in snapshot.get("annual", {}).items()}
+        self.lifetime = int(snapshot.get("lifetime", 0))
+        self.seq = int(snapshot.get("seq", 0))
+        self.offset = int(snapshot.get("offset", 0))
+        self.records_since_snapshot = 0
+        
+        if not os.path.exists(self.ledger_path):
+            return
+        
+        if not self.read_only:
+            self._truncate_torn_tail()
+        if self.offset > os.path.getsize(self.ledger_path):
+            # 台帳がスナップショットより短い（手動で差し替えられた等）ので先頭から集計し直す
+            self.annual, self.lifetime, self.seq, self.offset = {}, 0, 0, 0
+        self._read_tail()
+    
+    def refresh(self):
+        """他プロセスが追記した取引を集計に取り込む（増えていなければstat1回で終わる）"""
+        with self._lock:
+            self._read_tail()
+    
+    def _read_tail(self):
+        """集計済み位置より後ろの完結した行を適用"""
+        if not os.path.exists(self.ledger_path) or os.path.getsize(self.ledger_path) <= self.offset:
+            return
+        with open(self.ledger_path, "rb") as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # 書き込み途中の行は次回に回す
+                    break
+                self.offset += len(line)
+                record = json.loads(line)
+                if record["seq"] <= self.seq:
+                    continue
+                self._apply(record)
+                self.records_since_snapshot += 1
+    
+    def _read_snapshot(self) -> Dict:
+        """スナップショットを読み込み（無い・壊れている場合は空）"""
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"NISA台帳スナップショット読み込みエラー（台帳から再集計します）: {e}")
+            return {}
+    
+    def _truncate_torn_tail(self):
+        """クラッシュで途中まで書かれた最終行を取り除く（未確定の取引なので捨てて良い）"""
+        with open(self.ledger_path, "rb+") as f:
+            data = f.read()
+            if not data or data.endswith(b"\n"):
+                return
+            end = data.rfind(b"\n") + 1
+            f.truncate(end)
+            print(f"NISA台帳の不完全な末尾行を削除しました ({len(data) - end}バイト)")
+    
+    def _apply(self, record: Dict):
+        """1取引を集計に反映"""
+        year = str(record["year"])
+        self.annual[year] = self.annual.get(year, 0) + int(record["amount"])
+        self.lifetime += int(record["amount"])
+        self.seq = max(self.seq, int(record["seq"]))
+    
+    def append(self, amount: int, order_id=None, account: str = "nisa", symbol: Optional[str] = None,
+               timestamp: Optional[datetime] = None, note: str = "") -> Dict:
+        """取引を追記（fsync後に集計へ反映）"""
+        timestamp = timestamp or datetime.now()
+        with self._lock:
+            self._read_tail()
+            record = {
+                "seq": self.seq + 1,
+                "timestamp": timestamp.isoformat(),
+                "year": timestamp.year,
+                "order_id": order_id,
+                "account": account,
+                "symbol": symbol,
+                "amount": int(amount)
+            }
+            if note:
+                record["note"] = note
+            
+            with open(self.ledger_path, "ab") as f:
+                f.write((json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                self.offset = f.tell()
+            
+            self._apply(record)
+            self.records_since_snapshot += 1
+            if self.records_since_snapshot >= self.snapshot_interval:
+                self._write_snapshot()
+        return record
+    
+    def snapshot(self):
+        """スナップショットを保存"""
+        with self._lock:
+            self._write_snapshot()
+    
+    def _write_snapshot(self):
+        """集計と台帳の読み込み位置を一時ファイル経由で原子的に保存"""
+        data = {
+            "seq": self.seq,
+            "offset": self.offset,
+            "annual": self.annual,
+            "lifetime": self.lifetime,
+            "created_at": datetime.now().isoformat()
+        }
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self.records_since_snapshot = 0
+    
+    def annual_usage(self, year: Optional[int] = None) -> int:
+        """指定年（省略時は今年）の使用額"""
+        year = year or date.today().year
+        with self._lock:
+            return self.annual.get(str(year), 0)
+    
+    def lifetime_usage(self) -> int:
+        """生涯使用額"""
+        with self._lock:
+            return self.lifetime
+    
+    def transactions(self, year: Optional[int] = None) -> List[Dict]:
+        """台帳の取引一覧（監査・レポート用、年で絞り込み可）"""
+        if not os.path.exists(self.ledger_path):
+            return []
+        with open(self.ledger_path, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.endswith("\n")]
+        if year is not None:
+            records = [record for record in records if record["year"] == year]
+        return records
+    
+    def migrate_legacy_usage(self, usage_file: str = "nisa_usage.json") -> bool:
+        """旧形式の nisa_usage.json を年ごとの移行レコードとして取り込む（台帳が空のときのみ）"""
+        if self.seq > 0 or not os.path.exists(usage_file):
+            return False
+        try:
+            with open(usage_file, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"旧NISA使用状況データ読み込みエラー: {e}")
+            return False
+        
+        annual = {int(year): int(amount) for year, amount in legacy.get("annual_usage", {}).items() if amount}
+        for year, amount in sorted(annual.items()):
+            self.append(amount, timestamp=datetime(year, 1, 1), note=f"migrated from {usage_file}")
+        
+        # 年別の内訳より生涯額が多い分（過去年の記録漏れ）は今年の枠を圧迫しないよう最古年の前年に計上
+        remainder = int(legacy.get("lifetime_usage", 0)) - sum(annual.values())
+        if remainder > 0:
+            year = min(annual or [date.today().year]) - 1
+            self.append(remainder, timestamp=datetime(year, 1, 1), note=f"migrated from {usage_file} (lifetime)")
+        
+        self.snapshot()
+        os.replace(usage_file, f"{usage_file}.migrated")
+        print(f"旧NISA使用状況データを台帳に移行しました: {usage_file}")
+        return True
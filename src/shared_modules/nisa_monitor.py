@@ -7,167 +7,162 @@ NISA非課税枠監視モジュール
 import json
 import os
 from datetime import datetime, date
-from typing import Dict, Tuple, Optional
+from typing import Dict, Tuple, Optional, TYPE_CHECKING
 from src.shared_modules.config_loader import ConfigLoader
 from src.shared_modules.discord_logger import DiscordLogger
-from src.shared_modules.ib_connector import IBConnector
+from src.shared_modules.nisa_ledger import NISALedger
+
+if TYPE_CHECKING:
+    from src.shared_modules.ib_connector import IBConnector
 
 class NISAMonitor:
-    def __init__(self, config: ConfigLoader, discord: DiscordLogger, ib_connector: IBConnector):
+    def __init__(self, config: ConfigLoader, discord: DiscordLogger, ib_connector: "IBConnector"):
         self.config = config
         self.discord = discord
         self.ib_connector = ib_connector
         
-        # NISA設宁E        self.annual_limit = self.config.get("nisa_settings.annual_limit", 3600000)  # 360丁EE
-        self.lifetime_limit = self.config.get("nisa_settings.lifetime_limit", 18000000)  # 1,800丁EE
-        self.monitoring_enabled = self.config.get("nisa_settings.monitoring_enabled", True)
+        # NISA設定
+        self.apply_config()
         
-        # チEEタファイル
-        self.usage_file = "nisa_usage.json"
+        # 取引台帳（年間・生涯使用額は台帳から集計）
+        nisa_settings = self.config.settings.nisa_settings
+        self.ledger = NISALedger(nisa_settings.ledger_dir, snapshot_interval=nisa_settings.snapshot_interval)
+        self.ledger.migrate_legacy_usage(nisa_settings.legacy_usage_file)
         self.current_year = date.today().year
-        
-        # 使用状況データ
-        self.usage_data = self._load_usage_data()
     
-    def _load_usage_data(self) -> Dict:
-        """NISA使用状況データを読み込み"""
-        try:
-            if os.path.exists(self.usage_file):
-                with open(self.usage_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            else:
-                return self._initialize_usage_data()
-        except Exception as e:
-            print(f"NISA使用状況データ読み込みエラー: {e}")
-            return self._initialize_usage_data()
+    def apply_config(self):
+        """上限・監視設定を現在の設定から読み直す（設定の再読み込み時にも呼ばれる）"""
+        nisa_settings = self.config.settings.nisa_settings
+        self.annual_limit = nisa_settings.annual_limit  # 360万円
+        self.lifetime_limit = nisa_settings.lifetime_limit  # 1,800万円
+        self.monitoring_enabled = nisa_settings.monitoring_enabled
+        self.stop_flag_file = self.config.settings.pre_trade.stop_flag_file
     
-    def _initialize_usage_data(self) -> Dict:
-        """初期使用状況データを作E"""
-        return {
-            "annual_usage": {str(self.current_year): 0},
-            "lifetime_usage": 0,
-            "last_updated": datetime.now().isoformat()
-        }
-    
-    def _save_usage_data(self):
-        """NISA使用状況データを保孁E""
-        try:
-            self.usage_data["last_updated"] = datetime.now().isoformat()
-            with open(self.usage_file, "w", encoding="utf-8") as f:
-                json.dump(self.usage_data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"NISA使用状況データ保存エラー: {e}")
+    def _check_year_rollover(self):
+        """年が変わっていれば通知（集計は取引日時の年で行うためリセット不要）"""
+        new_year = date.today().year
+        if new_year != self.current_year:
+            self.current_year = new_year
+            self.discord.info(f"NISA年間使用量の集計を{new_year}年に切り替えました")
     
     def get_current_usage(self) -> Tuple[int, int]:
-        """現在のNISA使用状況を取得（年間、生涯EE""
+        """現在のNISA使用状況を取得（年間、生涯）"""
         try:
-            annual_usage = self.usage_data["annual_usage"].get(str(self.current_year), 0)
-            lifetime_usage = self.usage_data["lifetime_usage"]
-            
-            return annual_usage, lifetime_usage
+            self._check_year_rollover()
+            self.ledger.refresh()
+            return self.ledger.annual_usage(self.current_year), self.ledger.lifetime_usage()
         except Exception as e:
             print(f"使用状況取得エラー: {e}")
             return 0, 0
     
-    def update_usage(self, amount: int, account_type: str = "nisa"):
-        """NISA使用状況を更新"""
+    def update_usage(self, amount: int, account_type: str = "nisa", order_id=None, symbol: Optional[str] = None):
+        """NISA使用状況を更新（台帳に取引を追記）"""
         if not self.monitoring_enabled:
             return
         
         try:
-            # 年間使用量を更新
-            if str(self.current_year) not in self.usage_data["annual_usage"]:
-                self.usage_data["annual_usage"][str(self.current_year)] = 0
-            
-            self.usage_data["annual_usage"][str(self.current_year)] += amount
-            
-            # 生涯使用量を更新
-            self.usage_data["lifetime_usage"] += amount
-            
-            # チEEタを保孁E            self._save_usage_data()
+            self.ledger.append(amount, order_id=order_id, account=account_type, symbol=symbol)
+            annual_usage, lifetime_usage = self.get_current_usage()
             
-            print(f"NISA使用状況を更新: +{amount:,}冁E(年閁E {self.usage_data['annual_usage'][str(self.current_year)]:,}冁E 生涯: {self.usage_data['lifetime_usage']:,}冁E")
+            print(f"NISA使用状況を更新: +{amount:,}円 (年間: {annual_usage:,}円, 生涯: {lifetime_usage:,}円)")
             
-            # 上限チェチE
+            # 上限チェック
             self._check_limits()
             
         except Exception as e:
             print(f"使用状況更新エラー: {e}")
     
+    def reverse_usage(self, amount: int, order_id=None, symbol: Optional[str] = None, reason: str = "",
+                      timestamp: Optional[datetime] = None):
+        """発注後に拒否・取消された注文の使用額を戻す（台帳に負の取引を追記）"""
+        if not self.monitoring_enabled:
+            return
+        
+        try:
+            self.ledger.append(-int(amount), order_id=order_id, symbol=symbol, timestamp=timestamp,
+                               note=f"取消: {reason}")
+            annual_usage, lifetime_usage = self.get_current_usage()
+            print(f"NISA使用状況を取消: -{amount:,}円 注文ID {order_id} ({reason}) "
+                  f"(年間: {annual_usage:,}円, 生涯: {lifetime_usage:,}円)")
+        except Exception as e:
+            print(f"使用状況取消エラー: {e}")
+    
     def _check_limits(self):
-        """NISA上限をチェチE"""
+        """NISA上限をチェック"""
         annual_usage, lifetime_usage = self.get_current_usage()
         
-        # 年間上限チェチE
+        # 年間上限チェック
         if annual_usage >= self.annual_limit:
-            self.discord.error(f"【NISA年間上限到達】年間使用釁E {annual_usage:,}冁E/ {self.annual_limit:,}冁E)
+            self.discord.error(f"【NISA年間上限到達】年間使用額: {annual_usage:,}円 / {self.annual_limit:,}円")
             self._create_stop_flag("annual_limit_reached")
         
-        # 生涯上限チェチE
+        # 生涯上限チェック
         elif lifetime_usage >= self.lifetime_limit:
-            self.discord.error(f"【NISA生涯上限到達】生涯使用釁E {lifetime_usage:,}冁E/ {self.lifetime_limit:,}冁E)
+            self.discord.error(f"【NISA生涯上限到達】生涯使用額: {lifetime_usage:,}円 / {self.lifetime_limit:,}円")
             self._create_stop_flag("lifetime_limit_reached")
         
-        # 警告レベルEE0%到達！E        elif annual_usage >= self.annual_limit * 0.8:
+        # 警告レベル（80%到達）
+        elif annual_usage >= self.annual_limit * 0.8:
             remaining = self.annual_limit - annual_usage
-            self.discord.warning(f"【NISA年間上限警告】残り: {remaining:,}冁E(使用釁E {annual_usage:,}冁E")
-        
+            self.discord.warning(f"【NISA年間上限警告】残り: {remaining:,}円 (使用額: {annual_usage:,}円)")
+            
         elif lifetime_usage >= self.lifetime_limit * 0.8:
             remaining = self.lifetime_limit - lifetime_usage
-            self.discord.warning(f"【NISA生涯上限警告】残り: {remaining:,}冁E(使用釁E {lifetime_usage:,}冁E")
+            self.discord.warning(f"【NISA生涯上限警告】残り: {remaining:,}円 (使用額: {lifetime_usage:,}円)")
     
     def _create_stop_flag(self, reason: str):
-        """停止フラグを作E"""
+        """停止フラグを作成"""
         try:
+            annual_usage, lifetime_usage = self.get_current_usage()
             stop_data = {
                 "reason": reason,
                 "timestamp": datetime.now().isoformat(),
-                "annual_usage": self.usage_data["annual_usage"].get(str(self.current_year), 0),
-                "lifetime_usage": self.usage_data["lifetime_usage"]
+                "annual_usage": annual_usage,
+                "lifetime_usage": lifetime_usage
             }
             
-            with open("STOP.flag", "w", encoding="utf-8") as f:
+            with open(self.stop_flag_file, "w", encoding="utf-8") as f:
                 json.dump(stop_data, f, ensure_ascii=False, indent=2)
             
-            print(f"停止フラグを作Eしました: {reason}")
+            print(f"停止フラグを作成しました: {reason}")
             
         except Exception as e:
-            print(f"停止フラグ作Eエラー: {e}")
+            print(f"停止フラグ作成エラー: {e}")
     
     def check_stop_flag(self) -> bool:
-        """停止フラグの存在をチェチE"""
-        return os.path.exists("STOP.flag")
+        """停止フラグの存在をチェック"""
+        return os.path.exists(self.stop_flag_file)
     
     def remove_stop_flag(self):
         """停止フラグを削除"""
         try:
-            if os.path.exists("STOP.flag"):
-                os.remove("STOP.flag")
+            if os.path.exists(self.stop_flag_file):
+                os.remove(self.stop_flag_file)
                 print("停止フラグを削除しました")
         except Exception as e:
             print(f"停止フラグ削除エラー: {e}")
     
     def can_invest(self, amount: int) -> Tuple[bool, str]:
-        """持E額E投賁E可能かチェチE"""
+        """指定金額の投資が可能かチェック"""
         if not self.monitoring_enabled:
             return True, "監視無効"
         
         annual_usage, lifetime_usage = self.get_current_usage()
         
-        # 年間上限チェチE
+        # 年間上限チェック
         if annual_usage + amount > self.annual_limit:
             remaining = self.annual_limit - annual_usage
-            return False, f"年間上限趁E (残り: {remaining:,}冁E"
+            return False, f"年間上限超過 (残り: {remaining:,}円)"
         
-        # 生涯上限チェチE
+        # 生涯上限チェック
         if lifetime_usage + amount > self.lifetime_limit:
             remaining = self.lifetime_limit - lifetime_usage
-            return False, f"生涯上限趁E (残り: {remaining:,}冁E"
+            return False, f"生涯上限超過 (残り: {remaining:,}円)"
         
-        return True, "投賁E能"
+        return True, "投資可能"
     
     def get_remaining_limits(self) -> Tuple[int, int]:
-        """残り使用可能額を取得（年間、生涯EE""
+        """残り使用可能額を取得（年間、生涯）"""
         annual_usage, lifetime_usage = self.get_current_usage()
         
         annual_remaining = max(0, self.annual_limit - annual_usage)
@@ -176,33 +171,28 @@ class NISAMonitor:
         return annual_remaining, lifetime_remaining
     
     def send_usage_report(self):
-        """使用状況レポEトをDiscordに送信"""
+        """使用状況レポートをDiscordに送信"""
         try:
             annual_usage, lifetime_usage = self.get_current_usage()
             annual_remaining, lifetime_remaining = self.get_remaining_limits()
             
             fields = [
-                {"name": "年間使用釁E, "value": f"{annual_usage:,}冁E, "inline": True},
-                {"name": "年間残り", "value": f"{annual_remaining:,}冁E, "inline": True},
-                {"name": "生涯使用釁E, "value": f"{lifetime_usage:,}冁E, "inline": True},
-                {"name": "生涯残り", "value": f"{lifetime_remaining:,}冁E, "inline": True},
-                {"name": "年間使用玁E, "value": f"{(annual_usage/self.annual_limit)*100:.1f}%", "inline": True},
-                {"name": "生涯使用玁E, "value": f"{(lifetime_usage/self.lifetime_limit)*100:.1f}%", "inline": True}
+                {"name": "年間使用額", "value": f"{annual_usage:,}円", "inline": True},
+                {"name": "年間残り", "value": f"{annual_remaining:,}円", "inline": True},
+                {"name": "生涯使用額", "value": f"{lifetime_usage:,}円", "inline": True},
+                {"name": "生涯残り", "value": f"{lifetime_remaining:,}円", "inline": True},
+                {"name": "年間使用率", "value": f"{(annual_usage/self.annual_limit)*100:.1f}%", "inline": True},
+                {"name": "生涯使用率", "value": f"{(lifetime_usage/self.lifetime_limit)*100:.1f}%", "inline": True}
             ]
             
-            self.discord.info("NISA使用状況レポEチE, fields)
+            self.discord.info("NISA使用状況レポート", fields)
             
         except Exception as e:
-            print(f"レポEト送信エラー: {e}")
+            print(f"レポート送信エラー: {e}")
     
     def reset_annual_usage(self):
-        """年間使用量をリセチEE新年用EE""
+        """年間使用量をリセット（新年用、互換のため残す：年の切り替えは自動で行われる）"""
         try:
-            new_year = date.today().year
-            if new_year != self.current_year:
-                self.usage_data["annual_usage"][str(new_year)] = 0
-                self.current_year = new_year
-                self._save_usage_data()
-                self.discord.info(f"NISA年間使用量をリセチEしました ({new_year}年)")
+            self._check_year_rollover()
         except Exception as e:
-            print(f"年間使用量リセチEエラー: {e}")
+            print(f"年間使用量リセットエラー: {e}")
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+建玉ジャーナルモジュール
+
+レンジBotの建玉を追記専用のJSON Linesファイルに記録し、再起動時に再構築する。
+- 書き込みはOSへのflushまでを同期で行い、fsyncはバックグラウンドでまとめて実行
+- 末尾の書きかけ行（クラッシュ時）は読み飛ばし、追記の前に切り詰める
+- 記録が増えたら現在の建玉だけを書いたファイルに原子的に置き換える
+- IBの実ポジションとの照合で数量のずれを補正する
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class PositionJournal:
+    def __init__(self, path: str = "journal/range_positions.jsonl", fsync_interval: float = 0.5,
+                 compact_threshold: int = 1000):
+        """ジャーナルの初期化"""
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+        self.positions = {}
+        self.records = 0
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._dirty = False
+        self._closed = threading.Event()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.replay()
+        if os.path.exists(self.path):
+            self._truncate_torn_tail()
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._sync_thread = threading.Thread(target=self._sync_loop, name="position-journal-sync", daemon=True)
+        self._sync_thread.start()
+    
+    def replay(self) -> Dict[str, Dict]:
+        """ジャーナルを先頭から適用して建玉を再構築"""
+        self.positions, self.records, self.seq = _replay_file(self.path)
+        return self.positions
+    
+    def _truncate_torn_tail(self):
+        """クラッシュで途中まで書かれた最終行を取り除く（追記が断片に繋がって次の起動で読めなくなるため）"""
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if not data or data.endswith(b"\n"):
+                return
+            end = data.rfind(b"\n") + 1
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+            print(f"建玉ジャーナルの不完全な末尾行を削除しました ({len(data) - end}バイト)")
+    
+    def _append(self, record: Dict):
+        """レコードを追記（fsyncはバックグラウンドでまとめて行う）"""
+        with self._lock:
+            self.seq += 1
+            record = dict(record, seq=self.seq, ts=time.time())
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._file.flush()
+            _apply(self.positions, record)
+            self.records += 1
+            self._dirty = True
+            # 建玉数に比べて記録が十分多いときだけ圧縮
+            needs_compaction = self.records >= max(self.compact_threshold, 2 * len(self.positions))
+        
+        if needs_compaction:
+            self.compact()
+    
+    def record_open(self, symbol, price, quantity, order_id=None, purchase_time=None):
+        """新規建玉を記録"""
+        self._append({
+            "op": "open",
+            "symbol": str(symbol),
+            "price": float(price),
+            "quantity": int(quantity),
+            "order_id": order_id,
+            "purchase_time": str(purchase_time) if purchase_time is not None else None
+        })
+    
+    def record_close(self, symbol, price=None, order_id=None, reason=""):
+        """建玉の決済を記録"""
+        self._append({
+            "op": "close",
+            "symbol": str(symbol),
+            "price": float(price) if price is not None else None,
+            "order_id": order_id,
+            "reason": reason
+        })
+    
+    def get_positions(self) -> Dict[str, Dict]:
+        """現在の建玉（コピー）"""
+        with self._lock:
+            return {symbol: dict(position) for symbol, position in self.positions.items()}
+    
+    def reconcile(self, ib_positions: Dict[str, float]) -> Dict[str, Dict]:
+        """IBの実ポジションと照合し、ジャーナル側の建玉を補正
+
+        ジャーナルにある銘柄のみ対象とする（IB側にしかない銘柄は他戦略の保有の可能性があるため報告のみ）。
+        """
+        report = {"closed": {}, "adjusted": {}, "untracked": {}}
+        ib_positions = {str(symbol): quantity for symbol, quantity in ib_positions.items()}
+        
+        for symbol, position in self.get_positions().items():
+            ib_quantity = int(ib_positions.get(symbol, 0))
+            if ib_quantity <= 0:
+                self.record_close(symbol, reason="reconcile: IBにポジションなし")
+                report["closed"][symbol] = position["quantity"]
+            elif ib_quantity != position["quantity"]:
+                self._append(dict(position, op="adjust", symbol=symbol, quantity=ib_quantity,
+                                  reason="reconcile: 数量補正"))
+                report["adjusted"][symbol] = (position["quantity"], ib_quantity)
+        
+        for symbol, quantity in ib_positions.items():
+            if quantity and symbol not in self.positions:
+                report["untracked"][symbol] = quantity
+        return report
+    
+    def compact(self):
+        """現在の建玉だけを書いたファイルに原子的に置き換える"""
+        with self._sync_lock, self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for symbol, position in self.positions.items():
+                    record = dict(position, op="open", symbol=symbol, seq=self.seq, ts=time.time())
+                    f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._fsync_directory()
+            self._file = open(self.path, "a", encoding="utf-8")
+            self.records = len(self.positions)
+            self._dirty = False
+    
+    def sync(self):
+        """未同期の書き込みをディスクに反映（fsync中も追記は止めない）"""
+        with self._sync_lock:
+            with self._lock:
+                if not self._dirty or self._file.closed:
+                    return
+                fd = self._file.fileno()
+                self._dirty = False
+            os.fsync(fd)
+    
+    def _sync_loop(self):
+        """一定間隔でまとめてfsync"""
+        while not self._closed.wait(self.fsync_interval):
+            try:
+                self.sync()
+            except (OSError, ValueError) as e:
+                print(f"建玉ジャーナル同期エラー: {e}")
+    
+    def _fsync_directory(self):
+        """リネームをディスクに反映（対応していないOSでは何もしない）"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+    
+    def close(self):
+        """同期してファイルを閉じる"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._sync_thread.join(timeout=self.fsync_interval + 1)
+        self.sync()
+        with self._sync_lock, self._lock:
+            self._file.close()
+
+
+def _apply(positions: Dict, record: Dict):
+    """1レコードを建玉に適用"""
+    symbol = record["symbol"]
+    if record["op"] in ("open", "adjust"):
+        positions[symbol] = {
+            "price": record["price"],
+            "quantity": record["quantity"],
+            "order_id": record.get("order_id"),
+            "purchase_time": record.get("purchase_time")
+        }
+    elif record["op"] == "close":
+        positions.pop(symbol, None)
+
+
+def _replay_file(path: str) -> Tuple[Dict[str, Dict], int, int]:
+    """ジャーナルファイルを読み、(建玉, レコード数, 最終seq) を返す"""
+    positions = {}
+    records = 0
+    seq = 0
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # クラッシュで途中まで書かれた行
+                    continue
+                _apply(positions, record)
+                seq = max(seq, record.get("seq", 0))
+                records += 1
+    return positions, records, seq
+
+
+def read_positions(path: Optional[str] = None) -> Dict[str, Dict]:
+    """追記用に開かずに現在の建玉だけを読む（他プロセスのジャーナル参照用）"""
+    return _replay_file(path or "journal/range_positions.jsonl")[0]
+
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def get_position_journal(path: Optional[str] = None, **kwargs) -> PositionJournal:
+    """パスごとに1つのジャーナルを取得（同じファイルを複数のハンドルで追記しないため）"""
+    path = path or "journal/range_positions.jsonl"
+    with _journals_lock:
+        journal = _journals.get(path)
+        if journal is None or journal._closed.is_set():
+            journal = _journals[path] = PositionJournal(path, **kwargs)
+        return journal
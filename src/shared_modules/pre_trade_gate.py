@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+発注前リスクゲートモジュール
+
+すべての発注経路（各Bot・リバランスのバスケット・ゲートウェイ経由の注文）で
+place_order の直前に以下をメモリ上でチェックする。
+- キルスイッチ（STOP.flag または trip() による即時停止）
+- NISA年間・生涯枠の残り（確定済み＋他ジョブの予約中の金額を含めて判定）
+- 戦略ごとの最大保有銘柄数
+- 銘柄ごとの最大投資額（全戦略の合計）
+
+チェックはロック1回の予約（reserve）で行い、発注後に確定（commit）、
+発注に失敗した場合は解放（release）する。同時に走るジョブが合わせて枠を超えることはない。
+確定した買い注文がIBで拒否・取消された場合は reverse() で未約定分を取り消す（NISA台帳には負の取引を記録）。
+"""
+
+import itertools
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+
+class PreTradeRejected(Exception):
+    """発注前チェックで注文が拒否された"""
+
+
+class Reservation:
+    """発注前チェックを通過した注文の予約（with文で使うと、確定しなかった予約は自動で解放）"""
+    
+    __slots__ = ("gate", "token", "strategy", "symbol", "side", "amount", "nisa", "state")
+    
+    def __init__(self, gate, token, strategy, symbol, side, amount, nisa):
+        self.gate = gate
+        self.token = token
+        self.strategy = strategy
+        self.symbol = symbol
+        self.side = side
+        self.amount = amount
+        self.nisa = nisa
+        self.state = "pending"
+    
+    def commit(self, order_id=None):
+        """発注済みとして確定"""
+        self.gate._commit(self, order_id)
+    
+    def release(self):
+        """発注しなかったので予約を解放"""
+        self.gate._release(self)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self.state == "pending":
+            self.release()
+        return False
+
+
+class PreTradeGate:
+    def __init__(self, nisa_monitor=None, max_holdings: Optional[Dict[str, int]] = None,
+                 max_symbol_exposure: Optional[float] = None, stop_flag_file: str = "STOP.flag",
+                 kill_switch_poll: float = 1.0):
+        """ゲートの初期化"""
+        self.nisa_monitor = nisa_monitor
+        self.max_holdings = dict(max_holdings or {})
+        self.max_symbol_exposure = max_symbol_exposure
+        self.stop_flag_file = stop_flag_file
+        self.kill_switch_poll = kill_switch_poll
+        
+        # 確定済みの保有（戦略 -> 銘柄 -> 投資額）と予約中の注文
+        self.holdings = {}
+        self.pending = {}
+        # 確定済みで約定・取消を待っている買い注文（注文ID -> (予約, 確定日時)）
+        self.open_orders = {}
+        self._tokens = itertools.count(1)
+        self._lock = threading.Lock()
+        
+        # キルスイッチ（STOP.flag の確認は kill_switch_poll 秒に1回だけ）
+        self.tripped_reason = None
+        self._stop_flag_present = False
+        self._stop_flag_checked_at = float("-inf")
+        
+        self.checks = 0
+        self.rejections = 0
+    
+    def seed_holdings(self, strategy: str, exposures: Dict[str, float]):
+        """起動時に既存の保有を登録（銘柄 -> 投資額）"""
+        with self._lock:
+            self.holdings[strategy] = {str(symbol): float(amount) for symbol, amount in exposures.items()}
+    
+    def trip(self, reason: str):
+        """キルスイッチを作動（以降の注文はすべて拒否）"""
+        self.tripped_reason = reason
+    
+    def reset(self):
+        """キルスイッチを解除"""
+        self.tripped_reason = None
+        self._stop_flag_checked_at = float("-inf")
+    
+    def kill_switch_reason(self) -> Optional[str]:
+        """キルスイッチが作動していればその理由"""
+        if self.tripped_reason:
+            return self.tripped_reason
+        now = time.monotonic()
+        if now - self._stop_flag_checked_at >= self.kill_switch_poll:
+            self._stop_flag_present = os.path.exists(self.stop_flag_file)
+            self._stop_flag_checked_at = now
+        return f"{self.stop_flag_file}が存在します" if self._stop_flag_present else None
+    
+    def check_kill_switch(self):
+        """キルスイッチ作動中なら拒否（戦略・金額が分からない注文にも必ず行う）"""
+        reason = self.kill_switch_reason()
+        if reason:
+            self.rejections += 1
+            raise PreTradeRejected(f"キルスイッチ作動中: {reason}")
+    
+    def reserve(self, strategy: str, symbol, amount: float, side: str = "BUY", nisa: bool = False) -> Reservation:
+        """チェックを行い、通過した注文の枠を予約（拒否時は PreTradeRejected）"""
+        symbol = str(symbol)
+        amount = float(amount or 0)
+        self.checks += 1
+        self.check_kill_switch()
+        
+        with self._lock:
+            # NISA枠の使用額は台帳の集計値（確定直後の注文も含めるためロック内で読む）
+            nisa_usage = None
+            if side == "BUY" and nisa and self._nisa_enabled():
+                ledger = self.nisa_monitor.ledger
+                nisa_usage = (ledger.annual_usage(), ledger.lifetime_usage())
+            
+            if side == "BUY":
+                reason = self._check_buy(strategy, symbol, amount, nisa_usage)
+                if reason:
+                    self.rejections += 1
+                    raise PreTradeRejected(f"{strategy} {symbol} {amount:,.0f}円: {reason}")
+            
+            reservation = Reservation(self, next(self._tokens), strategy, symbol, side, amount,
+                                      nisa_usage is not None)
+            self.pending[reservation.token] = reservation
+            return reservation
+    
+    def _nisa_enabled(self) -> bool:
+        return self.nisa_monitor is not None and self.nisa_monitor.monitoring_enabled
+    
+    def _check_buy(self, strategy, symbol, amount, nisa_usage) -> Optional[str]:
+        """買い注文のチェック（ロック内で呼ぶ。問題なければNone）"""
+        if nisa_usage is not None:
+            reserved = sum(r.amount for r in self.pending.values() if r.nisa)
+            annual_usage, lifetime_usage = nisa_usage
+            annual_remaining = self.nisa_monitor.annual_limit - annual_usage - reserved
+            if amount > annual_remaining:
+                return f"NISA年間枠超過 (残り: {max(0, annual_remaining):,.0f}円)"
+            lifetime_remaining = self.nisa_monitor.lifetime_limit - lifetime_usage - reserved
+            if amount > lifetime_remaining:
+                return f"NISA生涯枠超過 (残り: {max(0, lifetime_remaining):,.0f}円)"
+        
+        max_holdings = self.max_holdings.get(strategy)
+        if max_holdings is not None:
+            symbols = set(self.holdings.get(strategy, ()))
+            if symbol not in symbols:
+                symbols.update(r.symbol for r in self.pending.values() if r.strategy == strategy and r.side == "BUY")
+                if symbol not in symbols and len(symbols) >= max_holdings:
+                    return f"保有銘柄数上限 ({max_holdings}銘柄)"
+        
+        if self.max_symbol_exposure is not None:
+            exposure = sum(held.get(symbol, 0) for held in self.holdings.values())
+            exposure += sum(r.amount for r in self.pending.values() if r.symbol == symbol and r.side == "BUY")
+            if exposure + amount > self.max_symbol_exposure:
+                return f"銘柄ごとの投資上限超過 (現在: {exposure:,.0f}円 / 上限: {self.max_symbol_exposure:,.0f}円)"
+        return None
+    
+    def _commit(self, reservation: Reservation, order_id):
+        """予約を確定（NISA枠は台帳に記録してから予約を外す）"""
+        if reservation.state != "pending":
+            return
+        if reservation.nisa:
+            # 台帳への追記（fsync）はロックの外で行う。記録～予約解除の間は二重に数えるが安全側
+            self.nisa_monitor.update_usage(int(reservation.amount), order_id=order_id, symbol=reservation.symbol)
+        
+        with self._lock:
+            self.pending.pop(reservation.token, None)
+            held = self.holdings.setdefault(reservation.strategy, {})
+            if reservation.side == "BUY":
+                held[reservation.symbol] = held.get(reservation.symbol, 0) + reservation.amount
+                if order_id is not None:
+                    self.open_orders[order_id] = (reservation, datetime.now())
+            else:
+                held.pop(reservation.symbol, None)
+            reservation.state = "committed"
+    
+    def settle(self, order_id):
+        """約定した注文を取り消しの対象から外す"""
+        with self._lock:
+            self.open_orders.pop(order_id, None)
+    
+    def reverse(self, order_id, reason: str, unfilled_ratio: float = 1.0) -> bool:
+        """IBで拒否・取消された買い注文の確定を取り消す（未約定分の投資額・NISA枠を戻す。戻り値は取り消したか）"""
+        with self._lock:
+            entry = self.open_orders.pop(order_id, None)
+            if entry is None:
+                return False
+            reservation, committed_at = entry
+            amount = reservation.amount * min(max(unfilled_ratio, 0.0), 1.0)
+            held = self.holdings.get(reservation.strategy, {})
+            remaining = held.get(reservation.symbol, 0) - amount
+            if remaining > 0.5:
+                held[reservation.symbol] = remaining
+            else:
+                held.pop(reservation.symbol, None)
+            reservation.state = "reversed"
+        if reservation.nisa and int(amount) > 0:
+            # 発注した年の枠に戻すため、確定日時で記録する
+            self.nisa_monitor.reverse_usage(int(amount), order_id=order_id, symbol=reservation.symbol,
+                                            reason=reason, timestamp=committed_at)
+        return True
+    
+    def _release(self, reservation: Reservation):
+        """予約を解放"""
+        with self._lock:
+            self.pending.pop(reservation.token, None)
+            if reservation.state == "pending":
+                reservation.state = "released"
+    
+    def get_status(self) -> Dict:
+        """ゲートの状態（レポート用）"""
+        with self._lock:
+            return {
+                "kill_switch": self.kill_switch_reason(),
+                "pending": len(self.pending),
+                "holdings": {strategy: len(held) for strategy, held in self.holdings.items()},
+                "checks": self.checks,
+                "rejections": self.rejections
+            }
+
+
+def apply_gate_config(gate: PreTradeGate, config):
+    """設定の上限値をゲートに反映（設定の再読み込み時にも呼ばれる）"""
+    settings = config.settings
+    max_holdings = {
+        "dividend": settings.dividend_bot.max_holding_stocks,
+        "range": settings.pre_trade.max_range_positions
+    }
+    with gate._lock:
+        gate.max_holdings = max_holdings
+        gate.max_symbol_exposure = settings.pre_trade.max_symbol_exposure
+        gate.kill_switch_poll = settings.pre_trade.kill_switch_poll_seconds
+
+
+def build_pre_trade_gate(config, nisa_monitor=None, state_store=None) -> PreTradeGate:
+    """設定からゲートを作成し、保存済みの保有を登録"""
+    from src.shared_modules.position_journal import read_positions
+    
+    gate = PreTradeGate(
+        nisa_monitor=nisa_monitor,
+        stop_flag_file=config.settings.pre_trade.stop_flag_file
+    )
+    apply_gate_config(gate, config)
+    
+    if state_store is not None:
+        exposures = {}
+        for holding in state_store.get_holdings("dividend"):
+            exposures[holding["symbol"]] = exposures.get(holding["symbol"], 0) + (holding["amount"] or 0)
+        gate.seed_holdings("dividend", exposures)
+    
+    positions = read_positions(config.settings.range_bot.journal_path)
+    gate.seed_holdings("range", {
+        symbol: position["price"] * position["quantity"] for symbol, position in positions.items()
+    })
+    return gate
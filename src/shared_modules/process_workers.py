@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+プロセス分離ワーカーモジュール
+
+execution.mode が "process" の場合、各Botを専用のワーカープロセスで実行する。
+- 注文はIBゲートウェイプロセス（IB接続を1本だけ保持）へローカルIPCで送る
+- 株価・ポートフォリオなどの共有状態はマネージャープロセスが保持する
+- MainController は監督役としてジョブをワーカーへ送り、応答が無いワーカーは再起動する
+"""
+
+import errno
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from multiprocessing.managers import BaseManager
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from src.shared_modules.tracing import get_tracer, open_tracer
+
+STRATEGIES = ("index", "dividend", "range")
+# 受け付けが続けて失敗したときの再試行間隔（秒、失敗のたびに倍にして上限まで）
+ACCEPT_RETRY_SECONDS = 0.1
+ACCEPT_RETRY_MAX_SECONDS = 5.0
+
+
+def build_bot(strategy, config, discord, ib_connector, metrics=None, quote_book=None):
+    """戦略名からBotを生成（Botモジュールは必要になった時点で読み込む）"""
+    if strategy == "index":
+        from src.bots.core_index_bot import CoreIndexBot
+        return CoreIndexBot(config, discord, ib_connector)
+    if strategy == "dividend":
+        from src.bots.satellite_dividend_bot import SatelliteDividendBot
+        return SatelliteDividendBot(config, discord, ib_connector, metrics=metrics, quote_book=quote_book)
+    if strategy == "range":
+        from src.bots.satellite_range_bot import SatelliteRangeBot
+        return SatelliteRangeBot(config, discord, ib_connector, metrics=metrics, quote_book=quote_book)
+    raise ValueError(f"未知の戦略です: {strategy}")
+
+
+class SharedState:
+    """プロセス間で共有する株価・ポートフォリオ状態（マネージャープロセス内に1つだけ存在）"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._quotes = {}
+        self._portfolio = {}
+        self._workers = {}
+    
+    def set_quote(self, symbol, price, timestamp=None):
+        """株価を登録"""
+        with self._lock:
+            self._quotes[str(symbol)] = (float(price), timestamp or time.time())
+    
+    def get_quote(self, symbol, max_age=None):
+        """株価を取得（max_age秒より古い場合はNone）"""
+        with self._lock:
+            quote = self._quotes.get(str(symbol))
+        if quote is None:
+            return None
+        price, timestamp = quote
+        if max_age is not None and time.time() - timestamp > max_age:
+            return None
+        return price
+    
+    def get_quotes(self) -> Dict:
+        """全銘柄の株価を取得"""
+        with self._lock:
+            return dict(self._quotes)
+    
+    def update_portfolio(self, strategy, value):
+        """戦略ごとの評価額を更新"""
+        with self._lock:
+            self._portfolio[strategy] = float(value)
+    
+    def get_portfolio(self) -> Dict:
+        """戦略ごとの評価額を取得"""
+        with self._lock:
+            return dict(self._portfolio)
+    
+    def set_worker_status(self, strategy, status):
+        """ワーカーの状態を更新"""
+        with self._lock:
+            self._workers[strategy] = dict(status, updated_at=time.time())
+    
+    def get_worker_status(self) -> Dict:
+        """全ワーカーの状態を取得"""
+        with self._lock:
+            return {k: dict(v) for k, v in self._workers.items()}
+
+
+_shared_state = None
+
+
+def _get_shared_state():
+    """マネージャープロセス内の共有状態を取得"""
+    global _shared_state
+    if _shared_state is None:
+        _shared_state = SharedState()
+    return _shared_state
+
+
+class StateManager(BaseManager):
+    """共有状態を提供するマネージャー（ダッシュボードなど別プロセスからも接続可能）"""
+
+
+StateManager.register("shared_state", callable=_get_shared_state)
+
+
+def connect_shared_state(address, authkey):
+    """起動済みのマネージャーに接続して共有状態のプロキシを取得"""
+    manager = StateManager(address=address, authkey=authkey)
+    manager.connect()
+    return manager.shared_state()
+
+
+class QuoteBook:
+    """共有状態の株価を一定時間だけ再利用するためのラッパー"""
+    
+    def __init__(self, shared_state, max_age: float = 30):
+        self.shared_state = shared_state
+        self.max_age = max_age
+    
+    def get(self, symbol) -> Optional[float]:
+        """鮮度内の株価を取得（無ければNone）"""
+        try:
+            return self.shared_state.get_quote(symbol, self.max_age)
+        except Exception:
+            return None
+    
+    def put(self, symbol, price):
+        """取得した株価を共有"""
+        try:
+            self.shared_state.set_quote(symbol, price)
+        except Exception:
+            pass
+
+
+class GatewayServer:
+    """IB接続を1本だけ保持し、各プロセスからの注文をローカルIPCで受け付ける"""
+    
+    def __init__(self, ib_connector, address=("127.0.0.1", 0), authkey=None):
+        self.ib_connector = ib_connector
+        self.authkey = authkey
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        self.order_lock = threading.Lock()
+        self.running = False
+    
+    def serve_forever(self):
+        """接続を受け付け、接続ごとにスレッドで処理"""
+        self.running = True
+        retry = ACCEPT_RETRY_SECONDS
+        try:
+            while self.running:
+                try:
+                    conn = self.listener.accept()
+                except (EOFError, AuthenticationError, ConnectionError) as e:
+                    # 認証に失敗した・途中で切れた1つの接続では受け付けを止めない（止めると以降の注文がすべて失敗する）
+                    if self.running:
+                        print(f"ゲートウェイ接続の受け付けエラー: {e}")
+                    continue
+                except OSError as e:
+                    if not self.running:
+                        break
+                    if e.errno in (None, errno.EBADF, errno.EINVAL):
+                        # 待ち受けが閉じられていて再試行しても受け付けられない
+                        print(f"ゲートウェイの待ち受けを終了します: {e}")
+                        break
+                    # ファイル記述子の枯渇などは続けて起きるので、間隔を空けて再試行する（空回りさせない）
+                    print(f"ゲートウェイ接続の受け付けエラー（{retry:.1f}秒後に再試行）: {e}")
+                    time.sleep(retry)
+                    retry = min(retry * 2, ACCEPT_RETRY_MAX_SECONDS)
+                    continue
+                retry = ACCEPT_RETRY_SECONDS
+                if not self.running:
+                    conn.close()
+                    break
+                threading.Thread(target=self.handle_connection, args=(conn,), daemon=True).start()
+        finally:
+            self.listener.close()
+    
+    def shutdown(self):
+        """受け付けを停止（accept待ちを解除するため自分自身に接続する）"""
+        self.running = False
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except OSError:
+            pass
+    
+    def handle_connection(self, conn):
+        """1接続分のリクエストを処理"""
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                
+                command = request[0]
+                try:
+                    if command == "shutdown":
+                        conn.send(("ok", None))
+                        self.shutdown()
+                        return
+                    conn.send(("ok", self.dispatch(command, *request[1:])))
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+    
+    def dispatch(self, command, *args):
+        """コマンドを実行"""
+        if command == "ping":
+            return bool(self.ib_connector.connected)
+        if command == "place_order":
+            contract_spec, order_spec, intent = args
+            intent = dict(intent)
+            # Botワーカーのトレースの続きとして記録
+            with get_tracer().resume(intent.pop("trace", None)), self.order_lock:
+                return self.ib_connector.place_order(
+                    self.build_contract(contract_spec), self.build_order(order_spec), **intent
+                )
+        if command == "get_account_summary":
+            return self.ib_connector.get_account_summary(*args)
+        if command == "wait_for_order_acks":
+            return self.ib_connector.wait_for_order_acks(*args)
+        if command == "request_positions":
+            return self.ib_connector.request_positions(*args)
+        raise ValueError(f"未知のコマンドです: {command}")
+    
+    def build_contract(self, spec):
+        """契約仕様からIBの契約を作成"""
+        spec = dict(spec)
+        contract = self.ib_connector.create_stock_contract(spec.pop("symbol"), spec.pop("exchange", "TSE"))
+        for key, value in spec.items():
+            setattr(contract, key, value)
+        return contract
+    
+    def build_order(self, spec):
+        """注文仕様からIBの注文を作成"""
+        spec = dict(spec)
+        action = spec.pop("action")
+        quantity = spec.pop("totalQuantity")
+        if spec.get("orderType") == "LMT":
+            order = self.ib_connector.create_limit_order(action, quantity, spec.pop("lmtPrice"))
+        else:
+            order = self.ib_connector.create_market_order(action, quantity)
+        for key, value in spec.items():
+            setattr(order, key, value)
+        return order
+
+
+class GatewayClient:
+    """IBConnectorと同じインターフェースで、注文をゲートウェイプロセスへ転送する"""
+    
+    def __init__(self, address, authkey=None):
+        self.address = address
+        self.authkey = authkey
+        self._conn = None
+        self._lock = threading.Lock()
+    
+    @property
+    def connected(self):
+        try:
+            return bool(self._request("ping"))
+        except Exception:
+            return False
+    
+    def _request(self, command, *args):
+        """ゲートウェイにリクエストを送り、応答を待つ"""
+        with self._lock:
+            if self._conn is None:
+                self._conn = Client(self.address, authkey=self.authkey)
+            try:
+                self._conn.send((command,) + args)
+                status, result = self._conn.recv()
+            except (EOFError, OSError):
+                self._conn = None
+                raise
+        if status == "error":
+            raise Exception(result)
+        return result
+    
+    def connect_to_ib(self, host=None, port=None, client_id=None):
+        """ゲートウェイ経由のIB接続状態を確認（IB接続自体はゲートウェイが保持）"""
+        return self.connected
+    
+    def disconnect_from_ib(self):
+        """ゲートウェイとの接続を閉じる"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def place_order(self, contract, order, strategy=None, amount=None, nisa=False):
+        """注文をゲートウェイに送信（発注前チェックはゲートウェイ側で行う）"""
+        tracer = get_tracer()
+        with tracer.span("gateway.place_order"):
+            intent = {"strategy": strategy, "amount": amount, "nisa": nisa, "trace": tracer.context()}
+            return self._request("place_order", vars(contract), vars(order), intent)
+    
+    def get_account_summary(self, account_id):
+        """口座サマリーを要求"""
+        return self._request("get_account_summary", account_id)
+    
+    def request_positions(self, account_id=None, timeout=10):
+        """ゲートウェイ経由で保有ポジションを取得"""
+        return self._request("request_positions", account_id, timeout)
+    
+    def wait_for_order_acks(self, timeout=10):
+        """ゲートウェイで未確認の注文がなくなるまで待つ"""
+        return self._request("wait_for_order_acks", timeout)
+    
+    def create_stock_contract(self, symbol, exchange="TSE"):
+        """株式契約の仕様を作成"""
+        return SimpleNamespace(symbol=symbol, secType="STK", exchange=exchange, currency="JPY")
+    
+    def create_market_order(self, action, quantity):
+        """成行注文の仕様を作成"""
+        return SimpleNamespace(action=action, orderType="MKT", totalQuantity=quantity)
+    
+    def create_limit_order(self, action, quantity, limit_price):
+        """指値注文の仕様を作成"""
+        return SimpleNamespace(action=action, orderType="LMT", totalQuantity=quantity, lmtPrice=limit_price)
+
+
+def watch_config(config):
+    """設定で有効なら config.yaml・.env の監視を開始（各プロセスが自分の設定を再読み込み）"""
+    reload_settings = config.settings.config_reload
+    if reload_settings.enabled:
+        config.start_watching(reload_settings.interval_seconds)
+
+
+def run_gateway(ready_conn, authkey, ib_config):
+    """ゲートウェイプロセスのエントリーポイント"""
+    from src.shared_modules.config_loader import ConfigLoader
+    from src.shared_modules.discord_logger import DiscordLogger
+    from src.shared_modules.event_journal import open_event_journal
+    from src.shared_modules.ib_connector import IBConnector
+    from src.shared_modules.nisa_monitor import NISAMonitor
+    from src.shared_modules.pre_trade_gate import apply_gate_config, build_pre_trade_gate
+    from src.shared_modules.state_store import get_state_store
+    
+    # 全プロセスの注文が通るゲートウェイで発注前チェックを行う（NISA台帳への記録もここだけ）
+    config = ConfigLoader()
+    open_tracer(config, "gateway")
+    ib_connector = IBConnector()
+    ib_connector.event_journal = open_event_journal(config, "gateway")
+    nisa_monitor = NISAMonitor(config, DiscordLogger(config.settings.discord_webhook_url), ib_connector)
+    ib_connector.pre_trade_gate = build_pre_trade_gate(
+        config, nisa_monitor, get_state_store(config.settings.state_store.path)
+    )
+    
+    def on_config_reload(changed):
+        nisa_monitor.apply_config()
+        apply_gate_config(ib_connector.pre_trade_gate, config)
+    
+    config.add_reload_listener(on_config_reload)
+    watch_config(config)
+    connected = ib_connector.connect_to_ib(ib_config.host, ib_config.port, ib_config.client_id)
+    server = GatewayServer(ib_connector, authkey=authkey)
+    ready_conn.send((connected, server.address))
+    ready_conn.close()
+    
+    try:
+        server.serve_forever()
+    finally:
+        ib_connector.disconnect_from_ib()
+        ib_connector.event_journal.close()
+        get_tracer().close()
+
+
+def run_bot_worker(strategy, conn, gateway_address, state_address, authkey, quote_max_age):
+    """Botワーカープロセスのエントリーポイント"""
+    from src.shared_modules.config_loader import ConfigLoader
+    from src.shared_modules.discord_logger import DiscordLogger
+    from src.shared_modules.event_journal import open_event_journal
+    from src.shared_modules.job_metrics import get_job_metrics
+    
+    config = ConfigLoader()
+    watch_config(config)
+    tracer = open_tracer(config, f"worker-{strategy}")
+    discord = DiscordLogger(config.settings.discord_webhook_url)
+    discord.event_journal = open_event_journal(config, f"worker-{strategy}")
+    shared_state = connect_shared_state(state_address, authkey)
+    quote_book = QuoteBook(shared_state, quote_max_age)
+    
+    # ジョブ中にDiscordへ通知されたエラーは監督プロセスの計測に返す
+    handled_errors = []
+    discord.add_error_listener(handled_errors.append)
+    
+    metrics = get_job_metrics()
+    bot = build_bot(strategy, config, discord, GatewayClient(gateway_address, authkey),
+                    metrics=metrics, quote_book=quote_book)
+    
+    while True:
+        try:
+            command = conn.recv()
+        except (EOFError, OSError, KeyboardInterrupt):
+            break
+        if command[0] == "stop":
+            break
+        
+        _, method_name, args, want_result = command
+        handled_errors.clear()
+        shared_state.set_worker_status(strategy, {"pid": os.getpid(), "job": method_name, "state": "running"})
+        # データ取得レイテンシはワーカーで計測したものを応答ごとに監督プロセスへ送って合算する
+        try:
+            result = getattr(bot, method_name)(*args)
+            conn.send(("done", (list(handled_errors), result if want_result else None),
+                       metrics.take_fetch_observations()))
+        except Exception as e:
+            conn.send(("exception", f"{type(e).__name__}: {e}\n{traceback.format_exc()}",
+                       metrics.take_fetch_observations()))
+        shared_state.set_worker_status(strategy, {"pid": os.getpid(), "job": None, "state": "idle"})
+    
+    # 建玉ジャーナルなどを閉じてから終了
+    if hasattr(bot, "close"):
+        bot.close()
+    discord.event_journal.close()
+    tracer.close()
+    conn.close()
+
+
+class WorkerSupervisor:
+    """ゲートウェイ・共有状態・Botワーカーの各プロセスを起動し、ジョブを振り分ける"""
+    
+    def __init__(self, config, strategies=STRATEGIES, metrics=None):
+        self.config = config
+        self.metrics = metrics
+        self.strategies = list(strategies)
+        self.context = multiprocessing.get_context("spawn")
+        self.authkey = os.urandom(16)
+        self.job_timeout = config.settings.execution.job_timeout_seconds
+        self.quote_max_age = config.settings.execution.quote_max_age_seconds
+        
+        self.state_manager = None
+        self.shared_state = None
+        self.gateway_process = None
+        self.gateway_address = None
+        self.workers = {}
+        self.worker_locks = {strategy: threading.Lock() for strategy in self.strategies}
+        self.restarts = {strategy: 0 for strategy in self.strategies}
+    
+    def start(self) -> bool:
+        """全プロセスを起動（戻り値はゲートウェイのIB接続結果）"""
+        self.state_manager = StateManager(address=("127.0.0.1", 0), authkey=self.authkey, ctx=self.context)
+        self.state_manager.start()
+        self.shared_state = self.state_manager.shared_state()
+        
+        ready_parent, ready_child = self.context.Pipe(duplex=False)
+        self.gateway_process = self.context.Process(
+            target=run_gateway,
+            args=(ready_child, self.authkey, self.config.settings.ib_account),
+            name="chimera-ib-gateway",
+            daemon=True
+        )
+        self.gateway_process.start()
+        ready_child.close()
+        connected, self.gateway_address = ready_parent.recv()
+        ready_parent.close()
+        
+        for strategy in self.strategies:
+            self.start_worker(strategy)
+        return connected
+    
+    def start_worker(self, strategy):
+        """Botワーカーを起動"""
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=run_bot_worker,
+            args=(strategy, child_conn, self.gateway_address, self.state_manager.address,
+                  self.authkey, self.quote_max_age),
+            name=f"chimera-{strategy}-bot",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self.workers[strategy] = (process, parent_conn)
+    
+    def restart_worker(self, strategy):
+        """ワーカーを強制終了して再起動"""
+        process, conn = self.workers.pop(strategy)
+        conn.close()
+        if process.is_alive():
+            process.terminate()
+        process.join(timeout=5)
+        self.restarts[strategy] += 1
+        self.start_worker(strategy)
+    
+    def gateway_client(self) -> GatewayClient:
+        """監督プロセス用のゲートウェイクライアント"""
+        return GatewayClient(self.gateway_address, self.authkey)
+    
+    def quote_book(self) -> QuoteBook:
+        """監督プロセス用の共有株価"""
+        return QuoteBook(self.shared_state, self.quote_max_age)
+    
+    def run_job(self, strategy, method_name, *args, timeout=None) -> List[str]:
+        """ワーカーでBotのメソッドを実行し、完了を待つ（戻り値は通知済みエラー）"""
+        handled_errors, _ = self._run(strategy, method_name, args, False, timeout)
+        return handled_errors
+    
+    def call(self, strategy, method_name, *args, timeout=None):
+        """ワーカーでBotのメソッドを実行し、その戻り値を返す（株価の取得など）"""
+        _, result = self._run(strategy, method_name, args, True, timeout)
+        return result
+    
+    def _run(self, strategy, method_name, args, want_result, timeout):
+        timeout = timeout or self.job_timeout
+        with self.worker_locks[strategy]:
+            process, conn = self.workers[strategy]
+            if not process.is_alive():
+                self.restart_worker(strategy)
+                process, conn = self.workers[strategy]
+            
+            conn.send(("run", method_name, args, want_result))
+            if not conn.poll(timeout):
+                # 応答が無いワーカーは他のジョブを巻き込まないよう作り直す
+                self.restart_worker(strategy)
+                raise TimeoutError(f"{strategy} ワーカーが {timeout} 秒以内に応答しませんでした: {method_name}")
+            
+            try:
+                status, result, fetches = conn.recv()
+            except EOFError:
+                self.restart_worker(strategy)
+                raise RuntimeError(f"{strategy} ワーカーが異常終了しました: {method_name}")
+        
+        if self.metrics is not None:
+            self.metrics.merge_fetch_observations(fetches)
+        if status == "exception":
+            raise RuntimeError(result)
+        return result
+    
+    def shutdown(self, timeout: float = 10):
+        """全ワーカー・ゲートウェイ・共有状態を停止"""
+        for strategy, (process, conn) in list(self.workers.items()):
+            try:
+                conn.send(("stop",))
+            except (OSError, BrokenPipeError):
+                pass
+        
+        deadline = time.monotonic() + timeout
+        for strategy, (process, conn) in list(self.workers.items()):
+            process.join(timeout=max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+        self.workers.clear()
+        
+        if self.gateway_process is not None:
+            try:
+                self.gateway_client()._request("shutdown")
+            except Exception:
+                pass
+            self.gateway_process.join(timeout=max(deadline - time.monotonic(), 1))
+            if self.gateway_process.is_alive():
+                self.gateway_process.terminate()
+            self.gateway_process = None
+        
+        if self.state_manager is not None:
+            self.state_manager.shutdown()
+            self.state_manager = None
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+リバランス資金配分モジュール
+
+追加投資額を複数の戦略・銘柄へ「配分後の目標比率からの乖離（二乗和）が
+最小になる」ように分割し、売買単位とNISA残枠を考慮した注文バスケットを作成する。
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def allocate_cash(current_values, target_ratios, cash, caps=None) -> np.ndarray:
+    """追加資金を乖離最小となるように配分（最後の軸が戦略、前方の軸はバッチ）
+
+    min Σ (v_i + x_i - t_i * (V + C))^2  s.t.  Σ x_i = C, 0 <= x_i <= cap_i
+    の解は x_i = clip(g_i + μ, 0, cap_i) (g_i = t_i * (V + C) - v_i) となるため、
+    区分線形な Σx(μ) の折れ点を一括評価して μ を求める。
+    """
+    values = np.asarray(current_values, dtype=float)
+    ratios = np.broadcast_to(np.asarray(target_ratios, dtype=float), values.shape)
+    cash = np.asarray(cash, dtype=float)
+    if caps is None:
+        caps = np.full(values.shape, np.inf)
+    else:
+        caps = np.broadcast_to(np.asarray(caps, dtype=float), values.shape)
+    
+    ratio_sum = ratios.sum(axis=-1, keepdims=True)
+    ratios = np.divide(ratios, ratio_sum, out=np.zeros_like(ratios), where=ratio_sum > 0)
+    
+    # 上限合計を超える資金は配分できない
+    budget = np.minimum(np.maximum(cash, 0.0), caps.sum(axis=-1))
+    total = values.sum(axis=-1) + budget
+    gaps = ratios * total[..., None] - values
+    
+    # 折れ点（x_i が 0 から動き出す点と上限に達する点）
+    breakpoints = np.sort(np.concatenate([-gaps, caps - gaps], axis=-1), axis=-1)
+    filled = np.clip(gaps[..., None, :] + breakpoints[..., :, None], 0.0, caps[..., None, :]).sum(axis=-1)
+    
+    # Σx(μ) >= budget となる最初の折れ点
+    k = np.argmax(filled >= budget[..., None], axis=-1)[..., None]
+    prev = np.maximum(k - 1, 0)
+    bp_prev = np.take_along_axis(breakpoints, prev, axis=-1)[..., 0]
+    filled_prev = np.take_along_axis(filled, prev, axis=-1)[..., 0]
+    
+    # 直前の折れ点から先で増加している銘柄数が傾き
+    slope = ((-gaps <= bp_prev[..., None]) & (caps - gaps > bp_prev[..., None])).sum(axis=-1)
+    mu = np.where(
+        (k[..., 0] == 0) | (slope == 0),
+        bp_prev,
+        bp_prev + (budget - filled_prev) / np.maximum(slope, 1)
+    )
+    
+    return np.clip(gaps + mu[..., None], 0.0, caps)
+
+
+def round_to_lots(amounts, prices, lot_sizes, cash=None) -> np.ndarray:
+    """配分金額を売買単位の株数に変換（端数は残余額の大きい順に1単位ずつ補充）"""
+    amounts = np.asarray(amounts, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    lot_sizes = np.asarray(lot_sizes, dtype=float)
+    lot_cost = prices * lot_sizes
+    valid = lot_cost > 0
+    
+    lots = np.zeros_like(amounts)
+    np.floor_divide(amounts, lot_cost, out=lots, where=valid)
+    
+    # 切り捨てで余った資金で、残余額の大きい順に買える分だけ1単位ずつ追加
+    budget = amounts.sum() if cash is None else float(cash)
+    leftover = budget - (lots * lot_cost).sum()
+    remainder = np.where(valid, amounts - lots * lot_cost, -np.inf)
+    order = np.argsort(-remainder)
+    affordable = valid[order] & (remainder[order] > 0)
+    extra_cost = np.where(affordable, lot_cost[order], 0.0)
+    take = affordable & (np.cumsum(extra_cost) <= leftover + 1e-9)
+    lots[order[take]] += 1
+    
+    return (lots * lot_sizes).astype(int)
+
+
+class RebalanceAllocator:
+    def __init__(self, target_ratios: Dict[str, float], nisa_strategies: Sequence[str] = ("index", "dividend"),
+                 default_lot_size: int = 100, lot_sizes: Optional[Dict[str, int]] = None):
+        """配分エンジンの初期化"""
+        self.strategies = list(target_ratios.keys())
+        self.target_ratios = np.array([float(target_ratios[s]) for s in self.strategies])
+        self.nisa_strategies = set(nisa_strategies)
+        self.default_lot_size = default_lot_size
+        self.lot_sizes = {str(k): int(v) for k, v in (lot_sizes or {}).items()}
+    
+    def allocate(self, current_values: Dict[str, float], cash: float,
+                 caps: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """戦略ごとの追加投資額を算出"""
+        values = np.array([float(current_values.get(s, 0)) for s in self.strategies])
+        cap_array = None
+        if caps:
+            cap_array = np.array([float(caps.get(s, np.inf)) for s in self.strategies])
+        
+        amounts = allocate_cash(values, self.target_ratios, cash, cap_array)
+        return dict(zip(self.strategies, amounts.tolist()))
+    
+    def build_basket(self, strategy_amounts: Dict[str, float], sub_positions: Dict[str, List[Dict]],
+                     nisa_remaining: Optional[float] = None) -> Dict:
+        """戦略ごとの配分額を銘柄単位の注文バスケットに変換
+
+        sub_positions は戦略ごとの銘柄リストで、各要素は
+        symbol, price, current_value (任意), weight (任意), lot_size (任意) を持つ。
+        """
+        strategies = [s for s in self.strategies if sub_positions.get(s)]
+        unallocated = {s: a for s, a in strategy_amounts.items() if a > 0 and not sub_positions.get(s)}
+        if not strategies:
+            return {"orders": [], "unallocated": unallocated, "leftover_cash": 0.0}
+        
+        # 戦略 × 銘柄 の行列に詰めて、銘柄間の配分を一括で解く
+        width = max(len(sub_positions[s]) for s in strategies)
+        shape = (len(strategies), width)
+        values = np.zeros(shape)
+        weights = np.zeros(shape)
+        prices = np.zeros(shape)
+        lots = np.zeros(shape)
+        caps = np.zeros(shape)
+        symbols = np.full(shape, "", dtype=object)
+        
+        for row, strategy in enumerate(strategies):
+            for col, position in enumerate(sub_positions[strategy]):
+                symbol = str(position["symbol"])
+                symbols[row, col] = symbol
+                values[row, col] = float(position.get("current_value", 0))
+                weights[row, col] = float(position.get("weight", 1.0))
+                prices[row, col] = float(position.get("price", 0))
+                lots[row, col] = float(position.get("lot_size", self.lot_sizes.get(symbol, self.default_lot_size)))
+                caps[row, col] = np.inf if prices[row, col] > 0 else 0.0
+        
+        cash = np.array([float(strategy_amounts.get(s, 0)) for s in strategies])
+        amounts = allocate_cash(values, weights, cash, caps)
+        
+        orders = []
+        spent = 0.0
+        for row, strategy in enumerate(strategies):
+            quantities = round_to_lots(amounts[row], prices[row], lots[row], cash[row])
+            for col in np.flatnonzero(quantities > 0):
+                orders.append({
+                    "strategy": strategy,
+                    "symbol": symbols[row, col],
+                    "quantity": int(quantities[col]),
+                    "price": float(prices[row, col]),
+                    "lot_size": int(lots[row, col]),
+                    "amount": float(quantities[col] * prices[row, col]),
+                    "account": "nisa" if strategy in self.nisa_strategies else "taxable"
+                })
+                spent += quantities[col] * prices[row, col]
+        
+        if nisa_remaining is not None:
+            orders = self.route_nisa_orders(orders, nisa_remaining)
+        
+        return {"orders": orders, "unallocated": unallocated, "leftover_cash": float(cash.sum() - spent)}
+    
+    @staticmethod
+    def route_nisa_orders(orders: List[Dict], nisa_remaining: float) -> List[Dict]:
+        """NISA残枠を超える分を売買単位で課税口座に振り替え"""
+        nisa_index = [i for i, o in enumerate(orders) if o["account"] == "nisa"]
+        if not nisa_index:
+            return orders
+        
+        amounts = np.array([orders[i]["amount"] for i in nisa_index])
+        prices = np.array([orders[i]["price"] for i in nisa_index])
+        lot_sizes = np.array([orders[i]["lot_size"] for i in nisa_index])
+        quantities = np.array([orders[i]["quantity"] for i in nisa_index])
+        
+        # 先頭の注文から順に残枠を消費し、枠に収まる分を売買単位で切り捨て
+        used_before = np.cumsum(amounts) - amounts
+        nisa_amounts = np.clip(max(nisa_remaining, 0) - used_before, 0, amounts)
+        nisa_quantities = np.minimum(np.floor(nisa_amounts / (prices * lot_sizes)) * lot_sizes, quantities).astype(int)
+        split = dict(zip(nisa_index, nisa_quantities.tolist()))
+        
+        routed = []
+        for i, order in enumerate(orders):
+            if i not in split:
+                routed.append(order)
+                continue
+            nisa_qty = split[i]
+            taxable_qty = int(order["quantity"] - nisa_qty)
+            if nisa_qty > 0:
+                routed.append(dict(order, quantity=nisa_qty, amount=nisa_qty * order["price"], account="nisa"))
+            if taxable_qty > 0:
+                routed.append(dict(order, quantity=taxable_qty, amount=taxable_qty * order["price"], account="taxable"))
+        return routed
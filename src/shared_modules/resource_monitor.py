@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+リソース監視モジュール
+
+MainController のプロセス内で1つのスレッドが interval_seconds ごとに以下を記録し、JSON Lines のファイルに追記する
+（max_bytes を超えたら .1 .2 … に回して backup_count 個まで残す）。
+- CPU時間（ユーザー・システムの累計と前回からの使用率）・RSS・スレッド数・ファイル記述子とソケットの数
+- GCの回数と停止時間（gc.callbacks で世代ごとに計測し、前回からの合計と最大を記録）
+- キューの長さ（スケジューラーの実行中・実行待ちジョブ、Discordの未送信、IBの未確認注文など add_queue で登録したもの）
+
+取得は標準ライブラリだけで行う（Linux は /proc、Windows は ctypes、それ以外は取れる項目だけ）。
+1回の記録にかかった時間を sampler_ms として残し、summarize() で監視自体の負荷も確認できる。
+"""
+
+import gc
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+GC_GENERATIONS = 3
+
+
+def _page_size() -> int:
+    try:
+        return os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return 4096
+
+
+def _windows_rss() -> Optional[int]:
+    """Windows の現在のワーキングセット（GetProcessMemoryInfo）"""
+    import ctypes
+    from ctypes import wintypes
+    
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+    
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return counters.WorkingSetSize
+    return None
+
+
+def read_rss() -> Optional[int]:
+    """現在の常駐メモリ（バイト、取得できなければ None）"""
+    try:
+        if os.path.exists("/proc/self/statm"):
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * _page_size()
+        if sys.platform == "win32":
+            return _windows_rss()
+    except (OSError, ValueError, AttributeError):
+        pass
+    return None
+
+
+def read_thread_count() -> int:
+    """OSから見たスレッド数（/proc が無ければ Python のスレッド数）"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return threading.active_count()
+
+
+def read_descriptor_counts():
+    """開いているファイル記述子とそのうちのソケットの数（/proc が無ければ None, None）"""
+    try:
+        names = os.listdir("/proc/self/fd")
+    except OSError:
+        return None, None
+    sockets = 0
+    for name in names:
+        try:
+            if os.readlink(f"/proc/self/fd/{name}").startswith("socket:"):
+                sockets += 1
+        except OSError:
+            # listdir 自身の記述子など、読む前に閉じられたもの
+            continue
+    return len(names), sockets
+
+
+class _GCStats:
+    """前回の記録からのGCの回数と停止時間"""
+    
+    __slots__ = ("collections", "pause_total", "pause_max", "collected", "uncollectable")
+    
+    def __init__(self):
+        self.collections = [0] * GC_GENERATIONS
+        self.pause_total = 0.0
+        self.pause_max = 0.0
+        self.collected = 0
+        self.uncollectable = 0
+    
+    def as_dict(self) -> Dict:
+        return {
+            "collections": self.collections,
+            "pause_ms_total": round(self.pause_total * 1000, 3),
+            "pause_ms_max": round(self.pause_max * 1000, 3),
+            "collected": self.collected,
+            "uncollectable": self.uncollectable
+        }
+
+
+class ResourceMonitor:
+    def __init__(self, path: str = "metrics/resources.jsonl", interval_seconds: float = 30.0,
+                 max_bytes: int = 5_000_000, backup_count: int = 3):
+        """リソース監視の初期化（start() で記録を開始）"""
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queues: Dict[str, Callable[[], int]] = {}
+        self._gc = _GCStats()
+        self._gc_started = None
+        self._last_cpu = None
+        self._started = time.monotonic()
+        self._file = None
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def add_queue(self, name: str, probe: Callable[[], int]):
+        """長さを記録するキューを登録（probe は現在の長さを返す関数）"""
+        self.queues[name] = probe
+    
+    # ------------------------------------------------------------------
+    # 開始・停止
+    # ------------------------------------------------------------------
+    def start(self):
+        """GCの計測と記録スレッドを開始（開始時点の値も記録する）"""
+        if self._thread is not None:
+            return self
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        gc.callbacks.append(self._on_gc)
+        self._stop.clear()
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="resource-monitor", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """記録スレッドを止め、最後の値を記録してファイルを閉じる"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+        self.sample()
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+    
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"リソース監視エラー: {e}")
+    
+    def _on_gc(self, phase, info):
+        # GC中に呼ばれるのでロックは取らない（記録時に入れ替える前後の1回分は数え漏れてもよい）
+        if phase == "start":
+            self._gc_started = time.perf_counter()
+            return
+        if self._gc_started is None:
+            return
+        pause = time.perf_counter() - self._gc_started
+        self._gc_started = None
+        stats = self._gc
+        stats.collections[info["generation"]] += 1
+        stats.pause_total += pause
+        if pause > stats.pause_max:
+            stats.pause_max = pause
+        stats.collected += info.get("collected", 0)
+        stats.uncollectable += info.get("uncollectable", 0)
+    
+    # ------------------------------------------------------------------
+    # 記録
+    # ------------------------------------------------------------------
+    def sample(self) -> Dict:
+        """現在の値を1件記録して返す"""
+        started = time.perf_counter()
+        now = time.monotonic()
+        times = os.times()
+        cpu = times.user + times.system
+        cpu_percent = None
+        if self._last_cpu is not None and now > self._last_cpu[0]:
+            cpu_percent = round((cpu - self._last_cpu[1]) / (now - self._last_cpu[0]) * 100, 2)
+        self._last_cpu = (now, cpu)
+        gc_stats, self._gc = self._gc, _GCStats()
+        fds, sockets = read_descriptor_counts()
+        queues = {}
+        for name, probe in self.queues.items():
+            try:
+                queues[name] = probe()
+            except Exception:
+                queues[name] = None
+        record = {
+            "ts": round(time.time(), 3),
+            "uptime": round(now - self._started, 3),
+            "cpu_user": round(times.user, 3),
+            "cpu_system": round(times.system, 3),
+            "cpu_percent": cpu_percent,
+            "rss_bytes": read_rss(),
+            "threads": read_thread_count(),
+            "python_threads": threading.active_count(),
+            "fds": fds,
+            "sockets": sockets,
+            "gc": gc_stats.as_dict(),
+            "gc_objects": list(gc.get_count()),
+            "queues": queues
+        }
+        record["sampler_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        self._write(record)
+        return record
+    
+    def _write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._write_lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+    
+    def _rotate(self):
+        """resources.jsonl → .1 → .2 …（backup_count より古いものは削除）"""
+        self._file.close()
+        self._file = None
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+def sample_paths(path: str) -> List[str]:
+    """記録ファイル（回したものを含む）を古い順に"""
+    rotated = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        rotated.append(f"{path}.{index}")
+        index += 1
+    return rotated[::-1] + ([path] if os.path.exists(path) else [])
+
+
+def read_samples(path: str, since: Optional[float] = None) -> List[Dict]:
+    """記録を古い順に読み込む（書きかけの行は読み飛ばす）"""
+    samples = []
+    for file_path in sample_paths(path):
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    sample = json.loads(line)
+                except ValueError:
+                    continue
+                if since is None or sample["ts"] >= since:
+                    samples.append(sample)
+    return samples
+
+
+def split_sessions(samples: List[Dict]) -> List[List[Dict]]:
+    """プロセスの起動ごとに分ける（経過時間が戻ったところが再起動）"""
+    sessions = []
+    for sample in samples:
+        if not sessions or sample["uptime"] < sessions[-1][-1]["uptime"]:
+            sessions.append([])
+        sessions[-1].append(sample)
+    return sessions
+
+
+def _slope_per_hour(points: Iterable) -> Optional[float]:
+    """(時刻, 値) の最小二乗の傾き（1時間あたり）"""
+    points = [(t, v) for t, v in points if v is not None]
+    if len(points) < 2:
+        return None
+    mean_t = sum(t for t, _ in points) / len(points)
+    mean_v = sum(v for _, v in points) / len(points)
+    variance = sum((t - mean_t) ** 2 for t, _ in points)
+    if not variance:
+        return None
+    return sum((t - mean_t) * (v - mean_v) for t, v in points) / variance * 3600
+
+
+def _series_summary(samples: List[Dict], get) -> Optional[Dict]:
+    values = [(sample["ts"], get(sample)) for sample in samples]
+    present = [value for _, value in values if value is not None]
+    if not present:
+        return None
+    return {
+        "first": present[0],
+        "last": present[-1],
+        "min": min(present),
+        "max": max(present),
+        "mean": sum(present) / len(present),
+        "per_hour": _slope_per_hour(values)
+    }
+
+
+def summarize(samples: List[Dict]) -> Dict:
+    """記録の要約（項目ごとの最初・最後・最小・最大・平均と1時間あたりの増加量、GCの合計、監視自体の負荷）。
+    再起動をまたぐと増加量が意味を持たないため、通常は split_sessions() の1回分を渡す"""
+    if not samples:
+        return {"samples": 0}
+    duration = samples[-1]["ts"] - samples[0]["ts"]
+    metrics = {
+        "rss_mb": lambda s: s["rss_bytes"] / 2 ** 20 if s.get("rss_bytes") is not None else None,
+        "cpu_percent": lambda s: s.get("cpu_percent"),
+        "threads": lambda s: s.get("threads"),
+        "fds": lambda s: s.get("fds"),
+        "sockets": lambda s: s.get("sockets"),
+    }
+    queue_names = sorted({name for sample in samples for name in sample.get("queues", {})})
+    for name in queue_names:
+        metrics[f"queue.{name}"] = lambda s, name=name: s.get("queues", {}).get(name)
+    
+    collections = [0] * GC_GENERATIONS
+    for sample in samples:
+        for generation, count in enumerate(sample["gc"]["collections"]):
+            collections[generation] += count
+    pause_total = sum(sample["gc"]["pause_ms_total"] for sample in samples)
+    sampler_ms = sum(sample.get("sampler_ms", 0) for sample in samples)
+    return {
+        "samples": len(samples),
+        "start": samples[0]["ts"],
+        "end": samples[-1]["ts"],
+        "duration_hours": duration / 3600,
+        "sessions": len(split_sessions(samples)),
+        "metrics": {name: summary for name, summary in (
+            (name, _series_summary(samples, get)) for name, get in metrics.items()) if summary is not None},
+        "gc": {
+            "collections": collections,
+            "pause_ms_total": pause_total,
+            "pause_ms_max": max(sample["gc"]["pause_ms_max"] for sample in samples),
+            "pause_ms_per_hour": pause_total / (duration / 3600) if duration else None,
+            "uncollectable": sum(sample["gc"]["uncollectable"] for sample in samples)
+        },
+        "sampler_overhead_percent": sampler_ms / (duration * 1000) * 100 if duration else None
+    }
+
+
+# diagnose() の既定のしきい値
+DEFAULT_THRESHOLDS = {
+    "min_hours": 1.0,               # 増加量を判定するのに必要な記録の長さ（時間）
+    "rss_mb_per_hour": 5.0,         # RSS の増加（MB/時）
+    "threads_per_hour": 0.5,        # スレッド数の増加（/時）
+    "descriptors_per_hour": 1.0,    # ファイル記述子・ソケットの増加（/時）
+    "cpu_percent": 50.0,            # CPU使用率の平均（%）
+    "gc_pause_ms": 100.0,           # GCの1回の停止時間（ms）
+    "queue_depth": 50,              # キューの長さの最大
+    "sampler_overhead_percent": 1.0,  # 監視自体の負荷（%）
+}
+
+
+def diagnose(summary: Dict, thresholds: Optional[Dict] = None) -> List[Dict]:
+    """要約からしきい値を超えた項目と対処の候補を挙げる（問題が無ければ空）"""
+    limits = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    metrics = summary.get("metrics", {})
+    long_enough = summary.get("duration_hours", 0) >= limits["min_hours"]
+    findings = []
+    
+    def add(item, message, suggestion):
+        findings.append({"item": item, "message": message, "suggestion": suggestion})
+    
+    def growth(name):
+        metric = metrics.get(name)
+        return metric["per_hour"] if long_enough and metric and metric["per_hour"] is not None else None
+    
+    rss = growth("rss_mb")
+    if rss is not None and rss > limits["rss_mb_per_hour"]:
+        add("rss_mb", f"RSS が1時間あたり {rss:.1f}MB 増えています（{metrics['rss_mb']['first']:.0f}MB → "
+                      f"{metrics['rss_mb']['last']:.0f}MB）",
+            "tracemalloc のスナップショットを比べて増えている箇所を探す（株価・Bot のデータのキャッシュ、未送信の通知など）")
+    threads = growth("threads")
+    if threads is not None and threads > limits["threads_per_hour"]:
+        add("threads", f"スレッド数が1時間あたり {threads:.1f} 増えています（最大 {metrics['threads']['max']}）",
+            "ジョブごとに作るスレッド・HTTPセッションが終了しているか確認する")
+    for name, label in (("fds", "ファイル記述子"), ("sockets", "ソケット")):
+        increase = growth(name)
+        if increase is not None and increase > limits["descriptors_per_hour"]:
+            add(name, f"{label}の数が1時間あたり {increase:.1f} 増えています（最大 {metrics[name]['max']}）",
+                "yfinance・Discord・ゲートウェイへの接続やファイルが閉じられているか確認する")
+    cpu = metrics.get("cpu_percent")
+    if cpu and cpu["mean"] > limits["cpu_percent"]:
+        add("cpu_percent", f"CPU使用率の平均が {cpu['mean']:.0f}% です（最大 {cpu['max']:.0f}%）",
+            "ジョブの実行時間（metrics の chimera_job_duration_seconds）と合わせて重いジョブを特定する")
+    gc_stats = summary.get("gc", {})
+    if gc_stats.get("pause_ms_max", 0) > limits["gc_pause_ms"]:
+        add("gc", f"GCで最大 {gc_stats['pause_ms_max']:.0f}ms 停止しています"
+                  f"（世代ごとの回数 {gc_stats['collections']}）",
+            "起動後に gc.freeze() で長く残るオブジェクトを対象外にする、大量の一時オブジェクトを作る処理を減らす")
+    if gc_stats.get("uncollectable"):
+        add("gc", f"回収できないオブジェクトが {gc_stats['uncollectable']} 個あります", "gc.garbage の中身を確認する")
+    for name, metric in metrics.items():
+        if name.startswith("queue.") and metric["max"] > limits["queue_depth"]:
+            add(name, f"{name[len('queue.'):]} の長さが最大 {metric['max']} になっています（最後 {metric['last']}）",
+                "送り先の応答が遅くないか、投入の頻度が上がっていないか確認する")
+    overhead = summary.get("sampler_overhead_percent")
+    if overhead is not None and overhead > limits["sampler_overhead_percent"]:
+        add("sampler", f"監視自体の負荷が {overhead:.2f}% です", "resource_monitor.interval_seconds を長くする")
+    return findings
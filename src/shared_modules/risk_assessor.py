@@ -5,23 +5,29 @@
 """
 
 import json
-from typing import Dict, List, Tuple
+import os
+from typing import Dict, List, Optional, Tuple
 from src.shared_modules.config_loader import ConfigLoader
 
 class RiskAssessor:
     def __init__(self, config_loader: ConfigLoader):
         self.config = config_loader
-        self.risk_profiles = self.config.get("risk_assessment.profiles", {})
+        self.risk_profiles = {
+            name: ratios.as_dict() for name, ratios in self.config.settings.risk_assessment.profiles.items()
+        }
+        self._simulation = None
+        self._simulation_key = None
     
     def conduct_risk_assessment(self) -> str:
-        """リスク許容度診断を実行し、Eロファイルを返す"""
-        print("リスク許容度診断を開始しまぁE..")
+        """リスク許容度診断を実行し、プロファイルを返す"""
+        print("リスク許容度診断を開始します...")
         
-        # 診断質啁E        questions = self._get_risk_questions()
+        # 診断質問
+        questions = self._get_risk_questions()
         answers = []
         
         print("\\n=== リスク許容度診断 ===")
-        print("吁E問に1-5の数字で回答してくださいEE: 最も低い、E: 最も高いEE)
+        print("各質問に1-5の数字で回答してください（1: 最も低い、5: 最も高い）")
         
         for i, question in enumerate(questions, 1):
             print(f"\\n質問{i}: {question['question']}")
@@ -29,7 +35,7 @@ class RiskAssessor:
             
             while True:
                 try:
-                    answer = int(input("回筁E(1-5): "))
+                    answer = int(input("回答 (1-5): "))
                     if 1 <= answer <= 5:
                         answers.append(answer)
                         break
@@ -38,41 +44,43 @@ class RiskAssessor:
                 except ValueError:
                     print("数字で入力してください")
         
-        # スコア計箁E        total_score = sum(answers)
+        # スコア計算
+        total_score = sum(answers)
         risk_profile = self._calculate_risk_profile(total_score)
         
         print(f"\\n診断結果: {risk_profile}")
         print(f"総スコア: {total_score}/25")
+        self.show_profile_risk()
         
         return risk_profile
     
     def _get_risk_questions(self) -> List[Dict]:
-        """リスク診断質問を取征E""
+        """リスク診断質問を取得"""
         return [
             {
-                "question": "投賁E間Eどの程度を想定してぁEすかEE,
-                "options": "1: 1年未満, 2: 1-3年, 3: 3-5年, 4: 5-10年, 5: 10年以丁E
+                "question": "投資期間はどの程度を想定していますか？",
+                "options": "1: 1年未満, 2: 1-3年, 3: 3-5年, 4: 5-10年, 5: 10年以上"
             },
             {
-                "question": "投賁EE本の損失に対する許容度はEE,
-                "options": "1: 5%未満, 2: 5-10%, 3: 10-20%, 4: 20-30%, 5: 30%以丁E
+                "question": "投資元本の損失に対する許容度は？",
+                "options": "1: 5%未満, 2: 5-10%, 3: 10-20%, 4: 20-30%, 5: 30%以上"
             },
             {
-                "question": "投賁EE目皁EEEE,
-                "options": "1: 允E保E, 2: 安定収盁E 3: バランス, 4: 成長重要E 5: 積極皁EE長"
+                "question": "投資の目的は？",
+                "options": "1: 元本保全, 2: 安定収益, 3: バランス, 4: 成長重視, 5: 積極的成長"
             },
             {
-                "question": "市場の変動に対する反応EEE,
-                "options": "1: 非常に不宁E 2: 不宁E 3: 普送E 4: 冷靁E 5: 機会と捉えめE
+                "question": "市場の変動に対する反応は？",
+                "options": "1: 非常に不安, 2: 不安, 3: 普通, 4: 冷静, 5: 機会と捉える"
             },
             {
-                "question": "投賁E験EEE,
-                "options": "1: 初忁EE 2: 少し経騁E 3: 中程度, 4: 経験豊寁E 5: 専門家レベル"
+                "question": "投資経験は？",
+                "options": "1: 初心者, 2: 少し経験, 3: 中程度, 4: 経験豊富, 5: 専門家レベル"
             }
         ]
     
     def _calculate_risk_profile(self, total_score: int) -> str:
-        """総スコアからリスクプロファイルを決宁E""
+        """総スコアからリスクプロファイルを決定"""
         if total_score <= 10:
             return "stable"
         elif total_score <= 18:
@@ -80,25 +88,72 @@ class RiskAssessor:
         else:
             return "aggressive"
     
-    def get_portfolio_ratios(self, profile: str) -> Dict[str, float]:
-        """持EされたプロファイルのポEトフォリオ比率を取征E""
+    def get_portfolio_ratios(self, profile: str, show_risk: bool = False) -> Dict[str, float]:
+        """指定されたプロファイルのポートフォリオ比率を取得（show_risk=True なら想定リスクも表示）"""
         if profile not in self.risk_profiles:
-            print(f"警呁E プロファイル '{profile}' が見つかりません。デフォルトを使用します、E)
-            profile = self.config.get("risk_assessment.default_profile", "aggressive")
+            print(f"警告: プロファイル '{profile}' が見つかりません。デフォルトを使用します。")
+            profile = self.config.settings.risk_assessment.default_profile
         
+        if show_risk:
+            self.show_profile_risk(profile)
         return self.risk_profiles.get(profile, self.risk_profiles["aggressive"])
     
+    def simulate_profiles(self, returns=None):
+        """全プロファイルの想定リスクをモンテカルロ・シミュレーションで推定（月次リターンが無ければ None）
+
+        returns を省略すると risk_assessment.returns_file を読み込み、ファイルが変わるまで結果を使い回す。
+        """
+        settings = self.config.settings.risk_assessment
+        if not self.risk_profiles:
+            return None
+        key = None
+        if returns is None:
+            if not os.path.exists(settings.returns_file):
+                return None
+            key = (settings.returns_file, os.path.getmtime(settings.returns_file), settings)
+            if key == self._simulation_key:
+                return self._simulation
+            from src.backtesting.portfolio_simulator import load_sleeve_returns
+            returns = load_sleeve_returns(settings.returns_file)["returns"]
+        
+        from src.backtesting.monte_carlo import MonteCarloEngine
+        engine = MonteCarloEngine(
+            returns,
+            n_paths=settings.simulation_paths,
+            horizon_months=round(settings.horizon_years * 12),
+            block_months=settings.block_months
+        )
+        result = engine.simulate(self.risk_profiles)
+        if key is not None:
+            self._simulation, self._simulation_key = result, key
+        return result
+    
+    def show_profile_risk(self, profile: Optional[str] = None):
+        """プロファイル（省略時は全て）の想定リスクを表示"""
+        try:
+            result = self.simulate_profiles()
+        except Exception as e:
+            print(f"想定リスクの計算エラー: {e}")
+            return
+        if result is None:
+            print(f"想定リスクを表示するには月次リターンが必要です: {self.config.settings.risk_assessment.returns_file}")
+            return
+        if profile is None:
+            print(result.summary())
+        elif profile in result.profiles:
+            print(f"想定リスク（過去の月次リターンから推定）: {result.describe(profile)}")
+    
     def update_config_with_profile(self, profile: str) -> bool:
         """設定ファイルを指定されたプロファイルで更新"""
         try:
             ratios = self.get_portfolio_ratios(profile)
             
             # 設定を更新
-            self.config.config["portfolio_ratios"] = ratios
+            self.config.set_override("portfolio_ratios", dict(ratios))
             
-            print(f"ポEトフォリオ比率を更新しました:")
-            print(f"  インチEクス: {ratios['index']:.1%}")
-            print(f"  高E彁E {ratios['dividend']:.1%}")
+            print(f"ポートフォリオ比率を更新しました:")
+            print(f"  インデックス: {ratios['index']:.1%}")
+            print(f"  高配当: {ratios['dividend']:.1%}")
             print(f"  レンジ: {ratios['range']:.1%}")
             
             return True
@@ -108,7 +163,7 @@ class RiskAssessor:
             return False
     
     def save_assessment_result(self, profile: str, answers: List[int], total_score: int):
-        """診断結果をファイルに保孁E""
+        """診断結果をファイルに保存"""
         try:
             result = {
                 "profile": profile,
@@ -121,7 +176,7 @@ class RiskAssessor:
             with open("risk_assessment_result.json", "w", encoding="utf-8") as f:
                 json.dump(result, f, ensure_ascii=False, indent=2)
             
-            print("診断結果めErisk_assessment_result.json に保存しました")
+            print("診断結果を risk_assessment_result.json に保存しました")
             
         except Exception as e:
             print(f"結果保存エラー: {e}")
@@ -139,10 +194,10 @@ class RiskAssessor:
             return {}
     
     def get_profile_description(self, profile: str) -> str:
-        """プロファイルの説明を取征E""
+        """プロファイルの説明を取得"""
         descriptions = {
-            "stable": "安定型: リスクを最小限に抑え、安定した賁E形成を重要E,
-            "balanced": "バランス垁E リスクとリターンのバランスを重要E,
-            "aggressive": "積極垁E 高いリターンを狙ぁEリスクを許容"
+            "stable": "安定型: リスクを最小限に抑え、安定した資産形成を重視",
+            "balanced": "バランス型: リスクとリターンのバランスを重視",
+            "aggressive": "積極型: 高いリターンを狙い、リスクを許容"
         }
-        return descriptions.get(profile, "不Eなプロファイル")
+        return descriptions.get(profile, "不明なプロファイル")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+スクリーニング結果レジストリモジュール
+
+購入候補・レンジ取引対象を __slots__ のレコードとしてメモリに保持し、
+状態ストアのバージョンが変わった（スクリーニングが再実行された）ときだけ読み直す。
+毎分の監視ループではバージョン1行の参照だけで済み、行ごとの辞書やSeriesを作らない。
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class RangeTarget:
+    """レンジ取引対象"""
+    
+    __slots__ = ("symbol", "high_6m", "low_6m", "range_ratio", "screened_at")
+    
+    def __init__(self, symbol, high_6m, low_6m, range_ratio, screened_at=None):
+        self.symbol = symbol
+        self.high_6m = high_6m
+        self.low_6m = low_6m
+        self.range_ratio = range_ratio
+        self.screened_at = screened_at
+    
+    def __repr__(self):
+        return f"RangeTarget({self.symbol}, range_ratio={self.range_ratio:.3f})"
+
+
+class DividendCandidate:
+    """高配当株の購入候補"""
+    
+    __slots__ = ("symbol", "dividend_yield", "per", "equity_ratio", "no_dividend_cut", "screened_at")
+    
+    def __init__(self, symbol, dividend_yield, per, equity_ratio, no_dividend_cut, screened_at=None):
+        self.symbol = symbol
+        self.dividend_yield = dividend_yield
+        self.per = per
+        self.equity_ratio = equity_ratio
+        self.no_dividend_cut = bool(no_dividend_cut)
+        self.screened_at = screened_at
+    
+    def __repr__(self):
+        return f"DividendCandidate({self.symbol}, dividend_yield={self.dividend_yield:.2f})"
+
+
+class _Snapshot:
+    """1テーブル分の読み込み結果"""
+    
+    __slots__ = ("version", "records", "by_symbol")
+    
+    def __init__(self, version, records):
+        self.version = version
+        self.records = records
+        self.by_symbol = {record.symbol: record for record in records}
+
+
+class ScreeningRegistry:
+    def __init__(self, state_store):
+        """レジストリの初期化（読み込みは最初の参照時）"""
+        self.state_store = state_store
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self.reloads = 0
+    
+    def _snapshot(self, table: str) -> _Snapshot:
+        """バージョンが変わっていれば読み直して最新の内容を返す"""
+        version = self.state_store.get_version(table)
+        snapshot = self._snapshots.get(table)
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        
+        with self._lock:
+            snapshot = self._snapshots.get(table)
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._snapshots[table] = _Snapshot(version, self._load(table))
+                self.reloads += 1
+            return snapshot
+    
+    def _load(self, table: str) -> Tuple:
+        """状態ストアから並び順どおりにレコードを作成"""
+        if table == "range_targets":
+            return tuple(
+                RangeTarget(row["symbol"], row["high_6m"], row["low_6m"], row["range_ratio"], row["screened_at"])
+                for row in self.state_store.get_range_targets()
+            )
+        if table == "dividend_candidates":
+            return tuple(
+                DividendCandidate(row["symbol"], row["dividend_yield"], row["per"], row["equity_ratio"],
+                                  row["no_dividend_cut"], row["screened_at"])
+                for row in self.state_store.get_dividend_candidates()
+            )
+        raise ValueError(f"未知のテーブルです: {table}")
+    
+    def range_targets(self) -> Tuple[RangeTarget, ...]:
+        """取引対象（レンジ比率の小さい順）"""
+        return self._snapshot("range_targets").records
+    
+    def range_target(self, symbol) -> Optional[RangeTarget]:
+        """銘柄の取引対象情報"""
+        return self._snapshot("range_targets").by_symbol.get(str(symbol))
+    
+    def best_range_target(self) -> Optional[RangeTarget]:
+        """レンジ比率が最も小さい取引対象"""
+        records = self.range_targets()
+        return records[0] if records else None
+    
+    def dividend_candidates(self, limit: Optional[int] = None) -> Tuple[DividendCandidate, ...]:
+        """購入候補（配当利回りの高い順）"""
+        records = self._snapshot("dividend_candidates").records
+        return records if limit is None else records[:limit]
+    
+    def dividend_candidate(self, symbol) -> Optional[DividendCandidate]:
+        """銘柄の購入候補情報"""
+        return self._snapshot("dividend_candidates").by_symbol.get(str(symbol))
+    
+    def best_dividend_candidate(self) -> Optional[DividendCandidate]:
+        """配当利回りが最も高い購入候補"""
+        records = self.dividend_candidates()
+        return records[0] if records else None
+    
+    def get_status(self) -> Dict:
+        """読み込み済みのバージョンと件数"""
+        return {
+            table: {"version": snapshot.version, "count": len(snapshot.records)}
+            for table, snapshot in self._snapshots.items()
+        }
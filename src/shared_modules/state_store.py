@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+戦略状態ストアモジュール
+
+購入候補・レンジ取引対象・保有銘柄・約定をSQLite（WALモード）で管理する。
+CSVの全件読み込み・全件書き直しを、インデックス付きの参照とトランザクション内の更新に置き換える。
+"""
+
+import csv
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dividend_candidates (
+    symbol TEXT PRIMARY KEY,
+    dividend_yield REAL NOT NULL DEFAULT 0,
+    per REAL NOT NULL DEFAULT 0,
+    equity_ratio REAL NOT NULL DEFAULT 0,
+    no_dividend_cut INTEGER NOT NULL DEFAULT 1,
+    screened_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dividend_candidates_yield ON dividend_candidates (dividend_yield DESC);
+
+CREATE TABLE IF NOT EXISTS range_targets (
+    symbol TEXT PRIMARY KEY,
+    high_6m REAL NOT NULL,
+    low_6m REAL NOT NULL,
+    range_ratio REAL NOT NULL,
+    screened_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_range_targets_ratio ON range_targets (range_ratio);
+
+CREATE TABLE IF NOT EXISTS holdings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    strategy TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    amount REAL,
+    quantity REAL,
+    order_id INTEGER,
+    purchase_date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_holdings_strategy_symbol ON holdings (strategy, symbol);
+
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER,
+    strategy TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    price REAL,
+    account TEXT,
+    filled_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fills_symbol ON fills (symbol, filled_at);
+CREATE INDEX IF NOT EXISTS idx_fills_order ON fills (order_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+CANDIDATE_COLUMNS = ("symbol", "dividend_yield", "per", "equity_ratio", "no_dividend_cut")
+TARGET_COLUMNS = ("symbol", "high_6m", "low_6m", "range_ratio")
+
+# 旧CSVファイルと取り込み先
+LEGACY_CSV_FILES = {
+    "candidates": "purchase_candidate.csv",
+    "targets": "range_trade_target.csv",
+    "dividend_holdings": "dividend_holdings.csv",
+}
+
+
+def _to_sql(value):
+    """numpy / pandas の値をSQLiteに渡せる型に変換"""
+    if value is None:
+        return None
+    if hasattr(value, "item"):
+        value = value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _symbol(value) -> str:
+    """銘柄コードを文字列に正規化（CSV経由で 7203.0 になったものも戻す）"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(_to_sql(value))
+
+
+class StateStore:
+    def __init__(self, path: str = "chimera_state.db"):
+        """状態ストアの初期化"""
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn.executescript(SCHEMA)
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """スレッドごとの接続（WALなので読み取りは並行に行える）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+    
+    def transaction(self):
+        """書き込みトランザクション（BEGIN IMMEDIATEで書き込みロックを先に取る）"""
+        return _Transaction(self.conn)
+    
+    def close(self):
+        """このスレッドの接続を閉じる"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
+    # ------------------------------------------------------------------
+    # バージョン（テーブル更新の検知用）
+    # ------------------------------------------------------------------
+    def _bump_version(self, conn, table: str):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+            (f"version:{table}",)
+        )
+    
+    def get_version(self, table: str) -> int:
+        """テーブルの更新回数を取得"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (f"version:{table}",)).fetchone()
+        return int(row["value"]) if row else 0
+    
+    # ------------------------------------------------------------------
+    # 高配当株の購入候補
+    # ------------------------------------------------------------------
+    def replace_dividend_candidates(self, rows: Iterable[Dict]):
+        """スクリーニング結果で購入候補を置き換え"""
+        now = datetime.now().isoformat()
+        records = [
+            (_symbol(row["symbol"]), _to_sql(row.get("dividend_yield", 0)) or 0, _to_sql(row.get("per", 0)) or 0,
+             _to_sql(row.get("equity_ratio", 0)) or 0, int(bool(_to_sql(row.get("no_dividend_cut", True)))), now)
+            for row in rows
+        ]
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM dividend_candidates")
+            conn.executemany(
+                "INSERT INTO dividend_candidates (symbol, dividend_yield, per, equity_ratio, no_dividend_cut, screened_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(symbol) DO UPDATE SET dividend_yield = excluded.dividend_yield, per = excluded.per, "
+                "equity_ratio = excluded.equity_ratio, no_dividend_cut = excluded.no_dividend_cut, "
+                "screened_at = excluded.screened_at",
+                records
+            )
+            self._bump_version(conn, "dividend_candidates")
+    
+    def get_dividend_candidates(self, limit: Optional[int] = None) -> List[Dict]:
+        """購入候補を配当利回りの高い順に取得"""
+        sql = "SELECT * FROM dividend_candidates ORDER BY dividend_yield DESC"
+        params = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (int(limit),)
+        return [dict(row) for row in self.conn.execute(sql, params)]
+    
+    def get_dividend_candidate(self, symbol) -> Optional[Dict]:
+        """銘柄の購入候補情報を取得"""
+        row = self.conn.execute("SELECT * FROM dividend_candidates WHERE symbol = ?", (_symbol(symbol),)).fetchone()
+        return dict(row) if row else None
+    
+    def best_dividend_candidate(self) -> Optional[Dict]:
+        """配当利回りが最も高い購入候補を取得"""
+        candidates = self.get_dividend_candidates(limit=1)
+        return candidates[0] if candidates else None
+    
+    # ------------------------------------------------------------------
+    # レンジ取引対象
+    # ------------------------------------------------------------------
+    def replace_range_targets(self, rows: Iterable[Dict]):
+        """スクリーニング結果で取引対象を置き換え"""
+        now = datetime.now().isoformat()
+        records = [
+            (_symbol(row["symbol"]), _to_sql(row["high_6m"]), _to_sql(row["low_6m"]), _to_sql(row["range_ratio"]), now)
+            for row in rows
+        ]
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM range_targets")
+            conn.executemany(
+                "INSERT INTO range_targets (symbol, high_6m, low_6m, range_ratio, screened_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(symbol) DO UPDATE SET high_6m = excluded.high_6m, low_6m = excluded.low_6m, "
+                "range_ratio = excluded.range_ratio, screened_at = excluded.screened_at",
+                records
+            )
+            self._bump_version(conn, "range_targets")
+    
+    def get_range_targets(self) -> List[Dict]:
+        """取引対象をレンジ比率の小さい順に取得"""
+        return [dict(row) for row in self.conn.execute("SELECT * FROM range_targets ORDER BY range_ratio")]
+    
+    def get_range_target(self, symbol) -> Optional[Dict]:
+        """銘柄の取引対象情報を取得"""
+        row = self.conn.execute("SELECT * FROM range_targets WHERE symbol = ?", (_symbol(symbol),)).fetchone()
+        return dict(row) if row else None
+    
+    def best_range_target(self) -> Optional[Dict]:
+        """レンジ比率が最も小さい（安定した）取引対象を取得"""
+        row = self.conn.execute("SELECT * FROM range_targets ORDER BY range_ratio LIMIT 1").fetchone()
+        return dict(row) if row else None
+    
+    # ------------------------------------------------------------------
+    # 保有銘柄
+    # ------------------------------------------------------------------
+    def add_holding(self, strategy: str, symbol, amount=None, quantity=None, order_id=None, purchase_date=None):
+        """保有銘柄を1件追加"""
+        with self.transaction() as conn:
+            self._insert_holding(conn, strategy, symbol, amount, quantity, order_id, purchase_date)
+    
+    def _insert_holding(self, conn, strategy, symbol, amount, quantity, order_id, purchase_date):
+        conn.execute(
+            "INSERT INTO holdings (strategy, symbol, amount, quantity, order_id, purchase_date) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (strategy, _symbol(symbol), _to_sql(amount), _to_sql(quantity), _to_sql(order_id),
+             _to_sql(purchase_date) or datetime.now().isoformat())
+        )
+        self._bump_version(conn, "holdings")
+    
+    def remove_holdings(self, strategy: str, symbol):
+        """銘柄の保有記録を削除"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM holdings WHERE strategy = ? AND symbol = ?", (strategy, _symbol(symbol)))
+            self._bump_version(conn, "holdings")
+    
+    def get_holdings(self, strategy: str) -> List[Dict]:
+        """戦略の保有記録を取得"""
+        return [dict(row) for row in self.conn.execute(
+            "SELECT * FROM holdings WHERE strategy = ? ORDER BY id", (strategy,)
+        )]
+    
+    def holding_symbols(self, strategy: str) -> List[str]:
+        """戦略で保有している銘柄コードの一覧"""
+        return [row["symbol"] for row in self.conn.execute(
+            "SELECT DISTINCT symbol FROM holdings WHERE strategy = ? ORDER BY symbol", (strategy,)
+        )]
+    
+    def has_holding(self, strategy: str, symbol) -> bool:
+        """銘柄を保有しているか"""
+        row = self.conn.execute(
+            "SELECT 1 FROM holdings WHERE strategy = ? AND symbol = ? LIMIT 1", (strategy, _symbol(symbol))
+        ).fetchone()
+        return row is not None
+    
+    # ------------------------------------------------------------------
+    # 約定
+    # ------------------------------------------------------------------
+    def record_fill(self, strategy: str, symbol, side: str, quantity, price=None, order_id=None, account=None,
+                    filled_at=None):
+        """約定（発注時点の価格）を記録"""
+        with self.transaction() as conn:
+            self._insert_fill(conn, strategy, symbol, side, quantity, price, order_id, account, filled_at)
+    
+    def record_purchase(self, strategy: str, symbol, fill_quantity, price=None, order_id=None, account=None,
+                        amount=None, quantity=None):
+        """保有銘柄の追加と買いの約定を1つのトランザクションで記録（片方だけが残らないように）"""
+        with self.transaction() as conn:
+            self._insert_holding(conn, strategy, symbol, amount, quantity, order_id, None)
+            self._insert_fill(conn, strategy, symbol, "BUY", fill_quantity, price, order_id, account, None)
+    
+    @staticmethod
+    def _insert_fill(conn, strategy, symbol, side, quantity, price, order_id, account, filled_at):
+        conn.execute(
+            "INSERT INTO fills (order_id, strategy, symbol, side, quantity, price, account, filled_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (_to_sql(order_id), strategy, _symbol(symbol), side, _to_sql(quantity), _to_sql(price), account,
+             _to_sql(filled_at) or datetime.now().isoformat())
+        )
+    
+    def get_fills(self, symbol=None, limit: int = 100) -> List[Dict]:
+        """約定を新しい順に取得"""
+        if symbol is None:
+            rows = self.conn.execute("SELECT * FROM fills ORDER BY id DESC LIMIT ?", (limit,))
+        else:
+            rows = self.conn.execute(
+                "SELECT * FROM fills WHERE symbol = ? ORDER BY id DESC LIMIT ?", (_symbol(symbol), limit)
+            )
+        return [dict(row) for row in rows]
+    
+    def latest_fill_id(self) -> int:
+        """最新の約定のID（約定の追加の検知用、無ければ0）"""
+        row = self.conn.execute("SELECT MAX(id) AS id FROM fills").fetchone()
+        return int(row["id"] or 0)
+    
+    # ------------------------------------------------------------------
+    # 旧CSVからの移行
+    # ------------------------------------------------------------------
+    def migrate_legacy_csv(self, base_dir: str = ".") -> Dict[str, int]:
+        """旧CSVファイルを一度だけ取り込む（取り込み済みのファイルはスキップ）"""
+        imported = {}
+        for kind, filename in LEGACY_CSV_FILES.items():
+            path = os.path.join(base_dir, filename)
+            key = f"migrated:{filename}"
+            if not os.path.exists(path) or self.conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                continue
+            
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+            
+            if kind == "candidates":
+                self.replace_dividend_candidates(
+                    dict(row, **{c: float(row[c] or 0) for c in CANDIDATE_COLUMNS[1:4]},
+                         no_dividend_cut=str(row.get("no_dividend_cut", "True")).lower() in ("true", "1"))
+                    for row in rows
+                )
+            elif kind == "targets":
+                self.replace_range_targets(
+                    dict(row, **{c: float(row[c]) for c in TARGET_COLUMNS[1:]}) for row in rows
+                )
+            else:
+                for row in rows:
+                    self.add_holding(
+                        "dividend", row["symbol"],
+                        amount=float(row["amount"]) if row.get("amount") else None,
+                        order_id=int(float(row["order_id"])) if row.get("order_id") else None,
+                        purchase_date=row.get("purchase_date") or None
+                    )
+            
+            with self.transaction() as conn:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(time.time())))
+            imported[filename] = len(rows)
+        return imported
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE 〜 COMMIT / ROLLBACK"""
+    
+    def __init__(self, conn):
+        self.conn = conn
+    
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
+
+
+_state_store = None
+_state_store_lock = threading.Lock()
+
+
+def get_state_store(path: Optional[str] = None) -> StateStore:
+    """プロセス共通の状態ストアを取得"""
+    global _state_store
+    with _state_store_lock:
+        if _state_store is None:
+            _state_store = StateStore(path or "chimera_state.db")
+        return _state_store
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+時系列ストアモジュール
+
+ポートフォリオ評価額・戦略別損益・NISA枠の使用額・ジョブの実行時間をダッシュボードのグラフ用にSQLite（WALモード）へ記録する。
+- 生の値は保存せず、1分・1時間・1日の区切りごとの件数・合計・最小・最大・最後の値（ロールアップ）だけを持つ
+  （記録は1分ごとにまとめて書き込み、1分足・1時間足は保存期間を過ぎたら削除する）
+- 読み出しは期間に見合う最も細かい区切りを選び、点数が多ければ LTTB（Largest-Triangle-Three-Buckets）で間引く
+  （期間の長さによらず返す点数は max_points 以下）
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.shared_modules.lazy_import import lazy_import
+from src.shared_modules.state_store import _Transaction
+
+np = lazy_import("numpy")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    series TEXT NOT NULL,
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    minimum REAL NOT NULL,
+    maximum REAL NOT NULL,
+    last REAL NOT NULL,
+    last_at REAL NOT NULL,
+    PRIMARY KEY (series, resolution, bucket)
+) WITHOUT ROWID;
+"""
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+RESOLUTIONS = (MINUTE, HOUR, DAY)
+RESOLUTION_NAMES = {MINUTE: "1m", HOUR: "1h", DAY: "1d"}
+
+# 区切りを日本時間に合わせる（日足は日本時間の0時で区切る）
+TIMEZONE_OFFSET = 9 * 3600
+
+# 間引く前に読む点数の上限（max_points の何倍までなら細かい区切りのまま読んで LTTB で間引くか）
+OVERSAMPLE = 4
+
+# 古い1分足・1時間足を削除する間隔（秒）
+PRUNE_INTERVAL = 3600
+
+AGGREGATES = ("avg", "min", "max", "last")
+
+_UPSERT = (
+    "INSERT INTO rollups (series, resolution, bucket, count, total, minimum, maximum, last, last_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(series, resolution, bucket) DO UPDATE SET "
+    "count = count + excluded.count, total = total + excluded.total, "
+    "minimum = MIN(minimum, excluded.minimum), maximum = MAX(maximum, excluded.maximum), "
+    "last = CASE WHEN excluded.last_at >= last_at THEN excluded.last ELSE last END, "
+    "last_at = MAX(last_at, excluded.last_at)"
+)
+
+
+def bucket_start(timestamp: float, resolution: int) -> int:
+    """時刻が属する区切りの開始時刻（UNIX秒）"""
+    return int((timestamp + TIMEZONE_OFFSET) // resolution) * resolution - TIMEZONE_OFFSET
+
+
+def lttb(x, y, threshold: int):
+    """LTTB で残す点の添字（先頭と末尾は必ず残し、各区間から隣の区間と作る三角形が最大の点を選ぶ）"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    # 区間 i（先頭・末尾を除く点を threshold - 2 個に分けたもの）の範囲と平均
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], edges[:-1]) / sizes
+    mean_y = np.add.reduceat(y[:-1], edges[:-1]) / sizes
+    # 最後の区間の次は末尾の点
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+    
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        area = np.abs((x[a] - next_x[i]) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y[i] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+class TimeSeriesStore:
+    def __init__(self, path: str = "data/timeseries.db", minute_retention_days: int = 14,
+                 hour_retention_days: int = 730):
+        """時系列ストアの初期化（1日足は削除しない）"""
+        self.path = path
+        self.retention = {MINUTE: minute_retention_days * DAY, HOUR: hour_retention_days * DAY, DAY: None}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending: Dict[tuple, list] = {}
+        self._pending_minute: Optional[int] = None
+        self._pruned_at = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn.executescript(SCHEMA)
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """スレッドごとの接続（WALなので読み取りは並行に行える）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def close(self):
+        """未書き込みの値を書き込み、このスレッドの接続を閉じる"""
+        self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
+    # ------------------------------------------------------------------
+    # 記録
+    # ------------------------------------------------------------------
+    def record(self, series: str, value: float, timestamp: Optional[float] = None):
+        """値を記録（1分の区切りが変わったときにまとめて書き込む。NaN・無限大は記録しない）"""
+        self.record_many({series: value}, timestamp)
+    
+    def record_many(self, values: Dict[str, float], timestamp: Optional[float] = None):
+        """同じ時刻の複数の系列を記録"""
+        timestamp = time.time() if timestamp is None else timestamp
+        minute = bucket_start(timestamp, MINUTE)
+        with self._lock:
+            if self._pending_minute is not None and minute != self._pending_minute:
+                self._flush_locked(timestamp)
+            self._pending_minute = minute
+            for series, value in values.items():
+                if value is None or not math.isfinite(value):
+                    continue
+                value = float(value)
+                for resolution in RESOLUTIONS:
+                    key = (series, resolution, bucket_start(timestamp, resolution))
+                    pending = self._pending.get(key)
+                    if pending is None:
+                        self._pending[key] = [1, value, value, value, value, timestamp]
+                    else:
+                        pending[0] += 1
+                        pending[1] += value
+                        pending[2] = min(pending[2], value)
+                        pending[3] = max(pending[3], value)
+                        if timestamp >= pending[5]:
+                            pending[4], pending[5] = value, timestamp
+    
+    def flush(self):
+        """未書き込みの値を書き込む（区切りの途中でも、続きは書き込み済みの値に足し込まれる）"""
+        with self._lock:
+            self._flush_locked(time.time())
+    
+    def _flush_locked(self, now: float):
+        if not self._pending:
+            return
+        rows = [key + tuple(values) for key, values in self._pending.items()]
+        with _Transaction(self.conn) as conn:
+            conn.executemany(_UPSERT, rows)
+            if now - self._pruned_at >= PRUNE_INTERVAL:
+                for resolution, retention in self.retention.items():
+                    if retention is not None:
+                        conn.execute("DELETE FROM rollups WHERE resolution = ? AND bucket < ?",
+                                     (resolution, bucket_start(now - retention, resolution)))
+                self._pruned_at = now
+        self._pending.clear()
+    
+    # ------------------------------------------------------------------
+    # 読み出し
+    # ------------------------------------------------------------------
+    def series(self) -> List[str]:
+        """記録されている系列の名前"""
+        self.flush()
+        rows = self.conn.execute("SELECT DISTINCT series FROM rollups WHERE resolution = ? ORDER BY series", (DAY,))
+        return [row[0] for row in rows]
+    
+    def choose_resolution(self, start: float, end: float, max_points: int, now: Optional[float] = None) -> int:
+        """期間を max_points * OVERSAMPLE 点以下で読める最も細かい区切り（保存期間が期間の先頭を含むもの）"""
+        now = time.time() if now is None else now
+        for resolution in RESOLUTIONS:
+            retention = self.retention[resolution]
+            if retention is not None and start < now - retention:
+                continue
+            if (end - start) / resolution <= max_points * OVERSAMPLE:
+                return resolution
+        return DAY
+    
+    def query(self, series: str, start: Optional[float] = None, end: Optional[float] = None,
+              max_points: int = 500, aggregate: str = "avg") -> Dict:
+        """系列の推移（[[区切りの開始時刻, 値], ...] を max_points 点以下で返す。start を省略すると記録の最初から）"""
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"集計方法は {' / '.join(AGGREGATES)} のいずれかを指定してください: {aggregate}")
+        if max_points < 3:
+            raise ValueError(f"点数は3以上を指定してください: {max_points}")
+        self.flush()
+        now = time.time()
+        end = now if end is None else end
+        if start is None:
+            row = self.conn.execute(
+                "SELECT MIN(bucket) FROM rollups WHERE series = ? AND resolution = ?", (series, DAY)
+            ).fetchone()
+            start = row[0] if row[0] is not None else end
+        resolution = self.choose_resolution(start, end, max_points, now)
+        column = {"avg": "total / count", "min": "minimum", "max": "maximum", "last": "last"}[aggregate]
+        rows = self.conn.execute(
+            f"SELECT bucket, {column} FROM rollups WHERE series = ? AND resolution = ? AND bucket BETWEEN ? AND ? "
+            "ORDER BY bucket",
+            (series, resolution, bucket_start(start, resolution), bucket_start(end, resolution))
+        ).fetchall()
+        if len(rows) > max_points:
+            x = np.array([row[0] for row in rows], dtype=np.float64)
+            y = np.array([row[1] for row in rows], dtype=np.float64)
+            rows = [rows[i] for i in lttb(x, y, max_points)]
+        return {
+            "series": series,
+            "resolution": RESOLUTION_NAMES[resolution],
+            "aggregate": aggregate,
+            "points": [[row[0], row[1]] for row in rows]
+        }
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+トレースモジュール
+
+シグナルから注文・約定までの各段階（株価取得・バンド計算・設定参照・Discord通知・placeOrder・約定通知）の
+所要時間をスパンとして記録する。
+- trace() で1回の判定（例: monitor_stock）を始め、その中の span() が子スパンになる
+  （トレースの外の span() は何もしないので、同じ関数を他の経路から呼んでも記録されない）
+- 約定通知のように別スレッドで後から届くものは bind() で注文IDに文脈を結び付け、complete() で同じトレースに加える
+- プロセスをまたぐ場合は context() を渡して resume() で続ける
+- 時刻は time.perf_counter_ns()（単調増加。Linux・Windows ではプロセス間で同じ時計）
+- 終わったスパンは max_spans 件まで保持し、段階ごとに直近 window 件の所要時間から百分位を求める。
+  start_export() で一定間隔ごとに JSON Lines へ書き出し、scripts/trace_report.py で
+  百分位の表・Chrome のトレース形式（Perfetto 等）・folded 形式（フレームグラフ）にする
+
+無効のときは span() / trace() が共有の何もしないオブジェクトを返すだけになる。
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional
+
+# 後から届く約定通知のために保持しておく注文の文脈の数
+MAX_BOUND = 10000
+
+PERCENTILES = (50, 90, 99)
+
+
+class _NoopSpan:
+    """無効時・トレース外のスパン"""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+    
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attrs", "trace_id", "parent_id", "span_id", "start", "stack")
+    
+    def __init__(self, tracer, name, attrs, trace_id, parent_id):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+    
+    def __enter__(self):
+        self.span_id = self.tracer._next_id()
+        self.stack = self.tracer._stack()
+        self.stack.append((self.trace_id, self.span_id))
+        self.start = time.perf_counter_ns()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        self.stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._finish(self.trace_id, self.span_id, self.parent_id, self.name, self.start, end, self.attrs)
+        return False
+    
+    def set(self, **attrs):
+        """スパンに属性を追加（注文IDなど途中で分かるもの）"""
+        self.attrs.update(attrs)
+
+
+class _Resume:
+    """別プロセス・別スレッドから渡された文脈を親にする"""
+    
+    __slots__ = ("tracer", "context")
+    
+    def __init__(self, tracer, context):
+        self.tracer = tracer
+        self.context = context
+    
+    def __enter__(self):
+        self.tracer._stack().append(tuple(self.context))
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._stack().pop()
+        return False
+
+
+class Tracer:
+    def __init__(self, stream: str = "main", enabled: bool = True, max_spans: int = 20000, window: int = 1000):
+        """トレーサーの初期化（stream は書き出すファイル名）"""
+        self.stream = stream
+        self.enabled = enabled
+        self.window = window
+        self.spans = deque(maxlen=max_spans)
+        self.durations: Dict[str, deque] = {}
+        self.counts: Dict[str, int] = {}
+        self.pid = os.getpid()
+        # スパンIDはトレーサーごとの接頭辞＋連番（複数プロセスの書き出しをまとめても重ならない）
+        self._prefix = os.urandom(4).hex()
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._bound = OrderedDict()
+        self._export_path = None
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _stack(self) -> List:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+    
+    def _next_id(self) -> str:
+        return f"{self._prefix}.{next(self._ids):x}"
+    
+    # ------------------------------------------------------------------
+    # 記録
+    # ------------------------------------------------------------------
+    def trace(self, name: str, **attrs):
+        """トレースを開始（すでにトレース中なら子スパンになる）"""
+        if not self.enabled:
+            return _NOOP
+        stack = self._stack()
+        if stack:
+            return _Span(self, name, attrs, stack[-1][0], stack[-1][1])
+        return _Span(self, name, attrs, os.urandom(8).hex(), None)
+    
+    def span(self, name: str, **attrs):
+        """現在のトレースの子スパン（トレース外では何もしない）"""
+        if not self.enabled:
+            return _NOOP
+        stack = self._stack()
+        if not stack:
+            return _NOOP
+        return _Span(self, name, attrs, stack[-1][0], stack[-1][1])
+    
+    def context(self) -> Optional[tuple]:
+        """現在の文脈（トレースID, スパンID）。トレース外なら None"""
+        if not self.enabled:
+            return None
+        stack = self._stack()
+        return stack[-1] if stack else None
+    
+    def resume(self, context: Optional[Iterable]):
+        """渡された文脈の中で続きを記録（context が None なら何もしない）"""
+        if not self.enabled or context is None:
+            return _NOOP
+        return _Resume(self, context)
+    
+    def bind(self, key, **attrs):
+        """現在の文脈と時刻を key（注文IDなど）に結び付ける（トレース外では何もしない）"""
+        context = self.context()
+        if context is None:
+            return
+        with self._lock:
+            self._bound[key] = (context[0], context[1], time.perf_counter_ns(), attrs)
+            while len(self._bound) > MAX_BOUND:
+                self._bound.popitem(last=False)
+    
+    def complete(self, key, name: str, final: bool = True, **attrs) -> bool:
+        """bind() した時刻から現在までを同じトレースのスパンとして記録（final なら結び付けを解く）"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            bound = self._bound.pop(key, None) if final else self._bound.get(key)
+        if bound is None:
+            return False
+        trace_id, parent_id, start, bound_attrs = bound
+        self._finish(trace_id, self._next_id(), parent_id, name, start, time.perf_counter_ns(),
+                     dict(bound_attrs, **attrs))
+        return True
+    
+    def _finish(self, trace_id, span_id, parent_id, name, start, end, attrs):
+        duration = end - start
+        thread = threading.current_thread()
+        span = {
+            "trace": trace_id, "span": span_id, "parent": parent_id, "name": name,
+            "start_ns": start, "duration_ns": duration, "pid": self.pid,
+            "tid": thread.ident, "thread": thread.name, "attrs": attrs
+        }
+        with self._lock:
+            self.spans.append(span)
+            durations = self.durations.get(name)
+            if durations is None:
+                durations = self.durations[name] = deque(maxlen=self.window)
+            durations.append(duration)
+            self.counts[name] = self.counts.get(name, 0) + 1
+    
+    # ------------------------------------------------------------------
+    # 集計・書き出し
+    # ------------------------------------------------------------------
+    def stage_stats(self) -> Dict[str, Dict]:
+        """段階ごとの直近 window 件の百分位（ミリ秒）と累計の件数"""
+        with self._lock:
+            durations = {name: list(values) for name, values in self.durations.items()}
+            counts = dict(self.counts)
+        return {name: dict(duration_stats(values), count=counts[name]) for name, values in durations.items()}
+    
+    def export(self, path: Optional[str] = None):
+        """保持しているスパンを JSON Lines で書き出す（書き出し中に読まれても壊れないよう置き換える）"""
+        path = path or self._export_path
+        with self._lock:
+            spans = list(self.spans)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, ensure_ascii=False, default=str, separators=(",", ":")) + "\n")
+        os.replace(temp_path, path)
+    
+    def start_export(self, path: str, interval: float = 60.0):
+        """interval 秒ごとに書き出すスレッドを開始（close() で最後に書き出す）"""
+        self._export_path = path
+        if self._thread is None and self.enabled:
+            self._thread = threading.Thread(target=self._export_loop, args=(interval,), name="trace-export",
+                                            daemon=True)
+            self._thread.start()
+    
+    def _export_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.export()
+            except OSError as e:
+                print(f"トレース書き出しエラー: {e}")
+    
+    def close(self):
+        """書き出しスレッドを止め、最後に書き出す"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._export_path and self.spans:
+            self.export()
+
+
+def duration_stats(durations_ns: List[int]) -> Dict:
+    """所要時間（ナノ秒）の百分位・最大・平均（ミリ秒、最近傍順位法）"""
+    values = sorted(durations_ns)
+    if not values:
+        return {}
+    stats = {f"p{q}": values[max(0, -(-len(values) * q // 100) - 1)] / 1e6 for q in PERCENTILES}
+    stats["max"] = values[-1] / 1e6
+    stats["mean"] = sum(values) / len(values) / 1e6
+    return stats
+
+
+def read_spans(directory: str) -> List[Dict]:
+    """書き出されたスパン（全プロセス分）を開始時刻順に読む"""
+    spans = {}
+    if not os.path.isdir(directory):
+        return []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".jsonl"):
+            continue
+        with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    span = json.loads(line)
+                except ValueError:
+                    continue
+                spans[span["span"]] = span
+    return sorted(spans.values(), key=lambda span: span["start_ns"])
+
+
+def stage_summary(spans: Iterable[Dict]) -> Dict[str, Dict]:
+    """段階ごとの件数・百分位（ミリ秒）・合計"""
+    durations: Dict[str, List[int]] = {}
+    for span in spans:
+        durations.setdefault(span["name"], []).append(span["duration_ns"])
+    return {
+        name: dict(duration_stats(values), count=len(values), total=sum(values) / 1e6)
+        for name, values in durations.items()
+    }
+
+
+def chrome_trace(spans: Iterable[Dict]) -> Dict:
+    """Chrome のトレース形式（chrome://tracing・Perfetto・speedscope で開ける）"""
+    events = []
+    threads = {}
+    for span in spans:
+        threads[(span["pid"], span["tid"])] = span["thread"]
+        events.append({
+            "name": span["name"], "cat": span["name"].split(".")[0], "ph": "X",
+            "ts": span["start_ns"] / 1000, "dur": span["duration_ns"] / 1000,
+            "pid": span["pid"], "tid": span["tid"],
+            "args": dict(span["attrs"], trace=span["trace"])
+        })
+    for (pid, tid), name in threads.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def folded_stacks(spans: Iterable[Dict]) -> List[str]:
+    """folded 形式（"親;子;孫 自分だけの時間[µs]"、flamegraph.pl・speedscope で開ける）"""
+    spans = list(spans)
+    by_id = {span["span"]: span for span in spans}
+    child_time: Dict[str, int] = {}
+    for span in spans:
+        if span["parent"] in by_id:
+            child_time[span["parent"]] = child_time.get(span["parent"], 0) + span["duration_ns"]
+    
+    totals: Dict[str, int] = {}
+    for span in spans:
+        path = [span["name"]]
+        parent = by_id.get(span["parent"])
+        while parent is not None:
+            path.append(parent["name"])
+            parent = by_id.get(parent["parent"])
+        own = max(span["duration_ns"] - child_time.get(span["span"], 0), 0)
+        key = ";".join(reversed(path))
+        totals[key] = totals.get(key, 0) + own
+    return [f"{key} {value // 1000}" for key, value in sorted(totals.items())]
+
+
+_tracer = Tracer(enabled=False)
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """プロセス内で共有するトレーサー（open_tracer() するまでは無効）"""
+    return _tracer
+
+
+def open_tracer(config, stream: str) -> Tracer:
+    """設定に従い、プロセスごとのストリーム名でトレーサーを開いて書き出しを開始"""
+    global _tracer
+    settings = config.settings.tracing
+    with _tracer_lock:
+        if _tracer.enabled and _tracer.stream == stream:
+            return _tracer
+        _tracer = Tracer(stream, settings.enabled, settings.max_spans, settings.window)
+        if settings.enabled:
+            _tracer.start_export(os.path.join(settings.directory, f"{stream}.jsonl"), settings.export_interval_seconds)
+        return _tracer
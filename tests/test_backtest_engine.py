@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+レンジ取引バックテストのテスト
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.backtesting.backtest_engine import RangeBacktester
+
+
+def reference_trades(close, period=20, std_dev=2.0, break_stop=0.02):
+    """SatelliteRangeBot と同じ判定を1足ずつ行う参照実装"""
+    frame = pd.DataFrame(close.T)
+    middle = frame.rolling(period).mean().to_numpy().T
+    std = frame.rolling(period).std().to_numpy().T
+    upper, lower = middle + std * std_dev, middle - std * std_dev
+    trades = []
+    for symbol in range(close.shape[0]):
+        position = None
+        for bar in range(close.shape[1]):
+            price = close[symbol, bar]
+            if np.isnan(price) or np.isnan(upper[symbol, bar]):
+                continue
+            if position is None:
+                if price <= lower[symbol, bar]:
+                    position = (bar, price)
+                continue
+            if price >= upper[symbol, bar]:
+                reason = "利確"
+            elif price <= lower[symbol, bar] * 0.98:
+                reason = "損切り"
+            elif price <= position[1] * (1 - break_stop):
+                reason = "レンジブレイク損切り"
+            else:
+                continue
+            trades.append((symbol, position[0], bar, reason))
+            position = None
+        if position is not None:
+            trades.append((symbol, position[0], -1, "期間終了"))
+    return sorted(trades)
+
+
+def random_prices(n_symbols, n_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    return 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_symbols, n_bars)), axis=1))
+
+
+def test_matches_bar_by_bar_rules():
+    """一括評価の結果が1足ずつの判定と一致（欠損・上場前の期間を含む）"""
+    close = random_prices(20, 600)
+    close[3, :120] = np.nan
+    close[5, 300:310] = np.nan
+
+    trades = RangeBacktester(scan_window=4).simulate(close)
+    actual = sorted(
+        (int(symbol), int(entry), -1 if is_open else int(exit_), reason)
+        for symbol, entry, exit_, reason, is_open
+        in zip(trades["symbol"], trades["entry"], trades["exit"], trades["reason"], trades["open"])
+    )
+    assert actual == reference_trades(close)
+
+
+def test_equity_curve_matches_trade_pnl():
+    """最終資産 = 初期資金 + 決済済み損益 + 未決済の含み損益"""
+    close = random_prices(10, 400, seed=1)
+    prices = pd.DataFrame(close.T, index=pd.bdate_range("2020-01-01", periods=400),
+                          columns=[str(7200 + i) for i in range(10)])
+    result = RangeBacktester(commission_rate=0.001, initial_cash=1_000_000).run(prices)
+
+    assert result.metrics["trades"] > 0
+    assert np.isclose(result.equity.iloc[-1], 1_000_000 + result.trades["pnl"].sum())
+    assert set(result.trades["symbol"]) <= set(prices.columns)
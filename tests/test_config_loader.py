@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+設定ローダー（スナップショット・再読み込み）のテスト
+"""
+
+import os
+
+import pytest
+
+from src.shared_modules.config_loader import ConfigLoader
+from src.shared_modules.config_schema import ConfigValidationError
+
+CONFIG_YAML = """
+portfolio_ratios:
+  index: 0.6
+  dividend: 0.3
+  range: 0.1
+index_bot:
+  ticker: "2559"
+  monthly_investment: {monthly}
+ib_gateway:
+  host: "127.0.0.1"
+  port: 4002
+range_bot:
+  bollinger_period: 20
+  bollinger_std_dev: 2.0
+  stop_loss_percentage_on_break: 0.02
+rebalance:
+  nisa_strategies: ["index", "dividend"]
+"""
+
+
+def write_config(path, monthly=100000, text=None):
+    path.write_text(text if text is not None else CONFIG_YAML.format(monthly=monthly), encoding="utf-8")
+    # 更新時刻の粒度に依存しないよう明示的に進める
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def loader(tmp_path):
+    config_path = tmp_path / "config.yaml"
+    write_config(config_path)
+    return ConfigLoader(str(config_path), env_path=str(tmp_path / ".env"))
+
+
+def test_snapshot_lookup_and_immutability():
+    """ドット記法の参照はスナップショットから取得し、返した値は変更できない"""
+    config = ConfigLoader.from_dict({"a": {"b": {"c": 1}}, "items": [1, 2]})
+    assert config.get("a.b.c") == 1
+    assert config.get("a.b")["c"] == 1
+    assert config.get("a.x", "default") == "default"
+    assert config.get("items") == (1, 2)
+    with pytest.raises(TypeError):
+        config.get("a.b")["c"] = 2
+
+
+def test_loads_without_env_vars(loader):
+    """環境変数が無くても設定ファイルの内容は読み込まれる"""
+    assert loader.get("index_bot.monthly_investment") == 100000
+    assert loader.get("ib_account.port") == 4002
+    assert loader.get("rebalance.nisa_strategies") == ("index", "dividend")
+    assert loader.settings.range_bot.bollinger_std_dev == 2.0
+    assert loader.settings.ib_account.port == 4002
+
+
+def test_reload_notifies_changed_keys(loader, tmp_path):
+    """変更されたキーだけをリスナーに通知"""
+    changes = []
+    loader.add_reload_listener(changes.append)
+    assert not loader.check_for_changes()
+
+    write_config(tmp_path / "config.yaml", monthly=150000)
+    assert loader.check_for_changes()
+    assert changes == [["index_bot.monthly_investment"]]
+    assert loader.get("index_bot.monthly_investment") == 150000
+
+
+def test_reload_swaps_one_state(loader, tmp_path):
+    """辞書・スナップショット・型付き設定は1つの参照でまとめて差し替わり、取得済みの一式は変わらない"""
+    before = loader.state
+    write_config(tmp_path / "config.yaml", monthly=150000)
+    loader.reload()
+
+    after = loader.state
+    assert after is not before
+    assert before.raw["index_bot"]["monthly_investment"] == 100000
+    assert before.snapshot["index_bot.monthly_investment"] == 100000
+    assert before.settings.index_bot.monthly_investment == 100000
+    assert after.raw["index_bot"]["monthly_investment"] == 150000
+    assert after.settings.index_bot.monthly_investment == 150000
+    assert loader.config is after.raw and loader.snapshot is after.snapshot and loader.settings is after.settings
+
+
+def test_invalid_reload_keeps_previous_snapshot(loader, tmp_path):
+    """壊れた設定・検証に通らない設定は反映しない"""
+    changes = []
+    loader.add_reload_listener(changes.append)
+
+    write_config(tmp_path / "config.yaml", text="portfolio_ratios: [unclosed")
+    loader.check_for_changes()
+    write_config(tmp_path / "config.yaml", text=CONFIG_YAML.format(monthly=1).replace("0.6", "0.9"))
+    loader.check_for_changes()
+
+    assert changes == []
+    assert loader.get("index_bot.monthly_investment") == 100000
+
+
+def test_override_survives_reload(loader, tmp_path):
+    """実行中の上書きは再読み込み後も維持される"""
+    loader.set_override("portfolio_ratios", {"index": 0.5, "dividend": 0.3, "range": 0.2})
+    write_config(tmp_path / "config.yaml", monthly=120000)
+    loader.reload()
+    assert loader.get("portfolio_ratios.index") == 0.5
+    assert loader.get("index_bot.monthly_investment") == 120000
+
+
+def test_schema_reports_every_error():
+    """未知のキー・必須項目の欠落・型・範囲の誤りをまとめて報告"""
+    config = ConfigLoader.from_dict({
+        "portfolio_ratios": {"index": 0.6, "dividend": 0.3, "range": 0.1},
+        "index_bot": {"ticker": 2559, "monthly_investment": 100000},
+        "range_bot": {"bollinger_period": 20, "bolinger_std_dev": 2.0, "stop_loss_percentage_on_break": 0.02},
+        "execution": {"mode": "proc"},
+        "metrics": {"http_port": "9108"}
+    })
+    with pytest.raises(ConfigValidationError) as excinfo:
+        config.settings
+    assert excinfo.value.errors == [
+        "range_bot.bolinger_std_dev: 未知の設定項目です",
+        "range_bot.bollinger_std_dev: 必須の設定項目がありません",
+        "metrics.http_port: 整数で指定してください（'9108'）",
+        "execution.mode: thread / process のいずれかを指定してください（'proc'）"
+    ]
+
+
+def test_repository_config_is_valid():
+    """同梱の config.yaml がスキーマに通る"""
+    settings = ConfigLoader("src/config/config.yaml", env_path="/nonexistent/.env").settings
+    assert settings.rebalance.lot_sizes["2559"] == 1
+    assert settings.risk_assessment.profiles["balanced"].as_dict() == {"index": 0.6, "dividend": 0.3, "range": 0.1}
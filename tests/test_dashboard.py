@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ダッシュボード（変わったセクションだけの配信、タブ数によらない読み込み回数、SSE）のテスト
+"""
+
+import http.client
+import json
+
+from dashboard.app import DashboardFeed, DashboardServer
+from src.shared_modules.job_metrics import JobMetrics, job_health_from_text
+from src.shared_modules.nisa_ledger import NISALedger
+from src.shared_modules.position_journal import PositionJournal
+from src.shared_modules.state_store import StateStore
+
+
+def make_feed(tmp_path, **kwargs):
+    store = StateStore(str(tmp_path / "state.db"))
+    writer = NISALedger(str(tmp_path / "nisa_ledger"))
+    journal = PositionJournal(str(tmp_path / "range_positions.jsonl"))
+    quotes = {"7203": (2600.0, 0.0)}
+    feed = DashboardFeed(store, NISALedger(str(tmp_path / "nisa_ledger"), read_only=True), journal.path,
+                         quotes=lambda: quotes, annual_limit=3_600_000, lifetime_limit=18_000_000, **kwargs)
+    return feed, store, writer, journal, quotes
+
+
+def test_only_changed_sections_are_read_and_sent(tmp_path):
+    """変わっていないデータは読み直さず、変わったセクションだけを全タブに同じ内容で送る"""
+    feed, store, writer, journal, quotes = make_feed(tmp_path)
+    first = feed.snapshot()
+    tabs = [feed.subscribe() for _ in range(10)]
+    assert set(first["sections"]) == {"positions", "nisa", "jobs", "trades"}
+    reads = dict(feed.stats)
+    assert feed.refresh() == {}
+    assert {key: feed.stats[key] for key in ("holdings_reads", "journal_reads", "fills_reads")} == {
+        key: reads[key] for key in ("holdings_reads", "journal_reads", "fills_reads")}
+
+    journal.record_open("7203", 2500.0, 100)
+    journal.sync()
+    writer.append(250_000, symbol="7203")
+    changed = feed.refresh()
+    assert set(changed) == {"positions", "nisa"}
+    assert changed["positions"] == [{"strategy": "range", "symbol": "7203", "quantity": 100, "cost": 250000.0,
+                                     "since": changed["positions"][0]["since"], "price": 2600.0,
+                                     "value": 260000.0, "pnl": 10000.0}]
+    assert changed["nisa"]["annual_usage"] == 250_000 and changed["nisa"]["lifetime_ratio"] == 250_000 / 18_000_000
+    assert feed.stats["journal_reads"] == reads["journal_reads"] + 1
+    assert feed.stats["holdings_reads"] == reads["holdings_reads"] + 1
+
+    # 株価だけが変わったときは建玉を読み直さずに評価額を計算し直す
+    quotes["7203"] = (2400.0, 0.0)
+    assert feed.refresh()["positions"][0]["pnl"] == -10000.0
+    assert feed.stats["journal_reads"] == reads["journal_reads"] + 1
+
+    store.record_fill("range", "7203", "BUY", 100, 2500.0, order_id=1)
+    assert set(feed.refresh()) == {"trades"}
+    assert feed.stats["fills_reads"] == reads["fills_reads"] + 1
+
+    for tab in tabs:
+        messages = [tab.queue.get_nowait() for _ in range(tab.queue.qsize())]
+        assert [sorted(message["sections"]) for message in messages] == [
+            ["nisa", "positions"], ["positions"], ["trades"]]
+        assert [message["version"] for message in messages] == [2, 3, 4]
+
+
+def test_snapshot_refreshes_without_open_tabs(tmp_path):
+    """タブが無く確認スレッドが読み直さなくても、確認が古ければ snapshot() が読み直す"""
+    feed, store, writer, journal, quotes = make_feed(tmp_path)
+    assert feed.snapshot()["sections"]["nisa"]["annual_usage"] == 0
+    writer.append(250_000, symbol="7203")
+
+    refreshes = feed.stats["refreshes"]
+    assert feed.snapshot()["sections"]["nisa"]["annual_usage"] == 0
+    assert feed.stats["refreshes"] == refreshes
+
+    feed.updated_at -= feed.refresh_interval + 1
+    assert feed.snapshot()["sections"]["nisa"]["annual_usage"] == 250_000
+    assert feed.stats["refreshes"] == refreshes + 1
+    journal.close()
+
+
+def test_job_health_roundtrips_through_textfile():
+    """別プロセスのダッシュボードはメトリクスのテキストから同じジョブ状態を得る"""
+    metrics = JobMetrics()
+    metrics.instrument("range_trading", lambda: None, budget_seconds=60)()
+    try:
+        with metrics.track_job("dividend_screening"):
+            raise ValueError("x")
+    except ValueError:
+        pass
+    metrics.record_misfire("dividend_screening")
+    health = metrics.job_health()
+    assert health["range_trading"]["success"] == 1 and health["range_trading"]["budget"] == 60
+    assert health["dividend_screening"]["error"] == 1 and health["dividend_screening"]["misfires"] == 1
+    parsed = job_health_from_text(metrics.render_prometheus())
+    for job, values in health.items():
+        for key, value in values.items():
+            assert parsed[job][key] == (float(f"{value:.6g}") if isinstance(value, float) else value)
+
+
+def read_event(response):
+    """SSE のイベントを1つ読む（keepalive のコメントは読み飛ばす）"""
+    fields = {}
+    while True:
+        line = response.fp.readline().decode("utf-8").rstrip("\n")
+        if not line:
+            if fields:
+                return fields["event"], json.loads(fields["data"])
+            continue
+        if line.startswith(":"):
+            continue
+        name, _, value = line.partition(": ")
+        fields[name] = value
+
+
+def test_server_pushes_deltas_to_every_tab(tmp_path):
+    """各タブは接続時に全体を受け取り、その後は変わったセクションだけを受け取る"""
+    feed, store, _, _, _ = make_feed(tmp_path, refresh_interval=60)
+    server = DashboardServer(feed, port=0, max_clients=3).start()
+    host, port = server.address[:2]
+    try:
+        connection = http.client.HTTPConnection(host, port, timeout=10)
+        connection.request("GET", "/")
+        page = connection.getresponse().read().decode("utf-8")
+        assert "EventSource" in page
+
+        tabs = []
+        for _ in range(3):
+            connection = http.client.HTTPConnection(host, port, timeout=10)
+            connection.request("GET", "/events")
+            response = connection.getresponse()
+            assert response.getheader("Content-Type").startswith("text/event-stream")
+            event, message = read_event(response)
+            assert event == "snapshot" and message["sections"]["trades"] == []
+            tabs.append(response)
+
+        connection = http.client.HTTPConnection(host, port, timeout=10)
+        connection.request("GET", "/events")
+        assert connection.getresponse().status == 503
+
+        store.record_fill("dividend", "8306", "BUY", 1, 1500.0, order_id=7)
+        feed.refresh()
+        for response in tabs:
+            event, message = read_event(response)
+            assert event == "delta" and list(message["sections"]) == ["trades"]
+            assert message["sections"]["trades"][0]["symbol"] == "8306"
+        assert feed.stats["fills_reads"] == 2
+    finally:
+        server.stop()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+イベント駆動バックテスト（実際のBotを疑似ブローカーで動かす）のテスト
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.backtesting.event_backtest import EventDrivenBacktest, HistoricalDataSource, SimulatedClock
+from src.shared_modules.config_loader import ConfigLoader
+from src.shared_modules.event_journal import EventJournalReader
+
+CONFIG = {
+    "portfolio_ratios": {"index": 0.6, "dividend": 0.3, "range": 0.1},
+    "index_bot": {"ticker": "2559", "monthly_investment": 100000},
+    "range_bot": {"bollinger_period": 5, "bollinger_std_dev": 1.0, "stop_loss_percentage_on_break": 0.02},
+    "pre_trade": {"max_range_positions": 5}
+}
+
+
+def synthetic_close(days, seed=0):
+    """レンジ内で上下する銘柄と、積立対象のETF"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2024-01-01", periods=days)
+    wave = 1000 * (1 + 0.05 * np.sin(np.arange(days) * 0.9))
+    return pd.DataFrame({
+        "7203": wave * np.exp(rng.normal(0, 0.005, days)),
+        "6758": wave[::-1] * np.exp(rng.normal(0, 0.005, days)),
+        "2559": np.linspace(15000, 16000, days)
+    }, index=index)
+
+
+def test_session_prices_never_look_ahead():
+    """場中の株価は始値から終値へ動き、当日の足は現在値までしか見えない"""
+    clock = SimulatedClock(datetime(2024, 1, 2, 8, 0))
+    bars = {"7203": pd.DataFrame({
+        "Open": [100.0, 110.0], "High": [105.0, 130.0], "Low": [95.0, 105.0], "Close": [102.0, 120.0],
+        "Volume": [0.0, 0.0]
+    }, index=pd.to_datetime(["2024-01-01", "2024-01-02"]))}
+    source = HistoricalDataSource(bars, clock, quote_interval_minutes=60)
+
+    assert source.price("7203") == 102.0
+    assert len(source.history("7203", "5d")) == 1
+    clock.set(datetime(2024, 1, 2, 12, 30))
+    assert source.price("7203") == 115.0
+    today = source.history("7203", "5d").iloc[-1]
+    assert (today["High"], today["Low"], today["Close"]) == (115.0, 110.0, 115.0)
+    clock.set(datetime(2024, 1, 2, 16, 0))
+    assert source.history("7203", "5d")["High"].iloc[-1] == 130.0
+
+
+def test_runs_real_bots_against_simulated_broker(tmp_path):
+    """スクリーニング → 場中の売買 → 積立まで本番のスケジュールで動き、省略しても結果は同じ"""
+    close = synthetic_close(25)
+    results = []
+    for skip_unchanged in (True, False):
+        source = HistoricalDataSource.from_close(close, SimulatedClock(datetime(2024, 1, 1)), quote_interval_minutes=30)
+        backtest = EventDrivenBacktest(source, ConfigLoader.from_dict(CONFIG), initial_cash=5_000_000,
+                                       universes={"range": ["7203", "6758"], "dividend": []},
+                                       skip_unchanged=skip_unchanged, workdir=str(tmp_path / str(skip_unchanged)))
+        results.append(backtest.run(datetime(2024, 1, 1), datetime(2024, 2, 1, 23, 59)))
+
+    result = results[0]
+    range_fills = result.fills[result.fills["strategy"] == "range"]
+    assert {"BUY", "SELL"} <= set(range_fills["side"])
+    assert (result.fills["strategy"] == "index").sum() == 2
+    assert any("スケジューラー" in message["description"] for message in result.messages)
+    assert result.jobs["range_trading"]["skipped"] > 0
+    assert np.isclose(result.equity.iloc[-1], result.metrics["final_equity"])
+
+    pd.testing.assert_frame_equal(result.fills, results[1].fills)
+
+    # イベントジャーナルの時刻は疑似時刻
+    events = EventJournalReader(str(tmp_path / "True" / "events")).query(kinds=["fill"])
+    assert len(events) == len(result.fills)
+    assert all(datetime(2024, 1, 1).timestamp() <= event["ts"] <= datetime(2024, 2, 1, 23, 59).timestamp()
+               for event in events)
+
+
+def test_nisa_limit_stop_flag_stays_in_workdir(tmp_path, monkeypatch):
+    """NISA年間枠に達すると作業ディレクトリの STOP.flag で停止し、実行中のディレクトリには何も作らない"""
+    cwd = tmp_path / "cwd"
+    cwd.mkdir()
+    monkeypatch.chdir(cwd)
+    config = dict(CONFIG, nisa_settings={"annual_limit": 200000})
+    source = HistoricalDataSource.from_close(synthetic_close(25), SimulatedClock(datetime(2024, 1, 1)),
+                                             quote_interval_minutes=30)
+    backtest = EventDrivenBacktest(source, ConfigLoader.from_dict(config), initial_cash=5_000_000,
+                                   universes={"range": ["7203", "6758"], "dividend": []},
+                                   workdir=str(tmp_path / "work"))
+    result = backtest.run(datetime(2024, 1, 1), datetime(2024, 2, 1, 23, 59))
+
+    assert result.stop_reason == "2024-02-01 09:30 に停止"
+    assert (tmp_path / "work" / "STOP.flag").exists()
+    assert list(cwd.iterdir()) == []
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+イベントジャーナルのテスト
+"""
+
+import os
+
+from src.shared_modules.event_journal import EventJournal, EventJournalReader
+
+
+def test_query_by_symbol_strategy_kind_and_time(tmp_path):
+    """インデックスブロックをまたいだ絞り込みと複数ストリームの時刻順マージ"""
+    main = EventJournal(str(tmp_path), "main", block_size=4, flush_interval=60)
+    gateway = EventJournal(str(tmp_path), "gateway", block_size=4, flush_interval=60)
+    for i in range(10):
+        main.record("signal", strategy="range", symbol="6758" if i % 2 else "8306", price=1000 + i, side="BUY",
+                    ts=100.0 + i, reason=f"signal-{i}")
+    gateway.record("order", strategy="range", symbol="6758", order_id=42, quantity=100, side="BUY", ts=105.5)
+    gateway.record("fill", strategy="range", symbol="6758", order_id=42, quantity=100, price=1005, ts=106.5)
+    main.close()
+    gateway.close()
+    assert os.path.getsize(tmp_path / "main.idx") == 2 * 28
+
+    reader = EventJournalReader(str(tmp_path))
+    assert reader.streams == ["gateway", "main"]
+    assert reader.count(symbols=["6758"]) == 7
+
+    events = reader.query(symbols=["6758"], start=104.0, end=108.0)
+    assert [(e["kind"], e["ts"]) for e in events] == [
+        ("signal", 105.0), ("order", 105.5), ("fill", 106.5), ("signal", 107.0)
+    ]
+    assert events[0]["details"] == {"reason": "signal-5"} and events[0]["side"] == "BUY"
+    assert events[1]["order_id"] == 42 and events[1]["price"] is None
+
+    latest = reader.query(kinds=["signal"], limit=2)
+    assert [e["ts"] for e in latest] == [108.0, 109.0]
+    assert reader.query(symbols=["9999"]) == []
+    assert reader.count(strategies=["dividend"]) == 0
+
+
+def test_torn_tail_is_dropped_on_reopen(tmp_path):
+    """書きかけのレコード・詳細は再オープン時に切り詰めて追記を続ける"""
+    journal = EventJournal(str(tmp_path), "main", block_size=4, flush_interval=60)
+    for i in range(5):
+        journal.record("notification", ts=float(i), message=f"m{i}")
+    journal.close()
+
+    # 詳細の末尾が欠けた状態を再現
+    with open(tmp_path / "main.pay", "rb+") as f:
+        f.truncate(os.path.getsize(tmp_path / "main.pay") - 3)
+    with open(tmp_path / "main.rec", "ab") as f:
+        f.write(b"\x00" * 10)
+
+    journal = EventJournal(str(tmp_path), "main", block_size=4, flush_interval=60)
+    assert journal.count == 4 and journal.indexed_blocks == 1
+    journal.record("stop", ts=10.0, reason="test")
+    journal.close()
+
+    events = EventJournalReader(str(tmp_path)).query()
+    assert [e["kind"] for e in events] == ["notification"] * 4 + ["stop"]
+    assert events[-1]["details"] == {"reason": "test"}
+
+
+def test_torn_string_table_is_truncated_on_reopen(tmp_path):
+    """文字列辞書の書きかけの末尾を切り詰め、次の起動の戦略名・銘柄コードが正しく読める"""
+    journal = EventJournal(str(tmp_path), "main", flush_interval=60)
+    journal.record("signal", strategy="range", symbol="7203", ts=1.0)
+    journal.close()
+
+    # 長さ（99バイト）だけ書いて中身が欠けた状態を再現
+    with open(tmp_path / "main.str", "ab") as f:
+        f.write(b"\x63\x00" + b"99")
+
+    journal = EventJournal(str(tmp_path), "main", flush_interval=60)
+    journal.record("order", strategy="dividend", symbol="8306", ts=2.0)
+    journal.close()
+
+    events = EventJournalReader(str(tmp_path)).query()
+    assert [(e["strategy"], e["symbol"]) for e in events] == [("range", "7203"), ("dividend", "8306")]
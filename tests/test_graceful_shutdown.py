@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+グレースフルシャットダウンのテスト
+"""
+
+import threading
+import time
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from src.shared_modules.discord_logger import DiscordLogger
+from src.shared_modules.graceful_shutdown import GracefulShutdown
+from src.shared_modules.job_metrics import JobMetrics
+
+
+def test_shutdown_drains_running_job_before_flush_and_disconnect():
+    """実行中のジョブが終わってから書き出し・切断が行われる"""
+    metrics = JobMetrics()
+    scheduler = BackgroundScheduler()
+    started = threading.Event()
+    events = []
+
+    def slow_job():
+        started.set()
+        time.sleep(0.3)
+        events.append("job_done")
+
+    scheduler.add_job(metrics.instrument("range_trading", slow_job), "date", id="range_trading")
+    scheduler.start()
+    assert started.wait(5)
+
+    shutdown = GracefulShutdown(scheduler, metrics, drain_timeout=5, ack_timeout=1)
+    shutdown.register_flush_hook("journal", lambda: events.append("journal"))
+    report = shutdown.run(
+        wait_for_orders=lambda timeout: [],
+        disconnect=lambda: events.append("disconnect")
+    )
+
+    assert events == ["job_done", "journal", "disconnect"]
+    assert [entry["phase"] for entry in report] == [
+        "stop_scheduling", "drain_jobs", "order_acks", "flush:journal", "disconnect"
+    ]
+    assert all(entry["ok"] for entry in report)
+    assert not scheduler.running
+    assert "合計" in shutdown.format_report()
+
+
+def test_shutdown_reports_drain_timeout_and_unacked_orders():
+    """期限切れのジョブや未確認の注文はフェーズの失敗として報告される"""
+    metrics = JobMetrics()
+    scheduler = BackgroundScheduler()
+    release = threading.Event()
+    started = threading.Event()
+
+    def hung_job():
+        started.set()
+        release.wait(5)
+
+    scheduler.add_job(metrics.instrument("dividend_screening", hung_job), "date")
+    scheduler.start()
+    assert started.wait(5)
+
+    shutdown = GracefulShutdown(scheduler, metrics, drain_timeout=0.2)
+    report = {entry["phase"]: entry for entry in shutdown.run(wait_for_orders=lambda timeout: [101])}
+    release.set()
+
+    assert not report["drain_jobs"]["ok"]
+    assert not report["order_acks"]["ok"]
+
+
+def test_discord_flush_waits_for_queued_messages():
+    """非同期送信のキューがflushで送信し終わる"""
+    discord = DiscordLogger("https://example.invalid/webhook", async_send=True)
+    sent = []
+
+    def slow_post(payload):
+        time.sleep(0.05)
+        sent.append(payload["embeds"][0]["description"])
+        return True
+
+    discord._post = slow_post
+    for i in range(3):
+        assert discord.info(f"message {i}")
+
+    assert discord.flush(timeout=5)
+    assert sent == ["message 0", "message 1", "message 2"]
+    assert discord.close()
+    assert discord.pending_count() == 0
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+テクニカル指標（累積和による移動平均・標準偏差、ブロック累積による最高値・最安値）のテスト
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.bots import satellite_range_bot
+from src.shared_modules.config_loader import ConfigLoader
+from src.shared_modules.indicators import (
+    atr, bollinger_bands, range_ratio, rolling_max, rolling_mean_std, rolling_min, sma
+)
+from src.shared_modules.position_journal import PositionJournal
+from src.shared_modules.state_store import StateStore
+
+
+def random_close(n_symbols=20, n_bars=600, seed=0):
+    rng = np.random.default_rng(seed)
+    return 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_symbols, n_bars)), axis=1))
+
+
+def test_matches_pandas_rolling():
+    """pandas の rolling と 1/256 円以内で一致し、NaN になる足も同じ"""
+    close = random_close()
+    close[3, 200] = np.nan
+    frame = pd.DataFrame(close.T)
+    middle, std = rolling_mean_std(close, 20)
+    expected_middle = frame.rolling(20).mean().to_numpy().T
+    expected_std = frame.rolling(20).std().to_numpy().T
+    np.testing.assert_allclose(middle, expected_middle, rtol=0, atol=1 / 256)
+    np.testing.assert_allclose(std, expected_std, rtol=0, atol=1 / 256)
+    np.testing.assert_array_equal(sma(close, 20), middle)
+
+    high, low = close * 1.01, close * 0.99
+    np.testing.assert_array_equal(rolling_max(high, 50), frame.mul(1.01).rolling(50).max().to_numpy().T)
+    np.testing.assert_array_equal(rolling_min(low, 50), frame.mul(0.99).rolling(50).min().to_numpy().T)
+    windows = np.lib.stride_tricks.sliding_window_view(close, 126, axis=-1)
+    expected_ratio = (windows.max(axis=-1) - windows.min(axis=-1)) / windows.min(axis=-1)
+    np.testing.assert_array_equal(range_ratio(close, close, 126)[:, 125:], expected_ratio)
+
+    previous = np.concatenate([close[:, :1], close[:, :-1]], axis=1)
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - previous), np.abs(low - previous)))
+    expected_atr = pd.DataFrame(true_range.T).rolling(14).mean().to_numpy().T
+    np.testing.assert_allclose(atr(high, low, close, 14), expected_atr, rtol=0, atol=1 / 256)
+
+
+def test_values_do_not_depend_on_earlier_bars():
+    """同じ窓なら、直近の足だけで計算しても全期間で計算してもビット単位で同じ"""
+    close = random_close()
+    upper, middle, lower = bollinger_bands(close, 20, 2.0)
+    for end in (20, 137, 600):
+        recent = bollinger_bands(close[:, end - 30 if end > 30 else 0:end], 20, 2.0)
+        for full, part in zip((upper, middle, lower), recent):
+            np.testing.assert_array_equal(part[:, -1], full[:, end - 1])
+
+    # 1銘柄の1次元配列でも同じ
+    np.testing.assert_array_equal(bollinger_bands(close[5], 20, 2.0)[0], upper[5])
+    high, low = close * 1.01, close * 0.99
+    np.testing.assert_array_equal(atr(high[:, -40:], low[:, -40:], close[:, -40:], 14)[:, -1],
+                                  atr(high, low, close, 14)[:, -1])
+
+
+def test_live_bot_bands_match_backtest(tmp_path, monkeypatch):
+    """Bot が直近の株価で計算したバンドは、バックテストが全期間で計算したその日のバンドと同じ"""
+    config = ConfigLoader("src/config/config.yaml", env_path="/nonexistent/.env")
+    monkeypatch.chdir(tmp_path)
+    close = random_close(1, 400)[0]
+    history = pd.DataFrame({"Close": close[-30:]})
+
+    class FakeTicker:
+        def __init__(self, symbol):
+            pass
+
+        def history(self, period="1mo"):
+            return history
+
+    class FakeYFinance:
+        Ticker = FakeTicker
+
+    monkeypatch.setattr(satellite_range_bot, "yf", FakeYFinance)
+    bot = satellite_range_bot.SatelliteRangeBot(
+        config, None, None, state_store=StateStore(str(tmp_path / "state.db")),
+        position_journal=PositionJournal(str(tmp_path / "range_positions.jsonl"))
+    )
+    bands = bot.calculate_bollinger_bands("7203")
+
+    settings = config.settings.range_bot
+    upper, middle, lower = bollinger_bands(close, settings.bollinger_period, settings.bollinger_std_dev)
+    assert bands == {"upper": upper[-1], "middle": middle[-1], "lower": lower[-1]}
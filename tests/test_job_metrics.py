@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ジョブ計測モジュールのテスト
+"""
+
+import pytest
+
+from src.shared_modules.job_metrics import JobMetrics
+
+
+def test_instrument_records_duration_and_outcome():
+    """ジョブの実行時間と成功回数が記録される"""
+    metrics = JobMetrics()
+    job = metrics.instrument("range_trading", lambda: "ok", budget_seconds=60)
+
+    assert job() == "ok"
+    assert job() == "ok"
+
+    assert metrics.job_duration["range_trading"].count == 2
+    assert metrics.job_runs[("range_trading", "success")] == 2
+    assert metrics.in_flight_count() == 0
+
+    text = metrics.render_prometheus()
+    assert 'chimera_job_duration_seconds_count{job="range_trading"} 2' in text
+    assert 'chimera_job_budget_seconds{job="range_trading"} 60' in text
+    assert 'chimera_job_budget_utilization_ratio{job="range_trading"}' in text
+
+
+def test_exceptions_and_handled_errors_are_counted():
+    """送出された例外とDiscord通知済みのエラーが区別して集計される"""
+    metrics = JobMetrics()
+
+    def failing():
+        raise ValueError("boom")
+
+    def handled():
+        metrics.note_handled_error("レンジ取引エラー")
+
+    with pytest.raises(ValueError):
+        metrics.instrument("rebalance", failing)()
+    metrics.instrument("screening", handled)()
+
+    # ジョブ外で通知されたエラーはどのジョブにも紐づかない
+    metrics.note_handled_error("ジョブ外のエラー")
+
+    assert metrics.job_runs[("rebalance", "error")] == 1
+    assert metrics.job_exceptions[("rebalance", "ValueError")] == 1
+    assert metrics.job_runs[("screening", "error")] == 1
+    assert metrics.job_exceptions[("screening", "handled")] == 1
+    assert len(metrics.job_exceptions) == 2
+
+
+def test_fetch_latency_and_textfile(tmp_path):
+    """銘柄ごとの取得レイテンシがヒストグラムとして出力される"""
+    metrics = JobMetrics()
+    with metrics.time_fetch("7203", "quote"):
+        pass
+    metrics.observe_fetch("7203", 0.3, "quote")
+    metrics.record_misfire("range_trading")
+    metrics.record_overlap("range_trading")
+
+    path = tmp_path / "metrics" / "chimera.prom"
+    metrics.write_textfile(str(path))
+    text = path.read_text(encoding="utf-8")
+
+    assert 'chimera_symbol_fetch_duration_seconds_count{source="quote",symbol="7203"} 2' in text
+    assert 'chimera_symbol_fetch_duration_seconds_bucket{source="quote",symbol="7203",le="0.25"} 1' in text
+    assert 'chimera_job_misfires_total{job="range_trading"} 1' in text
+    assert 'chimera_job_overlaps_total{job="range_trading"} 1' in text
+
+
+def test_worker_fetch_latency_merges_into_supervisor():
+    """ワーカーで取り出した取得レイテンシは監督プロセスの値に加算され、二重に数えない"""
+    worker = JobMetrics()
+    worker.observe_fetch("8306", 0.02, "quote")
+    worker.observe_fetch("8306", 3.0, "quote")
+    supervisor = JobMetrics()
+    supervisor.observe_fetch("8306", 0.02, "quote")
+
+    supervisor.merge_fetch_observations(worker.take_fetch_observations())
+    supervisor.merge_fetch_observations(worker.take_fetch_observations())
+
+    histogram = supervisor.fetch_duration[("quote", "8306")]
+    assert histogram.count == 3 and histogram.total == pytest.approx(3.04)
+    assert histogram.cumulative_counts()[1] == 2 and histogram.cumulative_counts()[-1] == 3
+    assert worker.fetch_duration == {}
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+遅延インポートのテスト
+"""
+
+import os
+import subprocess
+import sys
+
+from src.shared_modules.lazy_import import LazyModule, lazy_import
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_lazy_module_loads_on_first_attribute_access():
+    """属性アクセスまで実モジュールを読み込まない"""
+    module = LazyModule("colorsys")
+    assert not module.is_loaded
+
+    assert module.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert module.is_loaded
+
+
+def test_lazy_import_returns_loaded_module():
+    """読み込み済みのモジュールはそのまま返す"""
+    assert lazy_import("os") is os
+
+
+def test_emergency_stop_does_not_import_heavy_dependencies():
+    """緊急停止スクリプトの起動時に重い依存を読み込まない"""
+    code = (
+        "import sys\n"
+        "import emergency_stop\n"
+        "emergency_stop.EmergencyStop().check_stop_flag()\n"
+        "print('heavy=' + ','.join(m for m in ('pandas', 'yfinance', 'requests', 'bs4', 'ibapi') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "heavy="
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+モンテカルロ・シミュレーション（ブロック・ブートストラップ、プロファイル別の想定リスク）のテスト
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.backtesting.monte_carlo import MonteCarloEngine, block_bootstrap_indices
+from src.backtesting.portfolio_simulator import save_sleeve_returns
+from src.shared_modules.config_loader import ConfigLoader
+from src.shared_modules.risk_assessor import RiskAssessor
+
+PROFILES = {
+    "stable": {"index": 0.7, "dividend": 0.25, "range": 0.05},
+    "aggressive": {"index": 0.5, "dividend": 0.3, "range": 0.2}
+}
+
+
+def sleeve_returns(n_months=240, seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal([0.006, 0.005, 0.002], [0.045, 0.04, 0.02], (n_months, 3))
+    return pd.DataFrame(returns, index=pd.date_range("2005-01-31", periods=n_months, freq="ME"),
+                        columns=["index", "dividend", "range"])
+
+
+def test_block_bootstrap_keeps_consecutive_months():
+    """ブロック内は連続した月（履歴の最後から先頭へ循環）"""
+    indices = block_bootstrap_indices(50, 200, 30, block_size=12, rng=np.random.default_rng(0))
+    assert indices.shape == (200, 30)
+    assert indices.min() >= 0 and indices.max() < 50
+    steps = (np.diff(indices, axis=1) % 50)[:, [i for i in range(29) if (i + 1) % 12]]
+    assert (steps == 1).all()
+
+
+def test_profiles_are_simulated_in_one_pass():
+    """一括計算の結果はプロファイルを1つずつ計算した結果と同じで、1万経路でも1秒未満"""
+    returns = sleeve_returns()
+    engine = MonteCarloEngine(returns, n_paths=10000, horizon_months=120)
+    start = time.perf_counter()
+    together = engine.simulate(PROFILES).metrics()
+    assert time.perf_counter() - start < 1.0
+
+    alone = MonteCarloEngine(returns, n_paths=10000, horizon_months=120).simulate(
+        {"aggressive": PROFILES["aggressive"]}).metrics()
+    pd.testing.assert_series_equal(together.loc["aggressive"], alone.loc["aggressive"])
+    assert set(together.columns) >= {"loss_probability", "max_drawdown_median", "terminal_p5", "terminal_median"}
+    assert (together["terminal_p5"] <= together["terminal_median"]).all()
+
+
+def test_constant_returns_have_no_risk():
+    """毎月同じリターンなら全経路が同じ最終資産で、元本割れもドローダウンも無い"""
+    returns = pd.DataFrame({"index": [0.01] * 24, "dividend": [0.005] * 24, "range": [0.0] * 24},
+                           index=pd.date_range("2020-01-31", periods=24, freq="ME"))
+    metrics = MonteCarloEngine(returns, n_paths=100, horizon_months=36).simulate(
+        {"mix": {"index": 1, "dividend": 1}}).metrics().loc["mix"]
+    assert np.isclose(metrics["terminal_p5"], 1.0075 ** 36)
+    assert np.isclose(metrics["terminal_p95"], 1.0075 ** 36)
+    assert metrics["loss_probability"] == 0 and metrics["max_drawdown_p95"] == 0
+
+
+def test_risk_assessor_shows_profile_risk(tmp_path, capsys):
+    """get_portfolio_ratios で想定リスクを表示し、月次リターンのファイルが変わるまで結果を使い回す"""
+    path = tmp_path / "sleeve_returns.csv"
+    returns = sleeve_returns(120)
+    save_sleeve_returns(str(path), {"returns": returns, "income": returns * 0})
+
+    config = ConfigLoader("src/config/config.yaml", env_path="/nonexistent/.env")
+    config.set_override("risk_assessment", {**config.config["risk_assessment"], "returns_file": str(path),
+                                            "simulation_paths": 2000})
+    assessor = RiskAssessor(config)
+    ratios = assessor.get_portfolio_ratios("balanced", show_risk=True)
+    assert ratios == config.settings.risk_assessment.profiles["balanced"].as_dict()
+    output = capsys.readouterr().out
+    assert "balanced" in output and "元本割れ" in output
+
+    result = assessor.simulate_profiles()
+    assert assessor.simulate_profiles() is result
+    assert set(result.profiles) == {"stable", "balanced", "aggressive"}
+    assert result.wealth.shape == (2000, 120, 3)
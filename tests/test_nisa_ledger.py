@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NISA取引台帳のテスト
+"""
+
+import json
+from datetime import datetime
+
+from src.shared_modules.nisa_ledger import NISALedger
+
+
+def test_usage_is_rebuilt_from_snapshot_and_tail(tmp_path):
+    """スナップショット＋末尾の取引から年間・生涯使用額を再構築"""
+    ledger = NISALedger(str(tmp_path), snapshot_interval=2)
+    ledger.append(100000, order_id=1, timestamp=datetime(2025, 12, 30))
+    ledger.append(200000, order_id=2, timestamp=datetime(2025, 12, 31))
+    ledger.append(50000, order_id=3, symbol="7203", timestamp=datetime(2026, 1, 5))
+    
+    snapshot = json.loads((tmp_path / "snapshot.json").read_text(encoding="utf-8"))
+    assert snapshot["seq"] == 2 and snapshot["lifetime"] == 300000
+    
+    # クラッシュで途中まで書かれた行は捨てる
+    with open(tmp_path / "ledger.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"seq":4,"amount":')
+    
+    reloaded = NISALedger(str(tmp_path), snapshot_interval=2)
+    assert reloaded.annual_usage(2025) == 300000
+    assert reloaded.annual_usage(2026) == 50000
+    assert reloaded.lifetime_usage() == 350000
+    assert [r["order_id"] for r in reloaded.transactions(2026)] == [3]
+    
+    reloaded.append(10000, order_id=4, timestamp=datetime(2026, 2, 1))
+    assert [r["seq"] for r in reloaded.transactions()] == [1, 2, 3, 4]
+
+
+def test_legacy_usage_file_is_migrated_once(tmp_path):
+    """旧 nisa_usage.json を台帳へ移行"""
+    legacy = tmp_path / "nisa_usage.json"
+    legacy.write_text(json.dumps({"annual_usage": {"2025": 1200000}, "lifetime_usage": 1500000}), encoding="utf-8")
+    
+    ledger = NISALedger(str(tmp_path / "ledger"))
+    assert ledger.migrate_legacy_usage(str(legacy))
+    assert ledger.annual_usage(2025) == 1200000
+    assert ledger.annual_usage(2024) == 300000
+    assert ledger.lifetime_usage() == 1500000
+    assert not legacy.exists()
+    
+    assert not NISALedger(str(tmp_path / "ledger")).migrate_legacy_usage(str(legacy))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+パラメータ探索（並列評価・キャッシュ・設定の変更案）のテスト
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.backtesting.backtest_engine import RangeBacktester
+from src.backtesting.optimizer import ParameterSpace, ParameterSweep, TPESampler, parameter_key, propose_config_diff
+
+SPACE = ["bollinger_period=10,20", "bollinger_std_dev=1.5,2.0", "stop_loss_percentage_on_break=0.02,0.05"]
+
+
+def random_prices(n_symbols=15, n_bars=500, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_bars, n_symbols)), axis=0))
+    return pd.DataFrame(close, index=pd.bdate_range("2020-01-01", periods=n_bars),
+                        columns=[str(7200 + i) for i in range(n_symbols)])
+
+
+def test_sweep_matches_backtester_and_reuses_cache(tmp_path):
+    """各組み合わせの成績が単独のバックテストと一致し、2回目はキャッシュから返る"""
+    prices = random_prices()
+    cache_path = str(tmp_path / "sweep.jsonl")
+    sweep = ParameterSweep(prices, ParameterSpace.parse(SPACE), min_trades=1, workers=1, cache_path=cache_path,
+                           commission_rate=0.001)
+    result = sweep.run("grid")
+    assert len(result.results) == 8 and result.evaluated == 8
+
+    best = result.best
+    expected = RangeBacktester(commission_rate=0.001, **best).run(prices).metrics
+    row = result.ranked().iloc[0]
+    assert np.isclose(row["sharpe"], expected["sharpe"])
+    assert row["trades"] == expected["trades"]
+
+    again = ParameterSweep(prices, ParameterSpace.parse(SPACE), min_trades=1, workers=1, cache_path=cache_path,
+                           commission_rate=0.001).run("grid")
+    assert again.evaluated == 0 and again.cached == 8
+    assert again.best == best
+
+
+def test_parallel_sweep_matches_serial():
+    """共有メモリを使うプロセスプールでも逐次実行と同じ結果"""
+    prices = random_prices(seed=1)
+    space = ParameterSpace.parse(["bollinger_period=12:14", "bollinger_std_dev=1.5,2.5"])
+    serial = ParameterSweep(prices, space, min_trades=1, workers=1).run("grid").ranked()
+    parallel = ParameterSweep(prices, space, min_trades=1, workers=2).run("grid").ranked()
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_tpe_suggests_within_bounds():
+    """提案は範囲内（整数は整数）で、評価済みの点は避ける"""
+    space = ParameterSpace.parse(["bollinger_period=10:40", "bollinger_std_dev=1.0:3.0"])
+    rng = np.random.default_rng(0)
+    history = [(params, -abs(params["bollinger_period"] - 20) - abs(params["bollinger_std_dev"] - 2))
+               for params in (space.sample(rng) for _ in range(30))]
+    seen = {parameter_key(params) for params, _ in history}
+    for _ in range(10):
+        params = TPESampler(space).suggest(history, rng, exclude=seen)
+        assert isinstance(params["bollinger_period"], int) and 10 <= params["bollinger_period"] <= 40
+        assert 1.0 <= params["bollinger_std_dev"] <= 3.0
+        assert parameter_key(params) not in seen
+        seen.add(parameter_key(params))
+
+
+def test_config_diff_keeps_comments(tmp_path):
+    """変更案は対象セクションの値だけを書き換え、コメントや他のセクションはそのまま"""
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(
+        "index_bot:\n"
+        "  monthly_investment: 15000\n"
+        "range_bot:\n"
+        "  bollinger_period: 20\n"
+        "  bollinger_std_dev: 2.0 # 倍率\n"
+        "  stop_loss_percentage_on_break: 0.02\n",
+        encoding="utf-8"
+    )
+    diff = propose_config_diff(str(config_path), "range_bot", {"bollinger_period": 15, "bollinger_std_dev": 2.5})
+    changed = [line for line in diff.splitlines() if line[:1] in "+-" and not line.startswith(("+++", "---"))]
+    assert changed == [
+        "-  bollinger_period: 20", "-  bollinger_std_dev: 2.0 # 倍率",
+        "+  bollinger_period: 15", "+  bollinger_std_dev: 2.5 # 倍率"
+    ]
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ポートフォリオ・シミュレーター（積立・リバランス・NISA枠・口座の振り分け）のテスト
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.backtesting.portfolio_simulator import TAX_RATE, PortfolioSimulator
+from src.shared_modules.config_loader import ConfigLoader
+
+RATIOS = {"index": 0.5, "dividend": 0.3, "range": 0.2}
+
+
+def monthly_returns(n_months, start="2024-10-31", seed=None, income=0.0):
+    index = pd.date_range(start, periods=n_months, freq="ME")
+    if seed is None:
+        returns = pd.DataFrame(0.0, index=index, columns=list(RATIOS))
+    else:
+        rng = np.random.default_rng(seed)
+        returns = pd.DataFrame(rng.normal(0.005, 0.04, (n_months, 3)), index=index, columns=list(RATIOS))
+    return returns, pd.DataFrame(income, index=index, columns=list(RATIOS))
+
+
+def test_nisa_limits_and_account_routing():
+    """残枠不足のインデックス積立は拒否され、リバランス分は残枠を使い切ってから課税口座へ"""
+    simulator = PortfolioSimulator(RATIOS, 30000, annual_limit=100000, lifetime_limit=250000)
+    returns, _ = monthly_returns(40)
+
+    # 10月: 30,000 + 高配当 18,000 / 11月: 30,000 + 高配当 18,000 / 12月: 積立は残枠 4,000 で拒否、
+    # リバランスの 15,000 のうち 4,000 だけ NISA
+    row = simulator.run(returns, 3, starts=[0]).frame().iloc[0]
+    assert row["nisa_value"] == 100000 and row["nisa_used"] == 100000
+    assert row["taxable_value"] == 50000 and row["taxable_contributed"] == 50000
+    assert row["cash"] == 30000 and row["rejected_index"] == 1
+
+    # 1月に年間枠が戻る（積立 30,000 + 高配当 18,000）
+    assert simulator.run(returns, 4, starts=[0]).frame().iloc[0]["nisa_used"] == 148000
+
+    result = simulator.run(returns, 36, starts=[0])
+    row = result.frame().iloc[0]
+    assert row["nisa_used"] == 250000 and row["nisa_value"] == 250000
+    assert row["contributed"] == row["nisa_value"] + row["taxable_value"] + row["cash"]
+    assert np.all(np.diff(result.history["lifetime_used"][0]) >= 0)
+    assert row["months_to_fill"] <= 36
+
+
+def test_vectorized_starts_match_individual_runs():
+    """全開始月を同時に計算しても、開始月ごとに計算した結果と同じ"""
+    simulator = PortfolioSimulator(RATIOS, 200000, annual_limit=3_600_000, lifetime_limit=18_000_000)
+    returns, income = monthly_returns(120, seed=0, income=0.002)
+    together = simulator.run(returns, 60, income).frame()
+    assert len(together) == 61
+
+    for start in (0, 17, 60):
+        alone = simulator.run(returns, 60, income, starts=[start]).frame()
+        pd.testing.assert_frame_equal(together.iloc[[start]].reset_index(drop=True), alone)
+
+
+def test_taxable_income_is_withheld():
+    """課税口座の分配金は源泉徴収され、NISAの分配金は非課税で現金に入る"""
+    simulator = PortfolioSimulator({"index": 0.5, "range": 0.5}, 100000, index_monthly_investment=0,
+                                   nisa_strategies=("index",), realized_strategies=())
+    returns = pd.DataFrame(0.01, index=pd.date_range("2024-01-31", periods=1, freq="ME"), columns=["index", "range"])
+    row = simulator.run(returns, 1, returns).frame().iloc[0]
+    assert row["nisa_value"] == 50000 and row["taxable_value"] == 50000
+    assert np.isclose(row["cash"], 500 + 500 * (1 - TAX_RATE))
+    assert np.isclose(row["tax_paid"], 500 * TAX_RATE)
+
+
+def test_from_config_uses_rebalance_settings():
+    """目標比率・積立額・NISA枠・NISAで買う戦略は config.yaml から"""
+    config = ConfigLoader("src/config/config.yaml", env_path="/nonexistent/.env")
+    simulator = PortfolioSimulator.from_config(config, monthly_investment=50000)
+    assert dict(zip(simulator.strategies, simulator.target_ratios)) == config.settings.portfolio_ratios.as_dict()
+    assert simulator.monthly_investment == 50000
+    assert simulator.index_monthly_investment == config.settings.index_bot.monthly_investment
+    assert simulator.nisa_strategies == ["index", "dividend"]
+    assert simulator.lifetime_limit == config.settings.nisa_settings.lifetime_limit
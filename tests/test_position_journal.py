@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+建玉ジャーナルのテスト
+"""
+
+from src.shared_modules.position_journal import PositionJournal, read_positions
+
+
+def test_positions_survive_restart_and_torn_write(tmp_path):
+    """再起動後に建玉が復元され、書きかけの末尾行は切り詰められる"""
+    path = str(tmp_path / "range_positions.jsonl")
+    journal = PositionJournal(path)
+    journal.record_open("7203", 2500.0, 100, order_id=1)
+    journal.record_open("6758", 3000.0, 100, order_id=2)
+    journal.record_close("7203", 2600.0, order_id=3, reason="利確")
+    journal.close()
+    
+    # クラッシュで途中まで書かれた行
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op":"open","symbol":"9984"')
+    
+    restored = PositionJournal(path)
+    assert restored.get_positions() == {
+        "6758": {"price": 3000.0, "quantity": 100, "order_id": 2, "purchase_time": None}
+    }
+    # 再起動後の追記が書きかけの断片に繋がらない
+    restored.record_open("9984", 8000.0, 100, order_id=4)
+    restored.close()
+    
+    assert set(read_positions(path)) == {"6758", "9984"}
+    reopened = PositionJournal(path)
+    assert set(reopened.get_positions()) == {"6758", "9984"}
+    reopened.close()
+
+
+def test_reconcile_with_ib_positions(tmp_path):
+    """IBに無い建玉は決済扱い、数量のずれはIBに合わせる"""
+    journal = PositionJournal(str(tmp_path / "range_positions.jsonl"))
+    journal.record_open("7203", 2500.0, 100)
+    journal.record_open("6758", 3000.0, 100)
+    journal.record_open("8306", 1200.0, 100)
+    
+    report = journal.reconcile({"7203": 100, "6758": 200, 2559: 10})
+    
+    assert report["closed"] == {"8306": 100}
+    assert report["adjusted"] == {"6758": (100, 200)}
+    assert report["untracked"] == {"2559": 10}
+    assert set(journal.get_positions()) == {"7203", "6758"}
+    assert journal.get_positions()["6758"]["quantity"] == 200
+    journal.close()
+
+
+def test_compaction_keeps_only_open_positions(tmp_path):
+    """記録数がしきい値を超えると現在の建玉だけに圧縮される"""
+    path = tmp_path / "range_positions.jsonl"
+    journal = PositionJournal(str(path), compact_threshold=10)
+    for i in range(6):
+        journal.record_open(str(7000 + i), 1000.0, 100)
+        if i % 2:
+            journal.record_close(str(7000 + i))
+    journal.close()
+    
+    assert len(path.read_text(encoding="utf-8").splitlines()) <= 10
+    assert set(PositionJournal(str(path)).get_positions()) == {"7000", "7002", "7004"}
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+発注前リスクゲートのテスト
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.shared_modules.nisa_ledger import NISALedger
+from src.shared_modules.pre_trade_gate import PreTradeGate, PreTradeRejected
+
+
+def make_nisa_monitor(tmp_path, annual_limit=1000000):
+    """台帳に記録するだけのNISA監視"""
+    ledger = NISALedger(str(tmp_path / "nisa"))
+    return SimpleNamespace(
+        ledger=ledger,
+        annual_limit=annual_limit,
+        lifetime_limit=18000000,
+        monitoring_enabled=True,
+        update_usage=lambda amount, order_id=None, symbol=None: ledger.append(amount, order_id=order_id, symbol=symbol),
+        reverse_usage=lambda amount, order_id=None, symbol=None, reason="", timestamp=None: ledger.append(
+            -amount, order_id=order_id, symbol=symbol, timestamp=timestamp, note=reason)
+    )
+
+
+def test_concurrent_reservations_cannot_overshoot_nisa_limit(tmp_path):
+    """同時に予約しても年間枠を超えない。確定分は台帳に記録、解放分は枠に戻る"""
+    nisa_monitor = make_nisa_monitor(tmp_path)
+    gate = PreTradeGate(nisa_monitor=nisa_monitor, stop_flag_file=str(tmp_path / "STOP.flag"))
+
+    accepted = []
+    rejected = []
+    barrier = threading.Barrier(8)
+
+    def worker(i):
+        barrier.wait()
+        try:
+            accepted.append(gate.reserve("index", "1306", 300000, nisa=True))
+        except PreTradeRejected:
+            rejected.append(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(accepted) == 3 and len(rejected) == 5
+    accepted[0].commit(order_id=1)
+    accepted[1].release()
+    with accepted[2]:
+        pass  # 確定しなかった予約はwith文の終わりで解放
+
+    assert nisa_monitor.ledger.annual_usage() == 300000
+    assert gate.pending == {}
+    gate.reserve("index", "1306", 700000, nisa=True).commit(order_id=2)
+    with pytest.raises(PreTradeRejected, match="NISA年間枠超過"):
+        gate.reserve("index", "1306", 1, nisa=True)
+    # 課税口座の注文はNISA枠の対象外
+    gate.reserve("index", "1306", 1, nisa=False).release()
+
+
+def test_holdings_exposure_and_kill_switch(tmp_path):
+    """最大保有銘柄数・銘柄ごとの上限・キルスイッチ"""
+    stop_flag = tmp_path / "STOP.flag"
+    gate = PreTradeGate(max_holdings={"range": 2}, max_symbol_exposure=500000,
+                        stop_flag_file=str(stop_flag), kill_switch_poll=0)
+    gate.seed_holdings("range", {"6758": 300000})
+
+    gate.reserve("range", "8306", 100000).commit(order_id=1)
+    with pytest.raises(PreTradeRejected, match="保有銘柄数上限"):
+        gate.reserve("range", "7203", 100000)
+    with pytest.raises(PreTradeRejected, match="銘柄ごとの投資上限"):
+        gate.reserve("range", "6758", 250000)
+
+    # 売却で銘柄が空けば新規銘柄を買える
+    gate.reserve("range", "8306", 100000, side="SELL").commit(order_id=2)
+    gate.reserve("range", "7203", 100000).commit(order_id=3)
+
+    stop_flag.write_text("{}", encoding="utf-8")
+    with pytest.raises(PreTradeRejected, match="キルスイッチ"):
+        gate.reserve("range", "6758", 1, side="SELL")
+    stop_flag.unlink()
+    gate.trip("手動停止")
+    with pytest.raises(PreTradeRejected, match="手動停止"):
+        gate.check_kill_switch()
+    gate.reset()
+    gate.check_kill_switch()
+
+
+def test_rejected_and_cancelled_orders_give_back_nisa_usage(tmp_path):
+    """IBで拒否・取消された注文は未約定分の NISA 枠と投資額を戻し、約定済みの注文は戻さない"""
+    nisa_monitor = make_nisa_monitor(tmp_path)
+    gate = PreTradeGate(nisa_monitor=nisa_monitor, max_symbol_exposure=1000000,
+                        stop_flag_file=str(tmp_path / "STOP.flag"))
+    gate.reserve("index", "1306", 600000, nisa=True).commit(order_id=1)
+    gate.reserve("index", "2558", 400000, nisa=True).commit(order_id=2)
+    gate.reserve("index", "1306", 400000, nisa=False).commit(order_id=3)
+    with pytest.raises(PreTradeRejected, match="NISA年間枠超過"):
+        gate.reserve("index", "1306", 1, nisa=True)
+
+    assert gate.reverse(1, "Error 201: Order rejected")
+    assert not gate.reverse(1, "Cancelled")
+    assert nisa_monitor.ledger.annual_usage() == 400000
+    # 半分約定してから取消
+    assert gate.reverse(2, "Cancelled", unfilled_ratio=0.5)
+    assert nisa_monitor.ledger.annual_usage() == 200000
+    assert gate.holdings["index"] == {"2558": 200000, "1306": 400000}
+    # 約定済みの注文は取り消さない
+    gate.settle(3)
+    assert not gate.reverse(3, "Cancelled")
+
+    gate.reserve("index", "1306", 600000, nisa=True).commit(order_id=4)
+    records = nisa_monitor.ledger.transactions()
+    assert [(record["order_id"], record["amount"]) for record in records] == [
+        (1, 600000), (2, 400000), (1, -600000), (2, -200000), (4, 600000)]
+    assert records[2]["note"] == "Error 201: Order rejected"
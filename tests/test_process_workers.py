@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+プロセス分離ワーカーモジュールのテスト
+"""
+
+import errno
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from types import SimpleNamespace
+
+import pytest
+
+from src.shared_modules import process_workers
+from src.shared_modules.process_workers import GatewayClient, GatewayServer, QuoteBook, SharedState
+
+
+class FakeConnector:
+    """発注内容を記録するだけのIB接続"""
+
+    def __init__(self):
+        self.connected = True
+        self.next_order_id = 100
+        self.orders = []
+        self.intents = []
+
+    def place_order(self, contract, order, **intent):
+        self.orders.append((contract, order))
+        self.intents.append(intent)
+        self.next_order_id += 1
+        return self.next_order_id - 1
+
+    def create_stock_contract(self, symbol, exchange="TSE"):
+        return SimpleNamespace(symbol=symbol, secType="STK", exchange=exchange, currency="JPY")
+
+    def create_market_order(self, action, quantity):
+        return SimpleNamespace(action=action, orderType="MKT", totalQuantity=quantity)
+
+    def create_limit_order(self, action, quantity, limit_price):
+        return SimpleNamespace(action=action, orderType="LMT", totalQuantity=quantity, lmtPrice=limit_price)
+
+
+def test_gateway_client_routes_orders_through_single_connection():
+    """クライアントの注文がゲートウェイのIB接続で発注される"""
+    connector = FakeConnector()
+    server = GatewayServer(connector, authkey=b"test")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    client = GatewayClient(server.address, authkey=b"test")
+    assert client.connected
+
+    order = client.create_limit_order("SELL", 100, 2450.0)
+    order.account = "U7654321"
+    order_id = client.place_order(client.create_stock_contract("7203"), order)
+
+    assert order_id == 100
+    contract, placed = connector.orders[0]
+    assert contract.symbol == "7203"
+    assert (placed.action, placed.orderType, placed.totalQuantity, placed.lmtPrice) == ("SELL", "LMT", 100, 2450.0)
+    assert placed.account == "U7654321"
+    assert connector.intents[0] == {"strategy": None, "amount": None, "nisa": False}
+
+    # 認証キーの違う接続があっても受け付けを続ける
+    with pytest.raises(AuthenticationError):
+        Client(server.address, authkey=b"wrong")
+    assert thread.is_alive()
+    other = GatewayClient(server.address, authkey=b"test")
+    assert other.place_order(other.create_stock_contract("8306"), other.create_market_order("BUY", 100)) == 101
+    other.disconnect_from_ib()
+
+    client._request("shutdown")
+    client.disconnect_from_ib()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+class FailingListener:
+    """accept() が指定した例外を順に送出する待ち受け"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.accepts = 0
+        self.closed = False
+
+    def accept(self):
+        self.accepts += 1
+        raise self.errors.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+def test_gateway_backs_off_and_stops_when_listener_is_unusable(monkeypatch):
+    """続けて起きる受け付けエラーは間隔を空けて再試行し、待ち受けが閉じられたら終了する"""
+    sleeps = []
+    monkeypatch.setattr(process_workers.time, "sleep", sleeps.append)
+    server = GatewayServer(FakeConnector(), authkey=b"test")
+    server.listener.close()
+    server.listener = FailingListener(
+        [OSError(errno.EMFILE, "Too many open files")] * 3 + [EOFError(), OSError("listener is closed")])
+
+    server.serve_forever()
+
+    assert server.listener.accepts == 5 and server.listener.closed
+    assert sleeps == [0.1, 0.2, 0.4]
+
+
+def test_quote_book_reuses_only_fresh_quotes():
+    """鮮度切れの共有株価は再利用しない"""
+    state = SharedState()
+    book = QuoteBook(state, max_age=30)
+
+    book.put("7203", 2500)
+    assert book.get("7203") == 2500.0
+    assert book.get("6758") is None
+
+    state.set_quote("6758", 3000, timestamp=time.time() - 60)
+    assert book.get("6758") is None
+    assert state.get_quotes()["6758"][0] == 3000.0
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+リバランス資金配分モジュールのテスト
+"""
+
+import numpy as np
+
+from src.shared_modules.rebalance_allocator import RebalanceAllocator, allocate_cash, round_to_lots
+
+
+def _bisect_reference(values, ratios, cash, caps):
+    """二分探索による参照解"""
+    budget = min(cash, caps.sum())
+    total = values.sum() + budget
+    gaps = ratios / ratios.sum() * total - values
+    lo, hi = -1e12, 1e12
+    for _ in range(200):
+        mid = (lo + hi) / 2
+        if np.clip(gaps + mid, 0, caps).sum() < budget:
+            lo = mid
+        else:
+            hi = mid
+    return np.clip(gaps + hi, 0, caps)
+
+
+def test_allocate_cash_matches_reference_in_batch():
+    """バッチ一括の解が銘柄ごとの参照解と一致する"""
+    rng = np.random.default_rng(42)
+    values = rng.uniform(0, 1e6, (200, 5))
+    ratios = rng.uniform(0.05, 1.0, (200, 5))
+    cash = rng.uniform(0, 5e5, 200)
+    caps = np.where(rng.random((200, 5)) < 0.3, rng.uniform(0, 1e5, (200, 5)), np.inf)
+
+    result = allocate_cash(values, ratios, cash, caps)
+    expected = np.array([_bisect_reference(values[i], ratios[i], cash[i], caps[i]) for i in range(200)])
+
+    np.testing.assert_allclose(result, expected, atol=1e-4)
+    np.testing.assert_allclose(result.sum(axis=1), np.minimum(cash, caps.sum(axis=1)), atol=1e-4)
+
+
+def test_allocation_splits_cash_instead_of_single_strategy():
+    """不足している全戦略に資金が分割される"""
+    allocator = RebalanceAllocator({"index": 0.5, "dividend": 0.3, "range": 0.2})
+
+    balanced = allocator.allocate({"index": 500000, "dividend": 300000, "range": 200000}, 15000)
+    assert balanced == {"index": 7500.0, "dividend": 4500.0, "range": 3000.0}
+
+    # range が超過している場合は不足分に比例して配分
+    skewed = allocator.allocate({"index": 400000, "dividend": 300000, "range": 300000}, 150000)
+    assert skewed["range"] == 0
+    assert abs(skewed["index"] - 140000) < 1e-6
+    assert abs(skewed["dividend"] - 10000) < 1e-6
+
+
+def test_round_to_lots_respects_cash():
+    """単元株に丸めた購入額が配分額を超えない"""
+    quantities = round_to_lots([60000, 45000], [250, 180], [100, 100], cash=105000)
+    assert quantities.tolist() == [200, 200]
+    assert (quantities * np.array([250, 180])).sum() <= 105000
+
+
+def test_basket_routes_overflow_to_taxable_account():
+    """NISA残枠を超える分が課税口座の注文に振り替えられる"""
+    allocator = RebalanceAllocator({"index": 0.5, "dividend": 0.3, "range": 0.2}, lot_sizes={"2559": 1})
+    plan = allocator.build_basket(
+        {"index": 90000, "dividend": 0, "range": 30000},
+        {
+            "index": [{"symbol": "2559", "price": 15000}],
+            "range": [{"symbol": "7203", "price": 140}, {"symbol": "6758", "price": 150}],
+        },
+        nisa_remaining=50000
+    )
+
+    index_orders = {o["account"]: o["quantity"] for o in plan["orders"] if o["strategy"] == "index"}
+    assert index_orders == {"nisa": 3, "taxable": 3}
+    assert all(o["account"] == "taxable" for o in plan["orders"] if o["strategy"] == "range")
+    assert sum(o["amount"] for o in plan["orders"]) + plan["leftover_cash"] == 120000
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+リソース監視（記録・ファイルの回転・要約・問題の検出）のテスト
+"""
+
+import gc
+import os
+
+from src.shared_modules.resource_monitor import (
+    ResourceMonitor, diagnose, read_samples, split_sessions, summarize
+)
+
+
+def test_samples_gc_queues_and_rotation(tmp_path):
+    """GCの回数・キューの長さを記録し、回したファイルも含めて古い順に読める"""
+    path = str(tmp_path / "metrics" / "resources.jsonl")
+    monitor = ResourceMonitor(path, interval_seconds=3600, max_bytes=2048, backup_count=2)
+    pending = [1, 2, 3]
+    monitor.add_queue("discord", lambda: len(pending))
+    monitor.add_queue("broken", lambda: 1 / 0)
+    monitor.start()
+    gc.collect()
+    sample = monitor.sample()
+    assert sample["gc"]["collections"][2] >= 1 and sample["gc"]["pause_ms_max"] >= 0
+    assert sample["queues"] == {"discord": 3, "broken": None}
+    assert sample["threads"] >= 2 and sample["python_threads"] >= 2
+    assert sample["cpu_percent"] is not None and sample["sampler_ms"] >= 0
+    if os.path.exists("/proc/self/statm"):
+        assert sample["rss_bytes"] > 0 and sample["fds"] >= sample["sockets"] >= 0
+
+    for _ in range(20):
+        monitor.sample()
+    monitor.stop()
+    assert monitor._on_gc not in gc.callbacks
+    assert sorted(os.listdir(tmp_path / "metrics")) == ["resources.jsonl", "resources.jsonl.1", "resources.jsonl.2"]
+    samples = read_samples(path)
+    assert 3 <= len(samples) < 23
+    assert [s["uptime"] for s in samples] == sorted(s["uptime"] for s in samples)
+    assert samples[-1]["uptime"] >= sample["uptime"]
+
+
+def make_sample(ts, uptime, rss_mb, discord=0, pause_ms=1.0):
+    return {"ts": ts, "uptime": uptime, "cpu_percent": 2.0, "rss_bytes": int(rss_mb * 2 ** 20), "threads": 12,
+            "fds": 40, "sockets": 3, "queues": {"discord": discord}, "sampler_ms": 0.5,
+            "gc": {"collections": [10, 1, 0], "pause_ms_total": pause_ms * 11, "pause_ms_max": pause_ms,
+                   "collected": 0, "uncollectable": 0}}
+
+
+def test_summary_and_findings_use_the_last_session():
+    """再起動で分け、最後の起動の増加量としきい値から問題を挙げる"""
+    start = 1_700_000_000
+    first = [make_sample(start + i * 60, i * 60, 500 - i) for i in range(30)]
+    # 再起動後の3時間で RSS が 100MB → 160MB（20MB/時）、Discord の未送信が一時 80件
+    second = [make_sample(start + 3600 + i * 60, i * 60, 100 + i / 3, discord=80 if i == 90 else 0)
+              for i in range(181)]
+    sessions = split_sessions(first + second)
+    assert [len(session) for session in sessions] == [30, 181]
+
+    summary = summarize(sessions[-1])
+    assert summary["samples"] == 181 and summary["duration_hours"] == 3.0
+    assert abs(summary["metrics"]["rss_mb"]["per_hour"] - 20.0) < 0.01
+    assert summary["metrics"]["threads"]["per_hour"] == 0
+    assert summary["metrics"]["queue.discord"]["max"] == 80
+    assert summary["gc"]["collections"] == [1810, 181, 0]
+    assert abs(summary["sampler_overhead_percent"] - 181 * 0.5 / (3 * 3600 * 1000) * 100) < 1e-9
+
+    assert [finding["item"] for finding in diagnose(summary)] == ["rss_mb", "queue.discord"]
+    assert diagnose(summary, {"rss_mb_per_hour": 30, "queue_depth": 100}) == []
+    # 短い記録では増加量を判定しない
+    assert [finding["item"] for finding in diagnose(summarize(sessions[-1][:30]))] == []
+    assert [finding["item"] for finding in diagnose(summarize(first), {"gc_pause_ms": 0.5})] == ["gc"]
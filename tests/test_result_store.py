@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+バックテスト結果ストア（コード・パラメータ・データのハッシュによる保存と無効化）のテスト
+"""
+
+import types
+
+import numpy as np
+import pandas as pd
+
+from src.backtesting import result_store
+from src.backtesting.backtest_engine import DividendBacktester, RangeBacktester
+from src.backtesting.result_store import BacktestResultStore, cached_run, code_version
+
+
+def random_prices(n_days=400, n_symbols=5, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, n_symbols)), axis=0))
+    return pd.DataFrame(close, index=pd.bdate_range("2020-01-01", periods=n_days),
+                        columns=[f"{7000 + i}" for i in range(n_symbols)])
+
+
+def test_rerun_is_served_from_store(tmp_path):
+    """同じ条件の再実行は保存済みの結果を返し、取引一覧・資産曲線・成績指標は再計算と同じ"""
+    store = BacktestResultStore(str(tmp_path))
+    prices = random_prices()
+    backtester = RangeBacktester(bollinger_period=20)
+    fresh, cached = cached_run(store, backtester, prices)
+    assert not cached and len(fresh.trades) > 0
+
+    loaded, cached = cached_run(store, backtester, prices)
+    assert cached
+    pd.testing.assert_frame_equal(loaded.trades, fresh.trades)
+    np.testing.assert_array_equal(loaded.equity.to_numpy(), fresh.equity.to_numpy())
+    assert (loaded.equity.index == fresh.equity.index).all()
+    assert loaded.metrics == fresh.metrics
+    assert loaded.summary() == fresh.summary()
+
+    # 新しい store でもファイルから読める
+    reopened = BacktestResultStore(str(tmp_path))
+    assert cached_run(reopened, backtester, prices)[1]
+
+
+def test_params_and_data_change_the_key(tmp_path):
+    """パラメータ・スクリーニング条件・終値の値が変われば再計算"""
+    store = BacktestResultStore(str(tmp_path))
+    prices = random_prices()
+    cached_run(store, RangeBacktester(bollinger_period=20), prices)
+    assert not cached_run(store, RangeBacktester(bollinger_period=25), prices)[1]
+    mask = np.ones((prices.shape[1], prices.shape[0]), dtype=bool)
+    assert not cached_run(store, RangeBacktester(bollinger_period=20), prices, mask)[1]
+
+    changed = prices.copy()
+    changed.iloc[100, 0] *= 1.01
+    assert not cached_run(store, RangeBacktester(bollinger_period=20), changed)[1]
+    assert len(store.query()) == 4
+
+    # 初期資金が違えば資産曲線も違う
+    small, cached = cached_run(store, RangeBacktester(bollinger_period=20, initial_cash=1_000_000), prices)
+    assert not cached and small.metrics["initial_cash"] == 1_000_000
+    assert DividendBacktester(accrue_dividends=False).params() != DividendBacktester().params()
+    assert DividendBacktester(initial_cash=1_000_000).params() != DividendBacktester().params()
+
+
+def test_shared_indicator_change_invalidates_results(tmp_path, monkeypatch):
+    """Bot と共有の指標計算のファイルが変われば、売買ルールのファイルが同じでも再計算"""
+    kernels = tmp_path / "kernels.py"
+    kernels.write_text("WINDOW = 20\n", encoding="utf-8")
+    module = types.ModuleType("kernels")
+    module.__file__ = str(kernels)
+    monkeypatch.setattr(result_store, "SHARED_SOURCES", (module,))
+    monkeypatch.setattr(result_store, "_code_versions", {})
+    before = code_version(RangeBacktester)
+
+    kernels.write_text("WINDOW = 21\n", encoding="utf-8")
+    result_store._code_versions.clear()
+    assert code_version(RangeBacktester) != before
+
+
+def test_new_bars_supersede_old_results(tmp_path):
+    """終値に新しい日が加わると再計算し、同じ条件の古い足までの結果は削除"""
+    store = BacktestResultStore(str(tmp_path))
+    prices = random_prices(420)
+    backtester = RangeBacktester(bollinger_period=20)
+    cached_run(store, backtester, prices.iloc[:400])
+    cached_run(store, RangeBacktester(bollinger_period=25), prices.iloc[:400])
+    assert len(list(tmp_path.glob("*.npz"))) == 2
+
+    result, cached = cached_run(store, backtester, prices)
+    assert not cached and len(result.equity) == 420
+    listing = store.query()
+    assert len(listing) == 2
+    assert set(zip(listing["bollinger_period"], listing["bars"])) == {(20, 420), (25, 400)}
+    assert len(list(tmp_path.glob("*.npz"))) == 2
+    assert set(listing.columns) >= {"sharpe", "total_return", "hits"}
+
+    assert store.invalidate("RangeBacktester") == 2
+    assert store.query().empty and not list(tmp_path.glob("*.npz"))
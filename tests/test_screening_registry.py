@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+スクリーニング結果レジストリのテスト
+"""
+
+from src.shared_modules.screening_registry import ScreeningRegistry
+from src.shared_modules.state_store import StateStore
+
+
+def test_screening_registry_reloads_only_on_new_screening(tmp_path):
+    """スクリーニング結果が更新されたときだけ読み直す"""
+    store = StateStore(str(tmp_path / "state.db"))
+    registry = ScreeningRegistry(store)
+    assert registry.range_targets() == ()
+
+    store.replace_range_targets([
+        {"symbol": "6758", "high_6m": 3200, "low_6m": 2800, "range_ratio": 0.14},
+        {"symbol": "8306", "high_6m": 1300, "low_6m": 1200, "range_ratio": 0.08},
+    ])
+    targets = registry.range_targets()
+    assert [t.symbol for t in targets] == ["8306", "6758"]
+    assert registry.range_targets() is targets
+    assert registry.best_range_target().symbol == "8306"
+    assert registry.range_target(6758).high_6m == 3200
+    assert registry.reloads == 2
+
+    store.replace_dividend_candidates([{"symbol": "9432", "dividend_yield": 4.1, "per": 12.0, "equity_ratio": 50.0}])
+    assert registry.range_targets() is targets
+    assert registry.best_dividend_candidate().symbol == "9432"
+    assert not hasattr(registry.best_dividend_candidate(), "__dict__")
+
+    store.replace_range_targets([{"symbol": "6758", "high_6m": 3200, "low_6m": 2800, "range_ratio": 0.14}])
+    assert [t.symbol for t in registry.range_targets()] == ["6758"]
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+戦略状態ストアのテスト
+"""
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src.shared_modules.state_store import StateStore
+
+
+def test_candidates_and_targets_are_replaced_and_versioned(tmp_path):
+    """スクリーニング結果の置き換えと並び順・バージョン"""
+    store = StateStore(str(tmp_path / "state.db"))
+    store.replace_dividend_candidates([
+        {"symbol": 7203, "dividend_yield": np.float64(3.8), "per": 10.0, "equity_ratio": 45.0, "no_dividend_cut": True},
+        {"symbol": "9432", "dividend_yield": 4.1, "per": 12.0, "equity_ratio": 50.0, "no_dividend_cut": True},
+    ])
+    store.replace_range_targets([
+        {"symbol": "6758", "high_6m": 3200, "low_6m": 2800, "range_ratio": 0.14},
+        {"symbol": "8306", "high_6m": np.int64(1300), "low_6m": 1200, "range_ratio": 0.08},
+    ])
+
+    assert [c["symbol"] for c in store.get_dividend_candidates()] == ["9432", "7203"]
+    assert store.get_dividend_candidate("7203")["dividend_yield"] == 3.8
+    assert store.best_range_target()["symbol"] == "8306"
+    assert store.get_version("range_targets") == 1
+
+    store.replace_range_targets([{"symbol": "6758", "high_6m": 3200, "low_6m": 2800, "range_ratio": 0.14}])
+    assert [t["symbol"] for t in store.get_range_targets()] == ["6758"]
+    assert store.get_version("range_targets") == 2
+
+
+def test_holdings_and_fills(tmp_path):
+    """保有銘柄の追加・参照と約定の記録"""
+    store = StateStore(str(tmp_path / "state.db"))
+    store.add_holding("dividend", "7203", amount=50000, order_id=11)
+    store.add_holding("dividend", "7203", amount=50000, order_id=12)
+    store.add_holding("dividend", "9432", amount=50000, order_id=13)
+    store.record_fill("range", "6758", "BUY", 100, 2900.0, order_id=14, account="U1234567")
+
+    assert store.holding_symbols("dividend") == ["7203", "9432"]
+    assert len(store.get_holdings("dividend")) == 3
+    assert store.has_holding("dividend", "9432")
+    assert not store.has_holding("range", "9432")
+
+    store.remove_holdings("dividend", "7203")
+    assert store.holding_symbols("dividend") == ["9432"]
+    assert store.get_fills("6758")[0]["order_id"] == 14
+
+
+def test_purchase_writes_holding_and_fill_together(tmp_path):
+    """購入は保有銘柄と約定を1つのトランザクションで書き、失敗すればどちらも残らない"""
+    store = StateStore(str(tmp_path / "state.db"))
+    store.record_purchase("dividend", "9432", 50000, order_id=21, account="U7654321", amount=50000)
+    assert store.get_holdings("dividend")[0]["amount"] == 50000
+    assert store.get_fills("9432")[0]["account"] == "U7654321"
+
+    with pytest.raises(sqlite3.Error):
+        store.record_purchase("dividend", "8306", 50000, order_id=22, account=object(), amount=50000)
+    assert not store.has_holding("dividend", "8306")
+    assert store.get_fills("8306") == []
+    assert store.get_version("holdings") == 1
+
+
+def test_legacy_csv_is_migrated_once(tmp_path):
+    """旧CSVは一度だけ取り込まれる"""
+    (tmp_path / "purchase_candidate.csv").write_text(
+        "symbol,dividend_yield,per,equity_ratio,no_dividend_cut\n7203,3.8,10.0,45.0,True\n", encoding="utf-8"
+    )
+    (tmp_path / "dividend_holdings.csv").write_text(
+        "symbol,amount,order_id,purchase_date\n7203,50000,11,2024-01-05 09:05:00\n", encoding="utf-8"
+    )
+    store = StateStore(str(tmp_path / "state.db"))
+
+    assert store.migrate_legacy_csv(str(tmp_path)) == {"purchase_candidate.csv": 1, "dividend_holdings.csv": 1}
+    assert store.migrate_legacy_csv(str(tmp_path)) == {}
+    assert store.get_dividend_candidate("7203")["no_dividend_cut"] == 1
+    assert store.get_holdings("dividend")[0]["order_id"] == 11
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+時系列ストア（1分・1時間・1日のロールアップ、LTTB による間引き、ダッシュボードからの記録）のテスト
+"""
+
+import time
+
+import numpy as np
+
+from dashboard.app import DashboardFeed
+from src.shared_modules.job_metrics import JobMetrics
+from src.shared_modules.state_store import StateStore
+from src.shared_modules.timeseries_store import DAY, HOUR, MINUTE, TimeSeriesStore, bucket_start, lttb
+
+
+def test_rollups_aggregate_each_resolution(tmp_path):
+    """途中で書き込んでも、各区切りの件数・平均・最小・最大・最後の値は全件をまとめた値と同じ"""
+    store = TimeSeriesStore(str(tmp_path / "series.db"))
+    day = bucket_start(time.time(), DAY) - DAY
+    values = [(day + HOUR + 10, 5.0), (day + HOUR + 20, 1.0), (day + HOUR + 70, 9.0), (day + 2 * HOUR + 5, 3.0)]
+    for i, (timestamp, value) in enumerate(values):
+        store.record("portfolio.value", value, timestamp)
+        if i == 0:
+            store.flush()
+    store.record("portfolio.value", float("nan"), day + 2 * HOUR + 6)
+
+    def points(start, end, aggregate):
+        return store.query("portfolio.value", start, end, aggregate=aggregate)
+
+    assert points(day, day + 3 * HOUR, "avg") == {
+        "series": "portfolio.value", "resolution": "1m", "aggregate": "avg",
+        "points": [[day + HOUR, 3.0], [day + HOUR + MINUTE, 9.0], [day + 2 * HOUR, 3.0]]}
+    assert points(day, day + DAY, "max")["resolution"] == "1m"
+    assert points(day, day + 2 * DAY, "max")["resolution"] == "1h"
+    assert points(day - 30 * DAY, day + DAY, "max")["resolution"] == "1h"
+    assert points(day - 30 * DAY, day + DAY, "max")["points"] == [[day + HOUR, 9.0], [day + 2 * HOUR, 3.0]]
+    assert points(day - 3 * 365 * DAY, day + DAY, "min")["points"] == [[day, 1.0]]
+    assert points(None, day + DAY, "last") == {
+        "series": "portfolio.value", "resolution": "1m", "aggregate": "last",
+        "points": [[day + HOUR, 1.0], [day + HOUR + MINUTE, 9.0], [day + 2 * HOUR, 3.0]]}
+    assert store.query("portfolio.value", day - 3 * 365 * DAY, day + DAY)["points"] == [[day, 4.5]]
+    assert store.series() == ["portfolio.value"]
+
+
+def test_queries_return_bounded_points(tmp_path):
+    """1日分の1分足を400点に間引き、長い期間は粗い区切りで読む（先頭・末尾・急変は残る）"""
+    store = TimeSeriesStore(str(tmp_path / "series.db"))
+    start = bucket_start(time.time(), DAY) - DAY
+    for minute in range(1440):
+        store.record("job.range_trading.duration", 30.0 if minute == 700 else 1.0 + (minute % 7) * 0.01,
+                     start + minute * MINUTE)
+
+    day = store.query("job.range_trading.duration", start, start + DAY - 1, max_points=400)
+    assert day["resolution"] == "1m" and len(day["points"]) == 400
+    assert day["points"][0][0] == start and day["points"][-1][0] == start + 1439 * MINUTE
+    assert [start + 700 * MINUTE, 30.0] in day["points"]
+    assert store.query("job.range_trading.duration", start, start + DAY - 1, max_points=300)["resolution"] == "1h"
+
+    x = np.arange(100_000, dtype=np.float64)
+    y = np.sin(x / 5000)
+    y[54_321] = 10.0
+    selected = lttb(x, y, 500)
+    assert len(selected) == 500 and selected[0] == 0 and selected[-1] == 99_999
+    assert np.all(np.diff(selected) > 0) and 54_321 in selected
+    assert list(lttb(x[:10], y[:10], 500)) == list(range(10))
+
+
+def test_feed_records_dashboard_values(tmp_path):
+    """ダッシュボードの確認ごとに評価額・損益・NISA枠を記録し、ジョブの実行時間は実行されたときだけ記録する"""
+    store = StateStore(str(tmp_path / "state.db"))
+    store.add_holding("dividend", "8306", 150_000.0, 100, order_id=1)
+    metrics = JobMetrics()
+    run = metrics.instrument("range_trading", lambda: None, budget_seconds=60)
+    timeseries = TimeSeriesStore(str(tmp_path / "series.db"))
+    quotes = {"8306": (1600.0, 0.0)}
+    feed = DashboardFeed(store, job_health=metrics.job_health, quotes=lambda: quotes,
+                         timeseries=timeseries, chart_points=50)
+    run()
+    feed.refresh()
+    quotes["8306"] = (1400.0, 0.0)
+    feed.refresh()
+    run()
+    feed.refresh()
+
+    assert feed.series() == {"series": ["job.range_trading.duration", "pnl.dividend", "portfolio.value"]}
+    value = feed.series("portfolio.value", aggregate="min", points=1000)
+    assert len(value["points"]) <= 2 and min(point[1] for point in value["points"]) == 140_000.0
+    assert max(point[1] for point in feed.series("pnl.dividend", aggregate="max")["points"]) == 10_000.0
+    assert feed.series("job.range_trading.duration", start=time.time() - 3 * DAY)["resolution"] == "1h"
+    assert timeseries.conn.execute(
+        "SELECT count FROM rollups WHERE series = 'job.range_trading.duration' AND resolution = ?", (DAY,)
+    ).fetchone()[0] == 2
+
+    reader = DashboardFeed(store, timeseries=TimeSeriesStore(str(tmp_path / "series.db")), record_series=False)
+    reader.refresh()
+    assert max(point[1] for point in reader.series("portfolio.value", aggregate="max")["points"]) == 160_000.0
+    assert reader.timeseries.conn.execute("SELECT SUM(count) FROM rollups WHERE resolution = ?", (DAY,)
+                                          ).fetchone()[0] == 3 + 3 + 2
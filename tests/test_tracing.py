@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+トレース（段階ごとのスパン、約定通知の結び付け、プロセス間の文脈、書き出し）のテスト
+"""
+
+import json
+import threading
+
+from src.shared_modules.tracing import (
+    Tracer, chrome_trace, duration_stats, folded_stacks, read_spans, stage_summary
+)
+
+
+def test_spans_nest_only_inside_a_trace():
+    """span() はトレースの中でだけ子スパンになり、外や無効時は何も記録しない"""
+    tracer = Tracer()
+    with tracer.span("range.price_fetch"):
+        pass
+    with Tracer(enabled=False).trace("range.monitor_stock") as span:
+        span.set(symbol="7203")
+    assert not tracer.spans
+
+    with tracer.trace("range.monitor_stock", symbol="7203") as root:
+        with tracer.span("range.history_fetch"):
+            with tracer.span("range.band_compute") as band:
+                band.set(upper=1.0)
+        try:
+            with tracer.span("ib.place_order"):
+                raise RuntimeError("拒否")
+        except RuntimeError:
+            pass
+    assert tracer.context() is None
+
+    spans = {span["name"]: span for span in tracer.spans}
+    assert {span["trace"] for span in spans.values()} == {root.trace_id}
+    assert spans["range.monitor_stock"]["parent"] is None
+    assert spans["range.history_fetch"]["parent"] == spans["range.monitor_stock"]["span"]
+    assert spans["range.band_compute"]["parent"] == spans["range.history_fetch"]["span"]
+    assert spans["range.band_compute"]["attrs"] == {"upper": 1.0}
+    assert spans["ib.place_order"]["attrs"] == {"error": "RuntimeError"}
+    assert spans["range.monitor_stock"]["duration_ns"] >= spans["range.history_fetch"]["duration_ns"]
+    assert tracer.stage_stats()["range.monitor_stock"]["count"] == 1
+
+    assert duration_stats(list(range(1_000_000, 101_000_000, 1_000_000))) == {
+        "p50": 50.0, "p90": 90.0, "p99": 99.0, "max": 100.0, "mean": 50.5}
+    assert duration_stats([]) == {}
+
+
+def test_callbacks_and_other_processes_join_the_same_trace():
+    """注文IDに結び付けた文脈へ別スレッドの受付・約定通知が加わり、渡された文脈からも続けられる"""
+    tracer = Tracer(window=2)
+    with tracer.trace("range.monitor_stock"):
+        with tracer.span("ib.send"):
+            tracer.bind(7, order_id=7)
+        context = tracer.context()
+
+    def callback():
+        assert tracer.complete(7, "ib.ack", final=False, status="Submitted")
+        assert tracer.complete(7, "ib.fill")
+        assert not tracer.complete(7, "ib.fill")
+
+    thread = threading.Thread(target=callback)
+    thread.start()
+    thread.join()
+    with tracer.resume(context):
+        with tracer.span("gateway.place_order"):
+            pass
+    with tracer.resume(None):
+        with tracer.span("gateway.place_order"):
+            pass
+
+    spans = {span["name"]: span for span in tracer.spans}
+    assert len(tracer.spans) == 5
+    assert spans["ib.fill"]["parent"] == spans["ib.send"]["span"]
+    assert spans["ib.fill"]["attrs"] == {"order_id": 7}
+    assert spans["ib.ack"]["attrs"] == {"order_id": 7, "status": "Submitted"}
+    assert spans["ib.fill"]["tid"] != spans["ib.send"]["tid"]
+    assert spans["gateway.place_order"]["parent"] == spans["range.monitor_stock"]["span"]
+    assert {span["trace"] for span in tracer.spans} == {context[0]}
+
+    for _ in range(3):
+        with tracer.trace("range.monitor_stock"):
+            pass
+    assert tracer.stage_stats()["range.monitor_stock"]["count"] == 4
+    assert len(tracer.durations["range.monitor_stock"]) == 2
+
+
+def test_exported_spans_convert_to_report_formats(tmp_path):
+    """プロセスごとの書き出しをまとめて読み、百分位の表・Chrome 形式・folded 形式にする"""
+    worker = Tracer("worker-range")
+    gateway = Tracer("gateway")
+    with worker.trace("range.monitor_stock"):
+        with worker.span("range.band_compute"):
+            pass
+        with worker.span("ib.place_order"):
+            context = worker.context()
+    with gateway.resume(context):
+        with gateway.span("ib.send"):
+            pass
+    worker.export(str(tmp_path / "worker-range.jsonl"))
+    gateway.export(str(tmp_path / "gateway.jsonl"))
+    (tmp_path / "gateway.jsonl.tmp").write_text("書き出し途中", encoding="utf-8")
+
+    spans = read_spans(str(tmp_path))
+    assert [span["name"] for span in spans] == ["range.monitor_stock", "range.band_compute", "ib.place_order",
+                                                "ib.send"]
+    assert read_spans(str(tmp_path / "missing")) == []
+
+    summary = stage_summary(spans)
+    assert summary["ib.send"]["count"] == 1
+    assert summary["range.monitor_stock"]["total"] == summary["range.monitor_stock"]["max"]
+
+    trace = json.loads(json.dumps(chrome_trace(spans)))
+    complete = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert len(complete) == 4 and complete[0]["cat"] == "range"
+    assert {event["args"]["trace"] for event in complete} == {spans[0]["trace"]}
+    assert any(event["ph"] == "M" for event in trace["traceEvents"])
+
+    stacks = [line.rsplit(" ", 1)[0] for line in folded_stacks(spans)]
+    assert stacks == ["range.monitor_stock", "range.monitor_stock;ib.place_order",
+                      "range.monitor_stock;ib.place_order;ib.send", "range.monitor_stock;range.band_compute"]
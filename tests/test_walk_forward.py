@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ウォークフォワード分析（指標の使い回し・時間予算）と高配当Botのバックテストのテスト
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.backtesting.backtest_engine import DividendBacktester, RangeBacktester, rolling_mean_std
+from src.backtesting.optimizer import ParameterSpace
+from src.backtesting.walk_forward import DividendStrategy, IndicatorCache, RangeStrategy, WalkForward
+
+
+def random_prices(n_symbols=12, n_bars=700, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_bars, n_symbols)), axis=0))
+    return pd.DataFrame(close, index=pd.bdate_range("2018-01-01", periods=n_bars),
+                        columns=[str(8000 + i) for i in range(n_symbols)])
+
+
+def flat_fundamentals(n_symbols, n_bars, dividend_yield=4.0, per=10.0):
+    return {
+        "dividend_yield": np.full((n_symbols, n_bars), dividend_yield),
+        "per": np.full((n_symbols, n_bars), per)
+    }
+
+
+def test_indicators_are_computed_once_per_window():
+    """指標は窓の長さごとに1度だけ計算され、フォールド・候補ごとの評価は単独実行と一致する"""
+    prices = random_prices()
+    range_space = ParameterSpace.parse(["bollinger_period=10,20", "bollinger_std_dev=1.5,2.0"])
+    dividend_space = ParameterSpace.parse(["ma_period=20,50", "min_dividend_yield=3.0,5.0"])
+    strategies = [
+        RangeStrategy(range_space, screen=True, min_trades=0),
+        DividendStrategy(flat_fundamentals(*prices.shape[::-1]), dividend_space)
+    ]
+    walk_forward = WalkForward(prices, strategies, train_bars=250, test_bars=100, time_budget_seconds=60)
+    assert walk_forward.folds() == [(0, 250, 250, 350), (100, 350, 350, 450), (200, 450, 450, 550),
+                                    (300, 550, 550, 650), (400, 650, 650, 700)]
+    report = walk_forward.run()
+
+    # 移動平均・標準偏差 10/20/50日 + レンジ比率 126日
+    assert walk_forward.cache.misses == 4
+    assert report.cache_windows == {"mean_std": [10, 20, 50], "range_ratio": [126]}
+    assert len(report.folds) == 10 and (report.folds["candidates"] == 4).all()
+
+    row = report.folds[report.folds["strategy"] == "range"].iloc[1]
+    close = prices.to_numpy(dtype=float).T
+    screened = RangeStrategy(range_space, screen=True).evaluate(IndicatorCache(close), 350, 450, row["params"])[0]
+    assert np.isclose(screened["total_return"], row["test_return"])
+
+    # スクリーニングなしなら切り出した窓で計算し直した結果と同じ（先読みしていない）
+    params = {"bollinger_period": 20, "bollinger_std_dev": 2.0}
+    cached, _ = RangeStrategy(range_space).evaluate(walk_forward.cache, 350, 450, params)
+    mean, std = rolling_mean_std(close, 20)
+    direct, _ = RangeBacktester(**params).evaluate(close[:, 350:450], None, (mean[:, 350:450], std[:, 350:450]))
+    assert cached == direct
+
+    equity = report.equity["range"]
+    assert equity.index[0] == prices.index[250] and equity.index[-1] == prices.index[-1]
+    assert equity.index.is_unique
+
+
+def test_run_respects_time_budget():
+    """予算を使い切ったら残りのフォールドは評価せずに報告する"""
+    prices = random_prices(n_symbols=30, n_bars=1500)
+    space = ParameterSpace.parse(["bollinger_period=5:60", "bollinger_std_dev=1.0,1.5,2.0,2.5,3.0"])
+    walk_forward = WalkForward(prices, [RangeStrategy(space, min_trades=0)], train_bars=500, test_bars=100,
+                               time_budget_seconds=1.0)
+    start = time.perf_counter()
+    report = walk_forward.run()
+    assert time.perf_counter() - start < 3.0
+    assert len(report.folds) + report.skipped_folds == len(walk_forward.folds())
+    assert (report.folds["candidates"] < len(space.grid())).all()
+    assert "sharpe" in report.summary()
+
+
+def test_dividend_backtester_buys_highest_yield_below_moving_average():
+    """移動平均割れの候補から利回りの高い順に1日1銘柄買い、保有上限で止まる"""
+    n_bars = 40
+    close = np.full((4, n_bars), 1000.0)
+    close[:, 30:] = 900.0
+    dividend_yield = np.array([[4.0], [6.0], [5.0], [2.0]]) * np.ones(n_bars)
+    per = np.array([[10.0], [10.0], [30.0], [10.0]]) * np.ones(n_bars)
+
+    backtester = DividendBacktester(max_holding_stocks=2, ma_period=10, purchase_amount=90000, accrue_dividends=False)
+    trades = backtester.simulate(close, dividend_yield, per)
+    # 2: PERが高い、3: 利回りが低い → 1（6%）, 0（4%）の順
+    assert trades["symbol"].tolist() == [1, 0]
+    assert trades["entry"].tolist() == [30, 31]
+    assert np.allclose(trades["quantity"], 100)
+
+    metrics, equity = backtester.evaluate(close, dividend_yield, per)
+    assert metrics["open_positions"] == 2
+    assert equity[-1] == backtester.initial_cash
+
+
+def test_dividend_thresholds_come_from_config():
+    """config.yaml の dividend_bot の既定値は Bot の従来の固定値（= バックテスターの既定値）と同じ"""
+    from src.shared_modules.config_loader import ConfigLoader
+
+    settings = ConfigLoader("src/config/config.yaml", env_path="/nonexistent/.env").settings.dividend_bot
+    assert DividendBacktester.from_settings(settings).params() == DividendBacktester().params()
+    assert (settings.min_dividend_yield, settings.min_equity_ratio, settings.max_per) == (3.5, 40.0, 25)
+    assert (settings.ma_period, settings.purchase_amount) == (25, 50000)